@@ -1,10 +1,157 @@
+from __future__ import annotations
+from logging.handlers import QueueHandler, QueueListener
+
+import copy
+import datetime
+import glob
+import heapq
+import json
 import logging
+import os
+import queue
+
+from plugins.test_context import current_nodeid, worker_id
+
+# Loggers of the libraries, too chatty at INFO for the project log
+DEFAULT_LEVELS = {"selenium": "WARNING", "urllib3": "WARNING", "websocket": "WARNING"}
+
+
+class ContextFilter(logging.Filter):
+    """
+    Tag the records with the test being run and the xdist worker. Runs in the thread that logs, where the current
+    test is known
+    """
+    def filter(self, record):
+        record.nodeid = current_nodeid()
+        record.worker = worker_id()
+        return True
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler doing the minimum in the logging thread: the %-style message is merged with its arguments,
+    the JSON encoding and the file write are left to the listener thread
+    """
+    def prepare(self, record):
+        # The arguments are merged here, not in the listener, in case they are modified after the call
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, message, test node id and worker
+    """
+    def format(self, record):
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="microseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "nodeid": getattr(record, "nodeid", None),
+            "worker": getattr(record, "worker", None)
+        }
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry)
+
+
+class LogPipeline:
+    """
+    Logging of one process: the root logger puts the records in a queue, a background thread writes them as JSON
+    lines to the file of the process. A test never waits for the disk
+    """
+    def __init__(self, path, level="INFO", levels=None):
+        """
+        :param path: JSON lines file written by this process
+        :param level: level of the root logger
+        :param levels: level per logger name, e.g. {"pages.page_base": "DEBUG"}
+        """
+        self.path = path
+        self.level = level
+        self.levels = dict(DEFAULT_LEVELS, **(levels or {}))
+        self._queue = queue.SimpleQueue()
+        self._handler = DeferredQueueHandler(self._queue)
+        self._handler.addFilter(ContextFilter())
+        self._listener = None
+        self._file_handler = None
+        self._previous_levels = {}
+
+    def start(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file_handler = logging.FileHandler(self.path, mode="a", encoding="utf-8", delay=True)
+        self._file_handler.setFormatter(JsonFormatter())
+        self._listener = QueueListener(self._queue, self._file_handler)
+        self._listener.start()
+
+        logging.getLogger().addHandler(self._handler)
+        for name, level in [(None, self.level), *self.levels.items()]:
+            logger = logging.getLogger(name)
+            self._previous_levels[name] = logger.level
+            logger.setLevel(level)
+        return self
+
+    def stop(self):
+        """
+        Write the records still in the queue and close the file
+        """
+        if self._listener is None:
+            return
+        logging.getLogger().removeHandler(self._handler)
+        for name, level in self._previous_levels.items():
+            logging.getLogger(name).setLevel(level)
+        self._listener.stop()
+        self._file_handler.close()
+        self._listener = None
+
+
+def parse_levels(specs) -> dict:
+    """
+    :param specs: MODULE=LEVEL strings, e.g. pages.page_base=DEBUG
+    :return: level per logger name
+    """
+    levels = {}
+    for spec in specs or []:
+        name, separator, level = spec.partition("=")
+        if not separator or logging.getLevelName(level.upper()) == f"Level {level.upper()}":
+            raise ValueError(f"Invalid logger level {spec}, expected MODULE=LEVEL like pages.page_base=DEBUG")
+        levels[name] = level.upper()
+    return levels
+
+
+def worker_log_path(log_path, worker) -> str:
+    stem, extension = os.path.splitext(log_path)
+    return f"{stem}.{worker}{extension}"
+
+
+def merge_worker_logs(log_path) -> int:
+    """
+    Append the per-worker files to the log file in time order and remove them
 
-# Set up logging
-logging.basicConfig(
-    filename='pyselenium_project_log.txt',  # Specify the log file name
-    filemode='a',  # Append to the file instead of overwriting ('w' for overwrite)
-    # Formatting the logging msg: timestamp - severity level - message
-    format='%(asctime)s - %(levelname)s - %(message)s',  # Log message format
-    level=logging.INFO  # Log level
-)
\ No newline at end of file
+    :param log_path: the merged JSON lines file
+    :return: number of lines merged
+    """
+    worker_paths = sorted(glob.glob(worker_log_path(log_path, "*")))
+    if not worker_paths:
+        return 0
+    files = [open(path, encoding="utf-8") for path in worker_paths]
+    merged = 0
+    try:
+        # Each worker file is already in time order
+        with open(log_path, "a", encoding="utf-8") as log_file:
+            for line in heapq.merge(*files, key=lambda line: json.loads(line)["time"]):
+                log_file.write(line)
+                merged += 1
+    finally:
+        for worker_file in files:
+            worker_file.close()
+    for path in worker_paths:
+        os.remove(path)
+    return merged
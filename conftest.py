@@ -0,0 +1,162 @@
+import pytest
+
+import functools
+import logging
+
+import settings
+from drivers import browser_daemon, driver_factory, remote_connection, storage_state
+from pages import page_shopping_items
+from standin.server import SwagLabsServer
+
+logger = logging.getLogger(__name__)
+
+pytest_plugins = [
+    "plugins.test_context",
+    "plugins.plugin_logging",
+    "plugins.plugin_timing",
+    "plugins.plugin_scheduler",
+    "plugins.plugin_artifacts",
+    "plugins.plugin_datasets",
+    "plugins.plugin_watchdog",
+    "plugins.plugin_performance",
+    "plugins.plugin_selection",
+    "plugins.plugin_reruns",
+    "plugins.plugin_visual",
+    # Runs pytest sessions for the tests of the plugins
+    "pytester"
+]
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("pyselenium", "application under test")
+    group.addoption("--target", choices=("live", "standin"), default=None,
+                    help="run against the real Swag Labs site or the bundled local stand-in (default: app.target in config.json)")
+    group.addoption("--standin-latency", type=float, default=None,
+                    help="seconds added to every request served by the stand-in")
+    group.addoption("--standin-jitter", type=float, default=None,
+                    help="maximum random seconds added to or removed from the stand-in latency")
+    group.addoption("--driver-profile", default=None,
+                    help="driver profile of config.json: page load strategy, blocked urls and resource types "
+                         "(default: driver.profile in config.json)")
+    group.addoption("--remote-url", default=None,
+                    help="run the browsers on a Selenium Grid or remote WebDriver server, e.g. http://grid:4444 "
+                         "(default: remote.url in config.json, none: local Chrome)")
+    group.addoption("--browser-daemon", action="store_true", default=None,
+                    help="attach the session browser to a Chrome kept running between runs by a daemon, started on "
+                         "the first run (default: browser_daemon.enabled in config.json)")
+    group.addoption("--execution-mode", choices=("pool", "contexts"), default=None,
+                    help="pool: warm browsers reused between tests. contexts: one shared Chrome process, "
+                         "one isolated browser context per test (default: execution.mode in config.json)")
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "cart_state(*items): slugs of the items in the cart when the test starts (e.g. sauce-labs-backpack). "
+        "Used by the cart_state fixture"
+    )
+    if config.getoption("execution_mode") is None:
+        config.option.execution_mode = settings.get_section("execution", {"mode": "pool"})["mode"]
+
+
+# Fixtures shared by all the test suites. The browser fixtures stay in the conftest.py of each suite
+@pytest.fixture(scope="session")
+def base_url(request):
+    """
+    Url of the application under test.
+    With the standin target a local copy of Swag Labs is served for the whole session (one server per xdist worker)
+    """
+    app_config = settings.get_section("app", {"target": "live", "base_url": "https://www.saucedemo.com/"})
+    target = request.config.getoption("target") or app_config["target"]
+    if target == "live":
+        yield app_config["base_url"]
+        return
+
+    standin_config = settings.get_section("standin", {"host": "127.0.0.1", "port": 0, "latency": 0.0, "jitter": 0.0})
+    latency = request.config.getoption("standin_latency")
+    jitter = request.config.getoption("standin_jitter")
+    with SwagLabsServer(
+        host=standin_config["host"],
+        port=standin_config["port"],
+        latency=standin_config["latency"] if latency is None else latency,
+        jitter=standin_config["jitter"] if jitter is None else jitter
+    ) as server:
+        yield server.url
+
+
+@pytest.fixture(scope="session")
+def driver_profile(request):
+    """
+    Name of the driver profile used by the browser fixtures, see drivers/driver_factory.py
+    """
+    return driver_factory.profile_name(request.config.getoption("driver_profile"))
+
+
+@pytest.fixture(scope="session")
+def remote_url(request):
+    """
+    Url of the remote WebDriver server the browser fixtures create their sessions on, None for a local Chrome.
+    The sessions of the process share a pool of keep-alive connections to the server, see drivers/remote_connection.py
+    """
+    url = driver_factory.remote_url(request.config.getoption("remote_url"))
+
+    yield url
+
+    if url:
+        logger.info("Remote WebDriver connections: %s", remote_connection.pool_stats())
+        remote_connection.close_pools()
+
+
+@pytest.fixture(scope="session")
+def driver_launcher(request, driver_profile, remote_url):
+    """
+    Callable launching the session browsers. With --browser-daemon it attaches to the browser a daemon keeps
+    running between runs instead, and falls back to a new browser when the daemon can't be used, see
+    drivers/browser_daemon.py. Hand the browser back with browser_daemon.release() instead of quitting it
+    """
+    daemon_config = settings.get_section("browser_daemon", browser_daemon.DEFAULT_CONFIG)
+    use_daemon = request.config.getoption("browser_daemon")
+    use_daemon = daemon_config["enabled"] if use_daemon is None else use_daemon
+    if not use_daemon or remote_url:
+        return functools.partial(driver_factory.create_driver, driver_profile, remote_url)
+    daemon = browser_daemon.BrowserDaemon(
+        str(request.config.cache.mkdir("browser_daemon")),
+        profile=driver_profile,
+        idle_timeout=daemon_config["idle_timeout"],
+        startup_timeout=daemon_config["startup_timeout"]
+    )
+    return daemon.driver
+
+
+@pytest.fixture
+def cart_state(request, browser):
+    """
+    Cart the test starts with, declared with @pytest.mark.cart_state("sauce-labs-backpack", ...). Without the marker
+    the cart is empty. The cart is written directly in the client-side storage of the application, so the test
+    doesn't depend on the items added by the tests run before it. Request it after the login fixture
+
+    :return: the PageCart of the page with the seeded cart
+    """
+    marker = request.node.get_closest_marker("cart_state")
+    page_cart = page_shopping_items.PageCart(browser)
+    page_cart.set_cart_contents(marker.args if marker else ())
+    # The seeding reloaded the inventory page, its loading performance is checked against the PageCart budgets
+    page_cart.record_page_performance()
+    return page_cart
+
+
+@pytest.fixture(scope="session")
+def storage_state_cache(request, base_url):
+    """
+    Authenticated storage state captured once through the login form and injected in the other drivers.
+    The state files are kept in the pytest cache directory, shared by the xdist workers
+    """
+    credentials = settings.get_section("credentials", {"username": "standard_user", "password": "secret_sauce"})
+    state_config = settings.get_section("storage_state", {"ttl": 540})
+    return storage_state.StorageStateCache(
+        cache_dir=str(request.config.cache.mkdir("storage_state")),
+        base_url=base_url,
+        username=credentials["username"],
+        password=credentials["password"],
+        ttl=state_config["ttl"]
+    )
@@ -0,0 +1 @@
+# Browser lifecycle helpers shared by the test fixtures
\ No newline at end of file
@@ -0,0 +1,215 @@
+from __future__ import annotations
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+import itertools
+import json
+import os
+import threading
+import time
+import logging
+
+import websocket
+
+from drivers import driver_factory
+from drivers.chrome_process import ChromeProcess, debugger_version, kill_pid, pid_alive
+from drivers.lock_file import LockFile
+from plugins.test_context import worker_id
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserCdp:
+    """
+    Connection to the browser-level DevTools endpoint. Browser contexts can only be created and disposed there,
+    the CDP commands sent through WebDriver go to the current page instead.
+    """
+    def __init__(self, debugger_address, timeout=10):
+        version = debugger_version(debugger_address)
+        if version is None:
+            raise RuntimeError(f"No Chrome debugging endpoint on {debugger_address}")
+        self._socket = websocket.create_connection(version["webSocketDebuggerUrl"], timeout=timeout, suppress_origin=True)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def send(self, method, params=None) -> dict:
+        """
+        Send a CDP command and wait for its answer. Events received meanwhile are ignored
+
+        :param method: CDP method, e.g. Target.createBrowserContext
+        :param params: parameters of the method
+        :return: the result of the command
+        """
+        with self._lock:
+            command_id = next(self._ids)
+            self._socket.send(json.dumps({"id": command_id, "method": method, "params": params or {}}))
+            while True:
+                message = json.loads(self._socket.recv())
+                if message.get("id") != command_id:
+                    continue
+                if "error" in message:
+                    raise RuntimeError(f"{method} failed: {message['error']}")
+                return message.get("result", {})
+
+    def close(self):
+        self._socket.close()
+
+
+class BrowserContext:
+    """
+    An isolated browser context (own cookie jar and web storage) with the tab opened in it
+    """
+    def __init__(self, context_id, target_id):
+        self.context_id = context_id
+        self.target_id = target_id
+
+
+class BrowserContextHost:
+    """
+    A WebDriver session attached to a shared Chrome process, handing out one isolated browser context per test.
+
+    Opening a context costs a new tab instead of a new Chrome process. The driver is switched to the tab of the
+    context, so tests keep using the regular driver API.
+    """
+    def __init__(self, debugger_address, profile=None):
+        """
+        :param debugger_address: host:port of the Chrome remote debugging endpoint
+        :param profile: driver profile (page load strategy and blocked urls), see driver_factory.get_profile()
+        """
+        self.profile = profile or driver_factory.get_profile()
+        # Chrome is already running, only the options of the WebDriver session apply
+        options = Options()
+        options.debugger_address = debugger_address
+        options.page_load_strategy = self.profile["page_load_strategy"]
+        options.set_capability("goog:loggingPrefs", {"browser": "ALL"})
+        self.driver = webdriver.Chrome(options=options)
+        self.cdp = BrowserCdp(debugger_address)
+        # Every attached session sees all the tabs of the shared Chrome: each worker parks its driver on its own tab
+        self.home_target_id = self.cdp.send("Target.createTarget", {"url": "about:blank"})["targetId"]
+        self.home_handle = self._wait_for_handle(self.home_target_id)
+        self.driver.switch_to.window(self.home_handle)
+
+    def open_context(self, url) -> BrowserContext:
+        """
+        Create an isolated browser context with one tab on the url and switch the driver to it
+
+        :param url: page opened in the new tab
+        :return: the created context
+        """
+        context_id = self.cdp.send("Target.createBrowserContext", {"disposeOnDetach": True})["browserContextId"]
+        target_id = self.cdp.send("Target.createTarget", {"url": "about:blank", "browserContextId": context_id})["targetId"]
+        self._wait_for_handle(target_id)
+        self.driver.switch_to.window(target_id)
+        # The url blocking of the profile is set per tab
+        driver_factory.apply_network_profile(self.driver, self.profile)
+        self.driver.get(url)
+        return BrowserContext(context_id, target_id)
+
+    def close_context(self, context):
+        """
+        Close the tab of a context and drop its cookies and storage
+
+        :param context: context returned by open_context()
+        """
+        try:
+            self.cdp.send("Target.closeTarget", {"targetId": context.target_id})
+            self.cdp.send("Target.disposeBrowserContext", {"browserContextId": context.context_id})
+        finally:
+            self.driver.switch_to.window(self.home_handle)
+
+    def close(self):
+        # Quitting a session attached through debuggerAddress leaves the shared Chrome running
+        try:
+            self.cdp.send("Target.closeTarget", {"targetId": self.home_target_id})
+        finally:
+            self.cdp.close()
+            self.driver.quit()
+
+    def _wait_for_handle(self, target_id, timeout=5) -> str:
+        """
+        Wait for ChromeDriver to list a new tab. Its window handles are the target ids, and only the exact id is
+        accepted: the other tabs showing up meanwhile belong to the other workers
+
+        :param target_id: CDP target id of the tab
+        :param timeout: seconds to wait
+        :return: the window handle of the tab
+        """
+        deadline = time.monotonic() + timeout
+        while target_id not in self.driver.window_handles:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"The tab {target_id} didn't show up in the window handles within {timeout}s")
+            time.sleep(0.05)
+        return target_id
+
+
+class SharedChromeProcess:
+    """
+    One Chrome process shared by all the pytest-xdist workers of a run.
+
+    The first worker launches Chrome and writes its debugging address to a state file. The other workers
+    attach to it and keep a reference count in the same file, protected by a lock file. The last worker to
+    release it stops Chrome.
+    """
+    def __init__(self, state_dir, headless=True, lock_timeout=60):
+        """
+        :param state_dir: directory shared by the workers, e.g. a pytest cache directory
+        :param headless: start Chrome without a window
+        :param lock_timeout: seconds to wait for the lock file
+        """
+        self.state_path = os.path.join(state_dir, "shared_chrome.json")
+        self.lock_path = os.path.join(state_dir, "shared_chrome.lock")
+        self.headless = headless
+        self.lock_timeout = lock_timeout
+        self._process = None
+
+    def acquire(self) -> str:
+        """
+        Get the debugging address of the shared Chrome, launching it if no healthy one is running
+
+        :return: host:port of the Chrome remote debugging endpoint
+        """
+        with self._locked():
+            state = self._read_state()
+            if state is None or debugger_version(state["address"]) is None:
+                self._process = ChromeProcess(headless=self.headless).start()
+                state = {"address": self._process.debugger_address, "pid": self._process.pid,
+                         "user_data_dir": self._process.user_data_dir, "users": 0}
+                logger.info("Worker %s launched the shared Chrome on %s", worker_id(), state['address'])
+            state["users"] += 1
+            self._write_state(state)
+            return state["address"]
+
+    def release(self):
+        """
+        Drop this worker's reference. The last reference stops Chrome
+        """
+        with self._locked():
+            state = self._read_state()
+            if state is None:
+                return
+            state["users"] -= 1
+            if state["users"] > 0:
+                self._write_state(state)
+                return
+            os.remove(self.state_path)
+
+        if self._process is not None:
+            self._process.stop()
+        elif pid_alive(state["pid"]):
+            # Launched by a worker that already finished
+            kill_pid(state["pid"])
+        logger.info("Worker %s stopped the shared Chrome on %s", worker_id(), state['address'])
+
+    def _read_state(self) -> dict | None:
+        try:
+            with open(self.state_path, encoding="utf-8") as state_file:
+                return json.load(state_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write_state(self, state):
+        with open(self.state_path, "w", encoding="utf-8") as state_file:
+            json.dump(state, state_file)
+
+    def _locked(self):
+        return LockFile(self.lock_path, self.lock_timeout)
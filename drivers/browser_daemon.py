@@ -0,0 +1,325 @@
+from __future__ import annotations
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import logging
+
+from drivers import driver_factory, driver_instrumentation
+from drivers.chrome_process import kill_pid, pid_alive
+from drivers.lock_file import LockFile
+from drivers.driver_pool import clear_browser_state
+from plugins.test_context import worker_id
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# pytest cache directory of the state files when the daemon is managed from the command line
+DEFAULT_STATE_DIR = os.path.join(".pytest_cache", "d", "browser_daemon")
+
+# Values used for the keys the browser_daemon section of config.json doesn't set
+DEFAULT_CONFIG = {
+    "enabled": False,
+    "idle_timeout": 900,
+    "startup_timeout": 30
+}
+
+# Seconds between two checks of the state file by the daemon, and between two health checks of its idle session
+POLL_INTERVAL = 1.0
+HEALTH_INTERVAL = 10.0
+
+
+class AttachedDriver(webdriver.Remote):
+    """
+    Driver attached to the session of a browser daemon instead of creating its own session.
+    detach() gives the browser back to the daemon for the next run. quit() ends the session and stops the daemon
+    """
+    def __init__(self, daemon, state):
+        """
+        :param daemon: BrowserDaemon the session belongs to
+        :param state: state written by the daemon: executor url, session id and capabilities
+        """
+        self._daemon = daemon
+        self._session = state
+        super().__init__(command_executor=state["executor_url"], options=webdriver.ChromeOptions())
+
+    def start_session(self, capabilities):
+        # Called by the Remote constructor: take over the existing session instead of requesting a new one
+        self.session_id = self._session["session_id"]
+        self.caps = self._session["capabilities"]
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        return self.execute("executeCdpCommand", {"cmd": cmd, "params": cmd_args})["value"]
+
+    def detach(self):
+        """
+        Leave the browser running for the next run
+        """
+        self._daemon.release()
+
+    def quit(self):
+        try:
+            super().quit()
+        finally:
+            self._daemon.stop()
+
+
+class BrowserDaemon:
+    """
+    A browser kept running between pytest invocations, so that re-running a test doesn't launch Chrome again.
+
+    The daemon is a background process owning a chromedriver and one WebDriver session, started by this client when
+    none is running. It writes the address of chromedriver and the session id to a state file, and the next runs
+    attach to that session instead of creating one: no chromedriver nor Chrome startup, and a warm HTTP cache. The
+    daemon exits after idle_timeout seconds without a run attached, or when its session dies. Each xdist worker has
+    its own daemon. From the project root, `python -m drivers.browser_daemon status` lists them and `stop` stops them
+    """
+    def __init__(self, state_dir, profile=None, idle_timeout=900, startup_timeout=30):
+        """
+        :param state_dir: directory of the state files, e.g. a pytest cache directory
+        :param profile: driver profile of the browser. A daemon running another profile is replaced
+        :param idle_timeout: seconds the daemon keeps the browser once no run is attached
+        :param startup_timeout: seconds to wait for a new daemon to open its session
+        """
+        self.state_path = os.path.join(state_dir, f"daemon-{worker_id()}.json")
+        self.lock_path = self.state_path + ".lock"
+        self.log_path = os.path.join(state_dir, f"daemon-{worker_id()}.log")
+        self.profile = driver_factory.profile_name(profile)
+        self.idle_timeout = idle_timeout
+        self.startup_timeout = startup_timeout
+        self._process = None
+
+    def driver(self):
+        """
+        Attach to the daemon browser, with its cookies and web storage cleared. Falls back to launching a regular
+        driver when the daemon is used by another run, can't be started or doesn't answer
+
+        :return: selenium web driver
+        """
+        try:
+            driver = self.attach()
+        except Exception as e:
+            logger.warning("Couldn't attach to the browser daemon, launching a new browser. Exception: %s", e)
+            driver = None
+        return driver or driver_factory.create_driver(self.profile)
+
+    def attach(self) -> AttachedDriver | None:
+        """
+        :return: a driver attached to the daemon session, None when the daemon is used by another run
+        """
+        with LockFile(self.lock_path, self.startup_timeout + 10):
+            state = read_state(self.state_path)
+            if state is not None and (state["profile"] != self.profile or not pid_alive(state["pid"])):
+                logger.info("Replacing the browser daemon %s of profile %s", state["pid"], state["profile"])
+                self._terminate(state)
+                state = None
+            if state is not None and state.get("owner") and state["owner"] != os.getpid() and pid_alive(state["owner"]):
+                logger.info("The browser daemon is used by the run of process %s", state["owner"])
+                return None
+            if state is None:
+                state = self._spawn()
+            state["owner"] = os.getpid()
+            state["last_used"] = time.time()
+            write_state(self.state_path, state)
+
+        start = time.monotonic()
+        driver = AttachedDriver(self, state)
+        try:
+            # Health check, then the state of the previous run is dropped
+            driver.current_url
+            clear_browser_state(driver)
+        except WebDriverException as e:
+            logger.warning("The browser daemon session doesn't answer, stopping it. Exception: %s", e)
+            self.stop()
+            return None
+        driver_instrumentation.instrument(driver)
+        logger.info("Attached to the browser daemon %s in %.2fs", state["pid"], time.monotonic() - start)
+        return driver
+
+    def release(self):
+        """
+        Mark the daemon browser free, its idle timeout starts now
+        """
+        with LockFile(self.lock_path, self.startup_timeout + 10):
+            state = read_state(self.state_path)
+            if state is None or state.get("owner") != os.getpid():
+                return
+            state["owner"] = None
+            state["last_used"] = time.time()
+            write_state(self.state_path, state)
+        logger.info("Browser daemon %s released, idle timeout %ss", state["pid"], self.idle_timeout)
+
+    def stop(self):
+        """
+        Stop the daemon and its browser
+        """
+        with LockFile(self.lock_path, self.startup_timeout + 10):
+            state = read_state(self.state_path)
+            if state is not None:
+                self._terminate(state)
+
+    def _spawn(self) -> dict:
+        command = [sys.executable, "-m", "drivers.browser_daemon", "serve", "--state", self.state_path,
+                   "--profile", self.profile, "--idle-timeout", str(self.idle_timeout)]
+        with open(self.log_path, "a", encoding="utf-8") as log_file:
+            # Its own session: the daemon outlives the pytest process and isn't hit by its Ctrl+C
+            process = self._process = subprocess.Popen(command, cwd=PROJECT_ROOT, stdin=subprocess.DEVNULL, stdout=log_file,
+                                       stderr=subprocess.STDOUT, start_new_session=True)
+        deadline = time.monotonic() + self.startup_timeout
+        while True:
+            state = read_state(self.state_path)
+            if state is not None and state["pid"] == process.pid:
+                logger.info("Started the browser daemon %s, profile %s", process.pid, self.profile)
+                return state
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError(f"The browser daemon didn't start within {self.startup_timeout}s, see {self.log_path}")
+            time.sleep(0.1)
+
+    def _terminate(self, state):
+        kill_pid(state["pid"])
+        if self._process is not None and self._process.pid == state["pid"]:
+            # Started by this process: reap it, it would stay a zombie otherwise
+            try:
+                self._process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        deadline = time.monotonic() + 10
+        while pid_alive(state["pid"]) and time.monotonic() < deadline:
+            time.sleep(0.1)
+        # Left behind when the daemon was killed
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+
+
+def release(driver):
+    """
+    Teardown of a browser fixture: give a daemon browser back for the next run, quit any other driver
+
+    :param driver: driver created by BrowserDaemon.driver() or driver_factory.create_driver()
+    """
+    detach = getattr(driver, "detach", None)
+    if detach is not None:
+        detach()
+    else:
+        driver.quit()
+
+
+def read_state(path) -> dict | None:
+    try:
+        with open(path, encoding="utf-8") as state_file:
+            return json.load(state_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def write_state(path, state):
+    # Written aside and renamed, the daemon reads it without taking the lock
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as state_file:
+        json.dump(state, state_file)
+    os.replace(temporary_path, path)
+
+
+def serve(state_path, driver_factory_function, idle_timeout, profile=None, poll_interval=POLL_INTERVAL,
+          health_interval=HEALTH_INTERVAL):
+    """
+    Daemon side: open a session, publish it in the state file and keep it until it is idle for idle_timeout seconds
+
+    :param state_path: state file read by the BrowserDaemon clients
+    :param driver_factory_function: callable with no arguments returning a new local webdriver
+    :param idle_timeout: seconds without an attached run after which the daemon exits
+    :param profile: driver profile name of the browser, checked by the clients
+    :param poll_interval: seconds between two reads of the state file
+    :param health_interval: seconds between two health checks of the session while no run is attached
+    """
+    driver = driver_factory_function()
+    state = {
+        "pid": os.getpid(),
+        "profile": profile,
+        "executor_url": driver.service.service_url,
+        "session_id": driver.session_id,
+        "capabilities": driver.caps,
+        "owner": None,
+        "started": time.time(),
+        "last_used": time.time()
+    }
+    write_state(state_path, state)
+    logger.info("Browser daemon serving session %s on %s", driver.session_id, state["executor_url"])
+
+    last_health_check = time.monotonic()
+    try:
+        while True:
+            time.sleep(poll_interval)
+            state = read_state(state_path)
+            if state is None or state["pid"] != os.getpid():
+                logger.info("State file removed, exiting")
+                return
+            attached = state.get("owner") and pid_alive(state["owner"])
+            if not attached and time.time() - state["last_used"] > idle_timeout:
+                logger.info("Idle for %ss, exiting", idle_timeout)
+                return
+            if not attached and time.monotonic() - last_health_check > health_interval:
+                last_health_check = time.monotonic()
+                try:
+                    driver.current_url
+                except WebDriverException as e:
+                    logger.warning("Session lost, exiting. Exception: %s", e)
+                    return
+    finally:
+        state = read_state(state_path)
+        if state is not None and state["pid"] == os.getpid():
+            os.remove(state_path)
+        try:
+            driver.quit()
+        except WebDriverException as e:
+            logger.warning("Error while quitting the daemon driver. Exception: %s", e)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Browser kept running between pytest invocations")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="run a daemon, started by the fixtures")
+    serve_parser.add_argument("--state", required=True, help="state file of the daemon")
+    serve_parser.add_argument("--profile", default=None, help="driver profile of config.json")
+    serve_parser.add_argument("--idle-timeout", type=float, default=DEFAULT_CONFIG["idle_timeout"])
+    for name, description in (("status", "list the running daemons"), ("stop", "stop the running daemons")):
+        command_parser = commands.add_parser(name, help=description)
+        command_parser.add_argument("--state-dir", default=DEFAULT_STATE_DIR, help="directory of the state files")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+        # SIGTERM from stop() or a replacing client: quit the browser on the way out
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+        serve(args.state, lambda: driver_factory.create_driver(args.profile), args.idle_timeout,
+              driver_factory.profile_name(args.profile))
+        return
+
+    state_files = sorted(name for name in os.listdir(args.state_dir) if name.endswith(".json")) \
+        if os.path.isdir(args.state_dir) else []
+    for name in state_files:
+        state = read_state(os.path.join(args.state_dir, name))
+        if state is None:
+            continue
+        if args.command == "status":
+            owner = f"attached to {state['owner']}" if state.get("owner") else \
+                f"idle for {time.time() - state['last_used']:.0f}s"
+            print(f"{name}: pid {state['pid']}, profile {state['profile']}, {owner}")
+        else:
+            kill_pid(state["pid"])
+            print(f"{name}: stopped {state['pid']}")
+    if not state_files:
+        print("No browser daemon running")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+from __future__ import annotations
+from datetime import datetime, timezone
+from selenium.common.exceptions import WebDriverException
+
+import json
+import os
+import threading
+import time
+import logging
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from plugins.test_context import worker_id
+
+logger = logging.getLogger(__name__)
+
+# Values used for the keys the watchdog section of config.json doesn't set. A None threshold is not checked
+DEFAULT_CONFIG = {
+    "enabled": True,
+    # Sample every N tests, the JS heap costs a WebDriver call
+    "every": 1,
+    "rss_mb": 2048,
+    "js_heap_mb": 512,
+    "cpu_percent": None,
+    "max_tests": None,
+    "series": "reports/browser_metrics.jsonl"
+}
+
+# performance.memory is Chrome only, and rounded unless Chrome runs with --enable-precise-memory-info
+JS_HEAP_SCRIPT = "return window.performance.memory ? window.performance.memory.usedJSHeapSize : null;"
+
+
+class RecyclingDriver:
+    """
+    Stands for a web driver that can be replaced by a fresh one while the tests keep their reference to it.
+
+    Every attribute is read from the current driver. recycle() quits it, creates a new one and runs the recycle
+    hooks registered by the fixtures to bring it back to their state, e.g. the start page and the login.
+    Elements found before a recycle belong to the old driver and can't be used anymore.
+    When no new browser can be started the proxy is left without a driver: the tests using it fail on a
+    WebDriverException telling why, instead of sending their commands to the browser already quit
+    """
+    def __init__(self, driver_factory):
+        """
+        :param driver_factory: callable with no arguments returning a new webdriver instance
+        """
+        self._factory = driver_factory
+        self.driver = driver_factory()
+        self.recycle_hooks = []
+        self.recycles = 0
+        self.failure = None
+
+    def __getattr__(self, name):
+        # Only called for the attributes not set on the proxy itself
+        driver = self.__dict__.get("driver")
+        if driver is not None:
+            return getattr(driver, name)
+        failure = self.__dict__.get("failure")
+        if failure is None or name.startswith("_"):
+            raise AttributeError(name)
+        raise WebDriverException(f"The browser was recycled and no new one could be started: {failure}")
+
+    def recycle(self):
+        """
+        Replace the browser by a new one, quitting the old one first to give its memory back
+
+        :raises WebDriverException: the new browser couldn't be started. The next recycle tries again
+        """
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except WebDriverException as e:
+                logger.warning("Error while quitting the recycled driver. Exception: %s", e)
+            self.driver = None
+        try:
+            self.driver = self._factory()
+        except Exception as e:
+            self.failure = e
+            logger.error("Couldn't start a new browser to replace the recycled one. Exception: %s", e)
+            raise WebDriverException(f"Couldn't start a new browser to replace the recycled one: {e}") from e
+        self.failure = None
+        self.recycles += 1
+        for hook in self.recycle_hooks:
+            hook(self)
+
+    def quit(self):
+        # Nothing to quit when the recycle couldn't start a new browser
+        if self.driver is not None:
+            self.driver.quit()
+
+
+def process_tree(driver) -> list:
+    """
+    :return: psutil processes of a local driver: chromedriver, the browser and its renderers. Empty for a
+        remote driver or without psutil
+    """
+    service_process = getattr(getattr(driver, "service", None), "process", None)
+    if psutil is None or service_process is None:
+        return []
+    try:
+        root = psutil.Process(service_process.pid)
+        return [root, *root.children(recursive=True)]
+    except psutil.NoSuchProcess:
+        return []
+
+
+def js_heap_size(driver) -> int | None:
+    """
+    Used JS heap of the current page, in bytes
+
+    :return: the heap size, None when the browser doesn't tell
+    """
+    try:
+        if hasattr(driver, "execute_cdp_cmd"):
+            return int(driver.execute_cdp_cmd("Runtime.getHeapUsage", {})["usedSize"])
+        return driver.execute_script(JS_HEAP_SCRIPT)
+    except (WebDriverException, KeyError) as e:
+        logger.debug("Couldn't read the JS heap size. Exception: %s", e)
+        return None
+
+
+class BrowserWatchdog:
+    """
+    Samples the resources of a browser between tests, appends them to a JSON lines time series and recycles the
+    browser when a threshold is crossed: process tree RSS, JS heap, CPU since the previous sample, or tests
+    served
+    """
+    def __init__(self, driver, config=None):
+        """
+        :param driver: RecyclingDriver to watch
+        :param config: watchdog section of config.json, merged over DEFAULT_CONFIG
+        """
+        self.driver = driver
+        self.config = dict(DEFAULT_CONFIG, **(config or {}))
+        self.tests = 0
+        self.samples = 0
+        self._last_cpu = None
+        self._series = None
+        self._lock = threading.Lock()
+        if self.config["series"]:
+            os.makedirs(os.path.dirname(os.path.abspath(self.config["series"])), exist_ok=True)
+            self._series = open(self.config["series"], "a", encoding="utf-8")
+
+    def sample(self) -> dict:
+        """
+        Read the resources used by the browser
+
+        :return: dict with rss_mb and cpu_percent (None for a remote browser or without psutil) and js_heap_mb
+            (None when the browser doesn't tell)
+        """
+        rss = cpu_time = None
+        processes = process_tree(self.driver.driver)
+        if processes:
+            rss = cpu_time = 0
+            for process in processes:
+                try:
+                    rss += process.memory_info().rss
+                    times = process.cpu_times()
+                    cpu_time += times.user + times.system
+                except psutil.NoSuchProcess:
+                    # A renderer that went away while the tree was read
+                    continue
+
+        cpu_percent = None
+        now = time.monotonic()
+        if cpu_time is not None:
+            if self._last_cpu is not None and now > self._last_cpu[0]:
+                cpu_percent = max(0.0, (cpu_time - self._last_cpu[1]) / (now - self._last_cpu[0]) * 100)
+            self._last_cpu = (now, cpu_time)
+
+        heap = js_heap_size(self.driver.driver)
+        return {
+            "rss_mb": None if rss is None else round(rss / 2 ** 20, 1),
+            "cpu_percent": None if cpu_percent is None else round(cpu_percent, 1),
+            "js_heap_mb": None if heap is None else round(heap / 2 ** 20, 1)
+        }
+
+    def exceeded(self, metrics) -> list[str]:
+        """
+        :param metrics: a sample
+        :return: the thresholds crossed, e.g. ["rss_mb 2100.0 > 2048"]
+        """
+        reasons = []
+        for name in ("rss_mb", "js_heap_mb", "cpu_percent"):
+            limit = self.config[name]
+            if limit is not None and metrics[name] is not None and metrics[name] > limit:
+                reasons.append(f"{name} {metrics[name]} > {limit}")
+        if self.config["max_tests"] and self.tests >= self.config["max_tests"]:
+            reasons.append(f"tests {self.tests} >= {self.config['max_tests']}")
+        return reasons
+
+    def check(self, nodeid=None) -> bool:
+        """
+        Called after each test: sample the browser every `every` tests and recycle it when a threshold is crossed
+
+        :param nodeid: test that just ran
+        :return: True if the browser was recycled
+        """
+        self.tests += 1
+        if self.driver.driver is None:
+            # The previous recycle couldn't start a browser, try again before the next test
+            self.driver.recycle()
+            self.tests = 0
+            return True
+        if not self.config["enabled"] or self.tests % max(1, self.config["every"]):
+            return False
+        metrics = self.sample()
+        reasons = self.exceeded(metrics)
+        if reasons:
+            logger.warning("Recycling the browser after %s: %s", nodeid, ", ".join(reasons))
+            self.driver.recycle()
+            self.tests = 0
+            self._last_cpu = None
+        self.record(nodeid, metrics, reasons)
+        return bool(reasons)
+
+    def record(self, nodeid, metrics, reasons):
+        self.samples += 1
+        if self._series is None:
+            return
+        line = json.dumps({
+            "time": datetime.now(timezone.utc).isoformat(timespec="microseconds"),
+            "nodeid": nodeid,
+            "worker": worker_id(),
+            **metrics,
+            "recycled": reasons
+        })
+        # One write per line, appended by every xdist worker to the same file
+        with self._lock:
+            self._series.write(line + "\n")
+            self._series.flush()
+
+    def close(self):
+        if self._series is not None:
+            self._series.close()
+            self._series = None
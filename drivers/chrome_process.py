@@ -0,0 +1,152 @@
+from __future__ import annotations
+from urllib.error import URLError
+from urllib.request import urlopen
+
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import time
+import logging
+
+import settings
+
+logger = logging.getLogger(__name__)
+
+CHROME_NAMES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+
+
+def find_chrome_binary() -> str:
+    """
+    Locate the Chrome executable: chrome.binary in config.json, then the PATH, then selenium manager
+
+    :return: path of the Chrome executable
+    """
+    configured = settings.get_section("chrome").get("binary")
+    if configured:
+        return configured
+    for name in CHROME_NAMES:
+        path = shutil.which(name)
+        if path:
+            return path
+
+    from selenium.webdriver.common.selenium_manager import SeleniumManager
+    return SeleniumManager().binary_paths(["--browser", "chrome"])["browser_path"]
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def debugger_version(debugger_address, timeout=1.0) -> dict | None:
+    """
+    Ask a Chrome remote debugging endpoint for its version. Used as a health check
+
+    :param debugger_address: host:port of the remote debugging endpoint
+    :param timeout: seconds to wait for the answer
+    :return: the /json/version document, None if Chrome doesn't answer
+    """
+    try:
+        with urlopen(f"http://{debugger_address}/json/version", timeout=timeout) as response:
+            return json.loads(response.read().decode("utf-8"))
+    except (URLError, OSError, ValueError):
+        return None
+
+
+def pid_alive(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except (OSError, TypeError):
+        return False
+
+
+def kill_pid(pid):
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except OSError:
+        pass
+
+
+class ChromeProcess:
+    """
+    A Chrome browser started with a remote debugging port, that WebDriver sessions attach to
+    through the debuggerAddress option instead of launching their own browser.
+    """
+    def __init__(self, headless=True, extra_args=(), binary=None):
+        """
+        :param headless: start Chrome without a window
+        :param extra_args: additional Chrome command line switches
+        :param binary: Chrome executable. Located with find_chrome_binary() when not given
+        """
+        self.headless = headless
+        self.extra_args = list(extra_args)
+        self.binary = binary
+        self.port = None
+        self.process = None
+        self.user_data_dir = None
+
+    @property
+    def debugger_address(self) -> str:
+        return f"127.0.0.1:{self.port}"
+
+    @property
+    def pid(self) -> int | None:
+        return self.process.pid if self.process else None
+
+    def start(self, timeout=20):
+        """
+        Launch Chrome and wait until its debugging endpoint answers
+
+        :param timeout: seconds to wait for Chrome to start
+        :return: the process itself
+        """
+        self.port = free_port()
+        self.user_data_dir = tempfile.mkdtemp(prefix="pyselenium-chrome-")
+        arguments = [
+            self.binary or find_chrome_binary(),
+            f"--remote-debugging-port={self.port}",
+            f"--user-data-dir={self.user_data_dir}",
+            "--no-first-run",
+            "--no-default-browser-check",
+            "--disable-gpu",
+            "--no-sandbox",
+            "--window-size=1920,1080"
+        ]
+        if self.headless:
+            arguments.append("--headless=new")
+        arguments.extend(self.extra_args)
+        arguments.append("about:blank")
+
+        self.process = subprocess.Popen(arguments, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + timeout
+        while debugger_version(self.debugger_address) is None:
+            if self.process.poll() is not None or time.monotonic() > deadline:
+                self.stop()
+                raise RuntimeError(f"Chrome didn't open its debugging port {self.port} within {timeout}s")
+            time.sleep(0.1)
+        logger.info("Chrome started with pid %s, debugging on %s", self.pid, self.debugger_address)
+        return self
+
+    def is_healthy(self) -> bool:
+        return self.process is not None and self.process.poll() is None and \
+            debugger_version(self.debugger_address) is not None
+
+    def stop(self):
+        """
+        Terminate Chrome and remove its profile directory
+        """
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.user_data_dir:
+            shutil.rmtree(self.user_data_dir, ignore_errors=True)
+        logger.info("Chrome on %s stopped", self.debugger_address)
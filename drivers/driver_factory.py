@@ -0,0 +1,170 @@
+from __future__ import annotations
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import WebDriverException
+
+import logging
+
+import settings
+from drivers import driver_instrumentation, remote_connection
+
+logger = logging.getLogger(__name__)
+
+# Values used for the keys a profile of config.json doesn't set
+DEFAULT_PROFILE = {
+    "headless": True,
+    "window_size": "1920x1080",
+    "arguments": ["--disable-gpu", "--no-sandbox"],
+    "page_load_strategy": "normal",
+    "disable_images": False,
+    "block_url_patterns": [],
+    "block_resource_types": []
+}
+
+# Network.setBlockedURLs matches urls, not resource types, so each blockable type maps to url patterns
+RESOURCE_TYPE_PATTERNS = {
+    "Image": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico"],
+    "Font": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"],
+    "Media": ["*.mp4", "*.webm", "*.ogg", "*.mp3", "*.wav"],
+    "Stylesheet": ["*.css"]
+}
+
+
+def profile_name(name=None) -> str:
+    """
+    :param name: requested profile, None for the driver.profile of config.json
+    :return: name of the profile to use
+    """
+    return name or settings.get_section("driver", {"profile": "default"})["profile"]
+
+
+def get_profile(name=None) -> dict:
+    """
+    Read a driver profile from the driver.profiles section of config.json
+
+    :param name: profile name, None for the configured default profile
+    :return: the profile merged over DEFAULT_PROFILE
+    """
+    name = profile_name(name)
+    profiles = settings.get_section("driver", {"profiles": {}})["profiles"]
+    if name != "default" and name not in profiles:
+        raise ValueError(f"Unknown driver profile {name}, available profiles: {', '.join(['default', *profiles])}")
+    profile = dict(DEFAULT_PROFILE)
+    profile.update(profiles.get(name, {}))
+    return profile
+
+
+def build_options(profile) -> Options:
+    """
+    Chrome options of a profile
+
+    :param profile: profile returned by get_profile()
+    :return: selenium chrome options
+    """
+    # Setup web driver options
+    # headless: run the tests in headless mode. No browser is visible.
+    # --disable-gpu: disables GPU acceleration. Can be helpful in certain env or for performance optimization.
+    # --no-sandbox: bypasses the OS security model. Can be necessary in some environments, especially when running
+    # ChromeDriver inside containers or other isolated environments.
+    # window-size: Sets the window size of the browser. Can be useful if you're running the browser with a visible window.
+    # excludeSwitches: for not prompting DevTools information. just show the browser from user perspective.
+    # page_load_strategy: normal waits for the load event, eager for DOMContentLoaded, none returns right away.
+    # goog:loggingPrefs: keep the browser console messages, attached to the report of a failed test.
+    options = Options()
+    if profile["headless"]:
+        options.add_argument('--headless')
+    for argument in profile["arguments"]:
+        options.add_argument(argument)
+    options.add_argument(f"window-size={profile['window_size']}")
+    options.add_experimental_option("excludeSwitches", ["enable-logging"])
+    options.page_load_strategy = profile["page_load_strategy"]
+    options.set_capability("goog:loggingPrefs", {"browser": "ALL"})
+    if profile["disable_images"]:
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    return options
+
+
+def blocked_url_patterns(profile) -> list[str]:
+    """
+    Url patterns blocked by a profile, including the patterns of its blocked resource types
+
+    :param profile: profile returned by get_profile()
+    :return: patterns in the Network.setBlockedURLs syntax ('*' wildcards)
+    """
+    patterns = list(profile["block_url_patterns"])
+    for resource_type in profile["block_resource_types"]:
+        if resource_type not in RESOURCE_TYPE_PATTERNS:
+            raise ValueError(f"Can't block resource type {resource_type}, blockable types: {', '.join(RESOURCE_TYPE_PATTERNS)}")
+        patterns.extend(RESOURCE_TYPE_PATTERNS[resource_type])
+    return patterns
+
+
+def apply_network_profile(driver, profile):
+    """
+    Block the requests of a profile in the current tab through the Chrome DevTools protocol.
+    Has to be applied again on every new tab
+
+    :param driver: chrome web driver
+    :param profile: profile returned by get_profile()
+    """
+    patterns = blocked_url_patterns(profile)
+    if not patterns:
+        return
+    # A remote driver has no execute_cdp_cmd, the command is forwarded to the node by its PooledRemoteConnection
+    execute_cdp_cmd = getattr(driver, "execute_cdp_cmd", None) or \
+        (lambda cmd, params: driver.execute("executeCdpCommand", {"cmd": cmd, "params": params})["value"])
+    try:
+        execute_cdp_cmd("Network.enable", {})
+        execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    except WebDriverException as e:
+        logger.error("Couldn't block the urls %s. Exception: %s", patterns, e)
+        raise
+
+
+def remote_url(url=None) -> str | None:
+    """
+    :param url: requested remote WebDriver url, None for the remote.url of config.json
+    :return: url of the remote WebDriver server to use, None to run a local Chrome
+    """
+    return url or settings.get_section("remote", remote_connection.DEFAULT_CONFIG)["url"]
+
+
+def create_driver(name=None, remote=None):
+    """
+    Launch a Chrome driver configured by a profile, locally or on a remote WebDriver server (Selenium Grid).
+    Its commands are timed for the --timing-report
+
+    :param name: profile name, None for the configured default profile
+    :param remote: remote WebDriver url, None for the remote.url of config.json (no url: local Chrome)
+    :return: selenium web driver
+    """
+    profile = get_profile(name)
+    url = remote_url(remote)
+    if url:
+        remote_config = settings.get_section("remote", remote_connection.DEFAULT_CONFIG)
+        # The remote drivers of the process share their keep-alive connections to the server
+        executor = remote_connection.PooledRemoteConnection(
+            remote_connection.shared_pool(url, remote_config),
+            remote_config["command_timeouts"]
+        )
+        driver = webdriver.Remote(command_executor=executor, options=build_options(profile))
+    else:
+        # Initialize WebDriver. replace browser with desired one.
+        driver = webdriver.Chrome(options=build_options(profile))
+    driver_instrumentation.instrument(driver)
+    apply_network_profile(driver, profile)
+    logger.info("Created %s driver with profile %s%s", driver.name, profile_name(name), f" on {url}" if url else "")
+    return driver
+
+
+def create_drivers(count, name=None, remote=None) -> list:
+    """
+    Launch several drivers, their sessions requested at the same time (remote.session_concurrency)
+
+    :param count: number of drivers
+    :param name: profile name, None for the configured default profile
+    :param remote: remote WebDriver url, None for the remote.url of config.json
+    :return: selenium web drivers
+    """
+    concurrency = settings.get_section("remote", remote_connection.DEFAULT_CONFIG)["session_concurrency"]
+    return remote_connection.create_concurrently(lambda: create_driver(name, remote), count, concurrency)
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+import logging
+
+from pages.page_base import PageBase
+from plugins import test_context
+
+logger = logging.getLogger(__name__)
+
+
+class CommandSample:
+    """
+    One WebDriver command sent to the browser, with the test and page object method that sent it
+    """
+    __slots__ = ("command", "duration", "nodeid", "caller")
+
+    def __init__(self, command, duration, nodeid, caller):
+        self.command = command
+        self.duration = duration
+        self.nodeid = nodeid
+        self.caller = caller
+
+    def to_dict(self) -> dict:
+        return {"command": self.command, "duration": self.duration, "nodeid": self.nodeid, "caller": self.caller}
+
+
+class CommandRecorder:
+    """
+    Collects the timing of the WebDriver commands of every instrumented driver of the process.
+    Disabled, the commands are sent untimed and nothing is kept
+    """
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def record(self, command, duration, nodeid, caller):
+        with self._lock:
+            self.samples.append(CommandSample(command, duration, nodeid, caller))
+
+    def drain(self) -> list[CommandSample]:
+        """
+        Take the recorded samples out of the recorder
+
+        :return: the samples recorded since the last drain
+        """
+        with self._lock:
+            samples, self.samples = self.samples, []
+        return samples
+
+
+# Recorder shared by the drivers of the process, enabled and read by the timing report plugin and the scripts
+RECORDER = CommandRecorder(enabled=False)
+
+
+def page_object_caller(frame=None) -> str | None:
+    """
+    Find the page object method that issued the current WebDriver command
+
+    :param frame: frame to start looking from, the caller of this function by default
+    :return: e.g. "PageCart.add_item_to_cart", or None when the command was sent outside of a page object
+    """
+    frame = frame or sys._getframe(1)
+    while frame is not None:
+        instance = frame.f_locals.get("self")
+        if isinstance(instance, PageBase) and not frame.f_code.co_name.startswith("_"):
+            return f"{type(instance).__name__}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def instrument(driver, recorder=RECORDER):
+    """
+    Time every command the driver sends to the browser.
+    The command executor of the driver is wrapped, so the commands sent by elements, waits and scripts are covered too
+    while the recorder is enabled
+
+    :param driver: selenium web driver
+    :param recorder: recorder receiving the samples
+    :return: the same driver
+    """
+    executor = driver.command_executor
+    if getattr(executor, "_timed", False):
+        return driver
+
+    execute = executor.execute
+
+    def timed_execute(command, params):
+        if not recorder.enabled:
+            return execute(command, params)
+        start = time.perf_counter()
+        try:
+            return execute(command, params)
+        finally:
+            duration = time.perf_counter() - start
+            recorder.record(command, duration, test_context.current_nodeid(), page_object_caller())
+
+    executor.execute = timed_execute
+    executor._timed = True
+    logger.info("Timing the WebDriver commands of %s", driver.name)
+    return driver
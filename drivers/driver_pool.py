@@ -0,0 +1,262 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from selenium.common.exceptions import WebDriverException, TimeoutException
+
+import threading
+import time
+import logging
+
+from pages import dom_waits
+from plugins.test_context import worker_id
+
+logger = logging.getLogger(__name__)
+
+# Clearing the web storage needs a page of the application origin. On about:blank or data: urls
+# the storage getters throw, so the errors are swallowed inside the script.
+CLEAR_STORAGE_SCRIPT = """
+try { window.localStorage.clear(); } catch (e) {}
+try { window.sessionStorage.clear(); } catch (e) {}
+"""
+
+
+def clear_browser_state(driver):
+    """
+    Close the windows opened after the first one, and clear the web storage and cookies of the site the driver is
+    on, so the next test starts logged out with an empty cart
+
+    :param driver: selenium web driver
+    """
+    handles = driver.window_handles
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(handles[0])
+
+    driver.execute_script(CLEAR_STORAGE_SCRIPT)
+    driver.delete_all_cookies()
+
+
+class PooledDriver:
+    """
+    A driver owned by the pool together with its bookkeeping
+    """
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.created_at = time.monotonic()
+
+
+class BrowserPool:
+    """
+    Pool of pre-launched drivers already navigated to the application under test.
+
+    Tests borrow a driver with acquire() and give it back with release(). Instead of relaunching the
+    browser, a released driver is reset: cookies, localStorage and sessionStorage are cleared and the
+    start page is loaded again. Drivers failing the health check or used max_uses times are quit and
+    replaced. Each pytest-xdist worker is its own process, so every worker gets its own pool.
+    """
+    def __init__(self, driver_factory, start_url, size=2, prewarm=1, max_uses=25, acquire_timeout=60,
+                 ready_title="Swag Labs", launch_concurrency=1):
+        """
+        :param driver_factory: callable with no arguments returning a new webdriver instance
+        :param start_url: url loaded on new drivers and on every reset
+        :param size: maximum number of drivers alive in the pool
+        :param prewarm: number of drivers launched up front by warm_up()
+        :param max_uses: number of tests a driver serves before being recycled
+        :param acquire_timeout: seconds to wait for a free driver when the pool is exhausted
+        :param ready_title: page title that marks the start page as loaded. None to skip the wait
+        :param launch_concurrency: drivers launched at the same time by warm_up(), e.g. new sessions queued by a grid
+        """
+        self.driver_factory = driver_factory
+        self.start_url = start_url
+        self.size = max(1, size)
+        self.prewarm = min(max(0, prewarm), self.size)
+        self.max_uses = max_uses
+        self.acquire_timeout = acquire_timeout
+        self.ready_title = ready_title
+        self.launch_concurrency = max(1, launch_concurrency)
+
+        self._idle = []
+        self._in_use = {}
+        self._launching = 0
+        self._closed = False
+        self._lock = threading.Condition()
+
+        self.stats = {"launched": 0, "acquired": 0, "reset": 0, "recycled": 0, "unhealthy": 0}
+
+    def warm_up(self):
+        """
+        Launch the pre-warmed drivers so the first tests don't pay for the browser startup
+        """
+        with self._lock:
+            missing = max(0, self.prewarm - self._alive())
+            self._launching += missing
+        if not missing:
+            return
+        with ThreadPoolExecutor(max_workers=min(missing, self.launch_concurrency), thread_name_prefix="warm-up") as executor:
+            futures = [executor.submit(self._launch) for _ in range(missing)]
+        errors = [future.exception() for future in futures if future.exception() is not None]
+        for future in futures:
+            if future.exception() is None:
+                self._add_idle(future.result())
+        if errors:
+            raise errors[0]
+
+    def acquire(self):
+        """
+        Borrow a driver from the pool. Blocks while the pool is at its size limit and every driver is in use
+
+        :return: a webdriver sitting on the start page
+        """
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise RuntimeError("The browser pool is closed")
+                if self._idle:
+                    pooled = self._idle.pop()
+                    break
+                if self._alive() < self.size:
+                    self._launching += 1
+                    pooled = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutException(f"No driver released within {self.acquire_timeout}s, pool size is {self.size}")
+                self._lock.wait(remaining)
+
+        if pooled is None:
+            pooled = self._launch()
+        elif not self.is_healthy(pooled.driver):
+            # The idle driver died, e.g. the browser crashed. Replace it with a fresh one
+            self._quit(pooled)
+            with self._lock:
+                self.stats["unhealthy"] += 1
+                self._launching += 1
+            pooled = self._launch()
+
+        pooled.uses += 1
+        with self._lock:
+            self._in_use[id(pooled.driver)] = pooled
+            self.stats["acquired"] += 1
+        return pooled.driver
+
+    def release(self, driver):
+        """
+        Give a driver back to the pool. It is reset for the next test, or quit when it is worn out or broken
+
+        :param driver: a driver returned by acquire()
+        """
+        with self._lock:
+            pooled = self._in_use.pop(id(driver), None)
+        if pooled is None:
+            logger.warning("Released a driver that is not owned by the pool")
+            return
+
+        reusable = False
+        try:
+            if self._closed:
+                pass
+            elif self.max_uses and pooled.uses >= self.max_uses:
+                logger.info("Recycling driver after %s uses on worker %s", pooled.uses, worker_id())
+                self._count("recycled")
+            elif not self.reset(driver):
+                self._count("unhealthy")
+            else:
+                reusable = True
+        finally:
+            # Whatever interrupted the reset, a driver not given back to the idle list is quit to free its slot
+            if reusable:
+                self._add_idle(pooled)
+            else:
+                self._quit(pooled)
+                with self._lock:
+                    self._lock.notify()
+
+    def reset(self, driver) -> bool:
+        """
+        Bring a used driver back to a clean state without relaunching the browser
+
+        :param driver: driver to reset
+        :return: True when the driver is clean and on the start page, False if it is not usable anymore
+        """
+        try:
+            clear_browser_state(driver)
+            self._load_start_page(driver)
+            self._count("reset")
+            return True
+        except Exception as e:
+            # Not only WebDriverException: a browser gone away fails in urllib3, e.g. MaxRetryError
+            logger.error("Failed to reset the driver, it will be replaced. Exception: %s", e)
+            return False
+
+    @staticmethod
+    def is_healthy(driver) -> bool:
+        """
+        Check the browser still answers WebDriver commands
+
+        :param driver: driver to check
+        :return: True if the driver session is alive
+        """
+        try:
+            driver.current_url
+            return True
+        except WebDriverException as e:
+            logger.warning("Driver failed the health check. Exception: %s", e)
+            return False
+
+    def close(self):
+        """
+        Quit every idle driver. Drivers still in use are quit when they are released
+        """
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._lock.notify_all()
+        for pooled in idle:
+            self._quit(pooled)
+        logger.info("Browser pool closed on worker %s. Stats: %s", worker_id(), self.stats)
+
+    def _alive(self) -> int:
+        return len(self._idle) + len(self._in_use) + self._launching
+
+    def _count(self, stat):
+        # The pool is shared by the threads of the load runner and the warm-up
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _launch(self) -> PooledDriver:
+        driver = None
+        try:
+            driver = self.driver_factory()
+            self._load_start_page(driver)
+        except Exception:
+            if driver is not None:
+                # Launched but never on the start page: quit it, on a grid the session would stay open until its timeout
+                self._quit(PooledDriver(driver))
+            with self._lock:
+                self._launching -= 1
+                self._lock.notify()
+            raise
+        with self._lock:
+            self._launching -= 1
+            self.stats["launched"] += 1
+        logger.info("Launched pooled driver %s on worker %s", driver.name, worker_id())
+        return PooledDriver(driver)
+
+    def _add_idle(self, pooled):
+        with self._lock:
+            self._idle.append(pooled)
+            self._lock.notify()
+
+    def _load_start_page(self, driver):
+        driver.get(self.start_url)
+        if self.ready_title:
+            dom_waits.wait_for_title(driver, self.ready_title, timeout=10)
+
+    @staticmethod
+    def _quit(pooled):
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logger.warning("Error while quitting a pooled driver. Exception: %s", e)
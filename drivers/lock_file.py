@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+import logging
+
+from drivers.chrome_process import pid_alive
+
+logger = logging.getLogger(__name__)
+
+
+class LockFile:
+    """
+    Cross-process lock based on the atomic creation of a file, portable to Windows. Shared by the pytest-xdist
+    workers and the runs using the same state files, e.g. the shared Chrome and the browser daemon.
+    The file holds the pid of its owner: the lock of a process that died holding it is broken instead of waited for
+    """
+    # Seconds a lock file may stay empty, between its creation and the write of the owner pid
+    EMPTY_GRACE = 5.0
+
+    def __init__(self, path, timeout):
+        """
+        :param path: lock file, created next to the state it protects
+        :param timeout: seconds to wait for a live owner before raising a TimeoutError
+        """
+        self.path = path
+        self.timeout = timeout
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                lock_fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if self._break_if_stale():
+                    continue
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Lock {self.path} held by process {self._owner()} for more than {self.timeout}s")
+                time.sleep(0.05)
+                continue
+            try:
+                os.write(lock_fd, str(os.getpid()).encode("ascii"))
+            finally:
+                os.close(lock_fd)
+            return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        os.remove(self.path)
+
+    def _owner(self) -> int | None:
+        return self._read_pid(self.path)
+
+    def _break_if_stale(self) -> bool:
+        """
+        Remove the lock file when its owner is dead
+
+        :return: True if the lock was broken, or released meanwhile
+        """
+        owner = self._owner()
+        if owner is None:
+            # Not written yet, unless its owner died right after creating it
+            try:
+                stale = time.time() - os.path.getmtime(self.path) > self.EMPTY_GRACE
+            except OSError:
+                return True
+        else:
+            stale = not pid_alive(owner)
+        if not stale:
+            return False
+        # Moved aside before checking it again: another waiter may have broken the stale lock and taken a new one
+        aside_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.stale"
+        try:
+            os.rename(self.path, aside_path)
+        except OSError:
+            return True
+        taken_owner = self._read_pid(aside_path)
+        if taken_owner == owner or (taken_owner is not None and not pid_alive(taken_owner)):
+            logger.warning("Broke the lock %s of process %s, which is not running anymore", self.path, owner)
+        else:
+            # A live lock was moved: put it back, unless the lock was taken again meanwhile
+            try:
+                os.link(aside_path, self.path)
+            except OSError:
+                pass
+        os.remove(aside_path)
+        return True
+
+    @staticmethod
+    def _read_pid(path) -> int | None:
+        """
+        :return: pid written in a lock file, None when it is gone or not written yet
+        """
+        try:
+            with open(path, encoding="ascii") as lock_file:
+                return int(lock_file.read())
+        except (OSError, ValueError):
+            return None
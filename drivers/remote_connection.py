@@ -0,0 +1,187 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.chromium.remote_connection import ChromiumRemoteConnection
+
+import threading
+import urllib3
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Values used for the keys the remote section of config.json doesn't set
+DEFAULT_CONFIG = {
+    # Selenium Grid or remote WebDriver url, e.g. http://grid:4444. None runs a local Chrome
+    "url": None,
+    # Connections kept open to the grid, shared by all the sessions of the process. Size it to the number of
+    # sessions sending commands at the same time
+    "pool_size": 64,
+    # Wait for a free connection when they are all busy, instead of opening one that is closed after the request
+    "block": True,
+    "connect_timeout": 10.0,
+    # Read timeout of each command by its selenium name, "default" for the others. A new session waits for a
+    # free slot of the grid
+    "command_timeouts": {"default": 120.0, "newSession": 300.0},
+    # New sessions requested at the same time when several drivers are created together
+    "session_concurrency": 8
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class SharedPool:
+    """
+    Keep-alive HTTP connections to one remote WebDriver server, shared by all the drivers of the process.
+
+    Selenium opens a pool of one connection per driver, or a new connection per command without keep-alive.
+    With hundreds of sessions the connection setup and the sockets left in TIME_WAIT add up: here the
+    connections are opened once and reused by whichever session sends the next command.
+    """
+    def __init__(self, url, pool_size=64, block=True, connect_timeout=10.0):
+        """
+        :param url: remote WebDriver server url
+        :param pool_size: maximum connections kept open
+        :param block: wait for a free connection when pool_size are in use, instead of opening a throwaway one
+        :param connect_timeout: seconds to open a connection
+        """
+        self.url = url
+        self.connect_timeout = connect_timeout
+        self.pool = urllib3.connection_from_url(url, maxsize=pool_size, block=block, retries=False,
+                                                timeout=urllib3.Timeout(connect=connect_timeout))
+        self._lock = threading.Lock()
+        self.timeouts = 0
+
+    def request(self, method, url, body=None, headers=None, read_timeout=None):
+        """
+        Send a request on a pooled connection
+
+        :param read_timeout: seconds to wait for the answer, None for no limit
+        :return: the urllib3 response
+        :raises TimeoutException: the connection or the answer timed out. A WebDriverException like the errors of
+            a local driver, so the health checks and resets replace the driver instead of failing the fixture
+        """
+        try:
+            return self.pool.request(method, url, body=body, headers=headers, redirect=False,
+                                     timeout=urllib3.Timeout(connect=self.connect_timeout, read=read_timeout))
+        except (urllib3.exceptions.ReadTimeoutError, urllib3.exceptions.ConnectTimeoutError) as e:
+            with self._lock:
+                self.timeouts += 1
+            raise TimeoutException(f"{method} {url} timed out: {e}") from e
+
+    def stats(self) -> dict:
+        """
+        Connection reuse counters
+
+        :return: dict with the requests sent, the connections opened, the requests sent on an already open
+            connection and the command timeouts
+        """
+        requests, connections = self.pool.num_requests, self.pool.num_connections
+        return {
+            "requests": requests,
+            "connections": connections,
+            "reused": max(0, requests - connections),
+            "reuse_ratio": round(1 - connections / requests, 3) if requests else 0.0,
+            "timeouts": self.timeouts
+        }
+
+    def close(self):
+        self.pool.close()
+
+
+class _CommandTimeoutConnection:
+    # What RemoteConnection._request expects from its urllib3 pool manager, with the timeout of the current command
+    def __init__(self, owner):
+        self._owner = owner
+
+    def request(self, method, url, body=None, headers=None):
+        return self._owner.shared_pool.request(method, url, body=body, headers=headers,
+                                               read_timeout=self._owner.current_timeout())
+
+    def clear(self):
+        # Called when a driver quits, the connections stay open for the other drivers
+        pass
+
+
+class PooledRemoteConnection(ChromiumRemoteConnection):
+    """
+    Command executor of a remote Chrome session sending its commands through a SharedPool, with a read timeout
+    per command
+    """
+    def __init__(self, shared_pool, command_timeouts=None):
+        """
+        :param shared_pool: SharedPool of the remote server
+        :param command_timeouts: read timeout in seconds by selenium command name, "default" for the others
+        """
+        # keep_alive=False: the pool manager of each connection is replaced by the shared pool
+        super().__init__(shared_pool.url, vendor_prefix="goog", browser_name="chrome", keep_alive=False,
+                         ignore_proxy=True)
+        self.keep_alive = True
+        self.shared_pool = shared_pool
+        self.command_timeouts = dict(DEFAULT_CONFIG["command_timeouts"], **(command_timeouts or {}))
+        self._conn = _CommandTimeoutConnection(self)
+        self._local = threading.local()
+
+    def execute(self, command, params):
+        self._local.command = command
+        return super().execute(command, params)
+
+    def current_timeout(self) -> float:
+        command = getattr(self._local, "command", None)
+        return self.command_timeouts.get(command, self.command_timeouts["default"])
+
+
+def shared_pool(url, config=None) -> SharedPool:
+    """
+    Get the connection pool of a remote server, created on first use
+
+    :param url: remote WebDriver server url
+    :param config: remote section of config.json, the pool settings are read when the pool is created
+    """
+    config = dict(DEFAULT_CONFIG, **(config or {}))
+    url = url.rstrip("/")
+    with _pools_lock:
+        if url not in _pools:
+            _pools[url] = SharedPool(url, config["pool_size"], config["block"], config["connect_timeout"])
+            logger.info("Opened a pool of up to %s connections to %s", config["pool_size"], url)
+        return _pools[url]
+
+
+def pool_stats() -> dict:
+    """
+    :return: connection reuse counters of each remote server used by the process, by url
+    """
+    with _pools_lock:
+        return {url: pool.stats() for url, pool in _pools.items()}
+
+
+def close_pools():
+    """
+    Close the connections of every remote server. Drivers created afterwards open a new pool
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+def create_concurrently(factory, count, concurrency) -> list:
+    """
+    Request several sessions at the same time. A grid answers new sessions slowly, from its queue, so they are
+    not waited for one after the other. If a creation fails, the sessions already created are quit
+
+    :param factory: callable with no arguments returning a new web driver
+    :param count: number of drivers
+    :param concurrency: sessions requested at the same time
+    :return: the drivers
+    """
+    with ThreadPoolExecutor(max_workers=max(1, min(count, concurrency)), thread_name_prefix="new-session") as executor:
+        futures = [executor.submit(factory) for _ in range(count)]
+    drivers = [future.result() for future in futures if future.exception() is None]
+    errors = [future.exception() for future in futures if future.exception() is not None]
+    if errors:
+        for driver in drivers:
+            driver.quit()
+        raise errors[0]
+    return drivers
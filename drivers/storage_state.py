@@ -0,0 +1,185 @@
+from __future__ import annotations
+from urllib.parse import urljoin, urlparse, urlsplit
+
+import json
+import os
+import time
+import logging
+
+from drivers.driver_pool import clear_browser_state
+from pages.page_login import PageLogin
+
+logger = logging.getLogger(__name__)
+
+DUMP_STORAGE_FUNCTION = """
+function dump(storage) {
+    var items = {};
+    for (var i = 0; i < storage.length; i++) {
+        var key = storage.key(i);
+        items[key] = storage.getItem(key);
+    }
+    return items;
+}
+"""
+
+# Read both web storages in one round-trip
+CAPTURE_STORAGE_SCRIPT = DUMP_STORAGE_FUNCTION + """
+return {localStorage: dump(window.localStorage), sessionStorage: dump(window.sessionStorage)};
+"""
+
+# Read the url of the page and both web storages in one round-trip
+CAPTURE_SNAPSHOT_SCRIPT = DUMP_STORAGE_FUNCTION + """
+return {url: window.location.href, localStorage: dump(window.localStorage), sessionStorage: dump(window.sessionStorage)};
+"""
+
+# Write both web storages in one round-trip
+INJECT_STORAGE_SCRIPT = """
+var state = arguments[0];
+Object.keys(state.localStorage).forEach(function (key) { window.localStorage.setItem(key, state.localStorage[key]); });
+Object.keys(state.sessionStorage).forEach(function (key) { window.sessionStorage.setItem(key, state.sessionStorage[key]); });
+"""
+
+
+class StorageStateCache:
+    """
+    Cache of an authenticated browser state (cookies, localStorage and sessionStorage).
+
+    The first login() of a run goes through the login form and saves the resulting state to disk.
+    Every following login(), in this process or in another xdist worker, injects the saved state into
+    the driver and opens the landing page directly. The saved state expires after ttl seconds, or
+    earlier if one of its cookies expires.
+    """
+    def __init__(self, cache_dir, base_url, username, password, ttl=540, landing_path="inventory.html"):
+        """
+        :param cache_dir: directory holding the state files
+        :param base_url: url of the application under test. The state is only valid for its host
+        :param username: user logged in through the form when there is no valid state
+        :param password: password of the user
+        :param ttl: seconds a saved state is considered valid
+        :param landing_path: page opened after injecting the state
+        """
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.ttl = ttl
+        self.landing_url = urljoin(base_url, landing_path)
+
+        host = urlparse(base_url).netloc.replace(":", "_")
+        self.path = os.path.join(cache_dir, f"{host}-{username}.json")
+
+    def login(self, driver) -> dict:
+        """
+        Get the driver logged in and on the landing page
+
+        :param driver: driver sitting on a page of the application origin, usually the login page
+        :return: the storage state used
+        """
+        state = self.load()
+        if state is None:
+            PageLogin(driver).login(self.username, self.password)
+            state = self.capture(driver)
+            self.save(state)
+            return state
+
+        self.inject(driver, state)
+        return state
+
+    def load(self) -> dict | None:
+        """
+        Read the saved state
+
+        :return: the state, or None if there is no state file or it has expired
+        """
+        try:
+            with open(self.path, encoding="utf-8") as state_file:
+                state = json.load(state_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        if state.get("expires_at", 0) <= time.time():
+            logger.info("Saved storage state %s has expired", self.path)
+            return None
+        return state
+
+    def save(self, state):
+        """
+        Write the state to disk. The file is replaced atomically so parallel workers never read half a file
+
+        :param state: state returned by capture()
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as state_file:
+            json.dump(state, state_file)
+        os.replace(temp_path, self.path)
+        logger.info("Saved storage state to %s", self.path)
+
+    def capture(self, driver) -> dict:
+        """
+        Read the cookies and the web storage of a logged in driver
+
+        :param driver: logged in driver
+        :return: a json serializable state
+        """
+        state = driver.execute_script(CAPTURE_STORAGE_SCRIPT)
+        state["cookies"] = driver.get_cookies()
+
+        # The state can't outlive the cookies it carries
+        expires_at = time.time() + self.ttl
+        for cookie in state["cookies"]:
+            if "expiry" in cookie:
+                expires_at = min(expires_at, cookie["expiry"])
+        state["expires_at"] = expires_at
+        return state
+
+    def inject(self, driver, state):
+        """
+        Load a saved state into a driver and open the landing page
+
+        :param driver: driver sitting on a page of the application origin
+        :param state: state returned by load() or capture()
+        """
+        for cookie in state["cookies"]:
+            # Let the cookie default to the current host, the saved domain may carry a leading dot
+            cookie = {key: value for key, value in cookie.items() if key not in ("domain", "sameSite")}
+            driver.add_cookie(cookie)
+        driver.execute_script(INJECT_STORAGE_SCRIPT, state)
+        driver.get(self.landing_url)
+
+
+def capture_snapshot(driver) -> dict:
+    """
+    Read the state of a browser a test starts from: url, cookies and web storage of the current site. Two WebDriver
+    calls
+
+    :param driver: selenium web driver
+    :return: a json serializable snapshot
+    """
+    snapshot = driver.execute_script(CAPTURE_SNAPSHOT_SCRIPT)
+    snapshot["cookies"] = driver.get_cookies()
+    return snapshot
+
+
+def restore_snapshot(driver, snapshot):
+    """
+    Bring a browser back to a snapshot: windows, cookies and web storage of the site cleared and replaced, then the
+    url of the snapshot loaded so the application reads the restored state
+
+    :param driver: selenium web driver, on any page
+    :param snapshot: snapshot returned by capture_snapshot()
+    """
+    origin = urlsplit(snapshot["url"])[:2]
+    if origin[0] not in ("http", "https"):
+        # about:blank or data: url, no site state
+        driver.get(snapshot["url"])
+        return
+    if urlsplit(driver.current_url)[:2] != origin:
+        # Cookies and web storage can only be written from a page of their site
+        driver.get(snapshot["url"])
+    clear_browser_state(driver)
+    for cookie in snapshot["cookies"]:
+        cookie = {key: value for key, value in cookie.items() if key not in ("domain", "sameSite")}
+        driver.add_cookie(cookie)
+    driver.execute_script(INJECT_STORAGE_SCRIPT, snapshot)
+    driver.get(snapshot["url"])
+    logger.info("Restored the browser state of %s", snapshot["url"])
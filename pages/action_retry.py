@@ -0,0 +1,111 @@
+from __future__ import annotations
+from selenium.common.exceptions import (
+    ElementClickInterceptedException,
+    ElementNotInteractableException,
+    StaleElementReferenceException
+)
+
+import random
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Values used for the keys the retry section of config.json doesn't set
+DEFAULT_CONFIG = {
+    "attempts": 3,
+    "initial_delay": 0.1,
+    "max_delay": 1.0,
+    "multiplier": 2.0,
+    "jitter": 0.2
+}
+
+# Errors of an action that fail before it had any effect on the page and go away once the page settles: an
+# overlay or an animation covering the element, or React re-rendering it between the lookup and the click
+TRANSIENT_EXCEPTIONS = (
+    ElementClickInterceptedException,
+    ElementNotInteractableException,
+    StaleElementReferenceException
+)
+
+
+class RetryPolicy:
+    """
+    Bounded retries of page object actions on transient WebDriver errors, with an exponential backoff.
+    Any other error is raised right away, and the last error once the attempts are exhausted
+    """
+    def __init__(self, attempts=3, initial_delay=0.1, max_delay=1.0, multiplier=2.0, jitter=0.2,
+                 exceptions=TRANSIENT_EXCEPTIONS, sleep=time.sleep):
+        """
+        :param attempts: maximum number of attempts of an action, the first one included
+        :param initial_delay: seconds to wait before the first retry
+        :param max_delay: cap of the wait between two attempts
+        :param multiplier: factor applied to the wait after every retry
+        :param jitter: fraction of the wait randomly added or removed, so parallel workers don't retry in step
+        :param exceptions: exception types retried
+        :param sleep: function waiting a number of seconds
+        """
+        if attempts < 1:
+            raise ValueError(f"attempts must be at least 1, got {attempts}")
+        self.attempts = attempts
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.exceptions = tuple(exceptions)
+        self.sleep = sleep
+        self.retries = {}
+        self._lock = threading.Lock()
+
+    def delays(self):
+        """
+        :return: the waits before each retry, in seconds
+        """
+        delay = self.initial_delay
+        for _ in range(self.attempts - 1):
+            yield min(delay, self.max_delay) * (1 + random.uniform(-self.jitter, self.jitter))
+            delay *= self.multiplier
+
+    def run(self, name, action, before_retry=None):
+        """
+        Run an action, again after a backoff when it fails with one of the retried exceptions
+
+        :param name: name of the action in the logs and in the retries counters, e.g. PageCart.add_item_to_cart
+        :param action: callable with no arguments. It runs from scratch on every attempt, elements included
+        :param before_retry: callable receiving the exception, called before waiting for the next attempt
+        :return: the value returned by the action
+        """
+        delays = self.delays()
+        attempt = 1
+        while True:
+            try:
+                return action()
+            except self.exceptions as e:
+                delay = next(delays, None)
+                if delay is None:
+                    logger.error("%s failed after %s attempts. Exception: %s", name, attempt, e)
+                    raise
+                logger.warning("%s attempt %s failed with %s, retrying in %.2fs", name, attempt, type(e).__name__, delay)
+                with self._lock:
+                    self.retries[name] = self.retries.get(name, 0) + 1
+                if before_retry is not None:
+                    before_retry(e)
+                self.sleep(delay)
+                attempt += 1
+
+
+# Policy of the page objects, configured from the retry section of config.json by plugins/plugin_reruns.py
+POLICY = RetryPolicy(**DEFAULT_CONFIG)
+
+
+def configure(config) -> RetryPolicy:
+    """
+    Replace the policy of the page objects
+
+    :param config: retry section of config.json, merged over DEFAULT_CONFIG
+    :return: the new policy
+    """
+    global POLICY
+    POLICY = RetryPolicy(**config)
+    return POLICY
@@ -0,0 +1,239 @@
+"""
+Read-only copy of the page DOM, queried locally with lxml.
+
+The serialized DOM is fetched with a single WebDriver call and every lookup after that runs in the test process.
+The locators are the selenium By constants, so a check written against the browser reads the same against a
+snapshot:
+
+    snapshot = page.snapshot()
+    prices = [element.text for element in snapshot.find_elements(By.CLASS_NAME, "inventory_item_price")]
+
+A snapshot doesn't follow the page: take a new one after an action that changes it. It has no layout either,
+the visibility of an element and the interactions (click, send_keys...) are left to the live element, which
+every snapshot element locates on demand.
+"""
+from __future__ import annotations
+from functools import lru_cache
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import InvalidSelectorException, NoSuchElementException
+from lxml import etree, html
+from lxml.cssselect import CSSSelector, SelectorError
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# The live DOM, as rendered by the application scripts, rather than the html the page was loaded from
+SNAPSHOT_SCRIPT = "return document.documentElement.outerHTML;"
+
+# Not rendered as text by the browser, so not part of WebElement.text either
+NON_TEXT_TAGS = {"head", "script", "style", "template", "noscript"}
+# Start a new line in the rendered text
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "fieldset", "figcaption", "figure",
+    "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "option", "p",
+    "pre", "section", "select", "table", "tr", "ul"
+}
+
+# (by: xpath of the candidates), evaluated with the locator value in $value
+XPATH_STRATEGIES = {
+    By.ID: "*[@id=$value]",
+    By.NAME: "*[@name=$value]",
+    By.CLASS_NAME: "*[contains(concat(' ', normalize-space(@class), ' '), concat(' ', $value, ' '))]",
+    By.TAG_NAME: "*[name()=$value]",
+    By.LINK_TEXT: "a",
+    By.PARTIAL_LINK_TEXT: "a"
+}
+
+
+@lru_cache(maxsize=256)
+def compile_css(selector) -> CSSSelector:
+    # Translating a selector to XPath costs more than evaluating it on a page this size
+    try:
+        return CSSSelector(selector, translator="html")
+    except SelectorError as e:
+        raise InvalidSelectorException(f"Invalid css selector {selector}: {e}")
+
+
+def rendered_text(node) -> str:
+    """
+    Approximate the text the browser renders for an element, like WebElement.text: the text of the element and
+    its descendants, without scripts and hidden elements, whitespace collapsed and a line per block element
+    """
+    lines = [[]]
+
+    def walk(element):
+        if not isinstance(element.tag, str) or element.tag in NON_TEXT_TAGS or is_hidden(element):
+            return
+        block = element.tag in BLOCK_TAGS
+        if block:
+            lines.append([])
+        if element.text:
+            lines[-1].append(element.text)
+        for child in element:
+            walk(child)
+            if child.tail:
+                lines[-1].append(child.tail)
+        if block:
+            lines.append([])
+
+    walk(node)
+    return "\n".join(text for text in (" ".join("".join(line).split()) for line in lines) if text)
+
+
+def is_hidden(element) -> bool:
+    # Only what the markup tells: the stylesheets are not applied to a snapshot
+    style = element.get("style", "").replace(" ", "").lower()
+    return (element.get("hidden") is not None or "display:none" in style
+            or (element.tag == "input" and element.get("type", "").lower() == "hidden"))
+
+
+class SnapshotElement:
+    """
+    An element of a DomSnapshot. Text, attributes and sub-element lookups are answered from the snapshot, any
+    other WebElement attribute (click, send_keys, is_displayed...) is forwarded to the live element
+    """
+    def __init__(self, snapshot, node):
+        self._snapshot = snapshot
+        self._node = node
+        self._live = None
+
+    def __repr__(self):
+        return f"<SnapshotElement {self.path}>"
+
+    def __eq__(self, other):
+        return isinstance(other, SnapshotElement) and self._node is other._node
+
+    def __hash__(self):
+        return hash(self._node)
+
+    @property
+    def tag_name(self) -> str:
+        return self._node.tag
+
+    @property
+    def text(self) -> str:
+        return rendered_text(self._node)
+
+    @property
+    def path(self) -> str:
+        """
+        Absolute XPath of the element in the snapshot, used to locate the live element
+        """
+        return self._node.getroottree().getpath(self._node)
+
+    def get_attribute(self, name) -> str | None:
+        return self._node.get(name)
+
+    def find_element(self, by=By.ID, value=None) -> SnapshotElement:
+        return self._snapshot.first(self._snapshot.find_all(by, value, self._node), by, value)
+
+    def find_elements(self, by=By.ID, value=None) -> list[SnapshotElement]:
+        return self._snapshot.find_all(by, value, self._node)
+
+    def live(self):
+        """
+        Locate the element in the browser. Costs one WebDriver call, the first time only
+
+        :return: the live selenium web element
+        """
+        if self._live is None:
+            self._live = self._snapshot.locate(self.path)
+        return self._live
+
+    def __getattr__(self, name):
+        # Only called for the attributes not answered by the snapshot
+        if name.startswith("_"):
+            raise AttributeError(name)
+        logger.debug("%s needs the live element for %s", self, name)
+        return getattr(self.live(), name)
+
+
+class DomSnapshot:
+    """
+    The DOM of a page parsed locally, with the find_element and find_elements of a selenium web driver
+    """
+    def __init__(self, source, browser=None):
+        """
+        :param source: serialized html of the page
+        :param browser: web driver the snapshot was taken from, used to locate the live elements
+        """
+        self.browser = browser
+        self.root = html.document_fromstring(source)
+        self.tree = self.root.getroottree()
+
+    @classmethod
+    def take(cls, browser) -> DomSnapshot:
+        """
+        Serialize the current DOM of the browser with a single WebDriver call
+
+        :param browser: selenium web driver
+        """
+        return cls(browser.execute_script(SNAPSHOT_SCRIPT), browser)
+
+    def find_element(self, by=By.ID, value=None) -> SnapshotElement:
+        """
+        :param by: selenium by element locator - by.id, by.name, by.css_selector...
+        :param value: selector of the element
+        :return: the first matching element in document order
+        """
+        return self.first(self.find_all(by, value), by, value)
+
+    def find_elements(self, by=By.ID, value=None) -> list[SnapshotElement]:
+        """
+        :param by: selenium by element locator - by.id, by.name, by.css_selector...
+        :param value: selector of the elements
+        :return: all the matching elements in document order
+        """
+        return self.find_all(by, value)
+
+    def find_all(self, by, value, context=None) -> list[SnapshotElement]:
+        """
+        Evaluate a locator in the snapshot
+
+        :param by: selenium by element locator
+        :param value: selector of the elements
+        :param context: lxml element to search the descendants of, None for the whole document
+        :return: matching elements in document order
+        """
+        if by == By.CSS_SELECTOR:
+            nodes = compile_css(value)(self.root if context is None else context)
+            # The selector is evaluated from the element itself, WebDriver only returns its descendants
+            nodes = [node for node in nodes if node is not context]
+        elif by == By.XPATH:
+            try:
+                nodes = (self.tree if context is None else context).xpath(value)
+            except etree.XPathError as e:
+                raise InvalidSelectorException(f"Invalid xpath {value}: {e}")
+            if not isinstance(nodes, list):
+                raise InvalidSelectorException(f"The xpath {value} selects a value, not elements")
+            nodes = [node for node in nodes if isinstance(node, etree._Element) and isinstance(node.tag, str)]
+        elif by in XPATH_STRATEGIES:
+            if by == By.CLASS_NAME and len(value.split()) != 1:
+                raise InvalidSelectorException(f"Compound class names are not permitted: {value}")
+            prefix = "//" if context is None else ".//"
+            target = value.lower() if by == By.TAG_NAME else value
+            nodes = (self.tree if context is None else context).xpath(prefix + XPATH_STRATEGIES[by], value=target)
+            if by == By.LINK_TEXT:
+                nodes = [node for node in nodes if rendered_text(node) == value]
+            elif by == By.PARTIAL_LINK_TEXT:
+                nodes = [node for node in nodes if value in rendered_text(node)]
+        else:
+            raise InvalidSelectorException(f"Unsupported locator strategy: {by}")
+        return [SnapshotElement(self, node) for node in nodes]
+
+    def first(self, elements, by, value) -> SnapshotElement:
+        if not elements:
+            raise NoSuchElementException(f"No element found in the snapshot by {by} with stmt: {value}")
+        return elements[0]
+
+    def locate(self, path):
+        """
+        Find a snapshot element in the browser by its absolute XPath
+
+        :param path: XPath of the element in the snapshot
+        :return: the live selenium web element
+        """
+        if self.browser is None:
+            raise NoSuchElementException(f"The snapshot has no browser to locate {path} in")
+        return self.browser.find_element(By.XPATH, path)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+from selenium.common.exceptions import JavascriptException, TimeoutException
+
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Waits inside the page instead of polling from Python.
+# The predicate is the body of a javascript function receiving `args`. It returns undefined or null while the
+# condition is still unknown, and any other value (including false) as soon as the answer is known. It is checked
+# right away, then on every DOM mutation and document readyState change, so the wait resolves in the same task the
+# page changed in. A single WebDriver call covers the whole wait.
+WAIT_SCRIPT = """
+var predicate = new Function('args', arguments[0]);
+var args = arguments[1];
+var timeoutMs = arguments[2];
+var done = arguments[arguments.length - 1];
+var settled = false;
+var observer = null;
+var timer = null;
+
+function finish(result) {
+    if (settled) { return; }
+    settled = true;
+    if (observer) { observer.disconnect(); }
+    clearTimeout(timer);
+    document.removeEventListener('readystatechange', check);
+    done(result);
+}
+
+function check() {
+    var value;
+    try {
+        value = predicate(args);
+    } catch (e) {
+        return finish({error: String(e)});
+    }
+    if (value !== undefined && value !== null) {
+        finish({value: value});
+    }
+}
+
+timer = setTimeout(function () { finish({timeout: true}); }, timeoutMs);
+observer = new MutationObserver(check);
+observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+document.addEventListener('readystatechange', check);
+check();
+"""
+
+DOCUMENT_READY_PREDICATE = "return document.readyState === 'complete' ? true : undefined;"
+
+TITLE_PREDICATE = "return document.title === args.title ? true : undefined;"
+
+# Selenium's default script timeout. Longer waits check the current one and raise it for the duration of the call
+DEFAULT_SCRIPT_TIMEOUT = 30
+
+
+def wait_for_js(driver, predicate, args=None, timeout=10):
+    """
+    Wait until a javascript predicate gives an answer
+
+    :param driver: selenium web driver
+    :param predicate: body of a javascript function receiving `args`, returning undefined/null while waiting
+    :param args: json serializable value, or web elements, passed to the predicate
+    :param timeout: seconds to wait
+    :return: the first value returned by the predicate that is not undefined or null
+    """
+    deadline = time.monotonic() + timeout
+    previous_script_timeout = None
+    if timeout >= DEFAULT_SCRIPT_TIMEOUT:
+        # Restored after the wait, it may not be the default one
+        script_timeout = driver.timeouts.script
+        if timeout >= script_timeout:
+            previous_script_timeout = script_timeout
+            driver.set_script_timeout(timeout + 5)
+    try:
+        while True:
+            remaining_ms = max(0, int((deadline - time.monotonic()) * 1000))
+            try:
+                result = driver.execute_async_script(WAIT_SCRIPT, predicate, args or {}, remaining_ms)
+            except JavascriptException as e:
+                # A navigation unloaded the document running the wait, start again on the new one
+                if "unload" in str(e) and time.monotonic() < deadline:
+                    logger.info("Document unloaded during a wait, waiting on the new document")
+                    continue
+                raise
+            break
+    finally:
+        if previous_script_timeout is not None:
+            driver.set_script_timeout(previous_script_timeout)
+
+    if "error" in result:
+        raise JavascriptException(f"Wait predicate failed: {result['error']}")
+    if result.get("timeout"):
+        raise TimeoutException(f"Condition not met after {timeout}s: {predicate}")
+    return result["value"]
+
+
+def wait_for_document_ready(driver, timeout=10):
+    """
+    Wait until the document and its sub-resources are loaded
+
+    :param driver: selenium web driver
+    :param timeout: seconds to wait
+    """
+    wait_for_js(driver, DOCUMENT_READY_PREDICATE, timeout=timeout)
+
+
+def wait_for_title(driver, title, timeout=10):
+    """
+    Wait until the page title is the expected one. Replaces WebDriverWait(...).until(title_is(...)) and its 0.5s polling
+
+    :param driver: selenium web driver
+    :param title: expected page title
+    :param timeout: seconds to wait
+    """
+    wait_for_js(driver, TITLE_PREDICATE, {"title": title}, timeout=timeout)
@@ -1,29 +1,494 @@
+from __future__ import annotations
+from typing import NamedTuple
 from selenium.webdriver.remote.webelement import WebElement
-from selenium.common.exceptions import NoSuchElementException, InvalidSelectorException, WebDriverException
+from selenium.common.exceptions import (
+    NoSuchElementException,
+    InvalidSelectorException,
+    StaleElementReferenceException,
+    WebDriverException
+)
+import base64
 import logging
 
+from pages import action_retry, dom_snapshot, dom_waits, page_performance, visual_regression
+
 logger = logging.getLogger(__name__)
 
+# In-page equivalent of find_elements: findAll(root, by, value) with the selenium By constants as `by` values
+FIND_ALL_FUNCTION = """
+function findAll(root, by, value) {
+    switch (by) {
+        case 'id': return Array.from(root.querySelectorAll('[id="' + CSS.escape(value) + '"]'));
+        case 'name': return Array.from(root.querySelectorAll('[name="' + CSS.escape(value) + '"]'));
+        case 'class name': return Array.from(root.getElementsByClassName(value));
+        case 'tag name': return Array.from(root.getElementsByTagName(value));
+        case 'css selector': return Array.from(root.querySelectorAll(value));
+        case 'link text':
+        case 'partial link text':
+            return Array.from(root.querySelectorAll('a')).filter(function (link) {
+                var text = link.innerText.trim();
+                return by === 'link text' ? text === value : text.indexOf(value) !== -1;
+            });
+        case 'xpath':
+            var snapshot = document.evaluate(value, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            var nodes = [];
+            for (var i = 0; i < snapshot.snapshotLength; i++) { nodes.push(snapshot.snapshotItem(i)); }
+            return nodes;
+    }
+    throw new Error('Unsupported locator strategy: ' + by);
+}
+"""
+
+# Resolves a list of locators, or a container locator with fields relative to each container, in the page.
+# Every match comes back with its text, visibility and requested attributes so the caller doesn't need a
+# WebDriver round-trip per element.
+BULK_QUERY_SCRIPT = "var spec = arguments[0];\n" + FIND_ALL_FUNCTION + """
+function isDisplayed(element) {
+    var style = window.getComputedStyle(element);
+    if (style.display === 'none' || style.visibility === 'hidden' || style.opacity === '0') { return false; }
+    return element.getClientRects().length > 0;
+}
+
+function describe(element) {
+    var attributes = {};
+    spec.attributes.forEach(function (name) { attributes[name] = element.getAttribute(name); });
+    return {element: element, text: element.innerText.trim(), displayed: isDisplayed(element), attributes: attributes};
+}
+
+if (spec.container) {
+    return findAll(document, spec.container[0], spec.container[1]).map(function (container) {
+        var fields = {};
+        Object.keys(spec.fields).forEach(function (field) {
+            var match = findAll(container, spec.fields[field][0], spec.fields[field][1])[0];
+            fields[field] = match ? describe(match) : null;
+        });
+        return fields;
+    });
+}
+return spec.locators.map(function (locator) {
+    return findAll(document, locator[0], locator[1]).map(describe);
+});
+"""
+
+# Geometry of a screenshot in one round-trip: the element to capture, the elements to mask, the viewport and the
+# whole document, in CSS pixels of the document, with the device pixel ratio
+VISUAL_GEOMETRY_SCRIPT = "var spec = arguments[0];\n" + FIND_ALL_FUNCTION + """
+var scrollX = window.scrollX, scrollY = window.scrollY;
+function documentRect(element) {
+    var rect = element.getBoundingClientRect();
+    return {x: rect.left + scrollX, y: rect.top + scrollY, width: rect.width, height: rect.height};
+}
+var element = spec.target ? findAll(document, spec.target[0], spec.target[1])[0] || null : null;
+var masks = [];
+spec.masks.forEach(function (locator) {
+    findAll(document, locator[0], locator[1]).forEach(function (match) { masks.push(documentRect(match)); });
+});
+var root = document.documentElement;
+var body = document.body || root;
+return {
+    dpr: window.devicePixelRatio,
+    element: element,
+    target: element ? documentRect(element) : null,
+    masks: masks,
+    viewport: {x: scrollX, y: scrollY, width: root.clientWidth, height: root.clientHeight},
+    page: {x: 0, y: 0, width: Math.max(root.scrollWidth, body.scrollWidth), height: Math.max(root.scrollHeight, body.scrollHeight)}
+};
+"""
+
+
+class ElementInfo(NamedTuple):
+    """
+    A web element returned by a bulk query, with the values read in the same round-trip
+    """
+    element: WebElement
+    text: str
+    displayed: bool
+    attributes: dict
+
+
+class CachedWebElement(WebElement):
+    """
+    Web element handed out by the PageBase element cache.
+    When the page re-renders and the element goes stale, it is located again with its original locator and
+    the failed command is retried once, so callers keep working with the same object.
+    """
+    def __init__(self, parent, id_, resolver):
+        super().__init__(parent, id_)
+        self._resolver = resolver
+
+    def _execute(self, command, params=None):
+        try:
+            return super()._execute(command, params)
+        except StaleElementReferenceException:
+            self._re_resolve()
+            return super()._execute(command, params)
+
+    def is_displayed(self) -> bool:
+        # Runs through execute_script instead of _execute, so the staleness is handled here too
+        try:
+            return super().is_displayed()
+        except StaleElementReferenceException:
+            self._re_resolve()
+            return super().is_displayed()
+
+    def get_attribute(self, name):
+        try:
+            return super().get_attribute(name)
+        except StaleElementReferenceException:
+            self._re_resolve()
+            return super().get_attribute(name)
+
+    def _re_resolve(self):
+        self._id = self._resolver().id
+
+
 class PageBase:
-    def __init__(self, browser):
+    def __init__(self, browser, use_cache=True):
+        """
+        :param browser: selenium web driver
+        :param use_cache: keep the elements found by select_web_element_by and return them on the next lookups
+        """
         self.browser = browser
+        self.use_cache = use_cache
+        self._element_cache = {}
+        self._cache_url = None
+        # Set by the actions that may navigate, the next lookup checks the url first
+        self._check_url = False
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_stale_refreshes = 0
 
-    def select_web_element_by(self, by, select_stmt) -> WebElement:
+    def select_web_element_by(self, by, select_stmt, use_cache=None) -> WebElement:
         """
-        Select a web element by its name
+        Select a web element by its name.
+        A cached element is handed out without checking the url, except for the first lookup after an action that
+        may navigate (see expect_navigation): the cache of the previous page is then dropped if the url changed
 
         :param by: selenium by element locator - by.id, by.name, by.css_selector...
         :param select_stmt: name of the element
+        :param use_cache: override the page use_cache setting for this lookup
         :return: a selenium web element
         """
+        use_cache = self.use_cache if use_cache is None else use_cache
+        if use_cache:
+            cached_element = self.get_cached_element(by, select_stmt)
+            if cached_element is not None:
+                return cached_element
+
         try:
-            return self.browser.find_element(by, select_stmt)
+            element = self.browser.find_element(by, select_stmt)
+            return self.cache_element(by, select_stmt, element) if use_cache else element
         except NoSuchElementException as e:
-            logger.error(f"Element not found by: {by} with stmt: {select_stmt}. Exception: {e}")
+            logger.error("Element not found by: %s with stmt: %s. Exception: %s", by, select_stmt, e)
             raise
         except InvalidSelectorException as e:
-            logger.error(f"Invalid selector used by {by} with stmt: {select_stmt}. Exception: {e}")
+            logger.error("Invalid selector used by %s with stmt: %s. Exception: %s", by, select_stmt, e)
+            raise
+        except WebDriverException as e:
+            logger.error("WebDriver exception occurred while selecting by %s with stmt: %s. Exception: %s", by, select_stmt, e)
+            raise
+
+    def get_cached_element(self, by, select_stmt) -> CachedWebElement | None:
+        """
+        Look up the element cache without calling WebDriver
+
+        :param by: selenium by element locator - by.id, by.name, by.css_selector...
+        :param select_stmt: selector of the element
+        :return: the cached element, or None on a cache miss
+        """
+        if self._check_url:
+            self._check_url = False
+            self.invalidate_cache_if_url_changed()
+        element = self._element_cache.get((by, select_stmt))
+        if element is None:
+            self.cache_misses += 1
+        else:
+            self.cache_hits += 1
+        return element
+
+    def cache_element(self, by, select_stmt, element) -> CachedWebElement:
+        """
+        Keep an element found by its locator for the next lookups of the same locator
+
+        :param by: selenium by element locator used to find the element
+        :param select_stmt: selector used to find the element
+        :param element: the element found by WebDriver
+        :return: the cached element, re-resolving itself when it goes stale
+        """
+        if self._cache_url is None:
+            # The url the cached elements belong to, read once per filling of the cache
+            self._cache_url = self.browser.current_url
+        key = (by, select_stmt)
+        cached_element = CachedWebElement(self.browser, element.id, resolver=lambda: self._re_resolve(key))
+        self._element_cache[key] = cached_element
+        return cached_element
+
+    def invalidate_cache(self):
+        """
+        Forget all the cached elements. Called when the page navigates
+        """
+        self._element_cache.clear()
+        self._cache_url = None
+
+    def expect_navigation(self):
+        """
+        Called by the page object actions that may navigate, e.g. a click on a link or a form submit: the first
+        lookup after it checks the url, so an element kept by the new page isn't handed out for a locator that now
+        matches another element
+        """
+        self._check_url = True
+
+    def invalidate_cache_if_url_changed(self) -> bool:
+        """
+        Forget the cached elements if the browser left the url they were found on. Costs one WebDriver call, so
+        select_web_element_by only checks the url on the first lookup after expect_navigation()
+
+        :return: True if the cache was invalidated
+        """
+        current_url = self.browser.current_url
+        changed = self._cache_url is not None and current_url != self._cache_url
+        if changed:
+            logger.info("Url changed from %s to %s, invalidating the element cache", self._cache_url, current_url)
+            self.invalidate_cache()
+        self._cache_url = current_url
+        return changed
+
+    def navigate(self, url):
+        """
+        Open a url and invalidate the element cache
+
+        :param url: url to open
+        """
+        self.invalidate_cache()
+        self.browser.get(url)
+        self._cache_url = url
+
+    def refresh(self):
+        """
+        Reload the page and invalidate the element cache
+        """
+        self.invalidate_cache()
+        self.browser.refresh()
+
+    def cache_stats(self) -> dict:
+        """
+        Element cache counters. Every hit is a find_element WebDriver call saved
+
+        :return: dict with the hits, misses and stale re-resolutions
+        """
+        return {"hits": self.cache_hits, "misses": self.cache_misses, "stale_refreshes": self.cache_stale_refreshes}
+
+    def _re_resolve(self, key):
+        self.cache_stale_refreshes += 1
+        logger.info("Cached element by: %s with stmt: %s went stale, locating it again", key[0], key[1])
+        try:
+            return self.browser.find_element(*key)
+        except NoSuchElementException:
+            # The element is gone from the page, don't hand it out anymore
+            self._element_cache.pop(key, None)
+            raise
+
+    def wait_for(self, predicate, args=None, timeout=10):
+        """
+        Wait in the page for a javascript condition, re-checked on every DOM mutation instead of polled.
+        The predicate returns undefined/null while the answer is unknown and any other value, false included,
+        as soon as the condition is met or provably can't be met
+
+        :param predicate: body of a javascript function receiving `args`
+        :param args: json serializable value, or web elements, passed to the predicate
+        :param timeout: seconds to wait before raising a TimeoutException
+        :return: the value returned by the predicate
+        """
+        return dom_waits.wait_for_js(self.browser, predicate, args, timeout)
+
+    def wait_for_document_ready(self, timeout=10):
+        """
+        Wait until the document and its sub-resources are loaded
+
+        :param timeout: seconds to wait before raising a TimeoutException
+        """
+        dom_waits.wait_for_document_ready(self.browser, timeout)
+
+    def query_elements(self, locators, attributes=()) -> list[list[ElementInfo]]:
+        """
+        Find all the elements matching each locator with a single WebDriver call
+
+        :param locators: list of (by, select_stmt) tuples
+        :param attributes: names of the attributes to read on every matched element
+        :return: for each locator, the list of matched elements in document order
+        """
+        spec = {"locators": [list(locator) for locator in locators], "attributes": list(attributes)}
+        results = self._run_bulk_query(spec)
+        return [[ElementInfo(**match) for match in matches] for matches in results]
+
+    def query_element(self, by, select_stmt, attributes=()) -> ElementInfo:
+        """
+        Find the first element matching a locator, together with its text and visibility, in one WebDriver call
+
+        :param by: selenium by element locator - by.id, by.name, by.css_selector...
+        :param select_stmt: selector of the element
+        :param attributes: names of the attributes to read on the element
+        :return: the first matched element
+        """
+        matches = self.query_elements([(by, select_stmt)], attributes)[0]
+        if not matches:
+            logger.error("Element not found by: %s with stmt: %s", by, select_stmt)
+            raise NoSuchElementException(f"No element found by {by} with stmt: {select_stmt}")
+        return matches[0]
+
+    def query_containers(self, container, fields, attributes=()) -> list[dict]:
+        """
+        Find repeated blocks of a page, e.g. the items of a list, and the fields inside each block with a single
+        WebDriver call
+
+        :param container: (by, select_stmt) locating the blocks
+        :param fields: dict of field name to (by, select_stmt) relative to a block. XPath fields must start with '.'
+        :param attributes: names of the attributes to read on every field element
+        :return: for each block, a dict of field name to the first matching ElementInfo, or None if there is no match
+        """
+        spec = {
+            "container": list(container),
+            "fields": {name: list(locator) for name, locator in fields.items()},
+            "attributes": list(attributes)
+        }
+        results = self._run_bulk_query(spec)
+        return [{name: ElementInfo(**match) if match else None for name, match in block.items()} for block in results]
+
+    def snapshot(self) -> dom_snapshot.DomSnapshot:
+        """
+        Fetch the DOM of the page with a single WebDriver call and parse it locally. The read-only checks of many
+        elements (texts, attributes, counts) then cost no round-trip, the elements locate their live counterpart
+        when they are interacted with. Take a new snapshot once the page changed
+
+        :return: a snapshot with find_element and find_elements like the web driver
+        """
+        try:
+            return dom_snapshot.DomSnapshot.take(self.browser)
+        except WebDriverException as e:
+            logger.error("WebDriver exception occurred while taking a DOM snapshot. Exception: %s", e)
             raise
+
+    def record_page_performance(self, page=None) -> dict:
+        """
+        Measure the loading performance of the current document with one WebDriver call: navigation timing (TTFB,
+        DOMContentLoaded, load), first and largest contentful paint, cumulative layout shift, long tasks and their
+        blocking time, and the count, size and slowest of the resources. The metrics are recorded for the page, and
+        checked against its budgets of the performance section of config.json at the end of the test
+
+        :param page: page name keying the budgets, by default the url path of the document
+        :return: dict of metric name to value, times in ms. Empty when the measures are disabled
+        """
+        if not page_performance.RECORDER.enabled:
+            return {}
+        try:
+            result = self.browser.execute_async_script(page_performance.COLLECT_SCRIPT)
         except WebDriverException as e:
-            logger.error(f"WebDriver exception occurred while selecting by {by} with stmt: {select_stmt}. Exception: {e}")
-            raise
\ No newline at end of file
+            logger.error("WebDriver exception occurred while reading the page performance. Exception: %s", e)
+            raise
+        metrics = page_performance.round_metrics(result["metrics"])
+        page_performance.RECORDER.record(type(self).__name__, result["url"], metrics, page)
+        logger.info("Page performance of %s: %s", result["url"], metrics)
+        return metrics
+
+    def measure_action(self, name, action, predicate, args=None, timeout=10, page=None) -> float | None:
+        """
+        Run an action and measure the time until the page shows its result, recorded as the `<name>_ms` metric of
+        the page. Measured in the page, from the first input event of the action to the frame rendering the
+        update, so the WebDriver round-trips are not counted. Costs one WebDriver call before the action and a wait
+        after it. For actions updating the current document, a navigation is measured by record_page_performance
+
+        :param name: name of the action, e.g. add_item_to_cart
+        :param action: callable performing the action, e.g. an element click
+        :param predicate: body of a javascript function receiving `args`, returning undefined/null until the page
+            is updated. It is called once before the action, where it can save the state it compares against in `args`
+        :param args: json serializable value passed to the predicate
+        :param timeout: seconds to wait for the update before raising a TimeoutException
+        :param page: page name keying the budgets, by default the url path of the document
+        :return: the latency in ms, None when the measures are disabled or the action replaced the document
+        """
+        if not page_performance.RECORDER.enabled:
+            action()
+            return None
+        self.browser.execute_script(page_performance.ARM_ACTION_SCRIPT, predicate, args or {})
+        action()
+        result = self.wait_for(page_performance.ACTION_LATENCY_PREDICATE, timeout=timeout)
+        if result is False:
+            logger.warning("The document was replaced during %s, its latency is not measured", name)
+            return None
+        latency = round(result["latency"], 1)
+        page_performance.RECORDER.record(type(self).__name__, result["url"], {f"{name}_ms": latency}, page)
+        logger.info("%s updated the page in %sms", name, latency)
+        return latency
+
+    def retry_action(self, name, action):
+        """
+        Run an action, retried with a backoff when it fails with a transient error: an element covered by an
+        overlay, not interactable yet, or re-rendered since it was located. The element cache is dropped before each
+        retry, so the action has to locate its elements itself. See the retry section of config.json
+
+        :param name: name of the action, e.g. add_item_to_cart
+        :param action: callable with no arguments
+        :return: the value returned by the action
+        """
+        return action_retry.POLICY.run(f"{type(self).__name__}.{name}", action,
+                                       before_retry=lambda e: self.invalidate_cache())
+
+    def check_visual(self, name, locator=None, full_page=False, masks=()) -> visual_regression.VisualCheck | None:
+        """
+        Compare a screenshot of the page, or of one element, to its baseline. Two WebDriver calls: the geometry of the
+        screenshot, then the screenshot itself. The comparison runs in the background, the visual plugin fails the
+        test once it ran if the screenshot differs. A missing baseline is created from the screenshot
+
+        :param name: name of the screenshot, unique within the page object, e.g. inventory
+        :param locator: (by, select_stmt) of the element to capture, None for the page
+        :param full_page: capture the whole document instead of the viewport, ignored with a locator
+        :param masks: (by, select_stmt) locators of the dynamic regions left out of the comparison, on top of the
+            masks of the page object in the visual section of config.json
+        :return: the submitted check, None when the visual checks are disabled
+        """
+        checker = visual_regression.CHECKER
+        if not checker.enabled:
+            return None
+        spec = {
+            "target": list(locator) if locator else None,
+            "masks": [list(mask) for mask in (*checker.masks_for(type(self).__name__), *masks)]
+        }
+        geometry = self.browser.execute_script(VISUAL_GEOMETRY_SCRIPT, spec)
+        if locator and geometry["element"] is None:
+            raise NoSuchElementException(f"No element found by {locator[0]} with stmt: {locator[1]}")
+
+        if locator:
+            clip = geometry["target"]
+        elif full_page:
+            clip = geometry["page"]
+        else:
+            clip = geometry["viewport"]
+        png, clip = self._capture_screenshot(geometry, clip, locator is not None or full_page)
+        boxes = visual_regression.mask_boxes(geometry["masks"], clip, geometry["dpr"])
+        logger.info("Visual check %s of %s submitted, %s masked regions", name, type(self).__name__, len(boxes))
+        return checker.submit(type(self).__name__, name, png, boxes)
+
+    def _capture_screenshot(self, geometry, clip, clipped) -> tuple[bytes, dict]:
+        if not clipped:
+            return self.browser.get_screenshot_as_png(), clip
+        # Chrome captures any region of the document in one call, beyond the viewport too
+        execute_cdp_cmd = getattr(self.browser, "execute_cdp_cmd", None)
+        if execute_cdp_cmd is not None:
+            try:
+                result = execute_cdp_cmd("Page.captureScreenshot", {
+                    "format": "png", "captureBeyondViewport": True, "clip": dict(clip, scale=1)
+                })
+                return base64.b64decode(result["data"]), clip
+            except WebDriverException as e:
+                logger.warning("Couldn't capture the screenshot through the DevTools protocol. Exception: %s", e)
+        if geometry["element"] is not None:
+            return geometry["element"].screenshot_as_png, clip
+        logger.warning("Full page screenshots need Chrome, captured the viewport only")
+        return self.browser.get_screenshot_as_png(), geometry["viewport"]
+
+    def _run_bulk_query(self, spec):
+        try:
+            return self.browser.execute_script(BULK_QUERY_SCRIPT, spec)
+        except WebDriverException as e:
+            logger.error("WebDriver exception occurred while running bulk query %s. Exception: %s", spec, e)
+            raise
@@ -0,0 +1,39 @@
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+
+import logging
+
+import pages.page_base
+
+logger = logging.getLogger(__name__)
+
+
+class PageLogin(pages.page_base.PageBase):
+    def __init__(self, browser):
+        super().__init__(browser=browser)
+        self.username_id = "user-name"
+        self.password_id = "password"
+        self.login_button_id = "login-button"
+        self.title_class = "title"
+
+    def login(self, username, password, timeout=10):
+        """
+        Log in through the login form and wait for the inventory page
+
+        :param username: swag labs user, e.g. standard_user
+        :param password: password of the user
+        :param timeout: seconds to wait for the inventory page title
+        """
+        username_field = self.select_web_element_by(By.ID, self.username_id)
+        username_field.clear()
+        username_field.send_keys(username)
+        self.select_web_element_by(By.ID, self.password_id).send_keys(password)
+        self.select_web_element_by(By.ID, self.login_button_id).click()
+        # The form is replaced by the inventory page
+        self.expect_navigation()
+
+        WebDriverWait(self.browser, timeout).until(
+            EC.presence_of_element_located((By.CLASS_NAME, self.title_class))
+        )
+        logger.info("Logged in through the login form as %s", username)
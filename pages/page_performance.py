@@ -0,0 +1,225 @@
+from __future__ import annotations
+from urllib.parse import urlsplit
+
+import threading
+import logging
+
+from plugins import test_context
+
+logger = logging.getLogger(__name__)
+
+# Values used for the keys the performance section of config.json doesn't set
+DEFAULT_CONFIG = {
+    "enabled": True,
+    "history": "reports/performance/history.jsonl",
+    # Per page, merged over "default": the page name given to the measure, else the url path (e.g. /cart.html),
+    # over the page object class name. A metric is over budget when it is greater than its budget
+    "budgets": {
+        "default": {}
+    }
+}
+
+# Reads the performance of the current document in one call. Navigation and resource timing come from the
+# performance timeline. LCP, layout shifts and long tasks are only reported to observers: they are installed on
+# the first call with `buffered` so the entries from before it are delivered too, and keep accumulating until the
+# document is replaced. A single-page navigation keeps the document, its navigation timing is the one of the
+# initial load
+COLLECT_SCRIPT = """
+var done = arguments[arguments.length - 1];
+var state = window.__pyseleniumPerformance;
+if (!state) {
+    state = window.__pyseleniumPerformance = {lcp: null, cls: 0, longTasks: 0, blocking: 0};
+    var observe = function (type, callback) {
+        try {
+            new PerformanceObserver(function (list) { list.getEntries().forEach(callback); }).observe({type: type, buffered: true});
+        } catch (e) {
+            // Entry type not supported by this browser, its metrics stay empty
+        }
+    };
+    observe('largest-contentful-paint', function (entry) { state.lcp = entry.startTime; });
+    observe('layout-shift', function (entry) { if (!entry.hadRecentInput) { state.cls += entry.value; } });
+    observe('longtask', function (entry) {
+        state.longTasks += 1;
+        state.blocking += Math.max(0, entry.duration - 50);
+    });
+}
+
+var settled = false;
+function report() {
+    if (settled) { return; }
+    settled = true;
+    var navigation = performance.getEntriesByType('navigation')[0];
+    var paint = performance.getEntriesByName('first-contentful-paint')[0];
+    var resources = performance.getEntriesByType('resource');
+    var transfer = navigation ? navigation.transferSize || 0 : 0;
+    var slowest = 0;
+    resources.forEach(function (resource) {
+        transfer += resource.transferSize || 0;
+        slowest = Math.max(slowest, resource.duration);
+    });
+    done({
+        url: location.href,
+        metrics: {
+            ttfb_ms: navigation ? navigation.responseStart - navigation.startTime : null,
+            dom_content_loaded_ms: navigation ? navigation.domContentLoadedEventEnd - navigation.startTime : null,
+            load_ms: navigation && navigation.loadEventEnd ? navigation.loadEventEnd - navigation.startTime : null,
+            fcp_ms: paint ? paint.startTime : null,
+            lcp_ms: state.lcp,
+            cls: state.cls,
+            long_tasks: state.longTasks,
+            total_blocking_time_ms: state.blocking,
+            resources: resources.length,
+            slowest_resource_ms: slowest,
+            transfer_kb: transfer / 1024
+        }
+    });
+}
+
+// The buffered entries are delivered in a task of their own: report after the next frame, or after 100ms when
+// the page doesn't render frames
+setTimeout(report, 100);
+requestAnimationFrame(function () { setTimeout(report, 0); });
+"""
+
+# Armed right before an action. The predicate (body of a javascript function receiving `args`, like the
+# PageBase.wait_for predicates) runs once now to save the state it compares against in `args`, then on every DOM
+# mutation until it returns a value. The latency runs from the first input event of the action to the frame
+# rendering the update, in the page clock, without the WebDriver round-trips
+ARM_ACTION_SCRIPT = """
+var predicate = new Function('args', arguments[0]);
+var args = arguments[1];
+var action = window.__pyseleniumAction = {armed: performance.now(), start: null, end: null};
+predicate(args);
+
+function markStart(event) {
+    if (action.start === null) { action.start = event.timeStamp; }
+}
+['pointerdown', 'mousedown', 'keydown', 'input', 'click'].forEach(function (type) {
+    document.addEventListener(type, markStart, {capture: true, once: true});
+});
+
+var observer = new MutationObserver(function () {
+    var value = predicate(args);
+    if (value === undefined || value === null) { return; }
+    observer.disconnect();
+    requestAnimationFrame(function () { action.end = performance.now(); });
+});
+observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+"""
+
+# Wait predicate of an armed action: its latency in ms and the url, false when a navigation replaced the document
+ACTION_LATENCY_PREDICATE = """
+var action = window.__pyseleniumAction;
+if (!action) { return false; }
+if (action.end === null) { return undefined; }
+return {latency: action.end - (action.start === null ? action.armed : action.start), url: location.href};
+"""
+
+
+def page_name(url, name=None) -> str:
+    """
+    :param url: url of the measured document
+    :param name: page name given to the measure
+    :return: the name, else the path of the url, e.g. /inventory.html
+    """
+    return name or urlsplit(url).path or "/"
+
+
+class PerformanceSample:
+    """
+    Performance metrics measured by a page object, with the test that measured them. `name` is the page measured:
+    a page object measures several pages, e.g. PageCart the inventory and the cart
+    """
+    __slots__ = ("page", "url", "metrics", "nodeid", "name")
+
+    def __init__(self, page, url, metrics, nodeid, name=None):
+        self.page = page
+        self.url = url
+        self.metrics = metrics
+        self.nodeid = nodeid
+        self.name = page_name(url, name)
+
+    def to_dict(self) -> dict:
+        return {"page": self.page, "name": self.name, "url": self.url, "metrics": self.metrics, "nodeid": self.nodeid}
+
+
+class PerformanceRecorder:
+    """
+    Collects the performance samples of every page object of the process. Disabled, the page objects don't measure
+    """
+    def __init__(self):
+        self.enabled = True
+        self.samples = []
+        # Taken by for_test, kept for the history
+        self.taken = []
+        self._lock = threading.Lock()
+
+    def record(self, page, url, metrics, name=None) -> PerformanceSample:
+        sample = PerformanceSample(page, url, metrics, test_context.current_nodeid(), name)
+        with self._lock:
+            self.samples.append(sample)
+        return sample
+
+    def for_test(self, nodeid) -> list[PerformanceSample]:
+        """
+        Take the samples recorded by a test out of the recorder: the next attempt of a rerun test starts without
+        the samples of the failed one. They are still returned by drain()
+
+        :param nodeid: pytest node id
+        :return: the samples recorded by the test since the last call, its fixtures included
+        """
+        with self._lock:
+            samples = [sample for sample in self.samples if sample.nodeid == nodeid]
+            self.samples = [sample for sample in self.samples if sample.nodeid != nodeid]
+            self.taken.extend(samples)
+        return samples
+
+    def drain(self) -> list[PerformanceSample]:
+        """
+        Take all the samples out of the recorder, the ones taken by for_test() included
+
+        :return: the samples recorded since the last drain
+        """
+        with self._lock:
+            samples = self.taken + self.samples
+            self.taken, self.samples = [], []
+        return samples
+
+
+# Recorder shared by the page objects of the process, read by the performance plugin
+RECORDER = PerformanceRecorder()
+
+
+def round_metrics(metrics) -> dict:
+    """
+    :param metrics: dict of metric name to number or None
+    :return: the metrics rounded to 0.1, CLS to 0.0001
+    """
+    return {name: value if value is None else round(value, 4 if name == "cls" else 1) for name, value in metrics.items()}
+
+
+def budget_for(budgets, page, name=None) -> dict:
+    """
+    :param budgets: budgets section of the performance config
+    :param page: page object class name, e.g. PageCart
+    :param name: page name of the sample, e.g. /cart.html
+    :return: the budgets of the page name merged over the ones of the page object class, over the default ones
+    """
+    return {**budgets.get("default", {}), **budgets.get(page, {}), **(budgets.get(name, {}) if name else {})}
+
+
+def check_budgets(samples, budgets) -> list[str]:
+    """
+    Find the metrics over their budget
+
+    :param samples: PerformanceSample list
+    :param budgets: budgets section of the performance config
+    :return: a description of every metric over budget, e.g. "/cart.html lcp_ms 4210.5 > 4000 on https://..."
+    """
+    violations = []
+    for sample in samples:
+        for metric, limit in budget_for(budgets, sample.page, sample.name).items():
+            value = sample.metrics.get(metric)
+            if limit is not None and value is not None and value > limit:
+                violations.append(f"{sample.name} {metric} {value} > {limit} on {sample.url}")
+    return violations
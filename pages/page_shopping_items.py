@@ -1,16 +1,6 @@
 from __future__ import annotations
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import (
-    ElementClickInterceptedException,
-    ElementNotInteractableException,
-    NoSuchElementException,
-    StaleElementReferenceException,
-    TimeoutException,
-    InvalidElementStateException,
-    WebDriverException
-)
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
 
 import logging
 
@@ -19,51 +9,213 @@ import pages.page_base
 logger = logging.getLogger(__name__)
 current_number_in_cart = 0
 
+# Cart badge state for PageBase.wait_for: [badge, text] when the cart has items, false when the cart icon is
+# rendered without a badge, undefined while the header is not rendered yet
+CART_BADGE_PREDICATE = """
+var link = document.getElementsByClassName(args.linkClass)[0];
+if (!link) { return undefined; }
+var badge = link.getElementsByClassName(args.badgeClass)[0];
+return badge ? [badge, badge.textContent] : false;
+"""
+
+# Cart badge text once it differs from the text it had when the predicate was first called, for
+# PageBase.measure_action. The cart icon without a badge counts as an empty text
+CART_BADGE_CHANGED_PREDICATE = """
+var link = document.getElementsByClassName(args.linkClass)[0];
+var badge = link ? link.getElementsByClassName(args.badgeClass)[0] : null;
+var text = badge ? badge.textContent : '';
+if (args.before === undefined) { args.before = text; return undefined; }
+return text !== args.before ? text : undefined;
+"""
+
+# Swag Labs keeps the cart in localStorage as a JSON array of item ids. The items are named here by the slug of
+# their add-to-cart button: add-to-cart-<slug>
+CART_STORAGE_KEY = "cart-contents"
+ITEM_IDS = {
+    "sauce-labs-backpack": 4,
+    "sauce-labs-bike-light": 0,
+    "sauce-labs-bolt-t-shirt": 1,
+    "sauce-labs-fleece-jacket": 5,
+    "sauce-labs-onesie": 2,
+    "test.allthethings()-t-shirt-(red)": 3
+}
+
+# An empty cart is stored as a missing entry, like the application does
+WRITE_CART_SCRIPT = """
+if (arguments[1].length) {
+    window.localStorage.setItem(arguments[0], JSON.stringify(arguments[1]));
+} else {
+    window.localStorage.removeItem(arguments[0]);
+}
+"""
+
+READ_CART_SCRIPT = "return JSON.parse(window.localStorage.getItem(arguments[0])) || [];"
+
+
 class PageCart(pages.page_base.PageBase):
     def __init__(self, browser):
         super().__init__(browser=browser)
         self.cart_badge_class = "shopping_cart_badge"
+        self.cart_link_class = "shopping_cart_link"
+        self.inventory_item_class = "inventory_item"
+        self.item_name_class = "inventory_item_name"
+        self.item_price_class = "inventory_item_price"
+        self.sort_dropdown_class = "product_sort_container"
 
     def add_item_to_cart(self, by, item_selector):
-        try:
-            selected_item = self.select_web_element_by(by, item_selector)
-            assert selected_item.is_displayed(), f"Item selected by {by} with selector {item_selector} is not displayed"
-            logger.info(f"Adding selected item {by} with selector {item_selector}")
-            selected_item.click()
-        except ElementClickInterceptedException as e:
-            #  element is not clickable at the point it is clicked.
-            logger.error(f"Element click intercepted for {selected_item.Name}. Exception: {e}")
-        except ElementNotInteractableException as e:
-            # Item exists but not Interactable
-            logger.error(f"Element not interactable for {selected_item.Name}. Exception: {e}")
-        except NoSuchElementException as e:
-            # Item couldn't be found
-            logger.error(f"No such element found with {selected_item.Name}. Exception: {e}")
-        except StaleElementReferenceException as e:
-            #  element is no longer attached to the DOM. the DOM has been updated or refreshed
-            logger.error(f"Stale element reference for {selected_item.Name}. Exception: {e}")
-        except TimeoutException as e:
-            # command takes too long to execute. exceeds waiting for an element to become clickable or visible.
-            logger.error(f"Timeout while waiting for element {selected_item.Name} to be clickable. Exception: {e}")
-        except InvalidElementStateException as e:
-            # Invalid for interaction. like disabled button
-            logger.error(f"Invalid element state for {selected_item.Name}. Exception: {e}")
-        except WebDriverException as e:
-            # webDriver related issues
-            logger.error(f"WebDriverException occurred for {selected_item.Name}. Exception: {e}")
-        except Exception as e:
-            # Any other issue
-            logger.error(f"An unexpected error occurred: {e}")
+        """
+        Click the add to cart button of an item and wait for the cart badge to show the new count. A click
+        intercepted by an overlay or on a button re-rendered in the meantime is retried, the button located again;
+        any other error is raised
+
+        :param by: selenium by element locator of the button
+        :param item_selector: selector of the button, e.g. add-to-cart-sauce-labs-backpack
+        """
+        def add():
+            # Element and visibility are read in one round-trip
+            selected_item = self.query_element(by, item_selector)
+            assert selected_item.displayed, f"Item selected by {by} with selector {item_selector} is not displayed"
+            # Timed from the click until the cart badge shows the new count
+            self.measure_action("add_item_to_cart", selected_item.element.click, CART_BADGE_CHANGED_PREDICATE,
+                                {"linkClass": self.cart_link_class, "badgeClass": self.cart_badge_class})
+
+        logger.info("Adding selected item %s with selector %s", by, item_selector)
+        self.retry_action("add_item_to_cart", add)
+
+    def set_cart_contents(self, items):
+        """
+        Replace the cart contents through the client-side storage of the application: one script call and one
+        refresh, whatever the number of items, instead of a click per item
+
+        :param items: slugs of the items (e.g. sauce-labs-backpack), in the order they were added
+        """
+        unknown = [item for item in items if item not in ITEM_IDS]
+        if unknown:
+            raise ValueError(f"Unknown items {unknown}, known items: {', '.join(ITEM_IDS)}")
+        self.browser.execute_script(WRITE_CART_SCRIPT, CART_STORAGE_KEY, [ITEM_IDS[item] for item in items])
+        # The application reads the storage when the page loads
+        self.refresh()
+        logger.info("Cart contents set to %s", list(items))
+
+    def get_cart_contents(self) -> list[str]:
+        """
+        Read the cart contents from the client-side storage of the application with a single WebDriver call
+
+        :return: slugs of the items in the cart, in the order they were added
+        """
+        slugs = {item_id: item for item, item_id in ITEM_IDS.items()}
+        return [slugs[item_id] for item_id in self.browser.execute_script(READ_CART_SCRIPT, CART_STORAGE_KEY)]
 
     def get_cart_count(self):
+        # Reuse the badge found by a previous call on this page. It locates itself again if React re-rendered it
+        shopping_cart_element = self.get_cached_element(By.CLASS_NAME, self.cart_badge_class)
+        if shopping_cart_element is not None:
+            try:
+                return self._read_cart_badge(shopping_cart_element)
+            except NoSuchElementException:
+                # The badge was removed, the cart may be empty now
+                pass
+
         try:
-            shopping_cart_element = WebDriverWait(self.browser, 10).until(
-                EC.presence_of_element_located((By.CLASS_NAME, self.cart_badge_class))
-            )
-            number_of_items_in_cart = float(shopping_cart_element.text.replace('$', ''))
-            logger.info(f"The shopping cart has {number_of_items_in_cart} items")
-            return number_of_items_in_cart
+            # Resolves as soon as the badge is there, or the cart icon is rendered without a badge (empty cart)
+            cart_badge = self.wait_for(CART_BADGE_PREDICATE, {"linkClass": self.cart_link_class, "badgeClass": self.cart_badge_class})
         except TimeoutException:
-            # TODO: check the cart image exists, only then return 0
-            logger.info(f"Shooping cart is empty")
-            return 0
\ No newline at end of file
+            logger.warning("Shopping cart icon not found on the page")
+            return 0
+
+        if cart_badge is False:
+            logger.info("Shooping cart is empty")
+            return 0
+
+        # The predicate returns the badge with its text, no extra round-trip needed to read it
+        shopping_cart_element, badge_text = cart_badge
+        self.cache_element(By.CLASS_NAME, self.cart_badge_class, shopping_cart_element)
+        number_of_items_in_cart = float(badge_text.replace('$', ''))
+        logger.info("The shopping cart has %s items", number_of_items_in_cart)
+        return number_of_items_in_cart
+
+    def _read_cart_badge(self, shopping_cart_element):
+        number_of_items_in_cart = float(shopping_cart_element.text.replace('$', ''))
+        logger.info("The shopping cart has %s items", number_of_items_in_cart)
+        return number_of_items_in_cart
+
+    def get_inventory_items(self) -> list[dict]:
+        """
+        Read the name, price and button of every listed item with a single WebDriver call
+
+        :return: list of dicts with the item name, its price as a float and the ElementInfo of its button
+        """
+        blocks = self.query_containers(
+            container=(By.CLASS_NAME, self.inventory_item_class),
+            fields={
+                "name": (By.CLASS_NAME, self.item_name_class),
+                "price": (By.CLASS_NAME, self.item_price_class),
+                "button": (By.TAG_NAME, "button")
+            }
+        )
+        return [{
+            "name": block["name"].text,
+            "price": float(block["price"].text.replace('$', '')),
+            "button": block["button"]
+        } for block in blocks]
+
+    def get_item_prices(self, snapshot=None) -> list[float]:
+        """
+        Read the prices of the listed items, in the order they are displayed, with a single WebDriver call
+
+        :param snapshot: DomSnapshot of the page to read the prices from without any WebDriver call
+        :return: list of prices
+        """
+        if snapshot is not None:
+            price_elements = snapshot.find_elements(By.CLASS_NAME, self.item_price_class)
+        else:
+            price_elements = self.query_elements([(By.CLASS_NAME, self.item_price_class)])[0]
+        return [float(price.text.replace('$', '')) for price in price_elements]
+
+    def get_item_names(self, snapshot=None) -> list[str]:
+        """
+        Read the names of the listed items, in the order they are displayed, with a single WebDriver call
+
+        :param snapshot: DomSnapshot of the page to read the names from without any WebDriver call
+        :return: list of names
+        """
+        if snapshot is not None:
+            name_elements = snapshot.find_elements(By.CLASS_NAME, self.item_name_class)
+        else:
+            name_elements = self.query_elements([(By.CLASS_NAME, self.item_name_class)])[0]
+        return [name.text for name in name_elements]
+
+    def add_cheapest_item_to_cart(self):
+        """
+        Add the item with the lowest price to the cart
+
+        :return: the name of the added item
+        """
+        def add():
+            # The items are read again on a retry, their buttons may have been re-rendered
+            cheapest_item = min(self.get_inventory_items(), key=lambda item: item["price"])
+            logger.info("Adding the cheapest item %s at %s", cheapest_item['name'], cheapest_item['price'])
+            cheapest_item["button"].element.click()
+            return cheapest_item["name"]
+
+        return self.retry_action("add_cheapest_item_to_cart", add)
+
+    def sort_items_by(self, option_value):
+        """
+        Sort the listed items using the sort dropdown
+
+        :param option_value: value of the sort option - az, za, lohi or hilo
+        """
+        sort_dropdown = self.select_web_element_by(By.CLASS_NAME, self.sort_dropdown_class)
+        sort_dropdown.click()
+        sort_dropdown.find_element(By.CSS_SELECTOR, f"option[value='{option_value}']").click()
+        logger.info("Sorted items by %s", option_value)
+
+    def open_cart(self):
+        """
+        Open the cart page through the cart link of the header
+        """
+        self.select_web_element_by(By.CLASS_NAME, self.cart_link_class).click()
+        # The header stays, the elements cached for the inventory are checked against the new url
+        self.expect_navigation()
+        logger.info("Opened the cart page")
@@ -0,0 +1,385 @@
+from __future__ import annotations
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import hashlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import re
+import threading
+import time
+import logging
+
+from plugins import test_context
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:
+    np = None
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Values used for the keys the visual section of config.json doesn't set
+DEFAULT_CONFIG = {
+    "enabled": True,
+    "baselines": "config/visual_baselines",
+    "results": "reports/visual",
+    # Largest difference of a color channel still counted as the same pixel, for the anti-aliasing noise
+    "pixel_tolerance": 8,
+    # Largest fraction of differing pixels of a passing screenshot
+    "max_diff_ratio": 0.001,
+    # Screenshots further apart than this perceptual hash distance (bits of 64) fail without a pixel diff
+    "max_hash_distance": 12,
+    # Processes comparing the screenshots, 0 to compare in the test process
+    "workers": 2,
+    # Seconds to wait for the comparisons of a test once it ran
+    "timeout": 60,
+    # Locators of the dynamic regions masked on every screenshot of a page object, by class name
+    "masks": {"default": []}
+}
+
+BASELINE_NAME = re.compile(r"^[\w.-]+(/[\w.-]+)*$")
+
+
+def require_numpy():
+    if np is None or Image is None:
+        raise RuntimeError("The visual checks need numpy and pillow: pip install numpy pillow")
+
+
+def decode_png(png) -> "np.ndarray":
+    """
+    :param png: PNG bytes
+    :return: height x width x 3 array of RGB values
+    """
+    with Image.open(io.BytesIO(png)) as image:
+        return np.asarray(image.convert("RGB"))
+
+
+def encode_png(pixels) -> bytes:
+    output = io.BytesIO()
+    Image.fromarray(pixels).save(output, format="PNG")
+    return output.getvalue()
+
+
+def mask_boxes(rects, clip, device_pixel_ratio) -> list[list[int]]:
+    """
+    Convert the rectangles of masked elements into pixel boxes of a screenshot
+
+    :param rects: dicts with the x, y, width and height of the elements, in CSS pixels of the document
+    :param clip: rectangle of the document captured by the screenshot, in CSS pixels
+    :param device_pixel_ratio: device pixels per CSS pixel of the screenshot
+    :return: [left, top, right, bottom] boxes in device pixels, rounded outwards
+    """
+    boxes = []
+    for rect in rects:
+        left = math.floor((rect["x"] - clip["x"]) * device_pixel_ratio)
+        top = math.floor((rect["y"] - clip["y"]) * device_pixel_ratio)
+        right = math.ceil((rect["x"] + rect["width"] - clip["x"]) * device_pixel_ratio)
+        bottom = math.ceil((rect["y"] + rect["height"] - clip["y"]) * device_pixel_ratio)
+        boxes.append([max(left, 0), max(top, 0), max(right, 0), max(bottom, 0)])
+    return boxes
+
+
+def apply_masks(pixels, boxes) -> "np.ndarray":
+    """
+    :param pixels: image array
+    :param boxes: [left, top, right, bottom] boxes, clipped to the image
+    :return: a copy of the image with the boxes filled in black
+    """
+    if not boxes:
+        return pixels
+    masked = pixels.copy()
+    for left, top, right, bottom in boxes:
+        masked[top:bottom, left:right] = 0
+    return masked
+
+
+def dhash(pixels, size=8) -> int:
+    """
+    Difference hash of an image: the brightness gradients of a size x (size + 1) grayscale thumbnail, one bit each.
+    Close images have hashes a few bits apart
+
+    :param pixels: image array
+    :return: size * size bits hash
+    """
+    gray = pixels @ np.array([0.299, 0.587, 0.114])
+    thumbnail = np.asarray(Image.fromarray(gray.astype(np.uint8)).resize((size + 1, size), Image.BOX), dtype=np.int16)
+    bits = np.packbits(thumbnail[:, 1:] > thumbnail[:, :-1])
+    return int.from_bytes(bits.tobytes(), "big")
+
+
+def hash_distance(first, second) -> int:
+    return bin(first ^ second).count("1")
+
+
+def diff_pixels(baseline, actual, tolerance) -> "np.ndarray":
+    """
+    :param baseline: image array
+    :param actual: image array of the same size
+    :param tolerance: largest difference of a color channel of matching pixels
+    :return: height x width boolean array of the differing pixels
+    """
+    return (np.abs(baseline.astype(np.int16) - actual.astype(np.int16)) > tolerance).any(axis=2)
+
+
+def diff_image(baseline, differing) -> "np.ndarray":
+    """
+    :return: the baseline faded to light gray, with the differing pixels in red
+    """
+    image = np.repeat((baseline.mean(axis=2, keepdims=True) * 0.3 + 170).astype(np.uint8), 3, axis=2)
+    image[differing] = (255, 0, 0)
+    return image
+
+
+def bounding_box(differing) -> list[int]:
+    """
+    :return: [left, top, right, bottom] of the differing pixels
+    """
+    rows = np.flatnonzero(differing.any(axis=1))
+    columns = np.flatnonzero(differing.any(axis=0))
+    return [int(columns[0]), int(rows[0]), int(columns[-1]) + 1, int(rows[-1]) + 1]
+
+
+def write_file(path, content):
+    # Written aside and renamed, the xdist workers and the comparison processes share the directories
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary_path, "wb") as output_file:
+        output_file.write(content)
+    os.replace(temporary_path, path)
+
+
+class BaselineStore:
+    """
+    Baseline screenshots stored by content: objects/<sha256>.png holds each distinct image once, whatever the
+    number of baselines showing it, and refs/<name>.json points a baseline name at its image. Both are written
+    aside and renamed, the xdist workers share the store
+    """
+    def __init__(self, root):
+        self.root = root
+
+    def ref_path(self, name) -> str:
+        if not BASELINE_NAME.match(name):
+            raise ValueError(f"Invalid baseline name {name}: letters, digits, '.', '-', '_' and '/' separators only")
+        return os.path.join(self.root, "refs", f"{name}.json")
+
+    def object_path(self, digest) -> str:
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.png")
+
+    def get(self, name) -> dict | None:
+        """
+        :param name: baseline name, e.g. lean/PageCart/inventory
+        :return: digest, width and height of the baseline image, None when there is no baseline
+        """
+        try:
+            with open(self.ref_path(name), encoding="utf-8") as ref_file:
+                return json.load(ref_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def read(self, ref) -> bytes:
+        with open(self.object_path(ref["digest"]), "rb") as image_file:
+            return image_file.read()
+
+    def put(self, name, png, pixels) -> dict:
+        """
+        Make an image the baseline of a name
+
+        :param name: baseline name
+        :param png: PNG bytes of the image
+        :param pixels: decoded image
+        :return: the new ref
+        """
+        digest = hashlib.sha256(png).hexdigest()
+        if not os.path.exists(self.object_path(digest)):
+            write_file(self.object_path(digest), png)
+        ref = {"digest": digest, "width": int(pixels.shape[1]), "height": int(pixels.shape[0]), "updated": time.time()}
+        write_file(self.ref_path(name), json.dumps(ref, indent=2).encode("utf-8"))
+        return ref
+
+
+def compare(job) -> dict:
+    """
+    Compare a screenshot to its baseline. Runs in the comparison processes: decoding, hashing, diffing and writing
+    the images stay out of the test process
+
+    Identical PNG bytes pass without being decoded. Otherwise both images are masked and their perceptual hashes
+    compared: screenshots too far apart fail right away, the others are diffed pixel by pixel. With update set the
+    screenshot becomes the baseline, otherwise a missing baseline is reported as missing: a check never passes on its
+    first run, the visual plugin skips it or fails it with --require-baselines
+
+    :param job: dict with the baseline name, the screenshot png, the mask boxes, the store and results
+        directories, the options of the visual config and update
+    :return: dict with the name, status (identical, passed, failed, missing, new or updated), message, and the hash
+        distance, diff ratio, box of the differences and files written when computed
+    """
+    require_numpy()
+    store = BaselineStore(job["store"])
+    name, png, options = job["name"], job["png"], job["options"]
+    result = {"name": name, "status": "passed", "message": "", "hash_distance": None, "diff_ratio": None,
+              "box": None, "files": []}
+    ref = store.get(name)
+    if ref is not None and not job["update"] and hashlib.sha256(png).hexdigest() == ref["digest"]:
+        return dict(result, status="identical", message="identical to the baseline")
+
+    def write(suffix, content):
+        path = os.path.join(job["results"], f"{name}-{suffix}.png")
+        write_file(path, content)
+        result["files"].append(path)
+
+    if ref is None and not job["update"]:
+        write("actual", png)
+        return dict(result, status="missing", message="no baseline, review the screenshot and create it with "
+                                                      "pytest --update-baselines")
+    actual = decode_png(png)
+    if job["update"]:
+        store.put(name, png, actual)
+        status = "new" if ref is None else "updated"
+        return dict(result, status=status, message=f"{status} baseline {actual.shape[1]}x{actual.shape[0]}")
+
+    if (actual.shape[1], actual.shape[0]) != (ref["width"], ref["height"]):
+        write("actual", png)
+        return dict(result, status="failed", message=f"size {actual.shape[1]}x{actual.shape[0]} instead of "
+                                                     f"{ref['width']}x{ref['height']}")
+
+    baseline = apply_masks(decode_png(store.read(ref)), job["masks"])
+    actual = apply_masks(actual, job["masks"])
+    result["hash_distance"] = hash_distance(dhash(baseline), dhash(actual))
+    if result["hash_distance"] > options["max_hash_distance"]:
+        write("actual", png)
+        return dict(result, status="failed", message=f"looks different, perceptual hash distance "
+                                                     f"{result['hash_distance']} > {options['max_hash_distance']}")
+
+    differing = diff_pixels(baseline, actual, options["pixel_tolerance"])
+    result["diff_ratio"] = round(float(differing.mean()), 6)
+    if result["diff_ratio"] <= options["max_diff_ratio"]:
+        return result
+    result["box"] = bounding_box(differing)
+    write("actual", png)
+    write("diff", encode_png(diff_image(baseline, differing)))
+    return dict(result, status="failed", message=f"{result['diff_ratio']:.2%} of the pixels differ "
+                                                 f"(> {options['max_diff_ratio']:.2%}) in {result['box']}")
+
+
+class VisualCheck:
+    """
+    A screenshot comparison submitted by a page object, with the test that submitted it
+    """
+    __slots__ = ("page", "name", "nodeid", "future")
+
+    def __init__(self, page, name, nodeid, future):
+        self.page = page
+        self.name = name
+        self.nodeid = nodeid
+        self.future = future
+
+
+class VisualChecker:
+    """
+    Compares the screenshots of every page object of the process to their baselines on a pool of processes. The page
+    objects submit their screenshots and go on, the visual plugin waits for the comparisons of a test once it ran
+    """
+    def __init__(self):
+        self.enabled = np is not None and Image is not None
+        self.store = BaselineStore(DEFAULT_CONFIG["baselines"])
+        self.results_dir = DEFAULT_CONFIG["results"]
+        self.variant = "default"
+        self.update = False
+        self.config = dict(DEFAULT_CONFIG)
+        self.checks = []
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def configure(self, config, baselines, results_dir, variant, update=False):
+        """
+        :param config: visual section of config.json merged over DEFAULT_CONFIG
+        :param baselines: directory of the baseline store
+        :param results_dir: directory of the screenshots and diffs of the failed checks
+        :param variant: prefix of the baseline names, e.g. the driver profile: screenshots of another window size or
+            browser have their own baselines
+        :param update: replace the baselines with the screenshots taken
+        """
+        self.config = config
+        self.enabled = config["enabled"] and np is not None and Image is not None
+        if config["enabled"] and not self.enabled:
+            logger.warning("numpy or pillow is not installed, the visual checks are disabled")
+        self.store = BaselineStore(baselines)
+        self.results_dir = results_dir
+        self.variant = variant
+        self.update = update
+
+    def masks_for(self, page) -> list:
+        """
+        :param page: page object class name, e.g. PageCart
+        :return: the locators masked on every screenshot of the page
+        """
+        masks = self.config["masks"]
+        return [*masks.get("default", []), *masks.get(page, [])]
+
+    def submit(self, page, name, png, boxes) -> VisualCheck:
+        """
+        :param page: page object class name
+        :param name: name of the screenshot, unique within the page object
+        :param png: PNG bytes of the screenshot
+        :param boxes: [left, top, right, bottom] pixel boxes masked on both images
+        :return: the check, its future gives the result of compare()
+        """
+        job = {
+            "name": f"{self.variant}/{page}/{name}",
+            "png": png,
+            "masks": boxes,
+            "store": self.store.root,
+            "results": self.results_dir,
+            "options": {key: self.config[key] for key in ("pixel_tolerance", "max_diff_ratio", "max_hash_distance")},
+            "update": self.update
+        }
+        if self.config["workers"] > 0:
+            future = self._pool().submit(compare, job)
+        else:
+            future = Future()
+            try:
+                future.set_result(compare(job))
+            except Exception as e:
+                future.set_exception(e)
+        check = VisualCheck(page, name, test_context.current_nodeid(), future)
+        with self._lock:
+            self.checks.append(check)
+        return check
+
+    def for_test(self, nodeid) -> list[VisualCheck]:
+        """
+        Take the checks submitted by a test out of the checker
+
+        :param nodeid: pytest node id
+        :return: the checks of the test, its fixtures included
+        """
+        with self._lock:
+            checks = [check for check in self.checks if check.nodeid == nodeid]
+            self.checks = [check for check in self.checks if check.nodeid != nodeid]
+        return checks
+
+    def close(self):
+        """
+        Wait for the pending comparisons and stop the comparison processes
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self.checks = []
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Spawned, not forked: the test process runs the WebDriver connection threads
+                self._executor = ProcessPoolExecutor(max_workers=self.config["workers"],
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+
+# Checker shared by the page objects of the process, configured and read by the visual plugin
+CHECKER = VisualChecker()
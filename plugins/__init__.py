@@ -0,0 +1 @@
+# pytest plugins of the project. They are registered by the root conftest.py
\ No newline at end of file
@@ -0,0 +1,292 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor, wait
+from selenium.common.exceptions import WebDriverException
+
+import base64
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+import logging
+import pytest
+
+import settings
+
+logger = logging.getLogger(__name__)
+
+writer_key = pytest.StashKey["ArtifactWriter"]()
+result_key = pytest.StashKey[dict]()
+
+DEFAULT_CONFIG = {
+    "dir": "reports/allure-results",
+    "workers": 2,
+    "capture_budget": 3.0,
+    "flush_timeout": 30.0,
+    "compress": False
+}
+
+# id(driver): reader thread left running a WebDriver command after its budget was spent
+_abandoned_readers = {}
+_abandoned_lock = threading.Lock()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("artifacts", "failure artifacts")
+    group.addoption("--artifacts-dir", metavar="DIR", default=None,
+                    help="Allure results directory for the test results and the screenshot, DOM and console log "
+                         "of the failed tests. An empty value disables them (default: artifacts.dir in config.json)")
+
+
+def find_driver(item):
+    """
+    :return: the web driver used by a test, None when it doesn't use one
+    """
+    for value in getattr(item, "funcargs", {}).values():
+        try:
+            if hasattr(value, "get_screenshot_as_base64") and hasattr(value, "page_source"):
+                return value
+        except WebDriverException:
+            # A recycled browser that no new one replaced, see drivers/browser_watchdog.py
+            continue
+    return None
+
+
+def capture(driver, budget) -> list[tuple[str, str, object]]:
+    """
+    Read the artifacts of a failure from the browser. Only the WebDriver calls are made here, everything else is
+    left to the writer threads. The calls run on a reader thread given the budget: a browser hanging on a command
+    doesn't hold the test until the WebDriver command timeout, and the artifacts not read in time are skipped.
+    An abandoned reader is cancelled before its next command, wait_for_capture() waits for the one it is running
+
+    :param driver: web driver of the failed test
+    :param budget: seconds the capture may take
+    :return: (name, kind, raw content) of each captured artifact
+    """
+    steps = [
+        ("screenshot", "screenshot", driver.get_screenshot_as_base64),
+        ("page source", "dom", lambda: driver.page_source),
+        ("browser console", "console", lambda: driver.get_log("browser"))
+    ]
+    artifacts = []
+    attempted = []
+    cancelled = threading.Event()
+
+    def read_artifacts():
+        for name, kind, read in steps:
+            if cancelled.is_set():
+                return
+            try:
+                content = read()
+            except Exception as e:
+                # The browser may be gone, or not support the command (e.g. logs of other browsers than Chrome)
+                logger.warning("Couldn't capture the %s. Exception: %s", name, e)
+                continue
+            finally:
+                attempted.append(name)
+            if not cancelled.is_set():
+                artifacts.append((name, kind, content))
+
+    # Daemon thread: a call hung past the budget is left behind, it doesn't hold the exit of the session either
+    reader = threading.Thread(target=read_artifacts, name="artifacts-capture", daemon=True)
+    reader.start()
+    reader.join(budget)
+    if reader.is_alive():
+        cancelled.set()
+        with _abandoned_lock:
+            _abandoned_readers[id(driver)] = reader
+        skipped = [name for name, kind, read in steps if name not in attempted]
+        logger.warning("Artifact capture budget of %ss spent, skipped the %s", budget, ", ".join(skipped))
+    return list(artifacts)
+
+
+def wait_for_capture(driver):
+    """
+    Wait for the command an abandoned capture still runs on the driver, so that it doesn't overlap the reset or quit
+    of the browser in the teardown
+
+    :param driver: web driver given to capture()
+    """
+    with _abandoned_lock:
+        reader = _abandoned_readers.pop(id(driver), None)
+    if reader is not None and reader.is_alive():
+        logger.warning("Waiting for the artifact capture to finish its WebDriver command before the teardown")
+        reader.join()
+
+
+def console_lines(entries) -> str:
+    """
+    :param entries: browser log entries, dicts with the level, message and timestamp
+    :return: one line per entry, readable inline in the Allure report
+    """
+    return "".join(f"{entry.get('timestamp', '')} {entry.get('level', '')} {entry.get('message', '')}\n"
+                   for entry in entries)
+
+
+def allure_status(report, call) -> str:
+    if report.passed:
+        return "passed"
+    if report.skipped:
+        return "skipped"
+    # Allure tells the assertion failures of the test from the other errors
+    return "failed" if report.when == "call" and call.excinfo.errisinstance(AssertionError) else "broken"
+
+
+class ArtifactWriter:
+    """
+    Writes Allure results and their attachments on a pool of background threads.
+
+    Attachments are named by the SHA-256 of their content: the same screenshot or page source captured by
+    several failures is written once and referenced by all their results. Attachments are written with the types
+    Allure shows inline, or the page source and console log gzipped when compress is set.
+    """
+    # kind: (mime type, file extension)
+    TYPES = {
+        "screenshot": ("image/png", "png"),
+        "dom": ("text/html", "html"),
+        "console": ("text/plain", "txt")
+    }
+
+    def __init__(self, results_dir, workers=2, compress=False):
+        self.results_dir = results_dir
+        self.compress = compress
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="artifacts")
+        self._futures = []
+        self._lock = threading.Lock()
+        self.stats = {"results": 0, "attachments": 0, "deduplicated": 0, "bytes": 0}
+        os.makedirs(results_dir, exist_ok=True)
+
+    def submit(self, result, artifacts=()):
+        """
+        Queue an Allure test result with its raw artifacts. Returns right away
+
+        :param result: Allure result dict, without its attachments
+        :param artifacts: (name, kind, raw content) returned by capture()
+        """
+        self._futures.append(self._executor.submit(self._write_result, result, list(artifacts)))
+
+    def flush(self, timeout) -> int:
+        """
+        Wait for the queued writes, at most timeout seconds
+
+        :return: number of results not written in time
+        """
+        done, not_done = wait(self._futures, timeout=timeout)
+        for future in done:
+            if future.exception() is not None:
+                logger.error("Failed to write test artifacts. Exception: %s", future.exception())
+        self._futures = list(not_done)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        return len(not_done)
+
+    def encode(self, kind, raw) -> bytes:
+        if kind == "screenshot":
+            return base64.b64decode(raw)
+        if kind == "console":
+            return console_lines(raw).encode("utf-8")
+        return raw.encode("utf-8")
+
+    def _write_result(self, result, artifacts):
+        result["attachments"] = [self._write_attachment(name, kind, raw) for name, kind, raw in artifacts]
+        self._write_file(f"{result['uuid']}-result.json", json.dumps(result).encode("utf-8"))
+        with self._lock:
+            self.stats["results"] += 1
+
+    def _write_attachment(self, name, kind, raw) -> dict:
+        content = self.encode(kind, raw)
+        mime, extension = self.TYPES[kind]
+        if self.compress and kind != "screenshot":
+            # PNG is already compressed. mtime=0 keeps the gzip of identical content identical
+            content = gzip.compress(content, compresslevel=6, mtime=0)
+            mime, extension = "application/gzip", f"{extension}.gz"
+        source = f"{hashlib.sha256(content).hexdigest()}-attachment.{extension}"
+
+        if os.path.exists(os.path.join(self.results_dir, source)):
+            with self._lock:
+                self.stats["deduplicated"] += 1
+        else:
+            self._write_file(source, content)
+            with self._lock:
+                self.stats["attachments"] += 1
+                self.stats["bytes"] += len(content)
+        return {"name": name, "source": source, "type": mime}
+
+    def _write_file(self, file_name, content):
+        # Written aside and renamed, the xdist workers share the directory
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.results_dir, prefix=".tmp-")
+        with os.fdopen(descriptor, "wb") as temporary_file:
+            temporary_file.write(content)
+        os.replace(temporary_path, os.path.join(self.results_dir, file_name))
+
+
+def pytest_configure(config):
+    artifacts_config = settings.get_section("artifacts", DEFAULT_CONFIG)
+    results_dir = config.getoption("artifacts_dir")
+    if results_dir is None:
+        results_dir = artifacts_config["dir"]
+    if not results_dir:
+        return
+    config.stash[writer_key] = ArtifactWriter(
+        os.path.join(str(config.rootpath), results_dir),
+        workers=artifacts_config["workers"],
+        compress=artifacts_config["compress"]
+    )
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    outcome = yield
+    report = outcome.get_result()
+    writer = item.config.stash.get(writer_key, None)
+    if writer is None:
+        return
+
+    result = item.stash.setdefault(result_key, {
+        "uuid": str(uuid.uuid4()),
+        "historyId": hashlib.md5(item.nodeid.encode("utf-8")).hexdigest(),
+        "fullName": item.nodeid,
+        "name": item.name,
+        "status": "passed",
+        "stage": "finished",
+        "start": int(call.start * 1000),
+        "labels": [{"name": "suite", "value": item.nodeid.split("::")[0]}],
+        "artifacts": []
+    })
+    result["stop"] = int(call.stop * 1000)
+    if report.failed or (report.skipped and result["status"] == "passed"):
+        result["status"] = allure_status(report, call)
+        result["statusDetails"] = {"message": call.excinfo.exconly() if call.excinfo else "", "trace": report.longreprtext}
+        # Captured before the teardown of the test closes or resets its browser
+        driver = find_driver(item) if report.failed and report.when != "teardown" else None
+        if driver is not None and not result["artifacts"]:
+            artifacts_config = settings.get_section("artifacts", DEFAULT_CONFIG)
+            result["artifacts"] = capture(driver, artifacts_config["capture_budget"])
+
+    if report.when == "teardown":
+        # A rerun of the test starts a new result with the same historyId, shown by Allure as a retry
+        del item.stash[result_key]
+        writer.submit(result, result.pop("artifacts"))
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_teardown(item, nextitem):
+    # Before the fixtures of the test reset, release or quit its browser
+    for value in getattr(item, "funcargs", {}).values():
+        wait_for_capture(value)
+    yield
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_sessionfinish(session, exitstatus):
+    writer = session.config.stash.get(writer_key, None)
+    if writer is None:
+        return
+    flush_timeout = settings.get_section("artifacts", DEFAULT_CONFIG)["flush_timeout"]
+    start = time.monotonic()
+    pending = writer.flush(flush_timeout)
+    if pending:
+        logger.error("%s test results not written within %ss", pending, flush_timeout)
+    logger.info("Artifacts written in %.2fs: %s", time.monotonic() - start, writer.stats)
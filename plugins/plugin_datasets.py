@@ -0,0 +1,289 @@
+from __future__ import annotations
+from array import array
+
+import csv
+import hashlib
+import io
+import json
+import os
+import random
+import pytest
+
+import settings
+
+datasets_key = pytest.StashKey[dict]()
+
+# Values used for the keys the datasets section of config.json doesn't set
+DEFAULT_CONFIG = {
+    "dir": "config/datasets",
+    "sample": None,
+    "seed": 0,
+    # Largest number of rows collected from a dataset without --dataset-sample, 0 for no limit
+    "max_rows": 10000
+}
+
+# Bump when the index layout changes, the indexes cached by older versions are then rebuilt
+INDEX_VERSION = 1
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_digest(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as data_file:
+        for chunk in iter(lambda: data_file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_csv_record(record) -> list[str]:
+    return next(csv.reader(io.StringIO(record.decode("utf-8"))))
+
+
+def write_atomic(path, content):
+    # Written aside and renamed, the xdist workers collect at the same time
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as temporary_file:
+        temporary_file.write(content)
+    os.replace(temporary_path, path)
+
+
+class Dataset:
+    """
+    A CSV or JSON lines file of test parameters, read one row at a time.
+
+    The rows are never all loaded: a single streaming pass validates them and records the byte offset of each
+    one. This index is cached by file content hash, so the next collections only hash the file. A test seeks
+    to its own row when it runs.
+    """
+    def __init__(self, path, cache_dir=None):
+        """
+        :param path: .csv file with a header line, or .jsonl file with one JSON object per line
+        :param cache_dir: directory of the cached indexes, None to index on every load
+        """
+        self.path = path
+        self.format = "jsonl" if path.endswith(".jsonl") else "csv"
+        self.columns, self.offsets = self._load_index(cache_dir)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def require(self, columns):
+        """
+        :param columns: columns every row must have
+        """
+        missing = [column for column in columns if column not in self.columns]
+        if missing:
+            raise ValueError(f"Dataset {self.path} has no column {', '.join(missing)}. Columns: {', '.join(self.columns)}")
+
+    def row(self, index) -> dict:
+        """
+        Read and parse one row
+
+        :param index: row number, from 0
+        :return: the row as a dict of column values
+        """
+        with open(self.path, "rb") as data_file:
+            data_file.seek(self.offsets[index])
+            record = self._read_record(data_file)
+        if self.format == "jsonl":
+            return json.loads(record)
+        return dict(zip(self.columns, parse_csv_record(record)))
+
+    def select(self, sample=None, seed=0, shard=None) -> list[int]:
+        """
+        Row numbers to run
+
+        :param sample: number of rows picked at random, None for all of them
+        :param seed: seed of the sample, the same seed picks the same rows
+        :param shard: (index, count) to keep one of count shards, index from 1
+        :return: sorted row numbers
+        """
+        indices = self._shard_rows(shard)
+        if sample is not None and sample < len(indices):
+            return sorted(random.Random(seed).sample(indices, sample))
+        return list(indices)
+
+    def size(self, shard=None) -> int:
+        """
+        :param shard: (index, count) of a shard, None for the whole dataset
+        :return: number of rows of the shard
+        """
+        return len(self._shard_rows(shard))
+
+    def _shard_rows(self, shard) -> range:
+        indices = range(len(self))
+        if shard is not None:
+            shard_index, shard_count = shard
+            indices = indices[shard_index - 1::shard_count]
+        return indices
+
+    def _load_index(self, cache_dir):
+        digest = file_digest(self.path)
+        if cache_dir is None:
+            return self._build_index()
+        base_path = os.path.join(cache_dir, f"{digest}-v{INDEX_VERSION}")
+        try:
+            with open(f"{base_path}.json", encoding="utf-8") as meta_file:
+                meta = json.load(meta_file)
+            offsets = array("q")
+            with open(f"{base_path}.idx", "rb") as index_file:
+                offsets.fromfile(index_file, meta["rows"])
+            return meta["columns"], offsets
+        except (FileNotFoundError, EOFError, ValueError, KeyError):
+            pass
+
+        columns, offsets = self._build_index()
+        os.makedirs(cache_dir, exist_ok=True)
+        # The offsets first: the metadata file marks a complete index
+        write_atomic(f"{base_path}.idx", offsets.tobytes())
+        write_atomic(f"{base_path}.json", json.dumps({"path": self.path, "columns": columns, "rows": len(offsets)}).encode("utf-8"))
+        return columns, offsets
+
+    def _build_index(self):
+        offsets = array("q")
+        columns = None
+        with open(self.path, "rb") as data_file:
+            if self.format == "csv":
+                header = self._read_record(data_file)
+                if not header:
+                    raise ValueError(f"Dataset {self.path} is empty, a header line is expected")
+                columns = parse_csv_record(header)
+            line_number = 1 if self.format == "csv" else 0
+            while True:
+                offset = data_file.tell()
+                record = self._read_record(data_file)
+                if not record:
+                    break
+                line_number += 1
+                if not record.strip():
+                    continue
+                columns = self._validate(record, columns, line_number)
+                offsets.append(offset)
+        return columns or [], offsets
+
+    def _read_record(self, data_file) -> bytes:
+        # A quoted CSV field may contain line breaks: a record ends on a line break outside of quotes
+        record = data_file.readline()
+        if self.format == "csv":
+            while record.count(b'"') % 2 == 1:
+                line = data_file.readline()
+                if not line:
+                    break
+                record += line
+        return record
+
+    def _validate(self, record, columns, line_number) -> list[str]:
+        if self.format == "csv":
+            # Without quotes the fields can be counted without parsing the record
+            field_count = record.count(b",") + 1 if b'"' not in record else len(parse_csv_record(record))
+            if field_count != len(columns):
+                raise ValueError(f"{self.path}:{line_number}: {field_count} fields, the header has {len(columns)}")
+            return columns
+        try:
+            row = json.loads(record)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{self.path}:{line_number}: invalid JSON: {e}")
+        if not isinstance(row, dict):
+            raise ValueError(f"{self.path}:{line_number}: a JSON object is expected")
+        if columns is not None and sorted(row) != sorted(columns):
+            raise ValueError(f"{self.path}:{line_number}: keys {sorted(row)}, the first row has {sorted(columns)}")
+        return columns if columns is not None else list(row)
+
+
+def parse_shard(value) -> tuple[int, int] | None:
+    """
+    :param value: I/N, e.g. 2/4 for the second of four shards
+    :return: (index, count)
+    """
+    if not value:
+        return None
+    try:
+        shard_index, shard_count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise pytest.UsageError(f"Invalid dataset shard {value}, expected I/N like 2/4")
+    if not 1 <= shard_index <= shard_count:
+        raise pytest.UsageError(f"Invalid dataset shard {value}, I goes from 1 to N")
+    return shard_index, shard_count
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("datasets", "data-driven tests")
+    group.addoption("--dataset-sample", type=int, default=None,
+                    help="run N random rows of each dataset (default: datasets.sample in config.json, all rows)")
+    group.addoption("--dataset-seed", type=int, default=None,
+                    help="seed of --dataset-sample. The same seed runs the same rows (default: datasets.seed)")
+    group.addoption("--dataset-shard", metavar="I/N", default=None,
+                    help="run the I-th of N shards of each dataset, e.g. one shard per CI machine")
+    group.addoption("--dataset-max-rows", type=int, default=None, metavar="N",
+                    help="without --dataset-sample, run N random rows of the datasets (or shards) larger than N rows, "
+                         "pytest collects one test per row. 0 runs all the rows (default: datasets.max_rows)")
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "dataset(file, required=(), id_column=None): run the test once per row of a CSV or JSONL file of "
+        "config/datasets, the row is given by the dataset_row fixture"
+    )
+    config.stash[datasets_key] = {}
+
+
+def load_dataset(config, file_name, required=()) -> Dataset:
+    """
+    Open a dataset once per pytest process
+
+    :param config: pytest config
+    :param file_name: file in the datasets directory
+    :param required: columns every row must have
+    """
+    datasets = config.stash[datasets_key]
+    if file_name not in datasets:
+        dataset_config = settings.get_section("datasets", DEFAULT_CONFIG)
+        path = os.path.join(str(config.rootpath), dataset_config["dir"], file_name)
+        cache_dir = str(config.cache.mkdir("datasets")) if getattr(config, "cache", None) else None
+        datasets[file_name] = Dataset(path, cache_dir)
+    datasets[file_name].require(required)
+    return datasets[file_name]
+
+
+def pytest_generate_tests(metafunc):
+    marker = metafunc.definition.get_closest_marker("dataset")
+    if marker is None:
+        return
+    config = metafunc.config
+    dataset_config = settings.get_section("datasets", DEFAULT_CONFIG)
+    dataset = load_dataset(config, marker.args[0], marker.kwargs.get("required", ()))
+
+    sample = config.getoption("dataset_sample")
+    sample = dataset_config["sample"] if sample is None else sample
+    seed = config.getoption("dataset_seed")
+    max_rows = config.getoption("dataset_max_rows")
+    max_rows = dataset_config["max_rows"] if max_rows is None else max_rows
+    shard = parse_shard(config.getoption("dataset_shard"))
+    # Every row collected is a test item, the collection time and memory grow with them: large datasets are sampled
+    if sample is None and max_rows and dataset.size(shard) > max_rows:
+        metafunc.definition.warn(pytest.PytestWarning(
+            f"{marker.args[0]}: {dataset.size(shard)} rows, running a sample of {max_rows} (datasets.max_rows). "
+            f"Use --dataset-shard to split them between machines, or --dataset-max-rows 0 to collect them all"
+        ))
+        sample = max_rows
+    indices = dataset.select(sample=sample, seed=dataset_config["seed"] if seed is None else seed, shard=shard)
+
+    # Only the row numbers are collected. Naming the tests after a column reads their rows at collection
+    id_column = marker.kwargs.get("id_column")
+    if id_column:
+        ids = [f"{index}-{dataset.row(index)[id_column]}" for index in indices]
+    else:
+        ids = [f"row{index}" for index in indices]
+    metafunc.parametrize("dataset_row", [(dataset, index) for index in indices], ids=ids, indirect=True)
+
+
+@pytest.fixture
+def dataset_row(request):
+    """
+    Row of the dataset of the test, see the dataset marker
+
+    :return: the row as a dict of column values
+    """
+    dataset, index = request.param
+    return dataset.row(index)
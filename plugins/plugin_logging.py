@@ -0,0 +1,58 @@
+import glob
+import os
+import pytest
+
+import conflog
+import settings
+
+pipeline_key = pytest.StashKey[conflog.LogPipeline]()
+log_path_key = pytest.StashKey[str]()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("pyselenium-logging", "project log")
+    group.addoption("--json-log", metavar="PATH", default=None,
+                    help="JSON lines log of the run, the xdist workers are merged in it at the end "
+                         "(default: logging.file in config.json)")
+    group.addoption("--log-module-level", metavar="MODULE=LEVEL", action="append", default=[],
+                    help="level of one logger, e.g. pages.page_base=DEBUG. Can be repeated")
+
+
+def pytest_configure(config):
+    log_config = settings.get_section("logging", {"file": "logs/pyselenium_project_log.jsonl", "level": "INFO", "levels": {}})
+    log_path = os.path.join(str(config.rootpath), config.getoption("json_log") or log_config["file"])
+    try:
+        levels = dict(log_config["levels"], **conflog.parse_levels(config.getoption("log_module_level")))
+    except ValueError as e:
+        raise pytest.UsageError(str(e))
+
+    if hasattr(config, "workerinput"):
+        worker = config.workerinput["workerid"]
+    else:
+        worker = "master"
+        # Worker files left by an interrupted run would be merged in this one
+        for stale_path in glob.glob(conflog.worker_log_path(log_path, "*")):
+            os.remove(stale_path)
+
+    # Every process writes its own file, no two processes append to the same one
+    pipeline = conflog.LogPipeline(conflog.worker_log_path(log_path, worker), log_config["level"], levels)
+    config.stash[pipeline_key] = pipeline.start()
+    config.stash[log_path_key] = log_path
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_sessionfinish(session, exitstatus):
+    config = session.config
+    pipeline = config.stash.get(pipeline_key, None)
+    if pipeline is None:
+        return
+    pipeline.stop()
+    # The workers are done when the controller finishes its session
+    if not hasattr(config, "workerinput"):
+        conflog.merge_worker_logs(config.stash[log_path_key])
+
+
+def pytest_unconfigure(config):
+    pipeline = config.stash.get(pipeline_key, None)
+    if pipeline is not None:
+        pipeline.stop()
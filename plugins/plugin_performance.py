@@ -0,0 +1,71 @@
+from __future__ import annotations
+from datetime import datetime, timezone
+
+import json
+import os
+import uuid
+import pytest
+
+import settings
+from pages.page_performance import RECORDER, DEFAULT_CONFIG, check_budgets
+from plugins import test_context
+
+performance_key = pytest.StashKey[dict]()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("performance", "page performance budgets")
+    group.addoption("--performance-history", metavar="PATH", default=None,
+                    help="JSON lines file the page performance samples of every run are appended to, for "
+                         "scripts/performance_trends.py. An empty value disables it (default: performance.history "
+                         "in config.json)")
+    group.addoption("--no-performance-budgets", action="store_true", default=False,
+                    help="record the page performance without failing the tests over budget")
+
+
+def pytest_configure(config):
+    performance_config = settings.get_section("performance", DEFAULT_CONFIG)
+    RECORDER.enabled = performance_config["enabled"]
+    history = config.getoption("performance_history")
+    history = performance_config["history"] if history is None else history
+    config.stash[performance_key] = {
+        "budgets": performance_config["budgets"],
+        "enforce": not config.getoption("no_performance_budgets"),
+        "history": os.path.join(str(config.rootpath), history) if history else None,
+        # The xdist workers of a run share its id, so the trends group their samples
+        "run": os.environ.get("PYTEST_XDIST_TESTRUNUID") or uuid.uuid4().hex
+    }
+
+
+# Innermost wrapper: the report is failed before the artifacts plugin reads it, so the failure gets its screenshot
+@pytest.hookimpl(hookwrapper=True, trylast=True)
+def pytest_runtest_makereport(item, call):
+    outcome = yield
+    report = outcome.get_result()
+    state = item.config.stash.get(performance_key, None)
+    if state is None or report.when == "setup":
+        return
+    # Taken out after every attempt, passed or not: a rerun is checked on its own samples. Those of the teardown,
+    # or of a failed setup, are only kept for the history
+    samples = RECORDER.for_test(item.nodeid)
+    if report.when != "call" or not report.passed or not state["enforce"]:
+        return
+    violations = check_budgets(samples, state["budgets"])
+    if violations:
+        report.outcome = "failed"
+        report.longrepr = "Performance budgets exceeded:\n" + "\n".join(violations)
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_sessionfinish(session, exitstatus):
+    state = session.config.stash.get(performance_key, None)
+    samples = RECORDER.drain()
+    if state is None or not state["history"] or not samples:
+        return
+    recorded = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    lines = "".join(json.dumps({"run": state["run"], "time": recorded, "worker": test_context.worker_id(),
+                                **sample.to_dict()}) + "\n" for sample in samples)
+    os.makedirs(os.path.dirname(state["history"]), exist_ok=True)
+    # One append per process, the xdist workers write to the same file
+    with open(state["history"], "a", encoding="utf-8") as history_file:
+        history_file.write(lines)
@@ -0,0 +1,205 @@
+from __future__ import annotations
+from _pytest.runner import call_and_report, show_test_item
+from selenium.common.exceptions import WebDriverException
+
+import time
+import logging
+import pytest
+
+import settings
+from drivers import storage_state
+from pages import action_retry
+from plugins import plugin_watchdog
+from plugins.plugin_scheduler import split_group
+
+logger = logging.getLogger(__name__)
+
+# Key of the flake statistics of the tests in the pytest cache (.pytest_cache)
+FLAKES_KEY = "pyselenium/flakes"
+
+# Values used for the keys the reruns section of config.json doesn't set
+DEFAULT_CONFIG = {
+    "reruns": 0,
+    "restore_state": True
+}
+
+reruns_key = pytest.StashKey[dict]()
+# Reruns and final outcome of the tests of this session, by node id
+_runs = {}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("reruns", "fast reruns of failed tests")
+    group.addoption("--fast-reruns", type=int, default=None, metavar="N",
+                    help="rerun a failed test up to N times right away, in the warm session browser brought back to "
+                         "the url, cookies and web storage the test started from. A test passing on a rerun is "
+                         "reported as flaky (default: reruns.reruns in config.json)")
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "no_rerun: never rerun the test when it fails, e.g. it has side effects outside of the browser"
+    )
+    # Retries of the page object actions, below the test reruns
+    action_retry.configure(settings.get_section("retry", action_retry.DEFAULT_CONFIG))
+
+    reruns_config = settings.get_section("reruns", DEFAULT_CONFIG)
+    reruns = config.getoption("fast_reruns")
+    config.stash[reruns_key] = {
+        "reruns": reruns_config["reruns"] if reruns is None else reruns,
+        "restore_state": reruns_config["restore_state"]
+    }
+
+
+def take_snapshots(config, snapshots):
+    """
+    Snapshot the session browsers that don't have one yet
+
+    :param config: pytest config
+    :param snapshots: dict of driver id to (driver, snapshot), updated
+    """
+    for driver in plugin_watchdog.watched_drivers(config):
+        if id(driver) in snapshots:
+            continue
+        try:
+            snapshots[id(driver)] = (driver, storage_state.capture_snapshot(driver))
+        except WebDriverException as e:
+            logger.warning("Couldn't snapshot the browser state, it won't be restored for a rerun. Exception: %s", e)
+
+
+def restore_snapshots(snapshots):
+    for driver, snapshot in snapshots.values():
+        try:
+            storage_state.restore_snapshot(driver, snapshot)
+        except WebDriverException as e:
+            logger.warning("Couldn't restore the browser state before the rerun. Exception: %s", e)
+
+
+def run_attempt(item, nextitem, may_rerun, snapshots) -> tuple[list, bool]:
+    """
+    Run the setup, call and teardown of a test like pytest does, without reporting them. When the attempt fails and
+    may be rerun, the teardown keeps the fixtures of the broader scopes: the rerun gets the same warm browsers
+
+    :param item: test item
+    :param nextitem: next test item, None for the last one
+    :param may_rerun: whether a failure leads to a rerun
+    :param snapshots: dict of driver id to (driver, snapshot) completed with the browsers launched by the setup,
+        None when the browser state is not restored
+    :return: the reports of the attempt, and whether the test is rerun
+    """
+    has_request = hasattr(item, "_request")
+    if has_request and not item._request:
+        # The fixture request of the previous attempt was dropped
+        item._initrequest()
+    try:
+        reports = [call_and_report(item, "setup", log=False)]
+        if reports[0].passed:
+            if snapshots is not None:
+                # Browsers launched by the fixtures of the first attempt start from their state after the setup
+                take_snapshots(item.config, snapshots)
+            setup_only = item.config.getoption("setuponly", False)
+            if item.config.getoption("setupshow", False):
+                show_test_item(item, add_space=not setup_only)
+            if not setup_only:
+                reports.append(call_and_report(item, "call", log=False))
+        rerun = may_rerun and any(report.failed for report in reports)
+        if item.session.shouldfail or item.session.shouldstop:
+            rerun = False
+            nextitem = None
+        # Torn down to the parent of the test: its function fixtures are finalized, the broader ones are kept
+        reports.append(call_and_report(item, "teardown", log=False, nextitem=item.parent if rerun else nextitem))
+    finally:
+        if has_request:
+            item._request = False
+            item.funcargs = None
+    return reports, rerun
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_protocol(item, nextitem):
+    state = item.config.stash.get(reruns_key, None)
+    if not state or state["reruns"] <= 0 or item.get_closest_marker("no_rerun"):
+        return None
+    # The state of the warm browsers before the test, the first attempt may change it
+    snapshots = {} if state["restore_state"] else None
+    if snapshots is not None:
+        take_snapshots(item.config, snapshots)
+
+    item.ihook.pytest_runtest_logstart(nodeid=item.nodeid, location=item.location)
+    for attempt in range(state["reruns"] + 1):
+        reports, rerun = run_attempt(item, nextitem, attempt < state["reruns"], snapshots)
+        for report in reports:
+            if rerun and report.failed:
+                report.outcome = "rerun"
+            item.ihook.pytest_runtest_logreport(report=report)
+        if not rerun:
+            break
+        logger.warning("%s failed, rerun %s of %s", item.nodeid, attempt + 1, state["reruns"])
+        if snapshots:
+            restore_snapshots(snapshots)
+    item.ihook.pytest_runtest_logfinish(nodeid=item.nodeid, location=item.location)
+    return True
+
+
+def pytest_report_teststatus(report, config):
+    if report.outcome == "rerun":
+        return "rerun", "R", ("RERUN", {"yellow": True})
+
+
+def pytest_runtest_logreport(report):
+    # Under xdist the controller receives the reports of all the workers
+    run = _runs.setdefault(split_group(report.nodeid)[0], {"reruns": 0, "failed": False})
+    if report.outcome == "rerun":
+        run["reruns"] += 1
+        run["failed"] = False
+    elif report.failed:
+        run["failed"] = True
+
+
+def update_flakes(flakes, runs, now) -> dict:
+    """
+    Add the runs of a session to the flake statistics
+
+    :param flakes: statistics by node id: runs, flaky (passed on a rerun), failed (failed every attempt), reruns
+    :param runs: reruns and final outcome by node id
+    :param now: timestamp of the session
+    :return: the updated statistics
+    """
+    for nodeid, run in runs.items():
+        stats = flakes.setdefault(nodeid, {"runs": 0, "flaky": 0, "failed": 0, "reruns": 0, "last_flaky": None})
+        stats["runs"] += 1
+        stats["reruns"] += run["reruns"]
+        if run["failed"]:
+            stats["failed"] += 1
+        elif run["reruns"]:
+            stats["flaky"] += 1
+            stats["last_flaky"] = now
+    return flakes
+
+
+def pytest_sessionfinish(session, exitstatus):
+    config = session.config
+    state = config.stash.get(reruns_key, None)
+    runs = dict(_runs)
+    _runs.clear()
+    if hasattr(config, "workerinput") or getattr(config, "cache", None) is None or not state or state["reruns"] <= 0:
+        return
+    flakes = update_flakes(config.cache.get(FLAKES_KEY, {}), runs, time.time())
+    config.cache.set(FLAKES_KEY, flakes)
+    state["flakes"] = flakes
+    state["rerun"] = {nodeid: run for nodeid, run in runs.items() if run["reruns"]}
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    state = config.stash.get(reruns_key, None)
+    if not state or not state.get("rerun"):
+        return
+    terminalreporter.section("fast reruns")
+    flaky = [nodeid for nodeid, run in state["rerun"].items() if not run["failed"]]
+    terminalreporter.line(f"{len(state['rerun'])} tests rerun, {len(flaky)} passed on a rerun (flaky)")
+    for nodeid, run in sorted(state["rerun"].items()):
+        stats = state["flakes"][nodeid]
+        result = "FAILED" if run["failed"] else "FLAKY "
+        terminalreporter.line(f"{result} {nodeid}: reruns {run['reruns']}, flaky in {stats['flaky']} of "
+                              f"{stats['runs']} runs")
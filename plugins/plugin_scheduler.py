@@ -0,0 +1,192 @@
+from __future__ import annotations
+from collections import defaultdict
+
+import heapq
+import statistics
+import pytest
+
+try:
+    from xdist.scheduler import LoadScopeScheduling
+except ImportError:
+    LoadScopeScheduling = None
+
+# Key of the per-test durations in the pytest cache (.pytest_cache)
+DURATIONS_KEY = "pyselenium/durations"
+# Weight of the last run in the recorded duration of a test, the rest is its history
+SMOOTHING = 0.5
+# Duration assumed for a test never run before, when no history is recorded at all
+DEFAULT_DURATION = 1.0
+# Appended by the workers to the node id of a test in a state group: <nodeid>@<group>, as xdist loadgroup does
+GROUP_SEPARATOR = "@"
+
+plan_key = pytest.StashKey[dict]()
+
+# Setup, call and teardown durations of the tests run in this session, summed per test
+_measured = defaultdict(float)
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("scheduler", "duration-aware xdist scheduling")
+    group.addoption("--schedule-by-duration", action="store_true", default=False,
+                    help="with -n: run the tests of a state_group on one worker in file order, and start the longest "
+                         "work first using the durations recorded by the previous runs")
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "state_group(name): the tests share state (e.g. a logged-in cart) and depend on their order. "
+        "With --schedule-by-duration they run on the same xdist worker, in file order"
+    )
+
+
+def split_group(nodeid) -> tuple[str, str | None]:
+    """
+    Split the state group suffix from a node id
+
+    :param nodeid: node id sent by a worker
+    :return: the original node id and the group name, None for a test outside of any group
+    """
+    position = nodeid.rfind(GROUP_SEPARATOR)
+    # A '@' before the last ']' belongs to a parametrize id
+    if position == -1 or position < nodeid.rfind("]"):
+        return nodeid, None
+    return nodeid[:position], nodeid[position + 1:]
+
+
+def load_durations(config) -> dict:
+    """
+    :return: the recorded duration of each test node id, in seconds
+    """
+    # No cache with -p no:cacheprovider
+    if getattr(config, "cache", None) is None:
+        return {}
+    return config.cache.get(DURATIONS_KEY, {})
+
+
+def estimate(nodeids, durations) -> float:
+    """
+    Expected run time of some tests. The tests without history count for the median recorded duration
+
+    :param nodeids: node ids, with or without group suffix
+    :param durations: recorded durations
+    :return: seconds
+    """
+    unknown = statistics.median(durations.values()) if durations else DEFAULT_DURATION
+    return sum(durations.get(split_group(nodeid)[0], unknown) for nodeid in nodeids)
+
+
+def lpt_plan(unit_durations, workers) -> list[tuple[float, list[str]]]:
+    """
+    Longest processing time first: give the longest remaining work unit to the least loaded worker.
+    The wall-clock time is at most 4/3 of the optimal one
+
+    :param unit_durations: estimated seconds of each work unit
+    :param workers: number of workers
+    :return: the load and the work units of each worker
+    """
+    bins = [(0.0, index, []) for index in range(max(workers, 1))]
+    heapq.heapify(bins)
+    for unit, duration in sorted(unit_durations.items(), key=lambda item: -item[1]):
+        load, index, units = heapq.heappop(bins)
+        units.append(unit)
+        heapq.heappush(bins, (load + duration, index, units))
+    return [(load, units) for load, index, units in sorted(bins, key=lambda item: item[1])]
+
+
+if LoadScopeScheduling is not None:
+    class DurationScheduling(LoadScopeScheduling):
+        """
+        xdist scheduler keeping each state group on one worker in file order, every other test being its own
+        work unit. Whenever a worker needs work it gets the longest pending unit, which is the LPT heuristic
+        applied as the workers become free instead of on estimated loads.
+        """
+        def __init__(self, config, log=None, durations=None):
+            super().__init__(config, log)
+            self.durations = load_durations(config) if durations is None else durations
+            self._ordered = False
+
+        def _split_scope(self, nodeid):
+            nodeid, group = split_group(nodeid)
+            return nodeid if group is None else f"{GROUP_SEPARATOR}{group}"
+
+        def unit_duration(self, work_unit) -> float:
+            return estimate([nodeid for nodeid, completed in work_unit.items() if not completed], self.durations)
+
+        def schedule(self):
+            if self.collection is None and self.collection_is_completed:
+                self._store_plan()
+            super().schedule()
+
+        def remove_node(self, node):
+            # The pending tests of a crashed worker are put back at the end of the queue
+            self._ordered = False
+            return super().remove_node(node)
+
+        def _assign_work_unit(self, node):
+            if not self._ordered:
+                for scope, work_unit in sorted(self.workqueue.items(), key=lambda item: -self.unit_duration(item[1])):
+                    self.workqueue.move_to_end(scope)
+                self._ordered = True
+            super()._assign_work_unit(node)
+
+        def _store_plan(self):
+            units = defaultdict(list)
+            for nodeid in next(iter(self.registered_collections.values())):
+                units[self._split_scope(nodeid)].append(nodeid)
+            unit_durations = {scope: estimate(nodeids, self.durations) for scope, nodeids in units.items()}
+            plan = lpt_plan(unit_durations, len(self.nodes))
+            self.config.stash[plan_key] = {
+                "workers": len(plan),
+                "units": len(unit_durations),
+                "groups": sorted(scope[1:] for scope in units if scope.startswith(GROUP_SEPARATOR)),
+                "serial": sum(unit_durations.values()),
+                "makespan": max(load for load, units in plan)
+            }
+else:
+    DurationScheduling = None
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_xdist_make_scheduler(config, log):
+    if config.getoption("schedule_by_duration") and DurationScheduling is not None and config.getvalue("dist") != "each":
+        return DurationScheduling(config, log)
+    return None
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(config, items):
+    # Workers tag the node ids with their group, the controller only receives node ids
+    if not (hasattr(config, "workerinput") and config.getoption("schedule_by_duration")):
+        return
+    for item in items:
+        marker = item.get_closest_marker("state_group")
+        if marker is not None:
+            name = marker.args[0] if marker.args else marker.kwargs.get("name", "default")
+            item._nodeid = f"{item.nodeid}{GROUP_SEPARATOR}{name}"
+
+
+def pytest_runtest_logreport(report):
+    # Under xdist the controller receives the reports of all the workers
+    _measured[split_group(report.nodeid)[0]] += report.duration
+
+
+def pytest_sessionfinish(session, exitstatus):
+    config = session.config
+    if hasattr(config, "workerinput") or getattr(config, "cache", None) is None or not _measured:
+        return
+    durations = load_durations(config)
+    for nodeid, duration in _measured.items():
+        previous = durations.get(nodeid)
+        durations[nodeid] = duration if previous is None else SMOOTHING * duration + (1 - SMOOTHING) * previous
+    config.cache.set(DURATIONS_KEY, durations)
+    _measured.clear()
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    plan = config.stash.get(plan_key, None)
+    if plan:
+        terminalreporter.section("duration scheduling")
+        terminalreporter.line(f"{plan['units']} work units on {plan['workers']} workers, state groups: "
+                              f"{', '.join(plan['groups']) or 'none'}")
+        terminalreporter.line(f"estimated wall-clock {plan['makespan']:.1f}s, serial {plan['serial']:.1f}s")
@@ -0,0 +1,453 @@
+from __future__ import annotations
+from selenium.webdriver.remote.webdriver import WebDriver
+from selenium.webdriver.remote.webelement import WebElement
+
+import ast
+import hashlib
+import json
+import os
+import sys
+import threading
+import pytest
+
+import settings
+from plugins.plugin_scheduler import split_group
+
+# Key of the per-test dependencies and outcomes in the pytest cache (.pytest_cache)
+SELECTION_KEY = "pyselenium/selection"
+# Name of the module level code of a source file: imports, constants, class attributes
+MODULE = "<module>"
+# Name of the whole content of a data file the tests read, e.g. config.json
+FILE = "<file>"
+# user_properties entry carrying the dependencies recorded by a worker to the controller
+PROPERTY = "selection"
+
+DEFAULT_CONFIG = {
+    "enabled": False,
+    "app_version": None,
+    "report": "reports/selection.json"
+}
+
+# The locators looked up through WebDriver are recorded along the code, the page objects included
+LOCATOR_CODES = {function.__code__ for function in (
+    WebDriver.find_element, WebDriver.find_elements, WebElement.find_element, WebElement.find_elements
+)}
+
+selection_key = pytest.StashKey[dict]()
+tracer_key = pytest.StashKey["CallTracer"]()
+# Outcomes and recorded dependencies of the tests of this session, by node id
+_outcomes = {}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("selection", "change-aware test selection")
+    group.addoption("--affected", action="store_true", default=None,
+                    help="only run the tests whose recorded dependencies changed since they last passed: the "
+                         "project functions they and their fixtures called, config.json, the stand-in pages, "
+                         "their dataset row and the app version "
+                         "(default: selection.enabled in config.json)")
+    group.addoption("--full", action="store_true", default=False,
+                    help="run every test, and record their dependencies for the next --affected runs")
+    group.addoption("--app-version", default=None,
+                    help="version of the application under test. A new version runs every test "
+                         "(default: selection.app_version in config.json)")
+
+
+def source_hashes(source) -> dict:
+    """
+    Hash every function of a source file, and its module level code without the function bodies. Comments and
+    formatting don't change the hashes
+
+    :param source: python source
+    :return: dict of function qualified name (e.g. PageCart.add_item_to_cart) to hash, plus MODULE
+    """
+    tree = ast.parse(source)
+    hashes = {}
+
+    def visit(node, prefix):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                qualname = prefix + child.name
+                hashes[qualname] = hashlib.sha1(ast.dump(child).encode("utf-8")).hexdigest()
+                visit(child, f"{qualname}.<locals>.")
+            elif isinstance(child, ast.ClassDef):
+                visit(child, f"{prefix}{child.name}.")
+            else:
+                visit(child, prefix)
+
+    visit(tree, "")
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            node.body = [ast.Pass()]
+    hashes[MODULE] = hashlib.sha1(ast.dump(tree).encode("utf-8")).hexdigest()
+    return hashes
+
+
+def dependency_name(qualname) -> str:
+    """
+    :param qualname: qualified name of a code object
+    :return: the function whose source holds it: lambdas, comprehensions and nested functions belong to the
+        function they are defined in
+    """
+    return qualname.split(".<locals>.", 1)[0]
+
+
+class SourceIndex:
+    """
+    Current hashes of the project source files, read once per file
+    """
+    def __init__(self, root):
+        self.root = root
+        self._files = {}
+
+    def file_hash(self, path) -> str | None:
+        """
+        :param path: data file relative to the root
+        :return: hash of its content, None when it is gone
+        """
+        key = (path, FILE)
+        if key not in self._files:
+            try:
+                with open(os.path.join(self.root, path), "rb") as data_file:
+                    self._files[key] = hashlib.sha1(data_file.read()).hexdigest()
+            except OSError:
+                self._files[key] = None
+        return self._files[key]
+
+    def hashes(self, path) -> dict:
+        """
+        :param path: source file relative to the root
+        :return: its source_hashes, empty when the file is gone or doesn't parse
+        """
+        if path not in self._files:
+            try:
+                with open(os.path.join(self.root, path), encoding="utf-8") as source_file:
+                    self._files[path] = source_hashes(source_file.read())
+            except (OSError, SyntaxError, ValueError):
+                self._files[path] = {}
+        return self._files[path]
+
+    def current(self, dependency) -> str | None:
+        """
+        :param dependency: path::qualname
+        :return: hash of the dependency now, None when it doesn't exist anymore
+        """
+        path, qualname = dependency.split("::", 1)
+        if qualname == FILE:
+            return self.file_hash(path)
+        hashes = self.hashes(path)
+        return hashes.get(qualname, hashes.get(MODULE) if qualname == MODULE else None)
+
+
+class CallTracer:
+    """
+    Records the project functions called while a test runs, with a profile function: call events only, in every
+    thread. The functions of the third-party packages are ignored.
+
+    The calls of a fixture setup are also kept per fixture definition: a session fixture is set up by the first
+    test requesting it only, its calls are added to every test requesting it with uses()
+    """
+    def __init__(self, root):
+        self.root = os.path.abspath(root) + os.sep
+        self.calls = set()
+        self.locators = set()
+        self.active = False
+        # Fixture definition: (calls, locators) of its setup
+        self.fixtures = {}
+        self._paths = {}
+
+    def start(self):
+        self.calls = set()
+        self.locators = set()
+        self.active = True
+        threading.setprofile(self._profile)
+        sys.setprofile(self._profile)
+
+    def stop(self):
+        self.active = False
+        sys.setprofile(None)
+        threading.setprofile(None)
+
+    def enter_fixture(self) -> tuple[set, set]:
+        """
+        Record the calls of a fixture setup apart
+
+        :return: the calls and locators recorded so far, for exit_fixture()
+        """
+        recorded = (self.calls, self.locators)
+        self.calls, self.locators = set(), set()
+        return recorded
+
+    def exit_fixture(self, fixturedef, recorded):
+        """
+        Keep the calls of a fixture setup, and add them back to the ones recorded before it
+
+        :param fixturedef: definition of the fixture set up
+        :param recorded: returned by enter_fixture()
+        """
+        self.fixtures[fixturedef] = (self.calls, self.locators)
+        self.calls = recorded[0] | self.calls
+        self.locators = recorded[1] | self.locators
+
+    def uses(self, fixturedefs):
+        """
+        Add the calls of the fixtures set up by earlier tests to the ones of the current test
+
+        :param fixturedefs: definitions of the fixtures requested by the test
+        """
+        for fixturedef in fixturedefs:
+            calls, locators = self.fixtures.get(fixturedef, ((), ()))
+            self.calls.update(calls)
+            self.locators.update(locators)
+
+    def _profile(self, frame, event, arg):
+        if not self.active:
+            # A thread started during a test and still running: stop profiling it
+            sys.setprofile(None)
+            return
+        if event != "call":
+            return
+        code = frame.f_code
+        if code in LOCATOR_CODES:
+            self.locators.add(f"{frame.f_locals.get('by')}={frame.f_locals.get('value')}")
+            return
+        path = self._paths.get(code.co_filename, False)
+        if path is False:
+            path = self._paths[code.co_filename] = self._project_path(code.co_filename)
+        if path is not None:
+            self.calls.add((path, code.co_qualname))
+
+    def _project_path(self, filename) -> str | None:
+        filename = os.path.abspath(filename)
+        if not filename.startswith(self.root) or "site-packages" in filename or not filename.endswith(".py"):
+            return None
+        return os.path.relpath(filename, self.root).replace(os.sep, "/")
+
+    def dependencies(self, index) -> dict:
+        """
+        :param index: SourceIndex of the project
+        :return: dict of path::qualname to hash of every function called, and of the module level code of their files
+        """
+        dependencies = {}
+        for path, qualname in self.calls:
+            hashes = index.hashes(path)
+            name = dependency_name(qualname)
+            if name not in hashes:
+                # Module or class body
+                name = MODULE
+            dependencies[f"{path}::{name}"] = hashes.get(name)
+            dependencies[f"{path}::{MODULE}"] = hashes.get(MODULE)
+        return dependencies
+
+
+def row_hash(row) -> str:
+    return hashlib.sha1(json.dumps(row, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def dataset_dependency(item) -> str | None:
+    """
+    :return: hash of the dataset row of a data-driven test, None for the other tests
+    """
+    params = getattr(getattr(item, "callspec", None), "params", {})
+    if "dataset_row" not in params:
+        return None
+    dataset, index = params["dataset_row"]
+    return row_hash(dataset.row(index))
+
+
+def fixture_definitions(item) -> list:
+    """
+    :return: the definitions of every fixture requested by a test, directly or through other fixtures, the
+        fixtures they override included
+    """
+    name2fixturedefs = getattr(getattr(item, "_fixtureinfo", None), "name2fixturedefs", {})
+    return [fixturedef for name in getattr(item, "fixturenames", ()) for fixturedef in name2fixturedefs.get(name, ())]
+
+
+def data_files(config) -> dict:
+    """
+    Files read by the tests without being python code: config.json, and the pages served by the stand-in
+
+    :return: dict of path::FILE to the hash of the file
+    """
+    root = str(config.rootpath)
+    paths = [os.path.relpath(settings.CONFIG_PATH, root)]
+    if app_version(config).split("/", 1)[0] == "standin":
+        static_dir = os.path.join(root, "standin", "static")
+        if os.path.isdir(static_dir):
+            paths += [f"standin/static/{name}" for name in sorted(os.listdir(static_dir))]
+    index = SourceIndex(root)
+    return {f"{path.replace(os.sep, '/')}::{FILE}": index.file_hash(path) for path in paths}
+
+
+def app_version(config) -> str:
+    """
+    :return: target and version of the application under test, e.g. standin/unversioned
+    """
+    selection_config = settings.get_section("selection", DEFAULT_CONFIG)
+    target = config.getoption("target", None) or settings.get_section("app", {"target": "live"})["target"]
+    version = config.getoption("app_version") or selection_config["app_version"] or "unversioned"
+    return f"{target}/{version}"
+
+
+def decide(entry, dataset_hash, version, index) -> tuple[bool, str]:
+    """
+    Whether a test has to run
+
+    :param entry: recorded dependencies and outcome of the test, None when it never ran
+    :param dataset_hash: current hash of its dataset row
+    :param version: current app version
+    :param index: SourceIndex of the project
+    :return: run or not, and why
+    """
+    if entry is None:
+        return True, "new test"
+    if entry["outcome"] != "passed":
+        return True, f"{entry['outcome']} on its last run"
+    if entry["app_version"] != version:
+        return True, f"app version changed from {entry['app_version']}"
+    if entry.get("dataset") != dataset_hash:
+        return True, "dataset row changed"
+    changed = sorted(dependency for dependency, recorded in entry["dependencies"].items()
+                     if index.current(dependency) != recorded)
+    if changed:
+        return True, "changed: " + ", ".join(changed)
+    return False, f"unchanged since it passed, {len(entry['dependencies'])} dependencies"
+
+
+def pytest_configure(config):
+    selection_config = settings.get_section("selection", DEFAULT_CONFIG)
+    affected = config.getoption("affected")
+    enabled = selection_config["enabled"] if affected is None else affected
+    if not enabled or getattr(config, "cache", None) is None:
+        return
+    config.stash[selection_key] = {
+        "full": config.getoption("full"),
+        "app_version": app_version(config),
+        "index": SourceIndex(str(config.rootpath)),
+        "files": data_files(config),
+        "report": os.path.join(str(config.rootpath), selection_config["report"]) if selection_config["report"] else None,
+        "summary": None
+    }
+    config.stash[tracer_key] = CallTracer(str(config.rootpath))
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(config, items):
+    state = config.stash.get(selection_key, None)
+    if state is None or state["full"]:
+        return
+    recorded = config.cache.get(SELECTION_KEY, {})
+    selected, deselected, ran, skipped = [], [], {}, {}
+    for item in items:
+        run, reason = decide(recorded.get(split_group(item.nodeid)[0]), dataset_dependency(item), state["app_version"], state["index"])
+        (selected if run else deselected).append(item)
+        (ran if run else skipped)[split_group(item.nodeid)[0]] = reason
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+    state["summary"] = {"app_version": state["app_version"], "ran": ran, "skipped": skipped}
+    if state["report"]:
+        # Every xdist worker decides the same, the controller reads the report for its summary
+        os.makedirs(os.path.dirname(state["report"]), exist_ok=True)
+        temporary_path = f"{state['report']}.{os.getpid()}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as report_file:
+            json.dump(state["summary"], report_file, indent=2)
+        os.replace(temporary_path, state["report"])
+
+
+@pytest.hookimpl(hookwrapper=True, tryfirst=True)
+def pytest_runtest_protocol(item, nextitem):
+    tracer = item.config.stash.get(tracer_key, None)
+    if tracer is not None:
+        tracer.start()
+    try:
+        yield
+    finally:
+        if tracer is not None:
+            tracer.stop()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_fixture_setup(fixturedef, request):
+    tracer = request.config.stash.get(tracer_key, None)
+    if tracer is None or not tracer.active:
+        yield
+        return
+    recorded = tracer.enter_fixture()
+    try:
+        yield
+    finally:
+        tracer.exit_fixture(fixturedef, recorded)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_teardown(item, nextitem):
+    yield
+    tracer = item.config.stash.get(tracer_key, None)
+    if tracer is None:
+        return
+    # Stopped before the teardown report is made, so that it carries the dependencies to the controller
+    tracer.stop()
+    tracer.uses(fixture_definitions(item))
+    state = item.config.stash[selection_key]
+    row = (getattr(item, "funcargs", None) or {}).get("dataset_row")
+    item.user_properties.append((PROPERTY, {
+        "dependencies": {**tracer.dependencies(state["index"]), **state["files"]},
+        "locators": sorted(tracer.locators),
+        "dataset": row_hash(row) if row is not None else None,
+        "app_version": state["app_version"]
+    }))
+
+
+def pytest_runtest_logreport(report):
+    # Under xdist the controller receives the reports of all the workers
+    entry = _outcomes.setdefault(split_group(report.nodeid)[0], {"outcome": "passed"})
+    if report.failed:
+        entry["outcome"] = "failed"
+    elif report.skipped and entry["outcome"] == "passed":
+        entry["outcome"] = "skipped"
+    for name, value in report.user_properties:
+        if name == PROPERTY:
+            entry.update(value)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    config = session.config
+    state = config.stash.get(selection_key, None)
+    if state is None or hasattr(config, "workerinput"):
+        return
+    recorded = config.cache.get(SELECTION_KEY, {})
+    for nodeid, entry in _outcomes.items():
+        if "dependencies" in entry:
+            recorded[nodeid] = entry
+        else:
+            # Interrupted before its teardown: run it next time
+            recorded.pop(nodeid, None)
+    config.cache.set(SELECTION_KEY, recorded)
+    _outcomes.clear()
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    state = config.stash.get(selection_key, None)
+    if state is None or state["full"]:
+        return
+    summary = state["summary"]
+    if summary is None and state["report"] and os.path.exists(state["report"]):
+        with open(state["report"], encoding="utf-8") as report_file:
+            summary = json.load(report_file)
+    if summary is None:
+        return
+    terminalreporter.section("change-aware selection")
+    terminalreporter.line(f"ran {len(summary['ran'])} tests, skipped {len(summary['skipped'])} unchanged since they "
+                          f"passed, app {summary['app_version']}. --full runs everything")
+    reasons = {}
+    for nodeid, reason in summary["ran"].items():
+        reasons.setdefault(reason.split(":")[0], []).append(nodeid)
+    for reason, nodeids in sorted(reasons.items()):
+        terminalreporter.line(f"  ran, {reason}: {len(nodeids)}")
+    if config.getoption("verbose") > 0:
+        for nodeid, reason in summary["ran"].items():
+            terminalreporter.line(f"RAN     {nodeid}: {reason}")
+        for nodeid, reason in summary["skipped"].items():
+            terminalreporter.line(f"SKIPPED {nodeid}: {reason}")
@@ -0,0 +1,189 @@
+from __future__ import annotations
+from collections import defaultdict
+from html import escape
+
+import glob
+import json
+import math
+import os
+import pytest
+
+from drivers.driver_instrumentation import RECORDER
+from plugins import test_context
+
+regressions_key = pytest.StashKey[list]()
+
+# A command is a regression when its p95 grows by more than the tolerance and by more than this many seconds,
+# so that sub-millisecond noise on fast commands doesn't fail the build
+MIN_REGRESSION_SECONDS = 0.005
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("timing", "WebDriver command timing")
+    group.addoption("--timing-report", metavar="DIR", default=None,
+                    help="write a JSON and HTML report of the WebDriver command latencies to DIR")
+    group.addoption("--timing-baseline", metavar="PATH", default=None,
+                    help="report json of a previous run. Latency and round-trip regressions fail the run")
+    group.addoption("--timing-tolerance", type=float, default=0.2,
+                    help="allowed p95 latency growth over the baseline, as a fraction (default: 0.2)")
+    group.addoption("--timing-save-baseline", action="store_true", default=False,
+                    help="save the report of this run as the new baseline")
+
+
+def percentile(values, pct) -> float:
+    """
+    Percentile with linear interpolation between the closest ranks
+
+    :param values: numbers, in any order
+    :param pct: percentile between 0 and 100
+    :return: the percentile, 0.0 for an empty list
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(durations) -> dict:
+    return {
+        "count": len(durations),
+        "total": sum(durations),
+        "p50": percentile(durations, 50),
+        "p95": percentile(durations, 95),
+        "p99": percentile(durations, 99)
+    }
+
+
+def build_report(samples) -> dict:
+    """
+    Aggregate command samples per command, per page object method and per test
+
+    :param samples: list of sample dicts with command, duration, nodeid and caller
+    :return: the report dict
+    """
+    by_command = defaultdict(list)
+    by_caller = defaultdict(list)
+    by_test = defaultdict(list)
+    for sample in samples:
+        by_command[sample["command"]].append(sample["duration"])
+        by_caller[sample["caller"] or "<test code>"].append(sample["duration"])
+        by_test[sample["nodeid"] or "<session>"].append(sample["duration"])
+
+    return {
+        "commands": {command: summarize(durations) for command, durations in sorted(by_command.items())},
+        "callers": {caller: summarize(durations) for caller, durations in sorted(by_caller.items())},
+        "tests": {nodeid: {"round_trips": len(durations), "total": sum(durations)}
+                  for nodeid, durations in sorted(by_test.items())}
+    }
+
+
+def compare_to_baseline(report, baseline, tolerance) -> list[str]:
+    """
+    Find the commands that got slower and the tests that make more round-trips than in the baseline
+
+    :param report: report of this run
+    :param baseline: report of the reference run
+    :param tolerance: allowed p95 growth as a fraction
+    :return: a description of every regression
+    """
+    regressions = []
+    for command, stats in report["commands"].items():
+        reference = baseline.get("commands", {}).get(command)
+        if reference is None:
+            continue
+        limit = max(reference["p95"] * (1 + tolerance), reference["p95"] + MIN_REGRESSION_SECONDS)
+        if stats["p95"] > limit:
+            regressions.append(f"{command}: p95 {stats['p95'] * 1000:.1f}ms, baseline {reference['p95'] * 1000:.1f}ms")
+
+    for nodeid, stats in report["tests"].items():
+        reference = baseline.get("tests", {}).get(nodeid)
+        if reference is not None and stats["round_trips"] > reference["round_trips"]:
+            regressions.append(f"{nodeid}: {stats['round_trips']} round-trips, baseline {reference['round_trips']}")
+    return regressions
+
+
+def render_html(report, regressions) -> str:
+    def table(title, rows, columns):
+        header = "".join(f"<th>{escape(column)}</th>" for column in columns)
+        body = "".join("<tr>" + "".join(f"<td>{escape(str(cell))}</td>" for cell in row) + "</tr>" for row in rows)
+        return f"<h2>{escape(title)}</h2><table><tr>{header}</tr>{body}</table>"
+
+    def latency_rows(section):
+        return [(name, stats["count"], f"{stats['p50'] * 1000:.1f}", f"{stats['p95'] * 1000:.1f}",
+                 f"{stats['p99'] * 1000:.1f}", f"{stats['total']:.2f}") for name, stats in section.items()]
+
+    latency_columns = ("name", "count", "p50 ms", "p95 ms", "p99 ms", "total s")
+    parts = [
+        "<html><head><meta charset='utf-8'><title>WebDriver command timing</title>",
+        "<style>table{border-collapse:collapse}td,th{border:1px solid #ccc;padding:2px 6px}</style></head><body>",
+        "<h1>WebDriver command timing</h1>"
+    ]
+    if regressions:
+        parts.append("<h2>Regressions</h2><ul>" + "".join(f"<li>{escape(line)}</li>" for line in regressions) + "</ul>")
+    parts.append(table("Commands", latency_rows(report["commands"]), latency_columns))
+    parts.append(table("Page object methods", latency_rows(report["callers"]), latency_columns))
+    parts.append(table("Tests", [(nodeid, stats["round_trips"], f"{stats['total']:.2f}")
+                                 for nodeid, stats in report["tests"].items()], ("test", "round-trips", "total s")))
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def pytest_configure(config):
+    report_dir = config.getoption("timing_report")
+    # Without a report the commands are not timed, the samples of a long session would only pile up
+    RECORDER.enabled = bool(report_dir)
+    if report_dir and not hasattr(config, "workerinput"):
+        # Samples left by the workers of a previous run would be merged in this report
+        for stale_file in glob.glob(os.path.join(report_dir, "samples-*.json")):
+            os.remove(stale_file)
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_sessionfinish(session, exitstatus):
+    config = session.config
+    report_dir = config.getoption("timing_report")
+    if not report_dir:
+        return
+    os.makedirs(report_dir, exist_ok=True)
+
+    samples = [sample.to_dict() for sample in RECORDER.drain()]
+    if hasattr(config, "workerinput"):
+        # xdist worker: leave the samples for the controller, which writes the report
+        with open(os.path.join(report_dir, f"samples-{test_context.worker_id()}.json"), "w", encoding="utf-8") as samples_file:
+            json.dump(samples, samples_file)
+        return
+
+    for samples_path in glob.glob(os.path.join(report_dir, "samples-*.json")):
+        with open(samples_path, encoding="utf-8") as samples_file:
+            samples.extend(json.load(samples_file))
+
+    report = build_report(samples)
+    regressions = []
+    baseline_path = config.getoption("timing_baseline")
+    if baseline_path and os.path.exists(baseline_path):
+        with open(baseline_path, encoding="utf-8") as baseline_file:
+            regressions = compare_to_baseline(report, json.load(baseline_file), config.getoption("timing_tolerance"))
+    report["regressions"] = regressions
+
+    with open(os.path.join(report_dir, "timing.json"), "w", encoding="utf-8") as report_file:
+        json.dump(report, report_file, indent=2)
+    with open(os.path.join(report_dir, "timing.html"), "w", encoding="utf-8") as report_file:
+        report_file.write(render_html(report, regressions))
+    if baseline_path and config.getoption("timing_save_baseline"):
+        with open(baseline_path, "w", encoding="utf-8") as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+
+    if regressions:
+        config.stash[regressions_key] = regressions
+        if session.exitstatus == pytest.ExitCode.OK:
+            session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    regressions = config.stash.get(regressions_key, None)
+    if regressions:
+        terminalreporter.section("WebDriver timing regressions")
+        for line in regressions:
+            terminalreporter.line(line)
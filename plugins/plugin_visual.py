@@ -0,0 +1,109 @@
+from __future__ import annotations
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import os
+import pytest
+
+import settings
+from drivers import driver_factory
+from pages.visual_regression import CHECKER, DEFAULT_CONFIG
+
+visual_key = pytest.StashKey[dict]()
+# user_properties entry carrying the results of the visual checks of a test to the controller
+PROPERTY = "visual"
+# Results of the visual checks of this session
+_results = []
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("visual", "visual regression checks")
+    group.addoption("--update-baselines", action="store_true", default=False,
+                    help="create or replace the baselines of the visual checks with the screenshots taken, and pass "
+                         "them. Without it a check with no baseline skips its test")
+    group.addoption("--require-baselines", action="store_true", default=False,
+                    help="fail the tests whose visual checks have no baseline instead of skipping them, e.g. on CI")
+    group.addoption("--no-visual", action="store_true", default=False,
+                    help="skip the visual checks of the page objects")
+
+
+def pytest_configure(config):
+    visual_config = settings.get_section("visual", DEFAULT_CONFIG)
+    if config.getoption("no_visual"):
+        visual_config["enabled"] = False
+    CHECKER.configure(
+        visual_config,
+        baselines=os.path.join(str(config.rootpath), visual_config["baselines"]),
+        results_dir=os.path.join(str(config.rootpath), visual_config["results"]),
+        # Screenshots of another window size or browser options have their own baselines
+        variant=driver_factory.profile_name(config.getoption("driver_profile", None)),
+        update=config.getoption("update_baselines")
+    )
+    config.stash[visual_key] = {"timeout": visual_config["timeout"],
+                                "require_baselines": config.getoption("require_baselines")}
+
+
+# Innermost wrapper, like the performance budgets: the failure is in the report the artifacts plugin reads
+@pytest.hookimpl(hookwrapper=True, trylast=True)
+def pytest_runtest_makereport(item, call):
+    outcome = yield
+    report = outcome.get_result()
+    state = item.config.stash.get(visual_key, None)
+    if state is None or report.when != "call":
+        return
+    checks = CHECKER.for_test(item.nodeid)
+    if not checks:
+        return
+    results, failures, missing = [], [], []
+    for check in checks:
+        try:
+            result = check.future.result(timeout=state["timeout"])
+        except FutureTimeoutError:
+            result = {"name": check.name, "status": "failed", "message": f"not compared within {state['timeout']}s"}
+        except Exception as e:
+            result = {"name": check.name, "status": "failed", "message": f"comparison error {e!r}"}
+        results.append(result)
+        if result["status"] == "failed":
+            files = "".join(f"\n    {path}" for path in result.get("files", []))
+            failures.append(f"{result['name']}: {result['message']}{files}")
+        elif result["status"] == "missing":
+            missing.append(result["name"])
+    report.user_properties.append((PROPERTY, results))
+    if missing and state["require_baselines"]:
+        failures += [f"{name}: no baseline, create it with pytest --update-baselines" for name in missing]
+    if failures and report.passed:
+        report.outcome = "failed"
+        report.longrepr = "Visual regressions:\n" + "\n".join(failures)
+    elif missing and report.passed:
+        # Not checked rather than passed: the screenshots under the results directory are the baselines to review
+        report.outcome = "skipped"
+        report.longrepr = (str(item.path), item.location[1], f"Skipped: no visual baseline for {', '.join(missing)}")
+
+
+def pytest_runtest_logreport(report):
+    # Under xdist the controller receives the reports of all the workers
+    for name, value in report.user_properties:
+        if name == PROPERTY:
+            _results.extend(value)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    CHECKER.close()
+    state = session.config.stash.get(visual_key, None)
+    if state is not None:
+        state["results"] = list(_results)
+    _results.clear()
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    state = config.stash.get(visual_key, None)
+    if not state or not state.get("results"):
+        return
+    counts = {}
+    for result in state["results"]:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    terminalreporter.section("visual checks")
+    terminalreporter.line(", ".join(f"{count} {status}" for status, count in sorted(counts.items())) +
+                          f", baselines in {CHECKER.store.root}")
+    for result in state["results"]:
+        if result["status"] in ("new", "updated", "missing") or config.getoption("verbose") > 0:
+            terminalreporter.line(f"{result['status'].upper():9} {result['name']}: {result['message']}")
@@ -0,0 +1,81 @@
+import os
+import logging
+import pytest
+
+import settings
+from drivers import browser_watchdog
+from drivers.browser_watchdog import BrowserWatchdog, RecyclingDriver, DEFAULT_CONFIG
+
+logger = logging.getLogger(__name__)
+
+watchdogs_key = pytest.StashKey[list]()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("watchdog", "browser resource watchdog")
+    group.addoption("--no-watchdog", action="store_true", default=False,
+                    help="don't sample the session browsers between tests nor recycle them")
+    group.addoption("--watchdog-series", metavar="PATH", default=None,
+                    help="JSON lines file of the browser RSS, CPU and JS heap samples, empty to disable it "
+                         "(default: watchdog.series in config.json)")
+
+
+def pytest_configure(config):
+    config.stash[watchdogs_key] = []
+
+
+def watch(config, driver_factory) -> RecyclingDriver:
+    """
+    Create a browser recycled by a watchdog when it uses too much memory or CPU, see the watchdog section of
+    config.json. Fixtures bring the new browser back to their state with its recycle_hooks
+
+    :param config: pytest config
+    :param driver_factory: callable with no arguments returning a new webdriver instance
+    :return: the driver to hand out to the tests
+    """
+    watchdog_config = settings.get_section("watchdog", DEFAULT_CONFIG)
+    if config.getoption("no_watchdog"):
+        watchdog_config["enabled"] = False
+    if watchdog_config["enabled"] and browser_watchdog.psutil is None:
+        logger.warning("psutil is not installed, the watchdog only checks the JS heap and the tests served: "
+                       "pip install psutil")
+    series = config.getoption("watchdog_series")
+    series = watchdog_config["series"] if series is None else series
+    watchdog_config["series"] = os.path.join(str(config.rootpath), series) if series and watchdog_config["enabled"] else None
+
+    driver = RecyclingDriver(driver_factory)
+    config.stash[watchdogs_key].append(BrowserWatchdog(driver, watchdog_config))
+    return driver
+
+
+def unwatch(config, driver):
+    """
+    Stop watching a browser, before quitting it
+
+    :param config: pytest config
+    :param driver: driver returned by watch()
+    """
+    watchdogs = config.stash[watchdogs_key]
+    for watchdog in [watchdog for watchdog in watchdogs if watchdog.driver is driver]:
+        watchdog.close()
+        watchdogs.remove(watchdog)
+
+
+def watched_drivers(config) -> list[RecyclingDriver]:
+    """
+    :param config: pytest config
+    :return: the session browsers alive
+    """
+    return [watchdog.driver for watchdog in config.stash.get(watchdogs_key, [])]
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_teardown(item, nextitem):
+    yield
+    # After the last test the session browsers are quit anyway
+    if nextitem is None:
+        return
+    used = [id(value) for value in (getattr(item, "funcargs", None) or {}).values()]
+    for watchdog in item.config.stash.get(watchdogs_key, []):
+        if id(watchdog.driver) in used:
+            watchdog.check(item.nodeid)
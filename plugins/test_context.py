@@ -0,0 +1,35 @@
+import pytest
+
+import os
+
+# Node id of the test being run by this process. Read by the helpers that tag their data with the current test
+_current_nodeid = None
+
+
+def current_nodeid():
+    """
+    Node id of the test currently running in this process
+
+    :return: the pytest node id, or None outside of a test
+    """
+    return _current_nodeid
+
+
+def worker_id() -> str:
+    """
+    Name of the current pytest-xdist worker
+
+    :return: gw0, gw1... when running under xdist, master otherwise
+    """
+    return os.environ.get("PYTEST_XDIST_WORKER", "master")
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    # Covers the setup, call and teardown of the test, including the fixtures created for it
+    global _current_nodeid
+    _current_nodeid = item.nodeid
+    try:
+        yield
+    finally:
+        _current_nodeid = None
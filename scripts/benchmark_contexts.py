@@ -0,0 +1,94 @@
+"""
+Compare the memory used by N separate Chrome instances with N isolated browser contexts in one shared Chrome.
+
+Run from the project root (needs psutil):
+    python -m scripts.benchmark_contexts --sessions 8
+"""
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+import argparse
+import time
+
+from drivers.browser_contexts import BrowserContextHost
+from drivers.chrome_process import ChromeProcess
+from standin.server import SwagLabsServer
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def tree_rss(pid) -> int:
+    """
+    Resident memory of a process and all its descendants, in bytes
+    """
+    root = psutil.Process(pid)
+    total = 0
+    for process in [root] + root.children(recursive=True):
+        try:
+            total += process.memory_info().rss
+        except psutil.NoSuchProcess:
+            pass
+    return total
+
+
+def separate_browsers(url, sessions):
+    options = Options()
+    options.add_argument('--headless')
+    options.add_argument('--no-sandbox')
+    drivers = []
+    try:
+        start = time.perf_counter()
+        for _ in range(sessions):
+            driver = webdriver.Chrome(options=options)
+            driver.get(url)
+            drivers.append(driver)
+        elapsed = time.perf_counter() - start
+        # The chromedriver processes are included, each one is the parent of its Chrome
+        rss = sum(tree_rss(driver.service.process.pid) for driver in drivers)
+        return elapsed, rss
+    finally:
+        for driver in drivers:
+            driver.quit()
+
+
+def shared_browser(url, sessions):
+    chrome = ChromeProcess(headless=True).start()
+    host = None
+    try:
+        start = time.perf_counter()
+        host = BrowserContextHost(chrome.debugger_address)
+        for _ in range(sessions):
+            host.open_context(url)
+        elapsed = time.perf_counter() - start
+        rss = tree_rss(chrome.pid) + tree_rss(host.driver.service.process.pid)
+        return elapsed, rss
+    finally:
+        if host is not None:
+            host.close()
+        chrome.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark separate Chrome instances against shared browser contexts")
+    parser.add_argument("--sessions", type=int, default=4, help="number of concurrent isolated sessions")
+    args = parser.parse_args()
+    if psutil is None:
+        raise SystemExit("psutil is needed to measure the memory: pip install psutil")
+
+    with SwagLabsServer() as server:
+        results = {
+            "separate webdriver.Chrome": separate_browsers(server.url, args.sessions),
+            "contexts in one Chrome": shared_browser(server.url, args.sessions)
+        }
+
+    print(f"{args.sessions} isolated sessions on the inventory stand-in")
+    print(f"{'mode':<28}{'startup s':>10}{'total RSS MB':>14}{'RSS per session MB':>20}")
+    for mode, (elapsed, rss) in results.items():
+        print(f"{mode:<28}{elapsed:>10.2f}{rss / 2 ** 20:>14.0f}{rss / 2 ** 20 / args.sessions:>20.0f}")
+
+
+if __name__ == "__main__":
+    main()
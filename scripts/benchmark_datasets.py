@@ -0,0 +1,118 @@
+"""
+Measure the collection cost of the dataset parametrization as the dataset grows, against loading every row.
+
+Run from the project root (no browser needed):
+    python -m scripts.benchmark_datasets --rows 1000 10000 100000
+
+For each size a CSV of users, items and expected totals is generated, then measured:
+- load all rows: csv.DictReader into a list, what a parametrize over the rows would do
+- cold index: first collection, the file is validated and its row offsets are cached
+- warm index: next collections, the file is only hashed
+- pytest --collect-only of a test marked with the dataset, in a subprocess: one test item per row collected, all of
+  them, then the datasets.max_rows sample
+"""
+import argparse
+import csv
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from plugins.plugin_datasets import Dataset
+from pages.page_shopping_items import ITEM_IDS
+
+
+def generate(path, rows):
+    items = list(ITEM_IDS)
+    with open(path, "w", newline="", encoding="utf-8") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["username", "item", "quantity", "expected_total"])
+        for index in range(rows):
+            writer.writerow([f"user{index}", items[index % len(items)], index % 5 + 1, f"{(index % 5 + 1) * 9.99:.2f}"])
+
+
+def measure(action):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = action()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+DATASET_TEST = """
+import pytest
+
+
+@pytest.mark.dataset("{file_name}")
+def test_row(dataset_row):
+    pass
+"""
+
+
+def collect(work_dir, path, *options):
+    """
+    Collect a test of the dataset in a new pytest process
+
+    :return: seconds, peak resident memory in bytes and number of tests collected
+    """
+    with open(os.path.join(work_dir, "test_rows.py"), "w", encoding="utf-8") as test_file:
+        test_file.write(DATASET_TEST.format(file_name=os.path.basename(path)))
+    with open(os.path.join(work_dir, "conftest.py"), "w", encoding="utf-8") as conftest_file:
+        conftest_file.write('pytest_plugins = ["plugins.plugin_datasets"]\n')
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=project_root,
+               PYSELENIUM_CONFIG=os.path.join(project_root, "config", "config.json"))
+    command = [sys.executable, "-m", "pytest", "-q", "--collect-only", "-p", "no:cacheprovider", *options]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=work_dir, env=env, stdout=subprocess.PIPE, text=True)
+    output = process.stdout.read()
+    # The resource usage of this process only, RUSAGE_CHILDREN keeps the largest of all the children
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        raise RuntimeError(f"pytest --collect-only failed:\n{output}")
+    return elapsed, usage.ru_maxrss * 1024, output.count("::test_row")
+
+
+def load_all(path):
+    with open(path, newline="", encoding="utf-8") as csv_file:
+        return list(csv.DictReader(csv_file))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dataset index against loading all the rows")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--sample", type=int, default=100, help="rows collected with sampling")
+    args = parser.parse_args()
+
+    print(f"{'rows':>8}  {'method':<34}{'time ms':>10}{'peak MB':>10}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.makedirs(os.path.join(work_dir, "config", "datasets"))
+        paths = {rows: os.path.join(work_dir, "config", "datasets", f"users-{rows}.csv") for rows in sorted(args.rows)}
+        # The pytest processes first: forked from this one, their resident memory includes the rows it loaded
+        collections = {}
+        for rows, path in paths.items():
+            generate(path, rows)
+            collections[rows] = {
+                "pytest collection, all rows (RSS)": collect(work_dir, path, "--dataset-max-rows", "0"),
+                "pytest collection, max_rows (RSS)": collect(work_dir, path)
+            }
+        for rows, path in paths.items():
+            cache_dir = os.path.join(work_dir, "cache")
+            results = {
+                "load all rows": measure(lambda: load_all(path)),
+                "cold index": measure(lambda: Dataset(path, cache_dir)),
+                "warm index": measure(lambda: Dataset(path, cache_dir)),
+                f"warm index, sample {args.sample}": measure(lambda: Dataset(path, cache_dir).select(sample=args.sample)),
+                **collections[rows]
+            }
+            for method, (elapsed, peak, result) in results.items():
+                print(f"{rows:>8}  {method:<34}{elapsed * 1000:>10.1f}{peak / 2 ** 20:>10.2f}")
+
+if __name__ == "__main__":
+    main()
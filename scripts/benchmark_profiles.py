@@ -0,0 +1,72 @@
+"""
+Compare the page load time of the driver profiles of config.json.
+
+Run from the project root against the local stand-in, or the live site with --url:
+    python -m scripts.benchmark_profiles --profiles default eager lean --repeat 10
+    python -m scripts.benchmark_profiles --url https://www.saucedemo.com/ --profiles default lean
+
+For each profile the driver.get() wall time is measured, together with the Navigation Timing of the page:
+DOMContentLoaded, load event and the bytes transferred for the document.
+"""
+import argparse
+import statistics
+import time
+
+from drivers import driver_factory
+from plugins.plugin_timing import percentile
+from standin.server import SwagLabsServer
+
+NAVIGATION_TIMING_SCRIPT = """
+var entry = performance.getEntriesByType('navigation')[0];
+if (!entry) { return null; }
+var transferred = performance.getEntriesByType('resource').reduce(function (total, resource) {
+    return total + resource.transferSize;
+}, entry.transferSize);
+return {dcl: entry.domContentLoadedEventEnd, load: entry.loadEventEnd, transferred: transferred};
+"""
+
+
+def measure_profile(name, url, repeat):
+    driver = driver_factory.create_driver(name)
+    try:
+        # First load warms the http cache of the browser, like the tests after their first page
+        driver.get(url)
+        wall, dcl, transferred = [], [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            driver.get(url)
+            wall.append(time.perf_counter() - start)
+            timing = driver.execute_script(NAVIGATION_TIMING_SCRIPT)
+            if timing:
+                dcl.append(timing["dcl"] / 1000)
+                transferred.append(timing["transferred"])
+        return wall, dcl, transferred
+    finally:
+        driver.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the page load of the driver profiles")
+    parser.add_argument("--profiles", nargs="+", default=["default", "eager", "lean"])
+    parser.add_argument("--url", default=None, help="page to load, the local stand-in when not given")
+    parser.add_argument("--latency", type=float, default=0.02, help="stand-in latency per request, in seconds")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.url:
+        results = {name: measure_profile(name, args.url, args.repeat) for name in args.profiles}
+    else:
+        with SwagLabsServer(latency=args.latency, seed=0) as server:
+            results = {name: measure_profile(name, server.url, args.repeat) for name in args.profiles}
+
+    print(f"{args.url or 'stand-in'}, {args.repeat} loads per profile")
+    print(f"{'profile':<12}{'get median ms':>15}{'get p95 ms':>12}{'DCL median ms':>15}{'transferred KB':>16}")
+    for name, (wall, dcl, transferred) in results.items():
+        dcl_median = f"{statistics.median(dcl) * 1000:.1f}" if dcl else "-"
+        transferred_kb = f"{statistics.median(transferred) / 1024:.1f}" if transferred else "-"
+        print(f"{name:<12}{statistics.median(wall) * 1000:>15.1f}{percentile(wall, 95) * 1000:>12.1f}"
+              f"{dcl_median:>15}{transferred_kb:>16}")
+
+
+if __name__ == "__main__":
+    main()
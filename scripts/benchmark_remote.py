@@ -0,0 +1,78 @@
+"""
+Compare the connection handling of remote WebDriver sessions: selenium defaults against the shared keep-alive pool.
+
+Run from the project root against the bundled WebDriver node stand-in (no browser needed), or a real grid with --url:
+    python -m scripts.benchmark_remote --sessions 50 --commands 20 --latency 0.005
+    python -m scripts.benchmark_remote --url http://grid:4444 --sessions 20
+
+Each session is created, sends its commands and quits, all the sessions running at the same time:
+- selenium, no keep-alive: a new connection per command
+- selenium, keep-alive: a pool of one connection per session, the new session request has its own connection
+- shared pool: the sessions of the process share pool_size keep-alive connections
+"""
+from concurrent.futures import ThreadPoolExecutor
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.remote.remote_connection import RemoteConnection
+
+import argparse
+import time
+
+from drivers import remote_connection
+from standin.webdriver_node import WebDriverNode
+
+
+def run_session(factory, commands):
+    driver = factory()
+    try:
+        for _ in range(commands):
+            driver.title
+    finally:
+        driver.quit()
+
+
+def measure(url, sessions, commands, factory, node=None):
+    connections_before = node.connections if node else 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        list(executor.map(lambda _: run_session(factory, commands), range(sessions)))
+    elapsed = time.perf_counter() - start
+    return elapsed, (node.connections - connections_before) if node else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark remote WebDriver connection pooling")
+    parser.add_argument("--url", default=None, help="remote WebDriver url, the node stand-in by default")
+    parser.add_argument("--sessions", type=int, default=50, help="sessions running at the same time")
+    parser.add_argument("--commands", type=int, default=20, help="commands per session")
+    parser.add_argument("--latency", type=float, default=0.005, help="stand-in node latency per request, in seconds")
+    parser.add_argument("--pool-size", type=int, default=16, help="connections of the shared pool")
+    args = parser.parse_args()
+
+    node = None if args.url else WebDriverNode(latency=args.latency).start()
+    url = args.url or node.url
+    try:
+        strategies = {
+            "selenium, no keep-alive": lambda: webdriver.Remote(RemoteConnection(url, keep_alive=False), options=Options()),
+            "selenium, keep-alive": lambda: webdriver.Remote(RemoteConnection(url, keep_alive=True), options=Options()),
+            f"shared pool of {args.pool_size}": lambda: webdriver.Remote(remote_connection.PooledRemoteConnection(
+                remote_connection.shared_pool(url, {"pool_size": args.pool_size})), options=Options())
+        }
+        results = {name: measure(url, args.sessions, args.commands, factory, node) for name, factory in strategies.items()}
+        stats = remote_connection.pool_stats()[url.rstrip("/")]
+    finally:
+        remote_connection.close_pools()
+        if node:
+            node.stop()
+
+    requests = args.sessions * (args.commands + 2)
+    print(f"{args.sessions} sessions x {args.commands} commands, {requests} requests per strategy, "
+          f"latency={args.latency if node else 'grid'}")
+    print(f"{'strategy':<28}{'wall s':>8}{'requests/s':>12}{'connections':>13}")
+    for name, (elapsed, connections) in results.items():
+        print(f"{name:<28}{elapsed:>8.2f}{requests / elapsed:>12.0f}{'-' if connections is None else connections:>13}")
+    print(f"shared pool stats: {stats}")
+
+
+if __name__ == "__main__":
+    main()
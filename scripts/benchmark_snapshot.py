@@ -0,0 +1,102 @@
+"""
+Compare reading the elements of a page one WebDriver call at a time, with a bulk query and with a DOM snapshot.
+
+Run from the project root against the local stand-in:
+    python -m scripts.benchmark_snapshot --latency 0.02 --repeat 20
+
+Scenarios, the read-only checks of the list and cart tests:
+- sorted prices: the prices of the inventory, as read by test_shopping_list_sort_by_price
+- cart contents: the name, price and remove button of every item of a full cart page
+Each one reports the wall time and the WebDriver round-trips per check.
+"""
+from selenium.webdriver.common.by import By
+
+import argparse
+import statistics
+import time
+
+from drivers import driver_factory
+from drivers.driver_instrumentation import RECORDER
+from pages.page_login import PageLogin
+from pages.page_shopping_items import PageCart, ITEM_IDS
+from plugins.plugin_timing import percentile
+from standin.server import SwagLabsServer
+
+CART_FIELDS = {
+    "name": (By.CLASS_NAME, "inventory_item_name"),
+    "price": (By.CLASS_NAME, "inventory_item_price"),
+    "button": (By.TAG_NAME, "button")
+}
+
+
+def prices_per_element(driver):
+    return [float(price.text.replace('$', '')) for price in driver.find_elements(By.CLASS_NAME, "inventory_item_price")]
+
+
+def cart_per_element(driver):
+    return [[row.find_element(*locator).text for locator in CART_FIELDS.values()]
+            for row in driver.find_elements(By.CLASS_NAME, "cart_item")]
+
+
+def cart_bulk(page_cart):
+    blocks = page_cart.query_containers((By.CLASS_NAME, "cart_item"), CART_FIELDS)
+    return [[block[field].text for field in CART_FIELDS] for block in blocks]
+
+
+def cart_snapshot(page_cart):
+    rows = page_cart.snapshot().find_elements(By.CLASS_NAME, "cart_item")
+    return [[row.find_element(*locator).text for locator in CART_FIELDS.values()] for row in rows]
+
+
+def measure(repeat, action):
+    durations = []
+    RECORDER.drain()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = action()
+        durations.append(time.perf_counter() - start)
+    round_trips = len(RECORDER.drain()) / repeat
+    return durations, round_trips, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-element reads against bulk queries and DOM snapshots")
+    parser.add_argument("--latency", type=float, default=0.0, help="stand-in latency per request, in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="stand-in jitter per request, in seconds")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--profile", default=None, help="driver profile of config.json")
+    args = parser.parse_args()
+
+    # Counts the round-trips of each way of reading the page
+    RECORDER.enabled = True
+    with SwagLabsServer(latency=args.latency, jitter=args.jitter, seed=0) as server:
+        driver = driver_factory.create_driver(args.profile)
+        try:
+            driver.get(server.url)
+            PageLogin(driver).login("standard_user", "secret_sauce")
+            page_cart = PageCart(driver)
+            results = {
+                "sorted prices / per element": measure(args.repeat, lambda: prices_per_element(driver)),
+                "sorted prices / bulk query": measure(args.repeat, page_cart.get_item_prices),
+                "sorted prices / snapshot": measure(args.repeat, lambda: page_cart.get_item_prices(page_cart.snapshot()))
+            }
+
+            page_cart.set_cart_contents(list(ITEM_IDS))
+            page_cart.navigate(f"{server.url}cart.html")
+            results.update({
+                "cart contents / per element": measure(args.repeat, lambda: cart_per_element(driver)),
+                "cart contents / bulk query": measure(args.repeat, lambda: cart_bulk(page_cart)),
+                "cart contents / snapshot": measure(args.repeat, lambda: cart_snapshot(page_cart))
+            })
+        finally:
+            driver.quit()
+
+    print(f"latency={args.latency}s jitter={args.jitter}s")
+    print(f"{'scenario':<32}{'round-trips':>12}{'median ms':>12}{'p95 ms':>10}")
+    for scenario, (durations, round_trips, result) in results.items():
+        print(f"{scenario:<32}{round_trips:>12.0f}{statistics.median(durations) * 1000:>12.1f}"
+              f"{percentile(durations, 95) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
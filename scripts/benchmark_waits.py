@@ -0,0 +1,110 @@
+"""
+Compare the polling waits (WebDriverWait) with the in-page event-driven waits of pages.dom_waits.
+
+Run from the project root against the local stand-in:
+    python -m scripts.benchmark_waits --latency 0.05 --repeat 20
+
+Scenarios:
+- empty cart: reading the cart count when the cart is empty. The polling version waits for its whole timeout
+- delayed element: an element added by the page after a delay. The polling version overshoots by up to its poll interval
+- page title: loading the login page and waiting for its title
+"""
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions
+from selenium.common.exceptions import TimeoutException
+
+import argparse
+import statistics
+import time
+
+from pages import dom_waits
+from pages.page_login import PageLogin
+from pages.page_shopping_items import PageCart
+from plugins.plugin_timing import percentile
+from standin.server import SwagLabsServer
+
+ADD_DELAYED_ELEMENT_SCRIPT = """
+setTimeout(function () {
+    var element = document.createElement('div');
+    element.id = 'benchmark-delayed';
+    document.body.appendChild(element);
+}, arguments[0]);
+"""
+
+DELAYED_ELEMENT_PREDICATE = "return document.getElementById('benchmark-delayed') ? true : undefined;"
+
+
+def polling_cart_count(driver, timeout):
+    # get_cart_count before the event-driven waits: an empty cart costs the whole timeout
+    try:
+        badge = WebDriverWait(driver, timeout).until(
+            expected_conditions.presence_of_element_located((By.CLASS_NAME, "shopping_cart_badge"))
+        )
+        return float(badge.text)
+    except TimeoutException:
+        return 0
+
+
+def remove_delayed_element(driver):
+    driver.execute_script("var e = document.getElementById('benchmark-delayed'); if (e) { e.remove(); }")
+
+
+def measure(repeat, action, setup=None):
+    durations = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        action()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark polling waits against event-driven waits")
+    parser.add_argument("--latency", type=float, default=0.0, help="stand-in latency per request, in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="stand-in jitter per request, in seconds")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=10, help="timeout of the empty cart wait, in seconds")
+    parser.add_argument("--delay", type=int, default=300, help="delay of the delayed element, in milliseconds")
+    args = parser.parse_args()
+
+    options = Options()
+    options.add_argument('--headless')
+    options.add_argument('--no-sandbox')
+
+    with SwagLabsServer(latency=args.latency, jitter=args.jitter, seed=0) as server:
+        driver = webdriver.Chrome(options=options)
+        try:
+            driver.get(server.url)
+            PageLogin(driver).login("standard_user", "secret_sauce")
+            delayed = lambda: driver.execute_script(ADD_DELAYED_ELEMENT_SCRIPT, args.delay)
+            setup_delayed = lambda: (remove_delayed_element(driver), delayed())
+
+            results = {
+                "empty cart / polling": measure(min(args.repeat, 3), lambda: polling_cart_count(driver, args.timeout)),
+                "empty cart / event-driven": measure(args.repeat, lambda: PageCart(driver).get_cart_count()),
+                "delayed element / polling": measure(args.repeat, lambda: WebDriverWait(driver, 10).until(
+                    expected_conditions.presence_of_element_located((By.ID, "benchmark-delayed"))), setup_delayed),
+                "delayed element / event-driven": measure(args.repeat, lambda: dom_waits.wait_for_js(
+                    driver, DELAYED_ELEMENT_PREDICATE), setup_delayed),
+                "page title / polling": measure(args.repeat, lambda: (driver.get(server.url), WebDriverWait(driver, 10).until(
+                    expected_conditions.title_is("Swag Labs")))),
+                "page title / event-driven": measure(args.repeat, lambda: (driver.get(server.url), dom_waits.wait_for_title(
+                    driver, "Swag Labs")))
+            }
+        finally:
+            driver.quit()
+
+    print(f"latency={args.latency}s jitter={args.jitter}s delayed element after {args.delay}ms")
+    print(f"{'scenario':<34}{'runs':>6}{'median ms':>12}{'p95 ms':>10}")
+    for scenario, durations in results.items():
+        print(f"{scenario:<34}{len(durations):>6}{statistics.median(durations) * 1000:>12.1f}"
+              f"{percentile(durations, 95) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
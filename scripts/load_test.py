@@ -0,0 +1,404 @@
+"""
+Run the page object flows of the tests as concurrent synthetic users and report the latency percentiles of each step.
+
+Run from the project root. Without --url the bundled stand-in is served locally and used as the target:
+    python -m scripts.load_test --users 4 --duration 30 --ramp-up 5
+    python -m scripts.load_test --mode rate --rate 2 --users 8 --duration 60 --ramp-up 10 --latency 0.05
+    python -m scripts.load_test --url http://staging.example:8080/ --users 10 --json reports/load.json
+
+Every synthetic user drives a headless browser of the pool (driver profile of config.json, or --remote-url for a
+grid). One iteration is a shopping session: login, add the items to the cart, read the cart count, sort the items
+by price, then the cookies and storage are cleared for the next iteration. Scheduling:
+- closed: every user starts an iteration as soon as its previous one ended (after --think-time). With --ramp-up
+  the users start one after the other over that many seconds
+- rate: iterations start at --rate per second whatever the response times, on the first free browser of the pool.
+  With --ramp-up the rate grows linearly from 0 over that many seconds. The iteration latency is counted from the
+  time it was scheduled, so the time spent waiting for a free browser is not hidden (coordinated omission)
+Only point --url at an application you are allowed to load.
+"""
+from __future__ import annotations
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from selenium.webdriver.common.by import By
+
+import argparse
+import json
+import math
+import threading
+import time
+
+import settings
+from drivers import driver_factory
+from drivers.driver_instrumentation import RECORDER as COMMAND_RECORDER
+from pages import page_performance
+from pages.page_login import PageLogin
+from pages.page_shopping_items import PageCart, ITEM_IDS
+from standin.server import SwagLabsServer
+
+RESET_SCRIPT = "window.localStorage.clear(); window.sessionStorage.clear();"
+
+
+class Histogram:
+    """
+    Latency histogram with logarithmic buckets: constant memory whatever the number of samples, and percentiles
+    within `precision` of the recorded values
+    """
+    def __init__(self, precision=0.01):
+        self.precision = precision
+        self._log_base = math.log1p(precision)
+        self.buckets = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds):
+        microseconds = max(seconds * 1e6, 1.0)
+        self.buckets[math.ceil(math.log(microseconds) / self._log_base)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def merge(self, other):
+        self.buckets.update(other.buckets)
+        self.count += other.count
+        self.total += other.total
+        for bound in (other.min, other.max):
+            if bound is not None:
+                self.min = bound if self.min is None else min(self.min, bound)
+                self.max = bound if self.max is None else max(self.max, bound)
+
+    def percentile(self, pct) -> float:
+        """
+        :param pct: percentile between 0 and 100
+        :return: upper bound of the bucket holding the percentile, in seconds. 0.0 when empty
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * pct / 100))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(math.exp(bucket * self._log_base) / 1e6, self.max)
+        return self.max
+
+
+class LoadResults:
+    """
+    Step latencies and errors of a load run. Every user records in its own results, merged once the run is over
+    """
+    def __init__(self):
+        self.steps = defaultdict(Histogram)
+        self.errors = defaultdict(Counter)
+        self.round_trips = 0
+
+    def record(self, step, seconds):
+        self.steps[step].record(seconds)
+
+    def record_error(self, step, error):
+        self.errors[step][type(error).__name__] += 1
+
+    def merge(self, other):
+        for step, histogram in other.steps.items():
+            self.steps[step].merge(histogram)
+        for step, errors in other.errors.items():
+            self.errors[step].update(errors)
+        self.round_trips += other.round_trips
+
+    def summary(self, elapsed) -> dict:
+        """
+        :param elapsed: wall seconds of the run
+        :return: dict of step to its count, errors, throughput per second and latency percentiles in ms
+        """
+        summary = {}
+        for step in sorted(set(self.steps) | set(self.errors)):
+            histogram = self.steps[step]
+            summary[step] = {
+                "count": histogram.count,
+                "errors": sum(self.errors[step].values()),
+                "error_types": dict(self.errors[step]),
+                "per_second": histogram.count / elapsed if elapsed else 0.0,
+                "mean_ms": histogram.total / histogram.count * 1000 if histogram.count else 0.0,
+                **{f"p{pct}_ms": histogram.percentile(pct) * 1000 for pct in (50, 90, 95, 99)},
+                "max_ms": (histogram.max or 0.0) * 1000
+            }
+        return summary
+
+
+class StepTimer:
+    """
+    Times the steps of one iteration into the results. A failed step is counted as an error and ends the iteration
+    """
+    def __init__(self, results):
+        self.results = results
+
+    def __call__(self, step, action):
+        start = time.perf_counter()
+        try:
+            value = action()
+        except Exception as e:
+            self.results.record_error(step, e)
+            raise
+        self.results.record(step, time.perf_counter() - start)
+        return value
+
+
+class ShoppingScenario:
+    """
+    The flows of the POM tests as one synthetic user session: login, add items, read the cart count, sort
+    """
+    def __init__(self, base_url, username, password, items=("sauce-labs-backpack", "sauce-labs-bike-light"), sort="lohi"):
+        """
+        :param base_url: url of the login page of the application
+        :param username: swag labs user
+        :param password: password of the user
+        :param items: slugs of the items added to the cart
+        :param sort: sort option of the inventory - az, za, lohi or hilo
+        """
+        unknown = [item for item in items if item not in ITEM_IDS]
+        if unknown:
+            raise ValueError(f"Unknown items {unknown}, known items: {', '.join(ITEM_IDS)}")
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.items = list(items)
+        self.sort = sort
+
+    def run(self, driver, step):
+        """
+        One iteration, every step timed by `step`
+
+        :param driver: selenium web driver of the user
+        :param step: StepTimer of the user
+        """
+        def login():
+            driver.get(self.base_url)
+            PageLogin(driver).login(self.username, self.password)
+        step("login", login)
+
+        page_cart = PageCart(driver)
+        for item in self.items:
+            step("add_item", lambda: page_cart.add_item_to_cart(By.NAME, f"add-to-cart-{item}"))
+
+        count = step("cart_count", page_cart.get_cart_count)
+        if count != len(self.items):
+            raise AssertionError(f"Cart count {count}, expected {len(self.items)}")
+
+        def sort_items():
+            page_cart.sort_items_by(self.sort)
+            return page_cart.get_item_prices()
+        prices = step("sort", sort_items)
+        if self.sort in ("lohi", "hilo") and prices != sorted(prices, reverse=self.sort == "hilo"):
+            raise AssertionError(f"Prices not sorted by {self.sort}: {prices}")
+
+    def reset(self, driver):
+        """
+        Log out and empty the cart for the next iteration, not timed
+        """
+        driver.delete_all_cookies()
+        driver.execute_script(RESET_SCRIPT)
+
+
+def run_iteration(scenario, driver, results, scheduled=None):
+    """
+    Run one timed iteration. Its errors are counted, not raised
+
+    :param scenario: ShoppingScenario
+    :param driver: selenium web driver of the user
+    :param results: LoadResults of the user
+    :param scheduled: perf_counter time the iteration was due, its start by default
+    """
+    start = time.perf_counter() if scheduled is None else scheduled
+    step = StepTimer(results)
+    try:
+        scenario.run(driver, step)
+        results.record("iteration", time.perf_counter() - start)
+    except Exception as e:
+        results.record_error("iteration", e)
+    finally:
+        try:
+            scenario.reset(driver)
+        except Exception as e:
+            results.record_error("reset", e)
+        # The command samples are only counted, a long run would keep them all in memory otherwise
+        results.round_trips += len(COMMAND_RECORDER.drain())
+
+
+def run_closed_loop(scenario, drivers, duration, ramp_up=0.0, think_time=0.0) -> LoadResults:
+    """
+    Every user runs iterations back to back until the end of the run
+
+    :param scenario: ShoppingScenario
+    :param drivers: one web driver per user
+    :param duration: seconds after which no new iteration starts
+    :param ramp_up: seconds over which the users start, evenly spread
+    :param think_time: seconds a user waits between two iterations
+    :return: the merged results of the users
+    """
+    start = time.perf_counter()
+    deadline = start + duration
+    user_results = [LoadResults() for _ in drivers]
+
+    def user(index):
+        time.sleep(ramp_up * index / len(drivers))
+        while time.perf_counter() < deadline:
+            run_iteration(scenario, drivers[index], user_results[index])
+            if think_time:
+                time.sleep(think_time)
+
+    threads = [threading.Thread(target=user, args=(index,), name=f"user-{index}") for index in range(len(drivers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return merge_results(user_results)
+
+
+def arrival_times(rate, duration, ramp_up=0.0):
+    """
+    Start times of the iterations of a fixed-rate run, the rate growing linearly from 0 during the ramp-up
+
+    :param rate: iterations per second once ramped up
+    :param duration: seconds of the run
+    :param ramp_up: seconds to reach the rate
+    :return: generator of offsets in seconds from the start of the run
+    """
+    ramp_up = min(ramp_up, duration)
+    ramp_arrivals = rate * ramp_up / 2
+    arrival = 1
+    while True:
+        if arrival <= ramp_arrivals:
+            # Arrivals until t during the ramp-up: rate * t^2 / (2 * ramp_up)
+            offset = math.sqrt(2 * arrival * ramp_up / rate)
+        else:
+            offset = ramp_up + (arrival - ramp_arrivals) / rate
+        if offset >= duration:
+            return
+        yield offset
+        arrival += 1
+
+
+def run_fixed_rate(scenario, drivers, duration, rate, ramp_up=0.0) -> LoadResults:
+    """
+    Start iterations at a fixed rate, each on the first browser of the pool that is free
+
+    :param scenario: ShoppingScenario
+    :param drivers: browsers of the pool
+    :param duration: seconds after which no new iteration starts
+    :param rate: iterations started per second
+    :param ramp_up: seconds for the rate to grow from 0
+    :return: the merged results
+    """
+    free_drivers = Queue()
+    for driver in drivers:
+        free_drivers.put(driver)
+    lock = threading.Lock()
+    results = LoadResults()
+
+    def iteration(scheduled):
+        driver = free_drivers.get()
+        waited = time.perf_counter() - scheduled
+        iteration_results = LoadResults()
+        iteration_results.record("queue_wait", waited)
+        try:
+            run_iteration(scenario, driver, iteration_results, scheduled)
+        finally:
+            free_drivers.put(driver)
+            with lock:
+                results.merge(iteration_results)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(drivers), thread_name_prefix="user") as executor:
+        for offset in arrival_times(rate, duration, ramp_up):
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(iteration, start + offset)
+    return results
+
+
+def merge_results(all_results) -> LoadResults:
+    merged = LoadResults()
+    for results in all_results:
+        merged.merge(results)
+    return merged
+
+
+def render_report(summary, elapsed, round_trips) -> str:
+    iterations = summary.get("iteration", {}).get("count", 0)
+    lines = [f"{elapsed:.1f}s, {iterations} iterations, {iterations / elapsed if elapsed else 0:.2f} iterations/s, "
+             f"{round_trips / iterations if iterations else 0:.1f} WebDriver round-trips per iteration",
+             f"{'step':<12}{'count':>8}{'errors':>8}{'per s':>8}{'mean ms':>10}{'p50 ms':>10}{'p90 ms':>10}"
+             f"{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+    for step, stats in summary.items():
+        lines.append(f"{step:<12}{stats['count']:>8}{stats['errors']:>8}{stats['per_second']:>8.2f}{stats['mean_ms']:>10.1f}"
+                     f"{stats['p50_ms']:>10.1f}{stats['p90_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}"
+                     f"{stats['max_ms']:>10.1f}")
+    errors = {step: stats["error_types"] for step, stats in summary.items() if stats["error_types"]}
+    if errors:
+        lines.append(f"errors: {errors}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the application with synthetic users running the page object flows")
+    parser.add_argument("--url", default=None, help="application url, the local stand-in by default")
+    parser.add_argument("--users", type=int, default=4, help="synthetic users, one headless browser each")
+    parser.add_argument("--mode", choices=("closed", "rate"), default="closed", help="closed loop users or fixed arrival rate")
+    parser.add_argument("--rate", type=float, default=1.0, help="iterations started per second, rate mode")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds during which iterations start")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="seconds to start the users or reach the rate")
+    parser.add_argument("--think-time", type=float, default=0.0, help="seconds between two iterations of a user, closed mode")
+    parser.add_argument("--items", nargs="+", default=["sauce-labs-backpack", "sauce-labs-bike-light"], choices=list(ITEM_IDS))
+    parser.add_argument("--sort", choices=("az", "za", "lohi", "hilo"), default="lohi")
+    parser.add_argument("--profile", default=None, help="driver profile of config.json")
+    parser.add_argument("--remote-url", default=None, help="run the browsers on a Selenium Grid")
+    parser.add_argument("--latency", type=float, default=0.0, help="stand-in latency per request, in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="stand-in jitter per request, in seconds")
+    parser.add_argument("--page-metrics", action="store_true",
+                        help="also report the in-page action latencies of the page objects (one more call per action)")
+    parser.add_argument("--json", default=None, help="write the report as JSON to this file")
+    args = parser.parse_args()
+
+    credentials = settings.get_section("credentials", {"username": "standard_user", "password": "secret_sauce"})
+    page_performance.RECORDER.enabled = args.page_metrics
+    # Counts the round-trips of the iterations
+    COMMAND_RECORDER.enabled = True
+    server = None if args.url else SwagLabsServer(latency=args.latency, jitter=args.jitter).start()
+    scenario = ShoppingScenario(args.url or server.url, credentials["username"], credentials["password"], args.items, args.sort)
+    try:
+        drivers = driver_factory.create_drivers(args.users, args.profile, args.remote_url)
+        try:
+            COMMAND_RECORDER.drain()
+            start = time.perf_counter()
+            if args.mode == "closed":
+                results = run_closed_loop(scenario, drivers, args.duration, args.ramp_up, args.think_time)
+            else:
+                results = run_fixed_rate(scenario, drivers, args.duration, args.rate, args.ramp_up)
+            elapsed = time.perf_counter() - start
+        finally:
+            with ThreadPoolExecutor(max_workers=len(drivers)) as executor:
+                list(executor.map(lambda driver: driver.quit(), drivers))
+    finally:
+        if server:
+            server.stop()
+
+    for sample in page_performance.RECORDER.drain():
+        for metric, value in sample.metrics.items():
+            if value is not None:
+                results.record(f"page:{metric.removesuffix('_ms')}", value / 1000)
+    summary = results.summary(elapsed)
+    print(f"mode={args.mode} users={args.users} target={args.url or 'stand-in'}"
+          + (f" rate={args.rate}/s" if args.mode == "rate" else ""))
+    print(render_report(summary, elapsed, results.round_trips))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as report_file:
+            json.dump({"mode": args.mode, "users": args.users, "elapsed": elapsed, "round_trips": results.round_trips,
+                       "steps": summary}, report_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
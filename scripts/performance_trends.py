@@ -0,0 +1,142 @@
+"""
+Trends of the page performance recorded by the test runs, see plugins/plugin_performance.py.
+
+Run from the project root once a few runs appended their samples to the history:
+    python -m scripts.performance_trends --runs 10
+    python -m scripts.performance_trends --html reports/performance/trends.html
+
+For every page and metric: the p75 of each of the last runs, the last run against the median of the runs
+before it, and the budget of config.json. A metric is flagged when its last p75 grew by more than the tolerance.
+"""
+from collections import defaultdict
+from html import escape
+
+import argparse
+import json
+import statistics
+import sys
+
+import settings
+from pages.page_performance import DEFAULT_CONFIG, budget_for
+from plugins.plugin_timing import percentile
+
+
+def load_history(path) -> list[dict]:
+    """
+    :param path: history JSON lines file
+    :return: the recorded samples, one dict per line
+    """
+    with open(path, encoding="utf-8") as history_file:
+        return [json.loads(line) for line in history_file if line.strip()]
+
+
+def group_runs(records) -> dict:
+    """
+    :param records: history samples
+    :return: dict of run id to its samples, oldest run first
+    """
+    runs = defaultdict(list)
+    for record in sorted(records, key=lambda record: record["time"]):
+        runs[record["run"]].append(record)
+    return dict(runs)
+
+
+def build_trends(records, runs=10, tolerance=0.2, budgets=None) -> list[dict]:
+    """
+    :param records: history samples
+    :param runs: number of most recent runs to keep
+    :param tolerance: allowed p75 growth of the last run over the median of the previous runs, as a fraction
+    :param budgets: budgets section of the performance config
+    :return: one row per page object, page name and metric with its p75 per run (None when the run didn't measure
+        it), the last value, the reference median, the change, the budget and the regression and over budget flags
+    """
+    recent = list(group_runs(records).items())[-runs:]
+    values = defaultdict(lambda: [[] for _ in recent])
+    for index, (_, samples) in enumerate(recent):
+        for sample in samples:
+            for metric, value in sample["metrics"].items():
+                if value is not None:
+                    # Samples of the runs before the page names have none
+                    values[(sample["page"], sample.get("name"), metric)][index].append(value)
+
+    rows = []
+    for (page, name, metric), per_run in sorted(values.items(), key=lambda entry: tuple(map(str, entry[0]))):
+        series = [percentile(run_values, 75) if run_values else None for run_values in per_run]
+        measured = [value for value in series if value is not None]
+        last = series[-1]
+        reference = statistics.median(measured[:-1]) if last is not None and len(measured) > 1 else None
+        change = (last - reference) / reference if reference else None
+        budget = budget_for(budgets or {}, page, name).get(metric)
+        rows.append({
+            "page": page,
+            "name": name,
+            "metric": metric,
+            "series": series,
+            "last": last,
+            "reference": reference,
+            "change": change,
+            "budget": budget,
+            "regression": change is not None and change > tolerance,
+            "over_budget": budget is not None and last is not None and last > budget
+        })
+    return rows
+
+
+def format_value(value) -> str:
+    return "-" if value is None else f"{value:.4g}"
+
+
+def flags(row) -> str:
+    return " ".join(flag for flag, raised in (("REGRESSION", row["regression"]), ("OVER BUDGET", row["over_budget"])) if raised)
+
+
+def render_text(rows, run_count) -> str:
+    lines = [f"p75 per page and metric over the last {run_count} runs",
+             f"{'page':<14}{'name':<22}{'metric':<28}{'last':>10}{'median':>10}{'change':>9}{'budget':>9}  runs, oldest first"]
+    for row in rows:
+        change = "-" if row["change"] is None else f"{row['change']:+.0%}"
+        series = " ".join(format_value(value) for value in row["series"])
+        lines.append(f"{row['page']:<14}{row['name'] or '-':<22}{row['metric']:<28}{format_value(row['last']):>10}"
+                     f"{format_value(row['reference']):>10}{change:>9}{format_value(row['budget']):>9}  {series}  {flags(row)}")
+    return "\n".join(lines)
+
+
+def render_html(rows, run_ids) -> str:
+    header = "".join(f"<th>{escape(column)}</th>" for column in
+                     ("page", "name", "metric", *(f"run {run_id[:8]}" for run_id in run_ids), "median", "change", "budget", ""))
+    body = []
+    for row in rows:
+        change = "-" if row["change"] is None else f"{row['change']:+.0%}"
+        cells = [row["page"], row["name"] or "-", row["metric"], *(format_value(value) for value in row["series"]),
+                 format_value(row["reference"]), change, format_value(row["budget"]), flags(row)]
+        style = " style='background:#fdd'" if row["regression"] or row["over_budget"] else ""
+        body.append(f"<tr{style}>" + "".join(f"<td>{escape(str(cell))}</td>" for cell in cells) + "</tr>")
+    return ("<html><head><meta charset='utf-8'><title>Page performance trends</title>"
+            "<style>table{border-collapse:collapse}td,th{border:1px solid #ccc;padding:2px 6px}</style></head><body>"
+            "<h1>Page performance trends</h1><p>p75 of each run, oldest first</p>"
+            f"<table><tr>{header}</tr>{''.join(body)}</table></body></html>")
+
+
+def main():
+    performance_config = settings.get_section("performance", DEFAULT_CONFIG)
+    parser = argparse.ArgumentParser(description="Report the page performance trends across test runs")
+    parser.add_argument("--history", default=performance_config["history"], help="history JSON lines file")
+    parser.add_argument("--runs", type=int, default=10, help="number of most recent runs to compare")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p75 growth over the median, as a fraction")
+    parser.add_argument("--html", default=None, help="also write the trends as an HTML table to this file")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with 1 when a metric regressed")
+    args = parser.parse_args()
+
+    records = load_history(args.history)
+    run_ids = list(group_runs(records))[-args.runs:]
+    rows = build_trends(records, args.runs, args.tolerance, performance_config["budgets"])
+    print(render_text(rows, len(run_ids)))
+    if args.html:
+        with open(args.html, "w", encoding="utf-8") as html_file:
+            html_file.write(render_html(rows, run_ids))
+    if args.fail_on_regression and any(row["regression"] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
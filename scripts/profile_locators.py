@@ -0,0 +1,336 @@
+"""
+Find the locators of the project, time them in the browser and propose faster equivalents.
+
+Run from the project root against the local stand-in:
+    python -m scripts.profile_locators --repeat 200
+    python -m scripts.profile_locators --paths pages tests/tests_session_tests --slowest 10
+
+The locators are collected from the source without running it: every (By.X, "selector") pair of pages/ and
+tests/ with a literal selector, or a selector assigned to a page object attribute, and the by/selector columns
+of the datasets. The stand-in pages are loaded in several cart states: the login, then the inventory and the cart
+with an empty, a half-full and a full cart. Each locator is evaluated on the first page where it matches:
+- round-trip: median find_elements time, WebDriver call included
+- in page: time of one evaluation of the locator inside the browser, which is what a faster locator saves
+A locator is proposed instead when it matches exactly the same elements, in the same order, in every page and cart
+state: a button selected by its text or class (e.g. contains(text(), 'Fleece')) only gets a proposal selecting the
+same button, or none, whatever the cart. The locators selecting by position (e.g. (//button)[last()], :nth-child)
+get no proposal: the element at a position changes with states the pages aren't snapshotted in, like the sorting.
+"""
+from __future__ import annotations
+from typing import NamedTuple
+from selenium.webdriver.common.by import By
+
+import argparse
+import ast
+import glob
+import os
+import re
+import statistics
+import time
+
+from pages.dom_snapshot import DomSnapshot
+from pages.page_base import FIND_ALL_FUNCTION
+
+BY_NAMES = {name: getattr(By, name) for name in
+            ("ID", "NAME", "CLASS_NAME", "TAG_NAME", "CSS_SELECTOR", "XPATH", "LINK_TEXT", "PARTIAL_LINK_TEXT")}
+# Locators resolved by the browser straight from an index or a simple selector, nothing faster to propose
+FAST_STRATEGIES = {By.ID, By.NAME, By.CLASS_NAME, By.TAG_NAME}
+# Attributes the applications set for the tests, unique per element more often than not
+TEST_ATTRIBUTES = ("data-test", "data-testid")
+CSS_IDENTIFIER = re.compile(r"^[A-Za-z_][\w-]*$")
+# Positional predicates of XPath, structural pseudo-classes of CSS
+POSITIONAL = re.compile(r"\[\s*(\d+\s*\]|last\(\)|position\(\))|:(nth|first|last|only)-")
+
+IN_PAGE_TIMING_SCRIPT = FIND_ALL_FUNCTION + """
+var by = arguments[0], value = arguments[1], repeat = arguments[2];
+var count = findAll(document, by, value).length;
+var start = performance.now();
+for (var i = 0; i < repeat; i++) { findAll(document, by, value); }
+return {count: count, duration: (performance.now() - start) / repeat};
+"""
+
+
+class Locator(NamedTuple):
+    by: str
+    value: str
+    usages: tuple
+
+    def __str__(self):
+        return f"{self.by}={self.value}"
+
+
+class LocatorCollector(ast.NodeVisitor):
+    """
+    Collects the (By.X, "selector") pairs of a python file: as the first two arguments of a call or as a tuple
+    """
+    def __init__(self, path):
+        self.path = path
+        self.found = []
+        self.skipped = 0
+        self.attributes = {}
+
+    def collect(self, tree):
+        # Selectors kept in page object attributes, e.g. self.cart_badge_class = "shopping_cart_badge"
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+                for target in node.targets:
+                    if isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name) and target.value.id == "self":
+                        self.attributes[target.attr] = node.value.value
+        self.visit(tree)
+        return self.found
+
+    def visit_Call(self, node):
+        self._pair(node.args[:2], node.lineno)
+        self.generic_visit(node)
+
+    def visit_Tuple(self, node):
+        self._pair(node.elts, node.lineno)
+        self.generic_visit(node)
+
+    def _pair(self, nodes, line):
+        if len(nodes) != 2 or not self._is_by(nodes[0]):
+            return
+        value = self._selector(nodes[1])
+        if value is None:
+            # Built at runtime, e.g. an f-string or a parameter
+            self.skipped += 1
+            return
+        self.found.append((BY_NAMES[nodes[0].attr], value, f"{self.path}:{line}"))
+
+    def _is_by(self, node):
+        return isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "By" \
+            and node.attr in BY_NAMES
+
+    def _selector(self, node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            return node.value
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "self":
+            return self.attributes.get(node.attr)
+        return None
+
+
+def collect_dataset_locators(dataset_dir):
+    """
+    :return: (by, selector, usage) of the datasets with by and selector columns
+    """
+    from plugins.plugin_datasets import Dataset
+
+    found = []
+    for path in sorted(glob.glob(os.path.join(dataset_dir, "*.csv")) + glob.glob(os.path.join(dataset_dir, "*.jsonl"))):
+        dataset = Dataset(path)
+        if not {"by", "selector"} <= set(dataset.columns):
+            continue
+        for index in range(len(dataset)):
+            row = dataset.row(index)
+            if row["by"] in BY_NAMES:
+                found.append((BY_NAMES[row["by"]], row["selector"], f"{path} row {index}"))
+    return found
+
+
+def collect_locators(paths, dataset_dir=None, exclude=()) -> tuple[list[Locator], int]:
+    """
+    Collect the literal locators of python files
+
+    :param paths: python files or directories to search
+    :param dataset_dir: directory of the datasets to read the by/selector columns of, None to skip them
+    :param exclude: directories not to search
+    :return: the distinct locators with their usages, in first use order, and the number of runtime locators skipped
+    """
+    excluded = [os.path.join(os.path.normpath(path), "") for path in exclude]
+    files = []
+    for path in paths:
+        files.extend(sorted(glob.glob(os.path.join(path, "**", "*.py"), recursive=True)) if os.path.isdir(path) else [path])
+    files = [path for path in files if not any(os.path.normpath(path).startswith(prefix) for prefix in excluded)]
+
+    found, skipped = [], 0
+    for path in files:
+        with open(path, encoding="utf-8") as source_file:
+            tree = ast.parse(source_file.read(), filename=path)
+        collector = LocatorCollector(path)
+        found.extend(collector.collect(tree))
+        skipped += collector.skipped
+    if dataset_dir:
+        found.extend(collect_dataset_locators(dataset_dir))
+
+    usages = {}
+    for by, value, usage in found:
+        usages.setdefault((by, value), []).append(usage)
+    return [Locator(by, value, tuple(usage)) for (by, value), usage in usages.items()], skipped
+
+
+def css_string(value) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def candidate_locators(elements) -> list[tuple[str, str]]:
+    """
+    Cheaper locators that may select the given elements, from the most to the least preferred. They still have
+    to be checked against the pages
+
+    :param elements: snapshot elements selected by the original locator
+    :return: (by, value) candidates
+    """
+    first = elements[0]
+    candidates = []
+    if len(elements) == 1 and first.get_attribute("id"):
+        candidates.append((By.ID, first.get_attribute("id")))
+    names = {element.get_attribute("name") for element in elements}
+    if len(names) == 1 and None not in names:
+        candidates.append((By.NAME, first.get_attribute("name")))
+    for attribute in TEST_ATTRIBUTES:
+        values = {element.get_attribute(attribute) for element in elements}
+        if len(values) == 1 and None not in values:
+            candidates.append((By.CSS_SELECTOR, f"[{attribute}={css_string(first.get_attribute(attribute))}]"))
+
+    tags = {element.tag_name for element in elements}
+    common_classes = set.intersection(*(set((element.get_attribute("class") or "").split()) for element in elements))
+    classes = sorted(name for name in common_classes if CSS_IDENTIFIER.match(name))
+    candidates.extend((By.CLASS_NAME, name) for name in classes)
+    if len(tags) == 1 and classes:
+        candidates.extend((By.CSS_SELECTOR, f"{first.tag_name}.{name}") for name in classes)
+        if len(classes) > 1:
+            candidates.append((By.CSS_SELECTOR, first.tag_name + "".join(f".{name}" for name in classes)))
+    return candidates
+
+
+def same_elements(snapshots, original, candidate) -> bool:
+    # Compared on every page and cart state, a candidate must not match elsewhere either
+    for snapshot in snapshots:
+        expected = [element.path for element in snapshot.find_elements(*original)]
+        if [element.path for element in snapshot.find_elements(*candidate)] != expected:
+            return False
+    return True
+
+
+def selects_by_position(locator) -> bool:
+    """
+    :return: True when the locator selects elements by their position, e.g. (//button)[last()] or :nth-child(2)
+    """
+    return locator.by in (By.XPATH, By.CSS_SELECTOR) and POSITIONAL.search(locator.value) is not None
+
+
+def propose(locator, snapshots) -> tuple[str, str] | None:
+    """
+    Find a faster locator matching the same elements as the original one in every page
+
+    :param locator: the original locator
+    :param snapshots: DomSnapshot of each page and cart state the locator may be used on
+    :return: (by, value) of the proposal, None when there is none, the original is already fast or selects by
+        position
+    """
+    if locator.by in FAST_STRATEGIES or selects_by_position(locator):
+        return None
+    original = (locator.by, locator.value)
+    # The candidates come from every state the locator matches in, e.g. the ids of its button with and without
+    # the item in the cart
+    tried = set()
+    for snapshot in snapshots:
+        matches = snapshot.find_elements(*original)
+        if not matches:
+            continue
+        for candidate in candidate_locators(matches):
+            if candidate not in tried and same_elements(snapshots, original, candidate):
+                return candidate
+            tried.add(candidate)
+    return None
+
+
+def time_in_page(driver, by, value, repeat) -> tuple[int, float]:
+    """
+    :return: number of matches, seconds per evaluation of the locator in the page
+    """
+    result = driver.execute_script(IN_PAGE_TIMING_SCRIPT, by, value, repeat)
+    return result["count"], result["duration"] / 1000
+
+
+def time_round_trip(driver, by, value, repeat) -> float:
+    """
+    :return: median seconds of a find_elements call
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        driver.find_elements(by, value)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def load_pages(driver, url):
+    """
+    Yield at each page of the application the locators are used on, the inventory and the cart in each cart state:
+    empty, half full (both the add and the remove buttons are rendered) and full
+    """
+    from pages.page_login import PageLogin
+    from pages.page_shopping_items import PageCart, ITEM_IDS
+
+    driver.get(url)
+    yield "login"
+    PageLogin(driver).login("standard_user", "secret_sauce")
+    page_cart = PageCart(driver)
+    for state, items in (("empty", []), ("half", list(ITEM_IDS)[::2]), ("full", list(ITEM_IDS))):
+        page_cart.navigate(f"{url}inventory.html")
+        page_cart.set_cart_contents(items)
+        yield f"inventory/{state}"
+        page_cart.navigate(f"{url}cart.html")
+        yield f"cart/{state}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the locators of the project and propose faster ones")
+    parser.add_argument("--paths", nargs="+", default=["pages", "tests"], help="python files or directories to search")
+    parser.add_argument("--exclude", nargs="*", default=["tests/tests_framework"],
+                        help="directories not to search, the framework unit tests by default")
+    parser.add_argument("--datasets", default="config/datasets", help="datasets directory, empty to skip them")
+    parser.add_argument("--repeat", type=int, default=100, help="evaluations per locator inside the page")
+    parser.add_argument("--round-trips", type=int, default=10, help="find_elements calls per locator")
+    parser.add_argument("--slowest", type=int, default=None, help="only show the N slowest locators")
+    parser.add_argument("--profile", default=None, help="driver profile of config.json")
+    args = parser.parse_args()
+
+    from drivers import driver_factory
+    from standin.server import SwagLabsServer
+
+    locators, skipped = collect_locators(args.paths, args.datasets or None, args.exclude)
+    print(f"{len(locators)} distinct locators collected, {skipped} built at runtime skipped")
+
+    timings = {}
+    with SwagLabsServer() as server:
+        driver = driver_factory.create_driver(args.profile)
+        try:
+            # A first pass snapshots every page and cart state, a proposal has to match the same elements on all of them
+            snapshots = [DomSnapshot.take(driver) for _ in load_pages(driver, server.url)]
+            proposals = {locator: propose(locator, snapshots) for locator in locators}
+
+            for page in load_pages(driver, server.url):
+                for locator in locators:
+                    if locator in timings:
+                        continue
+                    count, in_page = time_in_page(driver, locator.by, locator.value, args.repeat)
+                    if not count:
+                        continue
+                    round_trip = time_round_trip(driver, locator.by, locator.value, args.round_trips)
+                    proposal = proposals[locator]
+                    proposal_in_page = time_in_page(driver, *proposal, args.repeat)[1] if proposal else None
+                    timings[locator] = (page, count, in_page, round_trip, proposal, proposal_in_page)
+        finally:
+            driver.quit()
+
+    table = sorted(timings.items(), key=lambda item: -item[1][2])[:args.slowest]
+    print(f"{'locator':<60}{'page':>16}{'matches':>8}{'in page us':>12}{'round-trip ms':>15}  proposal")
+    for locator, (page, count, in_page, round_trip, proposal, proposal_in_page) in table:
+        text = str(locator) if len(str(locator)) <= 58 else str(locator)[:55] + "..."
+        line = f"{text:<60}{page:>16}{count:>8}{in_page * 1e6:>12.1f}{round_trip * 1000:>15.2f}"
+        if proposal:
+            speedup = f"x{in_page / proposal_in_page:.1f}" if proposal_in_page else "-"
+            line += f"  {proposal[0]}={proposal[1]} ({proposal_in_page * 1e6:.1f}us, {speedup})"
+        elif selects_by_position(locator):
+            line += "  none, selects by position"
+        print(line)
+        print(f"    {', '.join(locator.usages)}")
+    unmatched = [str(locator) for locator in locators if locator not in timings]
+    if unmatched:
+        print(f"No match on any page: {', '.join(unmatched)}")
+
+
+if __name__ == "__main__":
+    main()
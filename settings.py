@@ -0,0 +1,40 @@
+import json
+import os
+
+# Path to the project configuration. Can be overridden with the PYSELENIUM_CONFIG environment variable
+CONFIG_PATH = os.environ.get(
+    "PYSELENIUM_CONFIG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "config", "config.json")
+)
+
+_config = None
+
+
+def load_config() -> dict:
+    """
+    Load the project configuration once per process
+
+    :return: the parsed config.json content. An empty or missing file gives an empty dict
+    """
+    global _config
+    if _config is None:
+        try:
+            with open(CONFIG_PATH, encoding="utf-8") as config_file:
+                content = config_file.read().strip()
+        except FileNotFoundError:
+            content = ""
+        _config = json.loads(content) if content else {}
+    return _config
+
+
+def get_section(name, defaults=None) -> dict:
+    """
+    Get a section of the configuration merged over its default values
+
+    :param name: top level key in config.json
+    :param defaults: values used for the keys missing from the config
+    :return: a new dict, safe to modify
+    """
+    section = dict(defaults or {})
+    section.update(load_config().get(name, {}))
+    return section
@@ -0,0 +1 @@
+# Local stand-in for the Swag Labs application, used for hermetic runs without internet access
\ No newline at end of file
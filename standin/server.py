@@ -0,0 +1,162 @@
+from __future__ import annotations
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+
+import argparse
+import os
+import random
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+# Same paths as the real application, mapped to the bundled pages
+PAGES = {
+    "/": "index.html",
+    "/index.html": "index.html",
+    "/inventory.html": "inventory.html",
+    "/cart.html": "cart.html"
+}
+
+CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".js": "application/javascript; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".svg": "image/svg+xml"
+}
+
+# Product pictures are replaced by a small generated image, still downloaded like the real ones
+PLACEHOLDER_IMAGE = (
+    b'<svg xmlns="http://www.w3.org/2000/svg" width="120" height="120">'
+    b'<rect width="120" height="120" fill="#ededed"/></svg>'
+)
+
+
+class SwagLabsRequestHandler(BaseHTTPRequestHandler):
+    server_version = "SwagLabsStandIn/1.0"
+
+    def do_GET(self):
+        self.server.delay()
+        path = urlparse(self.path).path
+
+        if path in PAGES:
+            self._send_file(PAGES[path])
+        elif path.startswith("/static/media/"):
+            self._send(200, CONTENT_TYPES[".svg"], PLACEHOLDER_IMAGE)
+        elif path.startswith("/static/"):
+            self._send_file(path[len("/static/"):])
+        else:
+            self._send(404, CONTENT_TYPES[".html"], b"<h1>Not Found</h1>")
+
+    def _send_file(self, name):
+        file_path = os.path.normpath(os.path.join(STATIC_DIR, name))
+        if not file_path.startswith(STATIC_DIR) or not os.path.isfile(file_path):
+            self._send(404, CONTENT_TYPES[".html"], b"<h1>Not Found</h1>")
+            return
+        with open(file_path, "rb") as static_file:
+            body = static_file.read()
+        self._send(200, CONTENT_TYPES.get(os.path.splitext(name)[1], "application/octet-stream"), body)
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - " + format, self.address_string(), *args)
+
+
+class SwagLabsServer(ThreadingHTTPServer):
+    """
+    Local HTTP server serving a copy of the Swag Labs login, inventory and cart pages.
+
+    Every request is delayed by `latency` seconds, plus or minus a random `jitter`, to reproduce a slow backend.
+    Use it as a context manager, or call start() and stop().
+    """
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, seed=None):
+        """
+        :param host: interface to listen on
+        :param port: port to listen on. 0 picks a free port
+        :param latency: seconds added to every request
+        :param jitter: maximum random seconds added to or removed from the latency
+        :param seed: seed of the jitter random generator, for reproducible benchmarks
+        """
+        super().__init__((host, port), SwagLabsRequestHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def delay(self):
+        """
+        Sleep for the configured latency and jitter before answering a request
+        """
+        if not self.latency and not self.jitter:
+            return
+        with self._random_lock:
+            jitter = self._random.uniform(-self.jitter, self.jitter)
+        time.sleep(max(0.0, self.latency + jitter))
+
+    def start(self):
+        """
+        Serve requests from a background thread
+
+        :return: the server itself
+        """
+        self._thread = threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.1},
+                                        name="swag-labs-standin", daemon=True)
+        self._thread.start()
+        logger.info("Swag Labs stand-in serving on %s with latency %ss and jitter %ss", self.url, self.latency, self.jitter)
+        return self
+
+    def stop(self):
+        """
+        Stop serving and close the socket
+        """
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        logger.info("Swag Labs stand-in stopped")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Swag Labs stand-in application")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="maximum random seconds added to or removed from the latency")
+    args = parser.parse_args()
+
+    server = SwagLabsServer(args.host, args.port, args.latency, args.jitter)
+    print(f"Serving the Swag Labs stand-in on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+/*
+ * Stand-in for the Swag Labs client application.
+ * It keeps the ids, names, classes and storage keys of https://www.saucedemo.com so the same locators,
+ * page objects and storage state work against both targets:
+ *  - the logged in user is kept in the "session-username" cookie
+ *  - the cart is kept in localStorage "cart-contents" as a JSON array of item ids
+ * Like the React application, adding or removing an item replaces its button, and the cart badge is
+ * removed from the page when the cart is empty.
+ */
+(function () {
+    var PASSWORD = 'secret_sauce';
+    var USERS = ['standard_user', 'locked_out_user', 'problem_user', 'performance_glitch_user', 'error_user', 'visual_user'];
+    var SESSION_SECONDS = 600;
+
+    var ITEMS = [
+        {id: 4, name: 'Sauce Labs Backpack', price: 29.99,
+            desc: 'carry.allTheThings() with the sleek, streamlined Sly Pack that melds uncompromising style with unequaled laptop and tablet protection.'},
+        {id: 0, name: 'Sauce Labs Bike Light', price: 9.99,
+            desc: "A red light isn't the desired state in testing but it sure helps when riding your bike at night. Water-resistant with 3 lighting modes, 1 AAA battery included."},
+        {id: 1, name: 'Sauce Labs Bolt T-Shirt', price: 15.99,
+            desc: 'Get your testing superhero on with the Sauce Labs bolt T-shirt. From American Apparel, 100% ringspun combed cotton, heather gray with red bolt.'},
+        {id: 5, name: 'Sauce Labs Fleece Jacket', price: 49.99,
+            desc: "It's not every day that you come across a midweight quarter-zip fleece jacket capable of handling everything from a relaxing day outdoors to a busy day at the office."},
+        {id: 2, name: 'Sauce Labs Onesie', price: 7.99,
+            desc: "Rib snap infant onesie for the junior automation engineer in development. Reinforced 3-snap bottom closure, two-needle hemmed sleeved and bottom won't unravel."},
+        {id: 3, name: 'Test.allTheThings() T-Shirt (Red)', price: 15.99,
+            desc: 'This classic Sauce Labs t-shirt is perfect to wear when cozying up to your keyboard to automate a few tests. Super-soft and comfy ringspun combed cotton.'}
+    ];
+
+    var SORTS = {
+        az: function (a, b) { return a.name.localeCompare(b.name); },
+        za: function (a, b) { return b.name.localeCompare(a.name); },
+        lohi: function (a, b) { return a.price - b.price; },
+        hilo: function (a, b) { return b.price - a.price; }
+    };
+
+    function slug(item) {
+        return item.name.toLowerCase().replace(/ /g, '-');
+    }
+
+    function el(tag, attributes, children) {
+        var element = document.createElement(tag);
+        Object.keys(attributes || {}).forEach(function (key) { element.setAttribute(key, attributes[key]); });
+        (children || []).forEach(function (child) {
+            element.appendChild(typeof child === 'string' ? document.createTextNode(child) : child);
+        });
+        return element;
+    }
+
+    function currentUser() {
+        var match = document.cookie.match(/(?:^|; )session-username=([^;]*)/);
+        return match ? decodeURIComponent(match[1]) : null;
+    }
+
+    function readCart() {
+        try {
+            return JSON.parse(window.localStorage.getItem('cart-contents')) || [];
+        } catch (e) {
+            return [];
+        }
+    }
+
+    function writeCart(ids) {
+        if (ids.length) {
+            window.localStorage.setItem('cart-contents', JSON.stringify(ids));
+        } else {
+            window.localStorage.removeItem('cart-contents');
+        }
+    }
+
+    function renderBadge() {
+        var link = document.querySelector('.shopping_cart_link');
+        var badge = link.querySelector('.shopping_cart_badge');
+        var count = readCart().length;
+        if (!count) {
+            if (badge) { link.removeChild(badge); }
+            return;
+        }
+        if (!badge) {
+            badge = el('span', {'class': 'shopping_cart_badge', 'data-test': 'shopping-cart-badge'});
+            link.appendChild(badge);
+        }
+        badge.textContent = String(count);
+    }
+
+    function cartButton(item, onChange) {
+        var inCart = readCart().indexOf(item.id) !== -1;
+        var name = (inCart ? 'remove-' : 'add-to-cart-') + slug(item);
+        var button = el('button', {
+            'class': inCart ? 'btn btn_secondary btn_small btn_inventory ' : 'btn btn_primary btn_small btn_inventory ',
+            'data-test': name,
+            'id': name,
+            'name': name
+        }, [inCart ? 'Remove' : 'Add to cart']);
+        button.addEventListener('click', function () {
+            var ids = readCart().filter(function (id) { return id !== item.id; });
+            if (!inCart) { ids.push(item.id); }
+            writeCart(ids);
+            onChange(button);
+            renderBadge();
+        });
+        return button;
+    }
+
+    // Only the clicked button is replaced, the other elements of the list stay attached
+    function swapButton(item) {
+        return function (button) {
+            button.parentNode.replaceChild(cartButton(item, swapButton(item)), button);
+        };
+    }
+
+    function renderInventory(sortKey) {
+        var list = document.querySelector('.inventory_list');
+        var items = ITEMS.slice().sort(SORTS[sortKey]);
+
+        while (list.firstChild) { list.removeChild(list.firstChild); }
+        items.forEach(function (item) {
+            list.appendChild(el('div', {'class': 'inventory_item', 'data-test': 'inventory-item'}, [
+                el('div', {'class': 'inventory_item_img'}, [
+                    el('a', {'href': '#', 'id': 'item_' + item.id + '_img_link'}, [
+                        el('img', {'alt': item.name, 'class': 'inventory_item_img', 'src': '/static/media/' + slug(item) + '.svg'})
+                    ])
+                ]),
+                el('div', {'class': 'inventory_item_description', 'data-test': 'inventory-item-description'}, [
+                    el('div', {'class': 'inventory_item_label'}, [
+                        el('a', {'href': '#', 'id': 'item_' + item.id + '_title_link'}, [
+                            el('div', {'class': 'inventory_item_name ', 'data-test': 'inventory-item-name'}, [item.name])
+                        ]),
+                        el('div', {'class': 'inventory_item_desc', 'data-test': 'inventory-item-desc'}, [item.desc])
+                    ]),
+                    el('div', {'class': 'pricebar'}, [
+                        el('div', {'class': 'inventory_item_price', 'data-test': 'inventory-item-price'}, ['$' + item.price.toFixed(2)]),
+                        cartButton(item, swapButton(item))
+                    ])
+                ])
+            ]));
+        });
+    }
+
+    function renderCart() {
+        var list = document.querySelector('.cart_list');
+        Array.prototype.slice.call(list.querySelectorAll('.cart_item')).forEach(function (row) { list.removeChild(row); });
+        readCart().forEach(function (id) {
+            var item = ITEMS.filter(function (candidate) { return candidate.id === id; })[0];
+            if (!item) { return; }
+            list.appendChild(el('div', {'class': 'cart_item', 'data-test': 'inventory-item'}, [
+                el('div', {'class': 'cart_quantity', 'data-test': 'item-quantity'}, ['1']),
+                el('div', {'class': 'cart_item_label'}, [
+                    el('a', {'href': '#', 'id': 'item_' + item.id + '_title_link'}, [
+                        el('div', {'class': 'inventory_item_name', 'data-test': 'inventory-item-name'}, [item.name])
+                    ]),
+                    el('div', {'class': 'inventory_item_desc', 'data-test': 'inventory-item-desc'}, [item.desc]),
+                    el('div', {'class': 'item_pricebar'}, [
+                        el('div', {'class': 'inventory_item_price', 'data-test': 'inventory-item-price'}, ['$' + item.price.toFixed(2)]),
+                        cartButton(item, function (button) {
+                            var row = button.closest('.cart_item');
+                            row.parentNode.removeChild(row);
+                        })
+                    ])
+                ])
+            ]));
+        });
+    }
+
+    function showLoginError(message) {
+        var container = document.querySelector('.error-message-container');
+        container.className = 'error-message-container error';
+        container.innerHTML = '';
+        container.appendChild(el('h3', {'data-test': 'error'}, [
+            el('button', {'class': 'error-button', 'data-test': 'error-button', 'type': 'button'}, ['×']),
+            message
+        ]));
+        document.getElementById('user-name').className = 'input_error form_input error';
+        document.getElementById('password').className = 'input_error form_input error';
+    }
+
+    function initLogin() {
+        var deniedPath = new URLSearchParams(window.location.search).get('denied');
+        if (deniedPath) {
+            showLoginError("Epic sadface: You can only access '" + deniedPath + "' when you are logged in.");
+        }
+        document.getElementById('login_form').addEventListener('submit', function (event) {
+            event.preventDefault();
+            var username = document.getElementById('user-name').value;
+            var password = document.getElementById('password').value;
+            if (!username) { return showLoginError('Epic sadface: Username is required'); }
+            if (!password) { return showLoginError('Epic sadface: Password is required'); }
+            if (USERS.indexOf(username) === -1 || password !== PASSWORD) {
+                return showLoginError('Epic sadface: Username and password do not match any user in this service');
+            }
+            if (username === 'locked_out_user') {
+                return showLoginError('Epic sadface: Sorry, this user has been locked out.');
+            }
+            var expires = new Date(Date.now() + SESSION_SECONDS * 1000).toUTCString();
+            document.cookie = 'session-username=' + encodeURIComponent(username) + '; expires=' + expires + '; path=/';
+            window.location.href = '/inventory.html';
+        });
+    }
+
+    function init() {
+        var page = document.body.getAttribute('data-page');
+        if (page === 'login') {
+            return initLogin();
+        }
+        if (!currentUser()) {
+            window.location.replace('/?denied=' + encodeURIComponent(window.location.pathname));
+            return;
+        }
+        document.getElementById('continue-shopping') && document.getElementById('continue-shopping')
+            .addEventListener('click', function () { window.location.href = '/inventory.html'; });
+
+        if (page === 'inventory') {
+            var select = document.querySelector('.product_sort_container');
+            select.addEventListener('change', function () {
+                document.querySelector('.active_option').textContent = select.options[select.selectedIndex].text;
+                renderInventory(select.value);
+            });
+            renderInventory('az');
+        } else if (page === 'cart') {
+            renderCart();
+        }
+        renderBadge();
+    }
+
+    init();
+})();
@@ -0,0 +1,192 @@
+from __future__ import annotations
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+
+import argparse
+import json
+import threading
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class WebDriverNodeRequestHandler(BaseHTTPRequestHandler):
+    server_version = "WebDriverNodeStandIn/1.0"
+    # Keep-alive: the connections stay open until the client closes them
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately: with Nagle's algorithm every answer on a kept-alive connection
+    # would wait for the delayed ACK of the client
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.count_connection()
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+        parts = urlparse(self.path).path.strip("/").split("/")
+        self.server.delay(parts[2:] if len(parts) > 2 else parts)
+
+        if parts == ["status"]:
+            self._send(200, {"ready": True, "message": "WebDriver node stand-in ready"})
+        elif parts == ["session"] and method == "POST":
+            self._send(200, self.server.new_session(body))
+        elif len(parts) >= 2 and parts[0] == "session":
+            session = self.server.sessions.get(parts[1])
+            if session is None:
+                self._send(404, {"error": "invalid session id", "message": f"No session {parts[1]}", "stacktrace": ""})
+            else:
+                self._send(200, self.server.command(parts[1], session, method, parts[2:], body))
+        else:
+            self._send(404, {"error": "unknown command", "message": f"{method} {self.path}", "stacktrace": ""})
+
+    def _send(self, status, value):
+        body = json.dumps({"value": value}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - " + format, self.address_string(), *args)
+
+
+class WebDriverNode(ThreadingHTTPServer):
+    """
+    Local HTTP server answering the W3C WebDriver protocol like a Selenium Grid node, without a browser.
+
+    It keeps the sessions, their current url and single window, answers the other commands with null, and counts
+    the TCP connections it accepts, so the connection reuse of a client can be checked. New sessions take
+    `session_delay` seconds and the commands listed in `command_delays` (by their path after the session id,
+    e.g. "title" or "execute/sync") take the given seconds, to reproduce a busy grid.
+    Use it as a context manager, or call start() and stop().
+    """
+    daemon_threads = True
+    # Hundreds of sessions may connect at once, the default backlog of 5 would reset them
+    request_queue_size = 1024
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, session_delay=0.0, command_delays=None):
+        """
+        :param host: interface to listen on
+        :param port: port to listen on. 0 picks a free port
+        :param latency: seconds added to every request
+        :param session_delay: seconds a new session takes, added to the latency
+        :param command_delays: dict of command path to seconds added to the latency
+        """
+        super().__init__((host, port), WebDriverNodeRequestHandler)
+        self.latency = latency
+        self.session_delay = session_delay
+        self.command_delays = command_delays or {}
+        self.sessions = {}
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def delay(self, command):
+        with self._lock:
+            self.requests += 1
+        delay = self.latency
+        if command == ["session"]:
+            delay += self.session_delay
+        delay += self.command_delays.get("/".join(command), 0.0)
+        if delay:
+            time.sleep(delay)
+
+    def new_session(self, body) -> dict:
+        session_id = uuid.uuid4().hex
+        capabilities = body.get("capabilities", {}).get("alwaysMatch", {})
+        with self._lock:
+            self.sessions[session_id] = {"url": "about:blank"}
+        return {"sessionId": session_id, "capabilities": {**capabilities, "browserName": "chrome"}}
+
+    def command(self, session_id, session, method, command, body):
+        if not command and method == "DELETE":
+            with self._lock:
+                self.sessions.pop(session_id, None)
+            return None
+        if command == ["url"]:
+            if method == "POST":
+                session["url"] = body["url"]
+                return None
+            return session["url"]
+        if command == ["title"]:
+            return "Swag Labs"
+        # A single window per session
+        if command == ["window", "handles"]:
+            return [session_id]
+        if command == ["window"] and method == "GET":
+            return session_id
+        return None
+
+    def start(self):
+        """
+        Serve requests from a background thread
+
+        :return: the node itself
+        """
+        self._thread = threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.1},
+                                        name="webdriver-node-standin", daemon=True)
+        self._thread.start()
+        logger.info("WebDriver node stand-in serving on %s with latency %ss", self.url, self.latency)
+        return self
+
+    def stop(self):
+        """
+        Stop serving and close the socket
+        """
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        logger.info("WebDriver node stand-in stopped after %s connections and %s requests", self.connections, self.requests)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a WebDriver node stand-in, answering without a browser")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4444)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--session-delay", type=float, default=0.0, help="seconds a new session takes")
+    args = parser.parse_args()
+
+    node = WebDriverNode(args.host, args.port, args.latency, args.session_delay)
+    print(f"Serving the WebDriver node stand-in on {node.url}")
+    try:
+        node.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        node.server_close()
+
+
+if __name__ == "__main__":
+    main()
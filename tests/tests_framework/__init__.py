@@ -0,0 +1 @@
+# Unit tests of the test framework helpers. They use fake drivers and run without a browser
\ No newline at end of file
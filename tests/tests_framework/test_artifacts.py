@@ -0,0 +1,131 @@
+import base64
+import gzip
+import json
+import threading
+import time
+
+from plugins import plugin_artifacts
+
+PNG = b"\x89PNG\r\n\x1a\n fake screenshot"
+
+
+class FakeDriver:
+    page_source = "<html><body>Swag Labs</body></html>"
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def get_screenshot_as_base64(self):
+        time.sleep(self.delay)
+        return base64.b64encode(PNG).decode("ascii")
+
+    def get_log(self, log_type):
+        return [{"level": "SEVERE", "message": "app.js 12 Uncaught TypeError"}]
+
+
+def allure_result(name):
+    return {"uuid": f"uuid-{name}", "fullName": f"test_cart.py::{name}", "name": name, "status": "failed"}
+
+
+def read_result(results_dir, name):
+    with open(results_dir / f"uuid-{name}-result.json", encoding="utf-8") as result_file:
+        return json.load(result_file)
+
+
+class TestCapture:
+    def test_screenshot_dom_and_console_are_captured(self):
+        artifacts = plugin_artifacts.capture(FakeDriver(), budget=1)
+        assert [kind for name, kind, raw in artifacts] == ["screenshot", "dom", "console"]
+
+    def test_capture_stops_when_the_budget_is_spent(self):
+        artifacts = plugin_artifacts.capture(FakeDriver(delay=0.05), budget=0.01)
+        assert artifacts == []
+
+    def test_hung_command_is_abandoned_once_the_budget_is_spent(self):
+        released = threading.Event()
+
+        class HungPageSourceDriver(FakeDriver):
+            @property
+            def page_source(self):
+                released.wait(10)
+                return "<html></html>"
+
+        start = time.monotonic()
+        try:
+            artifacts = plugin_artifacts.capture(HungPageSourceDriver(), budget=0.2)
+        finally:
+            released.set()
+
+        assert time.monotonic() - start < 1
+        assert [kind for name, kind, raw in artifacts] == ["screenshot"]
+
+    def test_abandoned_capture_sends_no_more_commands_and_is_waited_for(self):
+        released = threading.Event()
+        commands = []
+
+        class HungPageSourceDriver(FakeDriver):
+            @property
+            def page_source(self):
+                commands.append("page source")
+                released.wait(10)
+                return "<html></html>"
+
+            def get_log(self, log_type):
+                commands.append("log")
+                return []
+
+        driver = HungPageSourceDriver()
+        plugin_artifacts.capture(driver, budget=0.1)
+        waiter = threading.Thread(target=plugin_artifacts.wait_for_capture, args=(driver,))
+        waiter.start()
+        waiter.join(0.2)
+        assert waiter.is_alive()
+
+        released.set()
+        waiter.join(1)
+        assert not waiter.is_alive()
+        assert commands == ["page source"]
+
+
+class TestArtifactWriter:
+    def test_result_and_attachments_are_written_in_the_allure_layout(self, tmp_path):
+        writer = plugin_artifacts.ArtifactWriter(str(tmp_path))
+        writer.submit(allure_result("test_add"), plugin_artifacts.capture(FakeDriver(), budget=1))
+        assert writer.flush(timeout=10) == 0
+
+        result = read_result(tmp_path, "test_add")
+        assert [attachment["type"] for attachment in result["attachments"]] == ["image/png", "text/html", "text/plain"]
+        screenshot, dom, console = [tmp_path / attachment["source"] for attachment in result["attachments"]]
+        assert screenshot.read_bytes() == PNG
+        assert dom.read_text(encoding="utf-8") == FakeDriver.page_source
+        assert console.read_text(encoding="utf-8") == " SEVERE app.js 12 Uncaught TypeError\n"
+
+    def test_page_source_and_console_are_gzipped_when_compressing(self, tmp_path):
+        writer = plugin_artifacts.ArtifactWriter(str(tmp_path), compress=True)
+        writer.submit(allure_result("test_add"), plugin_artifacts.capture(FakeDriver(), budget=1))
+        assert writer.flush(timeout=10) == 0
+
+        attachments = read_result(tmp_path, "test_add")["attachments"]
+        assert [attachment["type"] for attachment in attachments] == ["image/png", "application/gzip", "application/gzip"]
+        assert [attachment["source"].split("-attachment.")[1] for attachment in attachments] == ["png", "html.gz", "txt.gz"]
+        dom = tmp_path / attachments[1]["source"]
+        assert gzip.decompress(dom.read_bytes()).decode("utf-8") == FakeDriver.page_source
+
+    def test_identical_artifacts_are_written_once(self, tmp_path):
+        writer = plugin_artifacts.ArtifactWriter(str(tmp_path), workers=1)
+        for name in ("test_add", "test_remove"):
+            writer.submit(allure_result(name), plugin_artifacts.capture(FakeDriver(), budget=1))
+        writer.flush(timeout=10)
+
+        assert read_result(tmp_path, "test_add")["attachments"] == read_result(tmp_path, "test_remove")["attachments"]
+        assert len(list(tmp_path.glob("*-attachment.*"))) == 3
+        assert writer.stats["deduplicated"] == 3
+
+    def test_submit_does_not_wait_for_the_disk(self, tmp_path, monkeypatch):
+        writer = plugin_artifacts.ArtifactWriter(str(tmp_path))
+        monkeypatch.setattr(writer, "_write_result", lambda result, artifacts: time.sleep(0.5))
+
+        start = time.monotonic()
+        writer.submit(allure_result("test_add"))
+        assert time.monotonic() - start < 0.1
+        assert writer.flush(timeout=0.01) == 1
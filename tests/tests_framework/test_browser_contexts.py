@@ -0,0 +1,105 @@
+import pytest
+
+from drivers import browser_contexts
+
+
+class FakeChromeProcess:
+    started = []
+
+    def __init__(self, headless=True):
+        self.debugger_address = f"127.0.0.1:{9222 + len(self.started)}"
+        self.pid = None
+        self.user_data_dir = None
+        self.stopped = False
+
+    def start(self):
+        self.started.append(self)
+        return self
+
+    def stop(self):
+        self.stopped = True
+
+
+class FakeCdp:
+    def __init__(self, driver):
+        self.driver = driver
+        self.targets = 0
+
+    def send(self, method, params=None):
+        if method == "Target.createBrowserContext":
+            return {"browserContextId": "context-1"}
+        if method == "Target.createTarget":
+            self.targets += 1
+            # Another worker opened a tab meanwhile
+            self.driver.window_handles += ["other-worker-tab", f"target-{self.targets}"]
+            return {"targetId": f"target-{self.targets}"}
+        return {}
+
+
+class FakeAttachedDriver:
+    def __init__(self):
+        self.window_handles = ["first-tab"]
+        self.urls = []
+        self.current_handle = "first-tab"
+
+    @property
+    def switch_to(self):
+        return self
+
+    def window(self, handle):
+        self.current_handle = handle
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        return {}
+
+    def get(self, url):
+        self.urls.append(url)
+
+
+@pytest.fixture
+def host(monkeypatch):
+    driver = FakeAttachedDriver()
+    monkeypatch.setattr(browser_contexts.webdriver, "Chrome", lambda options: driver)
+    monkeypatch.setattr(browser_contexts, "BrowserCdp", lambda address: FakeCdp(driver))
+    return browser_contexts.BrowserContextHost("127.0.0.1:9222", {"page_load_strategy": "normal", "block_url_patterns": [], "block_resource_types": []})
+
+
+class TestBrowserContextHost:
+    def test_each_worker_parks_its_driver_on_its_own_tab(self, host):
+        assert host.home_handle == "target-1"
+        assert host.driver.current_handle == "target-1"
+
+    def test_driver_switches_to_the_tab_of_the_context_only(self, host):
+        context = host.open_context("https://www.saucedemo.com/")
+
+        assert context.target_id == host.driver.current_handle == "target-2"
+        host.close_context(context)
+        assert host.driver.current_handle == "target-1"
+
+
+class TestSharedChromeProcess:
+    def test_workers_share_one_chrome_and_the_last_one_stops_it(self, tmp_path, monkeypatch):
+        FakeChromeProcess.started = []
+        monkeypatch.setattr(browser_contexts, "ChromeProcess", FakeChromeProcess)
+        monkeypatch.setattr(browser_contexts, "debugger_version", lambda address: {"Browser": "Chrome"})
+        first_worker = browser_contexts.SharedChromeProcess(str(tmp_path))
+        second_worker = browser_contexts.SharedChromeProcess(str(tmp_path))
+
+        assert first_worker.acquire() == second_worker.acquire()
+        assert len(FakeChromeProcess.started) == 1
+
+        second_worker.release()
+        assert not FakeChromeProcess.started[0].stopped
+        first_worker.release()
+        assert FakeChromeProcess.started[0].stopped
+
+    def test_dead_chrome_is_launched_again(self, tmp_path, monkeypatch):
+        FakeChromeProcess.started = []
+        monkeypatch.setattr(browser_contexts, "ChromeProcess", FakeChromeProcess)
+        monkeypatch.setattr(browser_contexts, "debugger_version", lambda address: None)
+        shared_chrome = browser_contexts.SharedChromeProcess(str(tmp_path))
+
+        shared_chrome.acquire()
+        shared_chrome.acquire()
+
+        assert len(FakeChromeProcess.started) == 2
@@ -0,0 +1,132 @@
+import os
+import subprocess
+import sys
+import threading
+import pytest
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+from drivers import browser_daemon, driver_factory
+from standin.webdriver_node import WebDriverNode
+
+
+@pytest.fixture
+def node():
+    with WebDriverNode() as webdriver_node:
+        yield webdriver_node
+
+
+@pytest.fixture
+def daemon_process():
+    # Stands for the daemon process: only its pid is used, to tell whether the daemon is alive
+    process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+    yield process
+    process.kill()
+    process.wait()
+
+
+def publish_session(node, state_path, pid, profile="default", owner=None):
+    """
+    Open a session on the node like the daemon does and write its state file
+    """
+    driver = webdriver.Remote(command_executor=node.url, options=webdriver.ChromeOptions())
+    state = {"pid": pid, "profile": profile, "executor_url": node.url, "session_id": driver.session_id,
+             "capabilities": driver.caps, "owner": owner, "started": 0, "last_used": 0}
+    browser_daemon.write_state(state_path, state)
+    return state
+
+
+class FakeDaemonDriver:
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+        self.session_id = "session-1"
+        self.caps = {"browserName": "chrome"}
+        self.service = type("Service", (), {"service_url": "http://127.0.0.1:9515"})()
+        self.quit_called = False
+
+    @property
+    def current_url(self):
+        if not self.healthy:
+            raise WebDriverException("session deleted")
+        return "about:blank"
+
+    def quit(self):
+        self.quit_called = True
+
+
+class TestBrowserDaemonClient:
+    def test_runs_attach_to_the_session_of_the_daemon(self, node, daemon_process, tmp_path):
+        daemon = browser_daemon.BrowserDaemon(str(tmp_path), profile="default")
+        state = publish_session(node, daemon.state_path, daemon_process.pid)
+
+        driver = daemon.driver()
+
+        assert isinstance(driver, browser_daemon.AttachedDriver)
+        assert driver.session_id == state["session_id"]
+        assert len(node.sessions) == 1
+        assert browser_daemon.read_state(daemon.state_path)["owner"] == os.getpid()
+
+        browser_daemon.release(driver)
+
+        assert browser_daemon.read_state(daemon.state_path)["owner"] is None
+        assert state["session_id"] in node.sessions
+
+    def test_daemon_used_by_another_run_falls_back_to_a_new_browser(self, node, daemon_process, tmp_path, monkeypatch):
+        daemon = browser_daemon.BrowserDaemon(str(tmp_path), profile="default")
+        publish_session(node, daemon.state_path, daemon_process.pid, owner=daemon_process.pid)
+        launched = object()
+        monkeypatch.setattr(driver_factory, "create_driver", lambda name=None, remote=None: launched)
+
+        assert daemon.driver() is launched
+        assert browser_daemon.read_state(daemon.state_path)["owner"] == daemon_process.pid
+
+    def test_daemon_of_another_profile_is_replaced(self, node, daemon_process, tmp_path, monkeypatch):
+        daemon = browser_daemon.BrowserDaemon(str(tmp_path), profile="lean")
+        # Started earlier by this process, which reaps it once terminated
+        daemon._process = daemon_process
+        publish_session(node, daemon.state_path, daemon_process.pid, profile="default")
+        spawned = []
+
+        def spawn():
+            spawned.append(True)
+            return publish_session(node, daemon.state_path, os.getpid(), profile="lean")
+        monkeypatch.setattr(daemon, "_spawn", spawn)
+
+        driver = daemon.attach()
+
+        assert spawned and driver.caps["browserName"] == "chrome"
+        assert daemon_process.returncode is not None
+
+
+class TestBrowserDaemonServer:
+    def test_daemon_exits_once_idle(self, tmp_path):
+        state_path = str(tmp_path / "daemon-master.json")
+        driver = FakeDaemonDriver()
+
+        browser_daemon.serve(state_path, lambda: driver, idle_timeout=0.1, profile="default", poll_interval=0.02)
+
+        assert driver.quit_called
+        assert not os.path.exists(state_path)
+
+    def test_attached_daemon_stays_until_its_session_dies(self, tmp_path):
+        state_path = str(tmp_path / "daemon-master.json")
+        driver = FakeDaemonDriver()
+        server = threading.Thread(target=browser_daemon.serve, args=(state_path, lambda: driver, 0.1),
+                                  kwargs={"poll_interval": 0.02, "health_interval": 0.05})
+        server.start()
+        while browser_daemon.read_state(state_path) is None:
+            pass
+        state = browser_daemon.read_state(state_path)
+        state["owner"] = os.getpid()
+        browser_daemon.write_state(state_path, state)
+
+        server.join(0.3)
+        assert server.is_alive()
+
+        state["owner"] = None
+        state["last_used"] = 1e12
+        browser_daemon.write_state(state_path, state)
+        driver.healthy = False
+        server.join(2)
+        assert not server.is_alive()
+        assert driver.quit_called
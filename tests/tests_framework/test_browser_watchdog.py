@@ -0,0 +1,128 @@
+import json
+import subprocess
+import sys
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+from drivers import browser_watchdog
+
+
+class FakeDriver:
+    """
+    Reports a JS heap through the CDP like Chrome. `service` is set for a local driver
+    """
+    name = "chrome"
+
+    def __init__(self, heap_mb=10, service=None):
+        self.heap_mb = heap_mb
+        self.service = service
+        self.quit_called = False
+
+    def execute_cdp_cmd(self, command, params):
+        assert command == "Runtime.getHeapUsage"
+        return {"usedSize": self.heap_mb * 2 ** 20, "totalSize": 2 * self.heap_mb * 2 ** 20}
+
+    def quit(self):
+        self.quit_called = True
+
+
+def make_driver(*heaps_mb):
+    created = []
+
+    def factory():
+        created.append(FakeDriver(heaps_mb[len(created)]))
+        return created[-1]
+
+    return browser_watchdog.RecyclingDriver(factory), created
+
+
+class FakeService:
+    def __init__(self, process):
+        self.process = process
+
+
+class TestRecyclingDriver:
+    def test_attributes_are_read_from_the_current_driver(self):
+        driver, created = make_driver(10, 20)
+        hooks = []
+        driver.recycle_hooks.append(lambda recycled: hooks.append(recycled.heap_mb))
+
+        assert driver.name == "chrome"
+        driver.recycle()
+
+        assert created[0].quit_called
+        assert driver.heap_mb == 20
+        assert hooks == [20]
+        assert driver.recycles == 1
+
+    def test_failed_recycle_leaves_no_quit_driver_behind(self):
+        created = []
+
+        def factory():
+            if created:
+                raise WebDriverException("chromedriver didn't start")
+            created.append(FakeDriver())
+            return created[-1]
+
+        driver = browser_watchdog.RecyclingDriver(factory)
+        with pytest.raises(WebDriverException, match="replace the recycled one"):
+            driver.recycle()
+
+        assert created[0].quit_called
+        with pytest.raises(WebDriverException, match="chromedriver didn't start"):
+            driver.get("https://www.saucedemo.com/")
+        driver.quit()
+        assert driver.recycles == 0
+
+
+class TestBrowserWatchdog:
+    def test_browser_is_recycled_past_the_heap_threshold(self, tmp_path):
+        driver, created = make_driver(600, 10)
+        series = tmp_path / "metrics.jsonl"
+        watchdog = browser_watchdog.BrowserWatchdog(driver, {"js_heap_mb": 512, "series": str(series)})
+
+        assert watchdog.check("test_cart.py::test_add")
+        assert not watchdog.check("test_cart.py::test_remove")
+        watchdog.close()
+
+        samples = [json.loads(line) for line in series.read_text().splitlines()]
+        assert [sample["js_heap_mb"] for sample in samples] == [600.0, 10.0]
+        assert samples[0]["recycled"] == ["js_heap_mb 600.0 > 512"]
+        assert samples[1]["nodeid"] == "test_cart.py::test_remove"
+        assert len(created) == 2
+
+    def test_browser_is_recycled_after_max_tests(self):
+        driver, created = make_driver(10, 10, 10)
+        watchdog = browser_watchdog.BrowserWatchdog(driver, {"max_tests": 2, "series": None})
+
+        recycled = [watchdog.check() for _ in range(4)]
+
+        assert recycled == [False, True, False, True]
+
+    def test_disabled_watchdog_doesnt_sample(self):
+        driver, _ = make_driver(600)
+        watchdog = browser_watchdog.BrowserWatchdog(driver, {"enabled": False, "series": None})
+
+        assert not watchdog.check()
+        assert watchdog.samples == 0
+
+    @pytest.mark.skipif(browser_watchdog.psutil is None, reason="psutil is not installed")
+    def test_process_tree_memory_and_cpu_are_sampled(self):
+        process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+        try:
+            driver = browser_watchdog.RecyclingDriver(lambda: FakeDriver(service=FakeService(process)))
+            watchdog = browser_watchdog.BrowserWatchdog(driver, {"series": None})
+
+            first, second = watchdog.sample(), watchdog.sample()
+        finally:
+            process.kill()
+            process.wait()
+
+        assert first["rss_mb"] > 1
+        assert first["cpu_percent"] is None
+        assert second["cpu_percent"] >= 0
+
+    def test_remote_browser_has_no_process_metrics(self):
+        driver, _ = make_driver(10)
+        sample = browser_watchdog.BrowserWatchdog(driver, {"series": None}).sample()
+        assert sample == {"rss_mb": None, "cpu_percent": None, "js_heap_mb": 10.0}
@@ -0,0 +1,69 @@
+import os
+import re
+import pytest
+
+from pages import page_shopping_items
+
+
+class FakeStorageDriver:
+    """
+    Keeps the cart ids written by the cart scripts and counts the WebDriver calls
+    """
+    def __init__(self):
+        self.storage = {}
+        self.calls = 0
+        self.refreshes = 0
+
+    def execute_script(self, script, key, *args):
+        self.calls += 1
+        if script == page_shopping_items.WRITE_CART_SCRIPT:
+            if args[0]:
+                self.storage[key] = list(args[0])
+            else:
+                self.storage.pop(key, None)
+            return None
+        return self.storage.get(key, [])
+
+    def refresh(self):
+        self.calls += 1
+        self.refreshes += 1
+
+
+class TestCartState:
+    def test_seeding_costs_one_script_and_one_refresh(self):
+        driver = FakeStorageDriver()
+        page_cart = page_shopping_items.PageCart(driver)
+
+        page_cart.set_cart_contents(list(page_shopping_items.ITEM_IDS))
+
+        assert driver.calls == 2
+        assert driver.refreshes == 1
+        assert driver.storage["cart-contents"] == [4, 0, 1, 5, 2, 3]
+
+    def test_contents_are_read_back_as_slugs(self):
+        driver = FakeStorageDriver()
+        page_cart = page_shopping_items.PageCart(driver)
+
+        page_cart.set_cart_contents(["sauce-labs-onesie", "sauce-labs-backpack"])
+
+        assert page_cart.get_cart_contents() == ["sauce-labs-onesie", "sauce-labs-backpack"]
+
+    def test_empty_cart_removes_the_entry(self):
+        driver = FakeStorageDriver()
+        page_cart = page_shopping_items.PageCart(driver)
+        page_cart.set_cart_contents(["sauce-labs-onesie"])
+
+        page_cart.set_cart_contents([])
+
+        assert "cart-contents" not in driver.storage
+
+    def test_unknown_item_is_refused(self):
+        with pytest.raises(ValueError):
+            page_shopping_items.PageCart(FakeStorageDriver()).set_cart_contents(["sauce-labs-umbrella"])
+
+    def test_item_ids_match_the_standin(self):
+        app_js_path = os.path.join(os.path.dirname(page_shopping_items.__file__), "..", "standin", "static", "app.js")
+        with open(app_js_path, encoding="utf-8") as app_js:
+            items = re.findall(r"\{id: (\d+), name: '([^']+)'", app_js.read())
+
+        assert {name.lower().replace(" ", "-"): int(item_id) for item_id, name in items} == page_shopping_items.ITEM_IDS
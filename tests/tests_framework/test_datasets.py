@@ -0,0 +1,101 @@
+import json
+import pytest
+
+from plugins import plugin_datasets
+
+CSV_ROWS = 'item,by,selector\nbackpack,CSS_SELECTOR,"button[name=\'add-to-cart-sauce-labs-backpack\']"\n' \
+           'fleece,XPATH,"//div[contains(text(), \'Fleece\')]"\n\nmultiline,ID,"first\nsecond"\n'
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "cart_items.csv"
+    path.write_text(CSV_ROWS, encoding="utf-8")
+    return str(path)
+
+
+class TestDataset:
+    def test_rows_are_read_by_offset(self, csv_path, tmp_path):
+        dataset = plugin_datasets.Dataset(csv_path, str(tmp_path / "cache"))
+
+        assert len(dataset) == 3
+        assert dataset.row(1) == {"item": "fleece", "by": "XPATH", "selector": "//div[contains(text(), 'Fleece')]"}
+        assert dataset.row(2)["selector"] == "first\nsecond"
+
+    def test_index_is_cached_by_content_hash(self, csv_path, tmp_path, monkeypatch):
+        cache_dir = str(tmp_path / "cache")
+        plugin_datasets.Dataset(csv_path, cache_dir)
+        monkeypatch.setattr(plugin_datasets.Dataset, "_build_index", lambda self: pytest.fail("index rebuilt"))
+
+        assert plugin_datasets.Dataset(csv_path, cache_dir).row(0)["item"] == "backpack"
+
+    def test_changed_file_is_indexed_again(self, csv_path, tmp_path):
+        cache_dir = str(tmp_path / "cache")
+        plugin_datasets.Dataset(csv_path, cache_dir)
+        with open(csv_path, "a", encoding="utf-8") as csv_file:
+            csv_file.write("onesie,ID,add-to-cart-sauce-labs-onesie\n")
+
+        assert len(plugin_datasets.Dataset(csv_path, cache_dir)) == 4
+
+    def test_invalid_rows_are_reported_with_their_line(self, tmp_path):
+        path = tmp_path / "users.jsonl"
+        path.write_text(json.dumps({"username": "standard_user"}) + "\n" + json.dumps({"user": "x"}) + "\n")
+
+        with pytest.raises(ValueError, match="users.jsonl:2"):
+            plugin_datasets.Dataset(str(path))
+
+    def test_missing_column_is_refused(self, csv_path):
+        with pytest.raises(ValueError, match="expected_total"):
+            plugin_datasets.Dataset(csv_path).require(["item", "expected_total"])
+
+
+class TestSelection:
+    def test_shards_split_the_rows(self, tmp_path):
+        path = tmp_path / "users.jsonl"
+        path.write_text("".join(json.dumps({"username": f"user{index}"}) + "\n" for index in range(10)))
+        dataset = plugin_datasets.Dataset(str(path))
+
+        shards = [dataset.select(shard=(index, 3)) for index in (1, 2, 3)]
+
+        assert sorted(sum(shards, [])) == list(range(10))
+        assert shards[0] == [0, 3, 6, 9]
+
+    def test_sample_is_reproducible(self, tmp_path):
+        path = tmp_path / "users.jsonl"
+        path.write_text("".join(json.dumps({"username": f"user{index}"}) + "\n" for index in range(100)))
+        dataset = plugin_datasets.Dataset(str(path))
+
+        assert dataset.select(sample=5, seed=1) == dataset.select(sample=5, seed=1)
+        assert len(dataset.select(sample=5, seed=1)) == 5
+
+    def test_invalid_shard_is_refused(self):
+        assert plugin_datasets.parse_shard("2/4") == (2, 4)
+        with pytest.raises(pytest.UsageError):
+            plugin_datasets.parse_shard("5/4")
+
+
+class TestCollection:
+    @pytest.fixture
+    def users_test(self, pytester):
+        datasets_dir = pytester.mkdir("config").joinpath("datasets")
+        datasets_dir.mkdir()
+        datasets_dir.joinpath("users.jsonl").write_text(
+            "".join(json.dumps({"username": f"user{index}"}) + "\n" for index in range(30)))
+        pytester.makepyfile(test_users="""
+            import pytest
+
+            @pytest.mark.dataset("users.jsonl", required=("username",))
+            def test_user(dataset_row):
+                assert dataset_row["username"].startswith("user")
+        """)
+        return pytester
+
+    def test_large_datasets_are_sampled_down_to_max_rows(self, users_test):
+        result = users_test.runpytest("-p", "plugins.plugin_datasets", "--collect-only", "-q", "--dataset-max-rows", "10")
+
+        result.stdout.fnmatch_lines(["*users.jsonl: 30 rows, running a sample of 10*", "10 tests collected*"])
+
+    def test_max_rows_0_collects_every_row(self, users_test):
+        result = users_test.runpytest("-p", "plugins.plugin_datasets", "--collect-only", "-q", "--dataset-max-rows", "0")
+
+        result.stdout.fnmatch_lines(["30 tests collected*"])
@@ -0,0 +1,122 @@
+from selenium.common.exceptions import InvalidSelectorException, NoSuchElementException
+from selenium.webdriver.common.by import By
+import pytest
+
+from pages import dom_snapshot, page_shopping_items
+
+# Markup of the inventory page as rendered by the application
+INVENTORY_HTML = """
+<html><head><title>Swag Labs</title><script>var cart = [];</script></head>
+<body>
+<div class="header_container" id="header_container">
+    <a class="shopping_cart_link" href="/cart.html"><span class="shopping_cart_badge">2</span></a>
+</div>
+<div class="inventory_list">
+    <div class="inventory_item">
+        <a href="#" id="item_4_title_link"><div class="inventory_item_name ">Sauce Labs Backpack</div></a>
+        <div class="inventory_item_price">$29.99</div>
+        <button class="btn btn_secondary btn_small btn_inventory " name="remove-sauce-labs-backpack">Remove</button>
+    </div>
+    <div class="inventory_item">
+        <a href="#" id="item_2_title_link"><div class="inventory_item_name ">Sauce Labs Onesie</div></a>
+        <div class="inventory_item_price">$7.99</div>
+        <button class="btn btn_primary btn_small btn_inventory " name="add-to-cart-sauce-labs-onesie">Add to cart</button>
+        <span style="display: none">out of stock</span>
+    </div>
+</div>
+</body></html>
+"""
+
+
+class FakeDriver:
+    """
+    Serves the inventory markup to the snapshot script and counts the WebDriver calls
+    """
+    def __init__(self):
+        self.calls = 0
+        self.located = []
+
+    def execute_script(self, script, *args):
+        self.calls += 1
+        assert script == dom_snapshot.SNAPSHOT_SCRIPT
+        return INVENTORY_HTML
+
+    def find_element(self, by, value):
+        self.calls += 1
+        self.located.append((by, value))
+        return FakeLiveElement()
+
+
+class FakeLiveElement:
+    clicked = False
+
+    def click(self):
+        self.clicked = True
+
+
+@pytest.fixture
+def snapshot():
+    return dom_snapshot.DomSnapshot(INVENTORY_HTML)
+
+
+class TestLocators:
+    @pytest.mark.parametrize("by, value, expected", [
+        (By.ID, "item_2_title_link", ["Sauce Labs Onesie"]),
+        (By.NAME, "add-to-cart-sauce-labs-onesie", ["Add to cart"]),
+        (By.CLASS_NAME, "inventory_item_name", ["Sauce Labs Backpack", "Sauce Labs Onesie"]),
+        (By.TAG_NAME, "BUTTON", ["Remove", "Add to cart"]),
+        (By.CSS_SELECTOR, "button[name^='remove']", ["Remove"]),
+        (By.XPATH, "//div[contains(text(), 'Onesie')]", ["Sauce Labs Onesie"]),
+        (By.LINK_TEXT, "Sauce Labs Backpack", ["Sauce Labs Backpack"]),
+        (By.PARTIAL_LINK_TEXT, "Sauce Labs", ["Sauce Labs Backpack", "Sauce Labs Onesie"])
+    ])
+    def test_locator_strategies_match_the_browser(self, snapshot, by, value, expected):
+        assert [element.text for element in snapshot.find_elements(by, value)] == expected
+
+    def test_relative_lookups_search_the_descendants(self, snapshot):
+        items = snapshot.find_elements(By.CLASS_NAME, "inventory_item")
+
+        assert items[1].find_element(By.CLASS_NAME, "inventory_item_price").text == "$7.99"
+        assert items[1].find_element(By.XPATH, ".//button").get_attribute("name") == "add-to-cart-sauce-labs-onesie"
+        assert items[0].find_elements(By.CSS_SELECTOR, "div.inventory_item") == []
+
+    def test_invalid_selectors_are_refused(self, snapshot):
+        with pytest.raises(InvalidSelectorException):
+            snapshot.find_elements(By.CLASS_NAME, "btn btn_primary")
+        with pytest.raises(InvalidSelectorException):
+            snapshot.find_elements(By.XPATH, "//div[")
+        with pytest.raises(InvalidSelectorException):
+            snapshot.find_elements(By.CSS_SELECTOR, "div >> span")
+
+    def test_missing_element_raises(self, snapshot):
+        with pytest.raises(NoSuchElementException):
+            snapshot.find_element(By.ID, "checkout")
+
+
+class TestText:
+    def test_scripts_and_hidden_elements_are_not_rendered(self, snapshot):
+        item = snapshot.find_elements(By.CLASS_NAME, "inventory_item")[1]
+
+        assert item.text == "Sauce Labs Onesie\n$7.99\nAdd to cart"
+        assert "var cart" not in snapshot.find_element(By.TAG_NAME, "html").text
+
+
+class TestLiveFallback:
+    def test_checks_cost_a_single_call(self):
+        driver = FakeDriver()
+        page_cart = page_shopping_items.PageCart(driver)
+
+        snapshot = page_cart.snapshot()
+
+        assert page_cart.get_item_prices(snapshot) == [29.99, 7.99]
+        assert page_cart.get_item_names(snapshot) == ["Sauce Labs Backpack", "Sauce Labs Onesie"]
+        assert driver.calls == 1
+
+    def test_interactions_go_to_the_live_element(self):
+        driver = FakeDriver()
+        button = page_shopping_items.PageCart(driver).snapshot().find_element(By.NAME, "add-to-cart-sauce-labs-onesie")
+
+        button.click()
+
+        assert driver.located == [(By.XPATH, "/html/body/div[2]/div[2]/button")]
+        assert button.live().clicked
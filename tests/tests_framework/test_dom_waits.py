@@ -0,0 +1,69 @@
+from selenium.common.exceptions import JavascriptException, TimeoutException
+from selenium.webdriver.common.timeouts import Timeouts
+import pytest
+
+from pages import dom_waits, page_shopping_items
+
+
+class FakeDriver:
+    """
+    Answers the in-page wait script with queued results. An exception in the queue is raised instead
+    """
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+        self.script_timeouts = []
+        self.timeouts = Timeouts(script=30)
+
+    def set_script_timeout(self, seconds):
+        self.script_timeouts.append(seconds)
+        self.timeouts.script = seconds
+
+    def execute_async_script(self, script, predicate, args, timeout_ms):
+        self.calls += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class TestDomWaits:
+    def test_wait_returns_the_predicate_value(self):
+        assert dom_waits.wait_for_js(FakeDriver({"value": 3}), "return 3;") == 3
+
+    def test_timeout_raises(self):
+        with pytest.raises(TimeoutException):
+            dom_waits.wait_for_js(FakeDriver({"timeout": True}), "return undefined;", timeout=1)
+
+    def test_predicate_error_raises(self):
+        with pytest.raises(JavascriptException, match="boom"):
+            dom_waits.wait_for_js(FakeDriver({"error": "Error: boom"}), "throw new Error('boom');")
+
+    def test_wait_restarts_when_the_document_unloads(self):
+        driver = FakeDriver(JavascriptException("document unloaded while waiting for result"), {"value": True})
+
+        assert dom_waits.wait_for_js(driver, dom_waits.DOCUMENT_READY_PREDICATE) is True
+        assert driver.calls == 2
+
+    def test_long_wait_restores_the_script_timeout_set_before_it(self):
+        driver = FakeDriver({"timeout": True})
+        driver.timeouts.script = 45
+
+        with pytest.raises(TimeoutException):
+            dom_waits.wait_for_js(driver, "return undefined;", timeout=60)
+        assert driver.script_timeouts == [65, 45]
+
+    def test_wait_shorter_than_the_script_timeout_keeps_it(self):
+        driver = FakeDriver({"value": True})
+        driver.timeouts.script = 120
+
+        dom_waits.wait_for_js(driver, "return true;", timeout=60)
+        assert driver.script_timeouts == []
+
+
+class TestCartCount:
+    def test_empty_cart_resolves_without_waiting_for_the_timeout(self):
+        driver = FakeDriver({"value": False})
+
+        assert page_shopping_items.PageCart(driver).get_cart_count() == 0
+        assert driver.calls == 1
@@ -0,0 +1,71 @@
+import pytest
+
+import settings
+from drivers import driver_factory
+
+CONFIG = {
+    "driver": {
+        "profile": "default",
+        "profiles": {
+            "eager": {"page_load_strategy": "eager"},
+            "lean": {"page_load_strategy": "eager", "disable_images": True, "headless": False,
+                     "block_resource_types": ["Font"], "block_url_patterns": ["*analytics*"]}
+        }
+    }
+}
+
+
+class FakeDriver:
+    def __init__(self):
+        self.cdp_commands = []
+
+    def execute_cdp_cmd(self, command, params):
+        self.cdp_commands.append((command, params))
+
+
+@pytest.fixture(autouse=True)
+def config(monkeypatch):
+    monkeypatch.setattr(settings, "_config", CONFIG)
+
+
+class TestProfiles:
+    def test_profile_is_merged_over_the_defaults(self):
+        profile = driver_factory.get_profile("eager")
+        assert profile["page_load_strategy"] == "eager"
+        assert profile["headless"] is True
+        assert profile["block_url_patterns"] == []
+
+    def test_configured_profile_is_the_default(self):
+        assert driver_factory.get_profile() == driver_factory.DEFAULT_PROFILE
+
+    def test_unknown_profile_is_refused(self):
+        with pytest.raises(ValueError, match="lean"):
+            driver_factory.get_profile("turbo")
+
+    def test_blocked_resource_types_become_url_patterns(self):
+        patterns = driver_factory.blocked_url_patterns(driver_factory.get_profile("lean"))
+        assert patterns == ["*analytics*", *driver_factory.RESOURCE_TYPE_PATTERNS["Font"]]
+
+    def test_unknown_resource_type_is_refused(self):
+        profile = dict(driver_factory.DEFAULT_PROFILE, block_resource_types=["Script"])
+        with pytest.raises(ValueError):
+            driver_factory.blocked_url_patterns(profile)
+
+
+class TestOptions:
+    def test_lean_profile_options(self):
+        options = driver_factory.build_options(driver_factory.get_profile("lean"))
+        assert options.page_load_strategy == "eager"
+        assert "--headless" not in options.arguments
+        assert options.experimental_options["prefs"] == {"profile.managed_default_content_settings.images": 2}
+
+    def test_network_profile_is_sent_over_cdp(self):
+        driver = FakeDriver()
+        driver_factory.apply_network_profile(driver, driver_factory.get_profile("lean"))
+        assert driver.cdp_commands[0] == ("Network.enable", {})
+        assert driver.cdp_commands[1][0] == "Network.setBlockedURLs"
+
+    def test_nothing_is_sent_without_blocked_urls(self):
+        driver = FakeDriver()
+        driver_factory.apply_network_profile(driver, driver_factory.get_profile("eager"))
+        assert driver.cdp_commands == []
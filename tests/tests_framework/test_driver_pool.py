@@ -0,0 +1,157 @@
+from selenium.common.exceptions import WebDriverException
+import threading
+import pytest
+
+from drivers import driver_pool
+
+
+class FakeDriver:
+    """
+    Minimal stand-in for a webdriver, recording the calls made by the pool
+    """
+    name = "fake"
+
+    def __init__(self):
+        self.title = ""
+        self.calls = []
+        self.alive = True
+
+    @property
+    def current_url(self):
+        if not self.alive:
+            raise WebDriverException("session deleted")
+        return "https://www.saucedemo.com/"
+
+    @property
+    def window_handles(self):
+        return ["main"]
+
+    @property
+    def switch_to(self):
+        return self
+
+    def window(self, handle):
+        pass
+
+    def get(self, url):
+        self.calls.append("get")
+        self.title = "Swag Labs"
+
+    def execute_script(self, script, *args):
+        self.calls.append("clear_storage")
+
+    def execute_async_script(self, script, predicate, args, timeout):
+        # Title wait of the pool
+        return {"value": self.title == args["title"] or None}
+
+    def delete_all_cookies(self):
+        self.calls.append("delete_cookies")
+
+    def quit(self):
+        self.calls.append("quit")
+
+
+def make_pool(**kwargs):
+    launched = []
+
+    def factory():
+        driver = FakeDriver()
+        launched.append(driver)
+        return driver
+
+    pool = driver_pool.BrowserPool(factory, "https://www.saucedemo.com/", **kwargs)
+    return pool, launched
+
+
+class TestBrowserPool:
+    def test_warm_up_launches_prewarmed_drivers(self):
+        pool, launched = make_pool(size=3, prewarm=2)
+        pool.warm_up()
+
+        assert len(launched) == 2
+        assert all(driver.title == "Swag Labs" for driver in launched)
+
+    def test_warm_up_launches_concurrently(self):
+        # Each launch waits for the others: launched one after the other, the barrier would time out
+        barrier = threading.Barrier(3, timeout=5)
+
+        def factory():
+            barrier.wait()
+            return FakeDriver()
+
+        pool = driver_pool.BrowserPool(factory, "https://www.saucedemo.com/", size=3, prewarm=3, launch_concurrency=3)
+        pool.warm_up()
+
+        assert pool.stats["launched"] == 3
+
+    def test_released_driver_is_reset_and_reused(self):
+        pool, launched = make_pool(size=1, prewarm=1)
+        pool.warm_up()
+
+        first = pool.acquire()
+        pool.release(first)
+        second = pool.acquire()
+
+        assert first is second
+        assert len(launched) == 1
+        assert first.calls[-3:] == ["clear_storage", "delete_cookies", "get"]
+
+    def test_driver_is_recycled_after_max_uses(self):
+        pool, launched = make_pool(size=1, prewarm=1, max_uses=2)
+        pool.warm_up()
+
+        for _ in range(3):
+            pool.release(pool.acquire())
+
+        assert len(launched) == 2
+        assert launched[0].calls[-1] == "quit"
+        assert pool.stats["recycled"] == 1
+
+    def test_unhealthy_idle_driver_is_replaced(self):
+        pool, launched = make_pool(size=1, prewarm=1)
+        pool.warm_up()
+        launched[0].alive = False
+
+        driver = pool.acquire()
+
+        assert driver is launched[1]
+        assert pool.stats["unhealthy"] == 1
+
+    def test_acquire_times_out_when_pool_is_exhausted(self):
+        pool, _ = make_pool(size=1, prewarm=0, acquire_timeout=0.1)
+        pool.acquire()
+
+        with pytest.raises(Exception, match="No driver released"):
+            pool.acquire()
+
+    def test_driver_failing_the_start_page_is_quit(self):
+        class UnreachableSiteDriver(FakeDriver):
+            def get(self, url):
+                raise WebDriverException("net::ERR_CONNECTION_REFUSED")
+
+        launched = []
+
+        def factory():
+            launched.append(UnreachableSiteDriver())
+            return launched[-1]
+
+        pool = driver_pool.BrowserPool(factory, "https://www.saucedemo.com/", size=1, prewarm=0)
+
+        with pytest.raises(WebDriverException):
+            pool.acquire()
+        assert launched[0].calls == ["quit"]
+        assert pool._alive() == 0
+
+    def test_driver_failing_the_reset_with_a_connection_error_is_quit(self):
+        pool, launched = make_pool(size=1, prewarm=0, acquire_timeout=0.1)
+        driver = pool.acquire()
+
+        def refuse_connection():
+            raise ConnectionRefusedError("[Errno 111] Connection refused")
+
+        driver.delete_all_cookies = refuse_connection
+        pool.release(driver)
+
+        assert launched[0].calls[-1] == "quit"
+        assert pool.stats["unhealthy"] == 1
+        assert pool.acquire() is launched[1]
@@ -0,0 +1,94 @@
+import threading
+import time
+import pytest
+
+from scripts import load_test
+
+
+class FakeScenario:
+    """
+    Iterations taking `duration` seconds. Iterations listed in `failing` fail at the cart count step
+    """
+    def __init__(self, duration=0.0, failing=()):
+        self.duration = duration
+        self.failing = set(failing)
+        self.iterations = 0
+        self.resets = 0
+        self._lock = threading.Lock()
+
+    def run(self, driver, step):
+        with self._lock:
+            self.iterations += 1
+            iteration = self.iterations
+        step("login", lambda: driver.append("login"))
+        if iteration in self.failing:
+            step("cart_count", lambda: 1 / 0)
+        step("sort", lambda: time.sleep(self.duration))
+
+    def reset(self, driver):
+        with self._lock:
+            self.resets += 1
+
+
+class TestHistogram:
+    def test_percentiles_are_within_the_precision(self):
+        histogram = load_test.Histogram(precision=0.01)
+        for millisecond in range(1, 1001):
+            histogram.record(millisecond / 1000)
+
+        assert histogram.percentile(50) == pytest.approx(0.5, rel=0.01)
+        assert histogram.percentile(99) == pytest.approx(0.99, rel=0.01)
+        assert histogram.percentile(100) == 1.0
+        assert histogram.count == 1000
+
+    def test_merged_histograms_give_the_percentiles_of_all_samples(self):
+        fast, slow = load_test.Histogram(), load_test.Histogram()
+        for _ in range(90):
+            fast.record(0.01)
+        for _ in range(10):
+            slow.record(1.0)
+
+        fast.merge(slow)
+
+        assert fast.percentile(50) == pytest.approx(0.01, rel=0.01)
+        assert fast.percentile(95) == pytest.approx(1.0, rel=0.01)
+        assert (fast.min, fast.max) == (0.01, 1.0)
+
+
+class TestScheduling:
+    def test_arrivals_follow_the_rate(self):
+        arrivals = list(load_test.arrival_times(rate=10, duration=2))
+
+        assert len(arrivals) == 19
+        assert arrivals[:2] == pytest.approx([0.1, 0.2])
+
+    def test_rate_ramps_up_linearly(self):
+        arrivals = list(load_test.arrival_times(rate=10, duration=4, ramp_up=2))
+
+        # 10 arrivals during the ramp-up (half the rate on average), then 10 per second
+        assert len([offset for offset in arrivals if offset <= 2]) == 10
+        assert len(arrivals) == 29
+        gaps = [later - earlier for earlier, later in zip(arrivals, arrivals[1:])]
+        assert gaps[0] > gaps[5] > gaps[-1] == pytest.approx(0.1)
+
+    def test_closed_loop_users_run_until_the_end(self):
+        scenario = FakeScenario(duration=0.01, failing=(2,))
+        drivers = [[], []]
+
+        results = load_test.run_closed_loop(scenario, drivers, duration=0.1)
+
+        summary = results.summary(0.1)
+        assert summary["iteration"]["count"] + summary["iteration"]["errors"] == scenario.iterations == scenario.resets
+        assert summary["cart_count"]["error_types"] == {"ZeroDivisionError": 1}
+        assert all(drivers)
+
+    def test_fixed_rate_waits_for_a_free_browser(self):
+        scenario = FakeScenario(duration=0.05)
+
+        results = load_test.run_fixed_rate(scenario, [[]], duration=0.2, rate=40)
+
+        summary = results.summary(0.2)
+        assert summary["iteration"]["count"] == 7
+        # One browser for 40 iterations per second of 50ms: the last ones waited for the previous ones
+        assert summary["queue_wait"]["max_ms"] > 50
+        assert summary["iteration"]["max_ms"] > summary["sort"]["max_ms"] + 50
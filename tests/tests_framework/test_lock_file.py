@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+import pytest
+
+from drivers import lock_file
+
+
+@pytest.fixture
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+class TestLockFile:
+    def test_lock_file_holds_the_pid_of_its_owner(self, tmp_path):
+        lock_path = str(tmp_path / "shared_chrome.lock")
+
+        with lock_file.LockFile(lock_path, timeout=1):
+            with open(lock_path, encoding="ascii") as lock:
+                assert int(lock.read()) == os.getpid()
+        assert not os.path.exists(lock_path)
+
+    def test_lock_of_a_dead_process_is_broken(self, tmp_path, dead_pid):
+        lock_path = str(tmp_path / "shared_chrome.lock")
+        with open(lock_path, "w", encoding="ascii") as lock:
+            lock.write(str(dead_pid))
+
+        with lock_file.LockFile(lock_path, timeout=0.2):
+            with open(lock_path, encoding="ascii") as lock:
+                assert int(lock.read()) == os.getpid()
+
+    def test_lock_of_a_live_process_times_out(self, tmp_path):
+        lock_path = str(tmp_path / "shared_chrome.lock")
+        with open(lock_path, "w", encoding="ascii") as lock:
+            lock.write(str(os.getppid()))
+
+        with pytest.raises(TimeoutError, match=f"held by process {os.getppid()}"):
+            with lock_file.LockFile(lock_path, timeout=0.2):
+                pass
+        assert os.path.exists(lock_path)
@@ -0,0 +1,68 @@
+import json
+import logging
+import pytest
+
+import conflog
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as log_file:
+        return [json.loads(line) for line in log_file]
+
+
+class TestLogPipeline:
+    def test_records_are_written_as_json_lines_with_the_test(self, tmp_path, request):
+        path = str(tmp_path / "log.gw0.jsonl")
+        pipeline = conflog.LogPipeline(path).start()
+        logging.getLogger("pages.page_shopping_items").info("The shopping cart has %s items", 3)
+        pipeline.stop()
+
+        entry = [line for line in read_lines(path) if line["logger"] == "pages.page_shopping_items"][0]
+        assert entry["message"] == "The shopping cart has 3 items"
+        assert entry["level"] == "INFO"
+        assert entry["nodeid"] == request.node.nodeid
+
+    def test_module_levels_are_applied_and_restored(self, tmp_path):
+        path = str(tmp_path / "log.jsonl")
+        logger = logging.getLogger("pages.page_base")
+        previous_level = logger.level
+        pipeline = conflog.LogPipeline(path, levels={"pages.page_base": "WARNING"}).start()
+        logger.info("Cached element went stale")
+        logger.warning("Element not found")
+        pipeline.stop()
+
+        assert [line["message"] for line in read_lines(path) if line["logger"] == "pages.page_base"] == ["Element not found"]
+        assert logger.level == previous_level
+
+    def test_exception_is_logged(self, tmp_path):
+        path = str(tmp_path / "log.jsonl")
+        pipeline = conflog.LogPipeline(path).start()
+        try:
+            raise RuntimeError("browser crashed")
+        except RuntimeError:
+            logging.getLogger("drivers.driver_pool").exception("Failed to reset the driver")
+        pipeline.stop()
+
+        assert "RuntimeError: browser crashed" in read_lines(path)[-1]["exception"]
+
+    def test_invalid_level_is_refused(self):
+        assert conflog.parse_levels(["pages=debug"]) == {"pages": "DEBUG"}
+        with pytest.raises(ValueError):
+            conflog.parse_levels(["pages=verbose"])
+
+
+class TestMerge:
+    def test_worker_files_are_merged_in_time_order(self, tmp_path):
+        log_path = str(tmp_path / "run.jsonl")
+        lines = {
+            "gw0": ["2024-05-01T10:00:00.000001+00:00", "2024-05-01T10:00:02.000000+00:00"],
+            "gw1": ["2024-05-01T10:00:01.000000+00:00", "2024-05-01T10:00:03.000000+00:00"]
+        }
+        for worker, times in lines.items():
+            with open(conflog.worker_log_path(log_path, worker), "w", encoding="utf-8") as worker_file:
+                worker_file.writelines(json.dumps({"time": time, "worker": worker}) + "\n" for time in times)
+
+        assert conflog.merge_worker_logs(log_path) == 4
+
+        assert [line["worker"] for line in read_lines(log_path)] == ["gw0", "gw1", "gw0", "gw1"]
+        assert not list(tmp_path.glob("run.gw*.jsonl"))
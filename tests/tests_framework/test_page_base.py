@@ -0,0 +1,128 @@
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webelement import WebElement
+import pytest
+
+from pages import page_base, page_shopping_items
+
+
+class FakeDriver:
+    """
+    Answers the bulk query script with canned results and counts the WebDriver calls
+    """
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    def execute_script(self, script, *args):
+        self.calls += 1
+        return self.result
+
+
+def element_info(text, displayed=True):
+    return {"element": object(), "text": text, "displayed": displayed, "attributes": {}}
+
+
+class TestBulkQuery:
+    def test_query_element_raises_when_nothing_matches(self):
+        page = page_base.PageBase(FakeDriver([[]]))
+
+        with pytest.raises(NoSuchElementException):
+            page.query_element(By.ID, "missing")
+
+    def test_inventory_items_are_read_in_one_call(self):
+        driver = FakeDriver([
+            {"name": element_info("Sauce Labs Backpack"), "price": element_info("$29.99"), "button": element_info("Add to cart")},
+            {"name": element_info("Sauce Labs Onesie"), "price": element_info("$7.99"), "button": element_info("Add to cart")}
+        ])
+        page_cart = page_shopping_items.PageCart(driver)
+
+        items = page_cart.get_inventory_items()
+
+        assert [(item["name"], item["price"]) for item in items] == [("Sauce Labs Backpack", 29.99), ("Sauce Labs Onesie", 7.99)]
+        assert driver.calls == 1
+
+    def test_missing_container_field_is_none(self):
+        page = page_base.PageBase(FakeDriver([{"price": None}]))
+
+        blocks = page.query_containers((By.CLASS_NAME, "inventory_item"), {"price": (By.CLASS_NAME, "inventory_item_price")})
+
+        assert blocks == [{"price": None}]
+
+
+class FakeFindDriver:
+    """
+    Hands out a new element id on every find_element call. Element ids listed in `stale` fail as stale
+    """
+    def __init__(self):
+        self.find_calls = 0
+        self.stale = set()
+        self.current_url = "https://www.saucedemo.com/inventory.html"
+
+    def find_element(self, by, value):
+        self.find_calls += 1
+        return WebElement(self, f"element-{self.find_calls}")
+
+    def execute(self, command, params):
+        if params["id"] in self.stale:
+            raise StaleElementReferenceException("stale element")
+        return {"value": params["id"]}
+
+
+class TestElementCache:
+    def test_repeated_lookups_hit_the_cache(self):
+        driver = FakeFindDriver()
+        page = page_base.PageBase(driver)
+
+        first = page.select_web_element_by(By.CLASS_NAME, "shopping_cart_badge")
+        second = page.select_web_element_by(By.CLASS_NAME, "shopping_cart_badge")
+
+        assert first is second
+        assert driver.find_calls == 1
+        assert page.cache_stats() == {"hits": 1, "misses": 1, "stale_refreshes": 0}
+
+    def test_stale_element_is_located_again(self):
+        driver = FakeFindDriver()
+        page = page_base.PageBase(driver)
+        element = page.select_web_element_by(By.CLASS_NAME, "shopping_cart_badge")
+        driver.stale.add("element-1")
+
+        assert element.text == "element-2"
+        assert page.cache_stale_refreshes == 1
+
+    def test_cache_is_invalidated_on_url_change(self):
+        driver = FakeFindDriver()
+        page = page_base.PageBase(driver)
+        page.invalidate_cache_if_url_changed()
+        page.select_web_element_by(By.ID, "react-burger-menu-btn")
+
+        driver.current_url = "https://www.saucedemo.com/cart.html"
+        assert page.invalidate_cache_if_url_changed()
+        page.select_web_element_by(By.ID, "react-burger-menu-btn")
+
+        assert driver.find_calls == 2
+
+    def test_lookup_after_a_navigating_action_drops_the_cache_of_the_previous_page(self):
+        driver = FakeFindDriver()
+        page = page_base.PageBase(driver)
+        page.select_web_element_by(By.CLASS_NAME, "title")
+
+        # A click kept on the same page, then one moving to the cart
+        page.expect_navigation()
+        page.select_web_element_by(By.CLASS_NAME, "title")
+        page.expect_navigation()
+        driver.current_url = "https://www.saucedemo.com/cart.html"
+        page.select_web_element_by(By.CLASS_NAME, "title")
+        page.select_web_element_by(By.CLASS_NAME, "title")
+
+        assert driver.find_calls == 2
+        assert page.cache_stats()["hits"] == 2
+
+    def test_cache_can_be_disabled(self):
+        driver = FakeFindDriver()
+        page = page_base.PageBase(driver, use_cache=False)
+
+        page.select_web_element_by(By.ID, "login-button")
+        page.select_web_element_by(By.ID, "login-button")
+
+        assert driver.find_calls == 2
@@ -0,0 +1,128 @@
+import pytest
+
+from pages import page_performance, page_shopping_items
+from scripts import performance_trends
+
+
+class FakeDriver:
+    """
+    Answers the performance scripts with canned results and keeps the calls
+    """
+    def __init__(self, async_results):
+        self.async_results = list(async_results)
+        self.calls = []
+
+    def execute_script(self, script, *args):
+        self.calls.append(("execute_script", script))
+
+    def execute_async_script(self, script, *args):
+        self.calls.append(("execute_async_script", script))
+        return self.async_results.pop(0)
+
+
+@pytest.fixture
+def recorder():
+    page_performance.RECORDER.drain()
+    yield page_performance.RECORDER
+    page_performance.RECORDER.enabled = True
+    page_performance.RECORDER.drain()
+
+
+class TestPagePerformance:
+    def test_page_metrics_are_rounded_and_recorded_for_the_page_object(self, recorder):
+        driver = FakeDriver([{"url": "https://www.saucedemo.com/inventory.html",
+                              "metrics": {"lcp_ms": 812.3456, "cls": 0.012345, "fcp_ms": None}}])
+
+        metrics = page_shopping_items.PageCart(driver).record_page_performance()
+
+        assert metrics == {"lcp_ms": 812.3, "cls": 0.0123, "fcp_ms": None}
+        [sample] = recorder.drain()
+        assert (sample.page, sample.url, sample.metrics) == ("PageCart", "https://www.saucedemo.com/inventory.html", metrics)
+
+    def test_action_is_armed_before_it_runs(self, recorder):
+        driver = FakeDriver([{"value": {"latency": 42.26, "url": "https://www.saucedemo.com/inventory.html"}}])
+        page_cart = page_shopping_items.PageCart(driver)
+
+        latency = page_cart.measure_action("open_menu", lambda: driver.calls.append(("click", None)), "return true;")
+
+        assert latency == 42.3
+        assert [call[0] for call in driver.calls] == ["execute_script", "click", "execute_async_script"]
+        assert driver.calls[0][1] == page_performance.ARM_ACTION_SCRIPT
+        assert recorder.drain()[0].metrics == {"open_menu_ms": 42.3}
+
+    def test_disabled_recorder_only_runs_the_action(self, recorder):
+        recorder.enabled = False
+        driver = FakeDriver([])
+        page_cart = page_shopping_items.PageCart(driver)
+
+        assert page_cart.measure_action("open_menu", lambda: driver.calls.append(("click", None)), "return true;") is None
+        assert page_cart.record_page_performance() == {}
+        assert driver.calls == [("click", None)]
+
+    def test_page_budgets_override_the_default_ones(self):
+        budgets = {"default": {"lcp_ms": 4000, "cls": 0.25}, "PageCart": {"lcp_ms": 1000, "add_item_to_cart_ms": 500}}
+        samples = [
+            page_performance.PerformanceSample("PageCart", "inventory.html", {"lcp_ms": 1500.0, "cls": 0.1}, "test_a"),
+            page_performance.PerformanceSample("PageLogin", "login", {"lcp_ms": 1500.0, "cls": None}, "test_a"),
+            page_performance.PerformanceSample("PageCart", "inventory.html", {"add_item_to_cart_ms": 620.5}, "test_a")
+        ]
+
+        violations = page_performance.check_budgets(samples, budgets)
+
+        assert violations == ["inventory.html lcp_ms 1500.0 > 1000 on inventory.html",
+                              "inventory.html add_item_to_cart_ms 620.5 > 500 on inventory.html"]
+
+    def test_budgets_of_the_page_override_the_ones_of_the_page_object(self):
+        budgets = {"default": {"lcp_ms": 4000}, "PageCart": {"lcp_ms": 1000}, "/cart.html": {"lcp_ms": 2000},
+                   "checkout": {"lcp_ms": 3000}}
+        samples = [
+            page_performance.PerformanceSample("PageCart", "https://www.saucedemo.com/cart.html", {"lcp_ms": 1500.0}, "test_a"),
+            page_performance.PerformanceSample("PageCart", "https://www.saucedemo.com/inventory.html", {"lcp_ms": 1500.0}, "test_a"),
+            page_performance.PerformanceSample("PageCart", "https://www.saucedemo.com/checkout-step-one.html",
+                                               {"lcp_ms": 2500.0}, "test_a", name="checkout")
+        ]
+
+        violations = page_performance.check_budgets(samples, budgets)
+
+        assert violations == ["/inventory.html lcp_ms 1500.0 > 1000 on https://www.saucedemo.com/inventory.html"]
+
+    def test_samples_of_a_test_are_taken_out_and_kept_for_the_history(self, recorder, monkeypatch):
+        monkeypatch.setattr(page_performance.test_context, "current_nodeid", lambda: "test_a")
+        recorder.record("PageCart", "https://www.saucedemo.com/inventory.html", {"lcp_ms": 1500.0})
+
+        assert len(recorder.for_test("test_a")) == 1
+        # A rerun attempt is checked on its own samples
+        recorder.record("PageCart", "https://www.saucedemo.com/inventory.html", {"lcp_ms": 900.0})
+        assert [sample.metrics for sample in recorder.for_test("test_a")] == [{"lcp_ms": 900.0}]
+        assert len(recorder.drain()) == 2
+
+
+def history_record(run, time, value, metric="lcp_ms", page="PageCart"):
+    return {"run": run, "time": time, "page": page, "url": "inventory.html", "metrics": {metric: value}, "nodeid": "test_a"}
+
+
+class TestPerformanceTrends:
+    def test_last_run_is_compared_to_the_median_of_the_previous_ones(self):
+        records = [
+            history_record("run-c", "2026-01-03T00:00:00", 1300),
+            history_record("run-a", "2026-01-01T00:00:00", 1000),
+            history_record("run-a", "2026-01-01T00:00:00", 1000),
+            history_record("run-b", "2026-01-02T00:00:00", 1100),
+            history_record("run-b", "2026-01-02T00:00:00", 900, metric="fcp_ms")
+        ]
+
+        rows = performance_trends.build_trends(records, runs=10, tolerance=0.2, budgets={"default": {"lcp_ms": 1200}})
+
+        fcp, lcp = rows
+        assert lcp["series"] == [1000, 1100, 1300]
+        assert lcp["reference"] == 1050
+        assert lcp["regression"] and lcp["over_budget"]
+        assert fcp["series"] == [None, 900, None]
+        assert fcp["change"] is None and not fcp["regression"]
+
+    def test_only_the_most_recent_runs_are_kept(self):
+        records = [history_record(f"run-{day}", f"2026-01-0{day}T00:00:00", day * 100) for day in range(1, 6)]
+
+        [row] = performance_trends.build_trends(records, runs=2)
+
+        assert row["series"] == [400, 500]
@@ -0,0 +1,124 @@
+from selenium.webdriver.common.by import By
+
+from pages.dom_snapshot import DomSnapshot
+from scripts import profile_locators
+
+PAGE_SOURCE = '''
+from selenium.webdriver.common.by import By
+
+
+class PageItems:
+    def __init__(self, browser):
+        self.browser = browser
+        self.price_class = "inventory_item_price"
+
+    def prices(self):
+        return self.browser.find_elements(By.CLASS_NAME, self.price_class)
+
+    def add(self, slug):
+        self.browser.find_element(By.ID, f"add-to-cart-{slug}").click()
+        self.browser.find_element(By.XPATH, "//button[text()='Remove']").click()
+        return (By.CLASS_NAME, "inventory_item_price")
+'''
+
+ITEM_HTML = """
+    <div class="inventory_item">
+        <div class="inventory_item_label"><a href="#"><div class="inventory_item_name ">{name}</div></a></div>
+        <div class="pricebar">
+            <button class="btn {button_class} btn_small btn_inventory " id="{action}-{slug}"
+                    name="{action}-{slug}">{text}</button>
+        </div>
+    </div>"""
+
+
+def inventory_html(in_cart):
+    """
+    :param in_cart: slugs of the items in the cart, their button removes them
+    """
+    items = []
+    for name, slug in (("Sauce Labs Fleece Jacket", "sauce-labs-fleece-jacket"), ("Sauce Labs Onesie", "sauce-labs-onesie")):
+        if slug in in_cart:
+            items.append(ITEM_HTML.format(name=name, slug=slug, action="remove", button_class="btn_secondary",
+                                          text="Remove"))
+        else:
+            items.append(ITEM_HTML.format(name=name, slug=slug, action="add-to-cart", button_class="btn_primary",
+                                          text="Add to cart"))
+    return f'<html><body><div class="inventory_list">{"".join(items)}</div></body></html>'
+
+
+# The fleece jacket can be added, the onesie is in the cart
+INVENTORY_HTML = inventory_html(["sauce-labs-onesie"])
+
+FLEECE_XPATH = "//div[a[div[contains(text(), 'Fleece')]]]/following-sibling::div//button[contains(@class, 'btn btn_primary')]"
+
+
+def locator(by, value):
+    return profile_locators.Locator(by, value, ())
+
+
+class TestCollection:
+    def test_literal_and_attribute_selectors_are_collected(self, tmp_path):
+        (tmp_path / "page_items.py").write_text(PAGE_SOURCE)
+
+        locators, skipped = profile_locators.collect_locators([str(tmp_path)])
+
+        assert [(found.by, found.value, len(found.usages)) for found in locators] == [
+            (By.CLASS_NAME, "inventory_item_price", 2),
+            (By.XPATH, "//button[text()='Remove']", 1)
+        ]
+        assert skipped == 1
+
+    def test_excluded_directories_are_not_searched(self, tmp_path):
+        (tmp_path / "unit").mkdir()
+        (tmp_path / "unit" / "page_items.py").write_text(PAGE_SOURCE)
+
+        assert profile_locators.collect_locators([str(tmp_path)], exclude=[str(tmp_path / "unit")]) == ([], 0)
+
+
+class TestProposals:
+    def test_xpath_is_replaced_by_the_id_of_its_element(self):
+        snapshot = DomSnapshot(INVENTORY_HTML)
+
+        assert profile_locators.propose(locator(By.XPATH, "//button[@name='add-to-cart-sauce-labs-fleece-jacket']"),
+                                        [snapshot]) == (By.ID, "add-to-cart-sauce-labs-fleece-jacket")
+
+    def test_locator_by_text_and_class_gets_a_proposal_holding_in_every_cart_state(self):
+        snapshots = [DomSnapshot(inventory_html(in_cart)) for in_cart in ([], ["sauce-labs-fleece-jacket"])]
+
+        assert profile_locators.propose(locator(By.XPATH, FLEECE_XPATH), snapshots) == \
+            (By.ID, "add-to-cart-sauce-labs-fleece-jacket")
+
+    def test_candidate_selecting_other_elements_in_another_cart_state_is_rejected(self):
+        remove_buttons = locator(By.XPATH, "//button[text()='Remove']")
+        half_cart = DomSnapshot(INVENTORY_HTML)
+        full_cart = DomSnapshot(inventory_html(["sauce-labs-fleece-jacket", "sauce-labs-onesie"]))
+
+        assert profile_locators.propose(remove_buttons, [half_cart]) == (By.ID, "remove-sauce-labs-onesie")
+        assert profile_locators.propose(remove_buttons, [half_cart, full_cart]) == (By.CLASS_NAME, "btn_secondary")
+
+    def test_locators_by_position_get_no_proposal(self):
+        snapshot = DomSnapshot(INVENTORY_HTML)
+
+        for by, value in ((By.XPATH, "(//button[contains(@class, 'btn_inventory')])[last()]"),
+                          (By.XPATH, "//div[@class='inventory_item'][2]//button"),
+                          (By.CSS_SELECTOR, "div.inventory_item:last-child button")):
+            assert snapshot.find_elements(by, value)
+            assert profile_locators.propose(locator(by, value), [snapshot]) is None
+
+    def test_element_sets_are_replaced_by_a_common_class(self):
+        snapshot = DomSnapshot(INVENTORY_HTML)
+
+        assert profile_locators.propose(locator(By.XPATH, "//div[@class='inventory_item']"), [snapshot]) == \
+            (By.CLASS_NAME, "inventory_item")
+
+    def test_proposal_must_hold_on_every_page(self):
+        # Another page where the class matches an element the xpath doesn't
+        other_page = DomSnapshot('<html><body><span class="inventory_item">Sauce Labs Onesie</span></body></html>')
+
+        proposal = profile_locators.propose(locator(By.XPATH, "//div[@class='inventory_item']"),
+                                            [DomSnapshot(INVENTORY_HTML), other_page])
+
+        assert proposal == (By.CSS_SELECTOR, "div.inventory_item")
+
+    def test_fast_locators_are_kept(self):
+        assert profile_locators.propose(locator(By.NAME, "remove-sauce-labs-onesie"), [DomSnapshot(INVENTORY_HTML)]) is None
@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.chrome.options import Options
+
+import time
+import pytest
+import urllib3
+
+import settings
+from drivers import driver_factory, driver_pool, remote_connection
+from standin.webdriver_node import WebDriverNode
+
+
+@pytest.fixture
+def node():
+    with WebDriverNode() as webdriver_node:
+        yield webdriver_node
+    remote_connection.close_pools()
+
+
+def remote_driver(pool, command_timeouts=None):
+    return webdriver.Remote(command_executor=remote_connection.PooledRemoteConnection(pool, command_timeouts),
+                            options=Options())
+
+
+def browse(driver, url):
+    for _ in range(5):
+        driver.get(url)
+        assert driver.title == "Swag Labs"
+    driver.quit()
+
+
+class TestSharedPool:
+    def test_concurrent_sessions_reuse_the_pooled_connections(self, node):
+        pool = remote_connection.SharedPool(node.url, pool_size=4)
+        drivers = remote_connection.create_concurrently(lambda: remote_driver(pool), count=8, concurrency=8)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda driver: browse(driver, "http://standin/"), drivers))
+
+        assert node.connections <= 4
+        stats = pool.stats()
+        assert stats["requests"] == node.requests == 8 * 12
+        assert stats["reused"] == stats["requests"] - stats["connections"]
+        assert not node.sessions
+
+    def test_commands_have_their_own_timeout(self, node):
+        node.command_delays = {"title": 0.5}
+        pool = remote_connection.SharedPool(node.url)
+        driver = remote_driver(pool, command_timeouts={"getTitle": 0.1})
+
+        start = time.monotonic()
+        with pytest.raises(TimeoutException, match="timed out"):
+            driver.title
+        assert time.monotonic() - start < 0.5
+        # The other commands keep the default timeout
+        driver.get("http://standin/")
+        assert driver.current_url == "http://standin/"
+        assert pool.stats()["timeouts"] == 1
+
+    def test_timed_out_driver_fails_the_health_check(self, node):
+        node.command_delays = {"url": 0.5}
+        driver = remote_driver(remote_connection.SharedPool(node.url), command_timeouts={"getCurrentUrl": 0.1})
+
+        assert not driver_pool.BrowserPool.is_healthy(driver)
+        driver.quit()
+
+    def test_failed_creation_quits_the_created_sessions(self, node):
+        pool = remote_connection.SharedPool(node.url)
+        created = []
+
+        def factory():
+            if len(created) == 2:
+                raise urllib3.exceptions.ProtocolError("grid full")
+            created.append(remote_driver(pool))
+            return created[-1]
+
+        with pytest.raises(urllib3.exceptions.ProtocolError):
+            remote_connection.create_concurrently(factory, count=3, concurrency=1)
+        assert not node.sessions
+
+
+class TestRemoteDriverFactory:
+    def test_remote_drivers_share_the_pool_of_their_url(self, node, monkeypatch):
+        monkeypatch.setattr(settings, "_config", {
+            "driver": {"profiles": {"lean": {"block_url_patterns": ["*analytics*"]}}},
+            "remote": {"url": node.url, "pool_size": 2}
+        })
+
+        drivers = driver_factory.create_drivers(3, "lean")
+
+        assert {type(driver.command_executor) for driver in drivers} == {remote_connection.PooledRemoteConnection}
+        assert len({id(driver.command_executor.shared_pool) for driver in drivers}) == 1
+        assert node.connections <= 2
+        for driver in drivers:
+            driver.quit()
+        assert remote_connection.pool_stats()[node.url]["reused"] > 0
+
+    def test_no_remote_url_is_a_local_driver(self, monkeypatch):
+        monkeypatch.setattr(settings, "_config", {})
+        assert driver_factory.remote_url() is None
+        assert driver_factory.remote_url("http://grid:4444") == "http://grid:4444"
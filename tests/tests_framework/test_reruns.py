@@ -0,0 +1,141 @@
+from selenium.common.exceptions import ElementClickInterceptedException, NoSuchElementException
+from selenium.webdriver.common.by import By
+import pytest
+
+from pages import action_retry, page_performance, page_shopping_items
+from plugins import plugin_reruns
+
+
+class FakeButton:
+    def __init__(self, failures):
+        self.failures = failures
+        self.clicks = 0
+
+    def click(self):
+        self.clicks += 1
+        if self.clicks <= self.failures:
+            raise ElementClickInterceptedException("other element would receive the click")
+
+
+class FakeCartDriver:
+    """
+    Answers the bulk query script with the add to cart button, or with no match
+    """
+    def __init__(self, button):
+        self.button = button
+        self.queries = 0
+
+    def execute_script(self, script, *args):
+        self.queries += 1
+        return [[{"element": self.button, "text": "Add to cart", "displayed": True, "attributes": {}}]] \
+            if self.button else [[]]
+
+
+@pytest.fixture
+def policy(monkeypatch):
+    delays = []
+    retry_policy = action_retry.RetryPolicy(attempts=3, initial_delay=0.1, max_delay=0.15, jitter=0, sleep=delays.append)
+    retry_policy.slept = delays
+    monkeypatch.setattr(action_retry, "POLICY", retry_policy)
+    page_performance.RECORDER.enabled = False
+    yield retry_policy
+    page_performance.RECORDER.enabled = True
+
+
+class TestRetryPolicy:
+    def test_transient_errors_are_retried_with_a_capped_backoff(self, policy):
+        button = FakeButton(failures=2)
+
+        policy.run("PageCart.add_item_to_cart", button.click)
+
+        assert button.clicks == 3
+        assert policy.slept == [0.1, 0.15]
+        assert policy.retries == {"PageCart.add_item_to_cart": 2}
+
+    def test_last_error_is_raised_once_the_attempts_are_exhausted(self, policy):
+        button = FakeButton(failures=5)
+
+        with pytest.raises(ElementClickInterceptedException):
+            policy.run("PageCart.add_item_to_cart", button.click)
+        assert button.clicks == 3
+
+    def test_other_errors_are_raised_right_away(self, policy):
+        def fail():
+            raise ValueError("not transient")
+
+        with pytest.raises(ValueError):
+            policy.run("action", fail)
+        assert policy.slept == []
+
+
+class TestAddItemToCart:
+    def test_intercepted_click_is_retried_on_a_new_lookup(self, policy):
+        driver = FakeCartDriver(FakeButton(failures=1))
+
+        page_shopping_items.PageCart(driver).add_item_to_cart(By.NAME, "add-to-cart-sauce-labs-backpack")
+
+        assert driver.button.clicks == 2
+        assert driver.queries == 2
+
+    def test_missing_item_is_raised(self, policy):
+        with pytest.raises(NoSuchElementException):
+            page_shopping_items.PageCart(FakeCartDriver(None)).add_item_to_cart(By.NAME, "add-to-cart-sauce-labs-umbrella")
+
+
+class TestFlakeStatistics:
+    def test_runs_are_counted_per_test(self):
+        flakes = plugin_reruns.update_flakes({}, {"a": {"reruns": 1, "failed": False},
+                                                  "b": {"reruns": 2, "failed": True},
+                                                  "c": {"reruns": 0, "failed": False}}, now=100)
+        flakes = plugin_reruns.update_flakes(flakes, {"a": {"reruns": 0, "failed": False}}, now=200)
+
+        assert flakes["a"] == {"runs": 2, "flaky": 1, "failed": 0, "reruns": 1, "last_flaky": 100}
+        assert (flakes["b"]["flaky"], flakes["b"]["failed"]) == (0, 1)
+        assert flakes["c"]["flaky"] == 0
+
+
+FLAKY_TESTS = """
+import pytest
+
+setups = {"module": 0, "function": 0}
+attempts = []
+
+
+@pytest.fixture(scope="module")
+def warm_browser():
+    setups["module"] += 1
+    return setups
+
+
+@pytest.fixture
+def page(warm_browser):
+    setups["function"] += 1
+    return setups
+
+
+def test_flaky(page):
+    attempts.append(dict(page))
+    assert len(attempts) > 1
+
+
+def test_fixtures_of_the_rerun():
+    # The broader fixtures were kept for the rerun, the function ones set up again
+    assert attempts == [{"module": 1, "function": 1}, {"module": 1, "function": 2}]
+
+
+def test_broken():
+    assert False
+"""
+
+
+class TestSession:
+    def test_failed_test_is_rerun_in_the_same_session(self, pytester):
+        pytester.makepyfile(test_flaky=FLAKY_TESTS)
+
+        result = pytester.runpytest("-p", "plugins.plugin_reruns", "--fast-reruns", "1")
+
+        outcomes = result.parseoutcomes()
+        assert (outcomes["passed"], outcomes["failed"], outcomes["rerun"]) == (2, 1, 2)
+        result.stdout.fnmatch_lines(["*fast reruns*", "2 tests rerun, 1 passed on a rerun (flaky)",
+                                     "FAILED test_flaky.py::test_broken: reruns 1, flaky in 0 of 1 runs",
+                                     "FLAKY  test_flaky.py::test_flaky: reruns 1, flaky in 1 of 1 runs"])
@@ -0,0 +1,148 @@
+import os
+import pytest
+
+from plugins import plugin_scheduler
+
+pytest.importorskip("xdist")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Each test writes the worker it ran on, the group tests pass only when they run in file order
+GROUPED_TESTS = """
+import os
+import pytest
+
+LOG = os.path.join(os.path.dirname(__file__), "workers.log")
+
+
+def ran(name):
+    with open(LOG, "a", encoding="utf-8") as log_file:
+        log_file.write(f"{name} {os.environ['PYTEST_XDIST_WORKER']}\\n")
+
+
+@pytest.mark.state_group("cart")
+class TestCart:
+    def test_add(self):
+        ran("add")
+
+    def test_count(self):
+        with open(LOG, encoding="utf-8") as log_file:
+            assert "add " in log_file.read()
+        ran("count")
+
+    def test_remove(self):
+        ran("remove")
+
+
+@pytest.mark.parametrize("index", range(6))
+def test_solo(index):
+    ran(f"solo{index}")
+"""
+
+
+class FakeOption:
+    loadscopereorder = False
+
+
+class FakeConfig:
+    option = FakeOption()
+    cache = None
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.stash = pytest.Stash()
+
+    def getvalue(self, name):
+        assert name == "tx"
+        return [f"{self.workers}*popen"]
+
+
+class FakeGateway:
+    def __init__(self, name):
+        self.id = name
+
+
+class FakeNode:
+    def __init__(self, name):
+        self.name = name
+        self.gateway = FakeGateway(name)
+        self.sent = []
+        self.shutting_down = False
+
+    def send_runtest_some(self, indices):
+        self.sent.extend(indices)
+
+    def shutdown(self):
+        self.shutting_down = True
+
+
+def run_schedule(collection, durations, workers=2):
+    scheduler = plugin_scheduler.DurationScheduling(FakeConfig(workers), durations=durations)
+    nodes = [FakeNode(f"gw{index}") for index in range(workers)]
+    for node in nodes:
+        scheduler.add_node(node)
+        scheduler.add_node_collection(node, collection)
+    scheduler.schedule()
+    # Let every node run its tests until the queue is empty
+    while scheduler.has_pending:
+        for node in nodes:
+            pending = [index for index in node.sent
+                       if not scheduler.assigned_work[node][scheduler._split_scope(collection[index])][collection[index]]]
+            if pending:
+                scheduler.mark_test_complete(node, pending[0])
+    return scheduler, {node.name: [collection[index] for index in node.sent] for node in nodes}
+
+
+class TestGroups:
+    def test_group_suffix_is_split_from_the_node_id(self):
+        assert plugin_scheduler.split_group("test_cart.py::test_add@session_cart") == ("test_cart.py::test_add", "session_cart")
+        assert plugin_scheduler.split_group("test_cart.py::test_add") == ("test_cart.py::test_add", None)
+        assert plugin_scheduler.split_group("test_login.py::test_login[user@host]") == ("test_login.py::test_login[user@host]", None)
+
+    def test_group_runs_on_one_worker_in_order(self):
+        collection = ["a.py::test_1@cart", "b.py::test_solo", "a.py::test_2@cart", "a.py::test_3@cart", "c.py::test_other"]
+        scheduler, sent = run_schedule(collection, {})
+        group_worker = [name for name, nodeids in sent.items() if "a.py::test_1@cart" in nodeids][0]
+        assert [nodeid for nodeid in sent[group_worker] if nodeid.endswith("@cart")] == \
+            ["a.py::test_1@cart", "a.py::test_2@cart", "a.py::test_3@cart"]
+        assert sorted(sum(sent.values(), [])) == sorted(collection)
+
+
+class TestDurations:
+    def test_longest_unit_starts_first(self):
+        collection = ["a.py::test_short", "b.py::test_long", "c.py::test_medium"]
+        durations = {"a.py::test_short": 1, "b.py::test_long": 30, "c.py::test_medium": 10}
+        scheduler, sent = run_schedule(collection, durations, workers=1)
+        assert sent["gw0"] == ["b.py::test_long", "c.py::test_medium", "a.py::test_short"]
+
+    def test_unknown_tests_count_for_the_median(self):
+        durations = {"a": 1.0, "b": 3.0, "c": 5.0}
+        assert plugin_scheduler.estimate(["a", "new@group"], durations) == 4.0
+        assert plugin_scheduler.estimate(["new"], {}) == plugin_scheduler.DEFAULT_DURATION
+
+    def test_lpt_plan_balances_the_workers(self):
+        plan = plugin_scheduler.lpt_plan({"cart": 8, "login": 6, "sort": 5, "list": 3}, 2)
+        assert plan == [(11, ["cart", "list"]), (11, ["login", "sort"])]
+
+    def test_plan_is_reported(self):
+        collection = ["a.py::test_1@cart", "a.py::test_2@cart", "b.py::test_solo"]
+        scheduler, sent = run_schedule(collection, {"a.py::test_1": 2, "a.py::test_2": 2, "b.py::test_solo": 1})
+        plan = scheduler.config.stash[plugin_scheduler.plan_key]
+        assert plan["groups"] == ["cart"]
+        assert plan["makespan"] == 4
+        assert plan["serial"] == 5
+
+
+class TestSession:
+    def test_state_group_runs_on_one_worker_in_file_order(self, pytester, monkeypatch):
+        # The workers import the plugin from the project
+        monkeypatch.setenv("PYTHONPATH", PROJECT_ROOT)
+        pytester.makepyfile(test_grouped=GROUPED_TESTS)
+
+        result = pytester.runpytest_subprocess("-p", "plugins.plugin_scheduler", "-n", "2", "--schedule-by-duration")
+
+        result.assert_outcomes(passed=9)
+        result.stdout.fnmatch_lines(["*state groups: cart*"])
+        ran = dict(line.split() for line in (pytester.path / "workers.log").read_text().splitlines())
+        assert ran["add"] == ran["count"] == ran["remove"]
+        assert len(set(ran.values())) == 2
@@ -0,0 +1,184 @@
+import importlib.util
+import json
+import textwrap
+
+from plugins import plugin_selection
+
+PAGE_SOURCE = textwrap.dedent("""
+    LOCATOR = ".cart_badge"
+
+
+    class PageCart:
+        def count(self):
+            return len([item for item in self.items()])
+
+        def items(self):
+            def visible(item):
+                return item
+            return [visible(item) for item in range(3)]
+
+
+    def helper():
+        return 1
+""")
+
+
+class FakeDriver:
+    def execute(self, command, params):
+        return {"value": None}
+
+
+def write_module(tmp_path, source=PAGE_SOURCE):
+    (tmp_path / "pages").mkdir(exist_ok=True)
+    path = tmp_path / "pages" / "page_fake.py"
+    path.write_text(source, encoding="utf-8")
+    return path
+
+
+def import_module(path):
+    spec = importlib.util.spec_from_file_location("page_fake", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def recorded_entry(tmp_path, index):
+    tracer = plugin_selection.CallTracer(str(tmp_path))
+    page = import_module(write_module(tmp_path)).PageCart()
+    tracer.start()
+    try:
+        page.count()
+    finally:
+        tracer.stop()
+    return {"outcome": "passed", "app_version": "standin/1", "dataset": None,
+            "dependencies": tracer.dependencies(index)}
+
+
+class TestSourceHashes:
+    def test_functions_are_hashed_by_qualified_name(self):
+        hashes = plugin_selection.source_hashes(PAGE_SOURCE)
+
+        assert set(hashes) == {plugin_selection.MODULE, "PageCart.count", "PageCart.items",
+                               "PageCart.items.<locals>.visible", "helper"}
+
+    def test_a_change_only_affects_its_function(self):
+        before = plugin_selection.source_hashes(PAGE_SOURCE)
+        after = plugin_selection.source_hashes(PAGE_SOURCE.replace("range(3)", "range(4)") + "\n# comment\n")
+
+        changed = {name for name in before if before[name] != after[name]}
+        assert changed == {"PageCart.items"}
+
+    def test_module_level_code_is_hashed_without_the_function_bodies(self):
+        before = plugin_selection.source_hashes(PAGE_SOURCE)
+        after = plugin_selection.source_hashes(PAGE_SOURCE.replace('".cart_badge"', '"#cart_badge"'))
+
+        assert before[plugin_selection.MODULE] != after[plugin_selection.MODULE]
+        assert before["helper"] == after["helper"]
+
+
+class TestCallTracer:
+    def test_records_the_project_functions_called(self, tmp_path):
+        index = plugin_selection.SourceIndex(str(tmp_path))
+
+        dependencies = recorded_entry(tmp_path, index)["dependencies"]
+
+        # The nested function and the comprehensions belong to the function they are defined in
+        assert set(dependencies) == {"pages/page_fake.py::PageCart.count", "pages/page_fake.py::PageCart.items",
+                                     "pages/page_fake.py::<module>"}
+        assert all(dependencies.values())
+
+    def test_records_the_locators_looked_up(self, tmp_path):
+        from selenium.webdriver.remote.webdriver import WebDriver
+        tracer = plugin_selection.CallTracer(str(tmp_path))
+
+        tracer.start()
+        try:
+            WebDriver.find_element(FakeDriver(), "css selector", ".shopping_cart_badge")
+        finally:
+            tracer.stop()
+
+        assert tracer.locators == {"css selector=.shopping_cart_badge"}
+        assert tracer.calls == set()
+
+
+class TestDecide:
+    def test_unchanged_passed_test_is_skipped(self, tmp_path):
+        index = plugin_selection.SourceIndex(str(tmp_path))
+        entry = recorded_entry(tmp_path, index)
+
+        run, reason = plugin_selection.decide(entry, None, "standin/1", plugin_selection.SourceIndex(str(tmp_path)))
+
+        assert not run and "unchanged" in reason
+
+    def test_change_of_a_called_function_runs_the_test(self, tmp_path):
+        entry = recorded_entry(tmp_path, plugin_selection.SourceIndex(str(tmp_path)))
+        write_module(tmp_path, PAGE_SOURCE.replace("range(3)", "range(4)"))
+
+        run, reason = plugin_selection.decide(entry, None, "standin/1", plugin_selection.SourceIndex(str(tmp_path)))
+
+        assert run and reason == "changed: pages/page_fake.py::PageCart.items"
+
+    def test_change_of_an_uncalled_function_skips_the_test(self, tmp_path):
+        entry = recorded_entry(tmp_path, plugin_selection.SourceIndex(str(tmp_path)))
+        write_module(tmp_path, PAGE_SOURCE.replace("return 1", "return 2"))
+
+        run, _ = plugin_selection.decide(entry, None, "standin/1", plugin_selection.SourceIndex(str(tmp_path)))
+
+        assert not run
+
+    def test_new_failed_and_other_version_tests_run(self, tmp_path):
+        index = plugin_selection.SourceIndex(str(tmp_path))
+        entry = recorded_entry(tmp_path, index)
+
+        assert plugin_selection.decide(None, None, "standin/1", index) == (True, "new test")
+        assert plugin_selection.decide(dict(entry, outcome="failed"), None, "standin/1", index)[0]
+        assert plugin_selection.decide(entry, None, "live/2", index) == \
+            (True, "app version changed from standin/1")
+        assert plugin_selection.decide(entry, "row-hash", "standin/1", index) == (True, "dataset row changed")
+
+    def test_change_of_a_data_file_runs_the_test(self, tmp_path):
+        (tmp_path / "config.json").write_text('{"app": {"target": "standin"}}', encoding="utf-8")
+        index = plugin_selection.SourceIndex(str(tmp_path))
+        entry = dict(recorded_entry(tmp_path, index))
+        entry["dependencies"] = dict(entry["dependencies"], **{"config.json::<file>": index.file_hash("config.json")})
+        (tmp_path / "config.json").write_text('{"app": {"target": "live"}}', encoding="utf-8")
+
+        run, reason = plugin_selection.decide(entry, None, "standin/1", plugin_selection.SourceIndex(str(tmp_path)))
+
+        assert run and reason == "changed: config.json::<file>"
+
+
+SESSION_FIXTURE_TESTS = """
+import pytest
+
+import helpers
+
+
+@pytest.fixture(scope="session")
+def login():
+    return helpers.log_in()
+
+
+def test_first(login):
+    assert login
+
+
+def test_second(login):
+    assert login
+"""
+
+
+class TestSession:
+    def test_session_fixture_calls_are_dependencies_of_every_test_requesting_it(self, pytester):
+        pytester.makepyfile(helpers="def log_in():\n    return True\n", test_login=SESSION_FIXTURE_TESTS)
+
+        result = pytester.runpytest("-p", "plugins.plugin_selection", "--affected", "--full")
+
+        result.assert_outcomes(passed=2)
+        cache_file = pytester.path / ".pytest_cache" / "v" / plugin_selection.SELECTION_KEY
+        recorded = json.loads(cache_file.read_text(encoding="utf-8"))
+        for name in ("test_first", "test_second"):
+            dependencies = recorded[f"test_login.py::{name}"]["dependencies"]
+            assert "helpers.py::log_in" in dependencies
+            assert "test_login.py::login" in dependencies
+            assert any(dependency.endswith("config.json::<file>") for dependency in dependencies)
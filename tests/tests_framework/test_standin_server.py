@@ -0,0 +1,50 @@
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import time
+import pytest
+
+from standin.server import SwagLabsServer
+
+
+@pytest.fixture
+def standin():
+    with SwagLabsServer() as server:
+        yield server
+
+
+def fetch(url):
+    with urlopen(url, timeout=5) as response:
+        return response.status, response.read().decode("utf-8")
+
+
+class TestSwagLabsServer:
+    def test_login_page_keeps_the_real_locators(self, standin):
+        status, body = fetch(standin.url)
+
+        assert status == 200
+        assert "<title>Swag Labs</title>" in body
+        for locator in ('id="user-name"', 'id="password"', 'id="login-button"'):
+            assert locator in body
+
+    def test_inventory_and_cart_pages_are_served(self, standin):
+        _, inventory = fetch(standin.url + "inventory.html")
+        _, cart = fetch(standin.url + "cart.html")
+
+        assert 'class="product_sort_container"' in inventory
+        assert 'class="shopping_cart_link"' in inventory
+        assert 'class="cart_list"' in cart
+
+    def test_unknown_path_is_not_found(self, standin):
+        with pytest.raises(HTTPError) as error:
+            fetch(standin.url + "missing.html")
+
+        assert error.value.code == 404
+
+    def test_latency_is_added_to_every_request(self):
+        with SwagLabsServer(latency=0.2, jitter=0.05, seed=1) as server:
+            start = time.perf_counter()
+            fetch(server.url + "static/app.js")
+            elapsed = time.perf_counter() - start
+
+        assert elapsed >= 0.15
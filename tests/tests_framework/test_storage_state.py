@@ -0,0 +1,104 @@
+import time
+
+from drivers import storage_state
+
+
+class FakeDriver:
+    """
+    Records the cookies and scripts sent by the storage state cache
+    """
+    def __init__(self):
+        self.cookies = []
+        self.scripts = []
+        self.urls = []
+
+    def add_cookie(self, cookie):
+        self.cookies.append(cookie)
+
+    def get_cookies(self):
+        return [{"name": "session-username", "value": "standard_user", "domain": "www.saucedemo.com",
+                 "path": "/", "expiry": int(time.time()) + 60}]
+
+    def execute_script(self, script, *args):
+        self.scripts.append(args)
+        return {"localStorage": {"cart-contents": "[4]"}, "sessionStorage": {}}
+
+    def get(self, url):
+        self.urls.append(url)
+
+
+def make_cache(tmp_path, ttl=540):
+    return storage_state.StorageStateCache(str(tmp_path), "https://www.saucedemo.com/",
+                                           "standard_user", "secret_sauce", ttl=ttl)
+
+
+class TestStorageStateCache:
+    def test_saved_state_is_loaded_back(self, tmp_path):
+        cache = make_cache(tmp_path)
+        state = cache.capture(FakeDriver())
+        cache.save(state)
+
+        assert cache.load() == state
+
+    def test_state_expires_with_its_cookies(self, tmp_path):
+        cache = make_cache(tmp_path, ttl=3600)
+        state = cache.capture(FakeDriver())
+
+        assert state["expires_at"] <= time.time() + 60
+
+    def test_expired_state_is_ignored(self, tmp_path):
+        cache = make_cache(tmp_path, ttl=0)
+        cache.save(cache.capture(FakeDriver()))
+
+        assert cache.load() is None
+
+    def test_login_injects_saved_state(self, tmp_path):
+        cache = make_cache(tmp_path)
+        cache.save(cache.capture(FakeDriver()))
+        driver = FakeDriver()
+
+        cache.login(driver)
+
+        assert driver.cookies[0]["name"] == "session-username"
+        assert "domain" not in driver.cookies[0]
+        assert driver.scripts[0][0]["localStorage"] == {"cart-contents": "[4]"}
+        assert driver.urls == ["https://www.saucedemo.com/inventory.html"]
+
+
+class FakeSnapshotDriver(FakeDriver):
+    """
+    Driver left on another site by a failed test
+    """
+    def __init__(self):
+        super().__init__()
+        self.current_url = "about:blank"
+        self.window_handles = ["main"]
+        self.switch_to = type("SwitchTo", (), {"window": lambda self, handle: None})()
+        self.cleared = False
+
+    def execute_script(self, script, *args):
+        if script == storage_state.CAPTURE_SNAPSHOT_SCRIPT:
+            return {"url": "https://www.saucedemo.com/cart.html", "localStorage": {"cart-contents": "[4]"},
+                    "sessionStorage": {}}
+        return super().execute_script(script, *args)
+
+    def delete_all_cookies(self):
+        self.cleared = True
+
+    def get(self, url):
+        super().get(url)
+        self.current_url = url
+
+
+class TestBrowserSnapshot:
+    def test_snapshot_is_restored_on_its_page(self):
+        driver = FakeSnapshotDriver()
+        snapshot = storage_state.capture_snapshot(driver)
+
+        storage_state.restore_snapshot(driver, snapshot)
+
+        # Opened once to write the site state, then again so the application reads it
+        assert driver.urls == ["https://www.saucedemo.com/cart.html"] * 2
+        assert driver.cleared
+        assert [cookie["name"] for cookie in driver.cookies] == ["session-username"]
+        assert driver.scripts[-1][0]["localStorage"] == {"cart-contents": "[4]"}
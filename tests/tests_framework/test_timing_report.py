@@ -0,0 +1,89 @@
+import pytest
+
+from drivers import driver_instrumentation
+from pages import page_base
+from plugins import plugin_timing
+
+
+class FakeExecutor:
+    def execute(self, command, params):
+        return {"value": None}
+
+
+class FakeDriver:
+    name = "fake"
+
+    def __init__(self):
+        self.command_executor = FakeExecutor()
+
+    def find_element(self, by, value):
+        return self.command_executor.execute("findElement", {"using": by, "value": value})
+
+
+class PageFake(page_base.PageBase):
+    def open_menu(self):
+        self.browser.find_element("id", "react-burger-menu-btn")
+
+
+def sample(command, duration, nodeid="test_a", caller=None):
+    return {"command": command, "duration": duration, "nodeid": nodeid, "caller": caller}
+
+
+class TestInstrumentation:
+    def test_commands_are_tagged_with_the_page_object_method(self):
+        recorder = driver_instrumentation.CommandRecorder()
+        driver = driver_instrumentation.instrument(FakeDriver(), recorder)
+
+        PageFake(driver).open_menu()
+        driver.find_element("id", "login-button")
+
+        callers = [recorded.caller for recorded in recorder.drain()]
+        assert callers == ["PageFake.open_menu", None]
+
+    def test_driver_is_only_wrapped_once(self):
+        recorder = driver_instrumentation.CommandRecorder()
+        driver = driver_instrumentation.instrument(FakeDriver(), recorder)
+        driver_instrumentation.instrument(driver, recorder)
+
+        driver.find_element("id", "login-button")
+
+        assert len(recorder.drain()) == 1
+
+    def test_disabled_recorder_keeps_no_samples(self):
+        recorder = driver_instrumentation.CommandRecorder(enabled=False)
+        driver = driver_instrumentation.instrument(FakeDriver(), recorder)
+
+        PageFake(driver).open_menu()
+
+        assert recorder.drain() == []
+
+
+class TestTimingReport:
+    def test_percentiles_interpolate_between_ranks(self):
+        values = [0.1, 0.2, 0.3, 0.4, 0.5]
+
+        assert plugin_timing.percentile(values, 50) == pytest.approx(0.3)
+        assert plugin_timing.percentile(values, 95) == pytest.approx(0.48)
+        assert plugin_timing.percentile([], 99) == 0.0
+
+    def test_report_counts_round_trips_per_test(self):
+        report = plugin_timing.build_report([
+            sample("findElement", 0.01), sample("clickElement", 0.02), sample("findElement", 0.01, nodeid="test_b")
+        ])
+
+        assert report["tests"]["test_a"]["round_trips"] == 2
+        assert report["commands"]["findElement"]["count"] == 2
+
+    def test_slower_commands_and_extra_round_trips_are_regressions(self):
+        baseline = plugin_timing.build_report([sample("findElement", 0.01)])
+        report = plugin_timing.build_report([sample("findElement", 0.05), sample("findElement", 0.05)])
+
+        regressions = plugin_timing.compare_to_baseline(report, baseline, tolerance=0.2)
+
+        assert len(regressions) == 2
+
+    def test_small_absolute_changes_are_tolerated(self):
+        baseline = plugin_timing.build_report([sample("getTitle", 0.001)])
+        report = plugin_timing.build_report([sample("getTitle", 0.002)])
+
+        assert plugin_timing.compare_to_baseline(report, baseline, tolerance=0.2) == []
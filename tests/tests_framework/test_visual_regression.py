@@ -0,0 +1,178 @@
+import os
+import pytest
+
+from pages import page_shopping_items, visual_regression
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+OPTIONS = {"pixel_tolerance": 8, "max_diff_ratio": 0.001, "max_hash_distance": 12}
+
+
+def page_image(price_color=(0, 0, 0), width=200, height=120):
+    """
+    Header, two item blocks and a price area
+    """
+    pixels = np.full((height, width, 3), 255, dtype=np.uint8)
+    pixels[:20] = (19, 35, 34)
+    pixels[30:70, 10:90] = (120, 160, 200)
+    pixels[30:70, 110:190] = (200, 120, 90)
+    pixels[80:100, 10:60] = price_color
+    return pixels
+
+
+def job(tmp_path, name, pixels, masks=(), update=False):
+    return {"name": name, "png": visual_regression.encode_png(pixels), "masks": list(masks),
+            "store": str(tmp_path / "baselines"), "results": str(tmp_path / "results"), "options": OPTIONS,
+            "update": update}
+
+
+class FakeScreenshotDriver:
+    """
+    Answers the geometry script and the viewport screenshot
+    """
+    def __init__(self, pixels):
+        self.png = visual_regression.encode_png(pixels)
+        self.calls = []
+
+    def execute_script(self, script, *args):
+        self.calls.append("execute_script")
+        return {"dpr": 1, "element": None, "target": None, "masks": [{"x": 10, "y": 80.5, "width": 50, "height": 20}],
+                "viewport": {"x": 0, "y": 0, "width": 200, "height": 120},
+                "page": {"x": 0, "y": 0, "width": 200, "height": 120}}
+
+    def get_screenshot_as_png(self):
+        self.calls.append("screenshot")
+        return self.png
+
+
+@pytest.fixture
+def checker(tmp_path):
+    visual_checker = visual_regression.CHECKER
+    # Configured by the visual plugin for this run
+    saved = (visual_checker.config, visual_checker.store.root, visual_checker.results_dir, visual_checker.variant,
+             visual_checker.update)
+    config = dict(visual_regression.DEFAULT_CONFIG, workers=0, masks={"default": [], "PageCart": [["class name", "price"]]})
+    visual_checker.configure(config, str(tmp_path / "baselines"), str(tmp_path / "results"), "lean")
+    yield visual_checker
+    visual_checker.close()
+    visual_checker.configure(*saved)
+
+
+class TestImageComparison:
+    def test_perceptual_hash_tells_small_from_large_changes(self):
+        baseline = page_image()
+        moved = np.roll(baseline, 40, axis=1)
+
+        assert visual_regression.hash_distance(visual_regression.dhash(baseline),
+                                               visual_regression.dhash(page_image(price_color=(8, 0, 0)))) <= 2
+        assert visual_regression.hash_distance(visual_regression.dhash(baseline), visual_regression.dhash(moved)) > 12
+
+    def test_mask_boxes_are_rounded_outwards_in_device_pixels(self):
+        boxes = visual_regression.mask_boxes([{"x": 110.5, "y": 30, "width": 10, "height": 5.2}],
+                                             {"x": 100, "y": 20}, device_pixel_ratio=2)
+
+        assert boxes == [[21, 20, 41, 31]]
+
+
+class TestCompare:
+    def test_missing_baseline_is_reported_until_it_is_created(self, tmp_path):
+        result = visual_regression.compare(job(tmp_path, "lean/PageCart/inventory", page_image()))
+
+        assert result["status"] == "missing" and "--update-baselines" in result["message"]
+        assert [os.path.basename(path) for path in result["files"]] == ["inventory-actual.png"]
+        assert visual_regression.BaselineStore(str(tmp_path / "baselines")).get("lean/PageCart/inventory") is None
+
+    def test_updated_screenshot_becomes_the_baseline(self, tmp_path):
+        result = visual_regression.compare(job(tmp_path, "lean/PageCart/inventory", page_image(), update=True))
+
+        assert result["status"] == "new"
+        assert visual_regression.compare(job(tmp_path, "lean/PageCart/inventory", page_image()))["status"] == "identical"
+
+    def test_changes_in_masked_regions_pass(self, tmp_path):
+        visual_regression.compare(job(tmp_path, "lean/PageCart/inventory", page_image(), update=True))
+
+        result = visual_regression.compare(job(tmp_path, "lean/PageCart/inventory", page_image(price_color=(255, 0, 0)),
+                                               masks=[[10, 80, 60, 100]]))
+
+        assert result["status"] == "passed"
+        assert result["diff_ratio"] == 0
+
+    def test_changed_pixels_fail_with_a_diff_image(self, tmp_path):
+        visual_regression.compare(job(tmp_path, "lean/PageCart/inventory", page_image(), update=True))
+
+        result = visual_regression.compare(job(tmp_path, "lean/PageCart/inventory", page_image(price_color=(255, 0, 0))))
+
+        assert result["status"] == "failed"
+        assert result["box"] == [10, 80, 60, 100]
+        assert result["diff_ratio"] == pytest.approx(1000 / 24000, abs=1e-6)
+        assert [os.path.basename(path) for path in result["files"]] == ["inventory-actual.png", "inventory-diff.png"]
+
+    def test_size_change_fails(self, tmp_path):
+        visual_regression.compare(job(tmp_path, "lean/PageCart/inventory", page_image(), update=True))
+
+        result = visual_regression.compare(job(tmp_path, "lean/PageCart/inventory", page_image(height=140)))
+
+        assert result["status"] == "failed" and "size 200x140" in result["message"]
+
+    def test_identical_baselines_are_stored_once(self, tmp_path):
+        visual_regression.compare(job(tmp_path, "lean/PageCart/inventory", page_image(), update=True))
+        visual_regression.compare(job(tmp_path, "lean/PageCart/inventory_sorted", page_image(), update=True))
+
+        store = visual_regression.BaselineStore(str(tmp_path / "baselines"))
+        assert store.get("lean/PageCart/inventory")["digest"] == store.get("lean/PageCart/inventory_sorted")["digest"]
+        assert len(os.listdir(os.path.join(store.root, "objects"))) == 1
+
+
+class TestCheckVisual:
+    def test_page_screenshot_is_compared_with_the_page_masks(self, checker):
+        driver = FakeScreenshotDriver(page_image())
+        checker.update = True
+
+        check = page_shopping_items.PageCart(driver).check_visual("inventory")
+
+        assert driver.calls == ["execute_script", "screenshot"]
+        assert check.future.result()["name"] == "lean/PageCart/inventory"
+        checker.update = False
+        driver.png = visual_regression.encode_png(page_image(price_color=(255, 0, 0)))
+        # The price area is masked by the PageCart masks of the config
+        assert page_shopping_items.PageCart(driver).check_visual("inventory").future.result()["status"] == "passed"
+        assert len(checker.for_test(check.nodeid)) == 2
+
+    def test_comparisons_run_in_the_process_pool(self, checker):
+        checker.config["workers"] = 1
+        checker.update = True
+        driver = FakeScreenshotDriver(page_image())
+
+        check = page_shopping_items.PageCart(driver).check_visual("inventory")
+
+        assert check.future.result(timeout=60)["status"] == "new"
+        assert checker.for_test(check.nodeid) == [check]
+
+
+MISSING_BASELINE_TEST = """
+import numpy as np
+
+from pages import visual_regression
+
+
+def test_page():
+    png = visual_regression.encode_png(np.zeros((10, 10, 3), dtype=np.uint8))
+    visual_regression.CHECKER.submit("PageCart", "inventory", png, [])
+"""
+
+
+class TestSession:
+    def test_check_without_baseline_skips_unless_baselines_are_required(self, pytester, monkeypatch):
+        monkeypatch.setenv("PYTHONPATH", PROJECT_ROOT)
+        pytester.makepyfile(test_page=MISSING_BASELINE_TEST)
+        plugins = ("-p", "plugins.test_context", "-p", "plugins.plugin_visual")
+
+        result = pytester.runpytest_subprocess(*plugins, "-rs")
+        result.assert_outcomes(skipped=1)
+        result.stdout.fnmatch_lines(["*no visual baseline for default/PageCart/inventory*"])
+
+        pytester.runpytest_subprocess(*plugins, "--require-baselines").assert_outcomes(failed=1)
+        pytester.runpytest_subprocess(*plugins, "--update-baselines").assert_outcomes(passed=1)
+        pytester.runpytest_subprocess(*plugins, "--require-baselines").assert_outcomes(passed=1)
@@ -1,59 +1,93 @@
 import pytest
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions
 
-import time
+import functools
 import logging
 
-# Set up logging
-logging.basicConfig(
-    filename='pyselenium_project_log.txt',  # Specify the log file name
-    filemode='a',  # Append to the file instead of overwriting ('w' for overwrite)
-    # Formatting the logging msg: timestamp - severity level - message
-    format='%(asctime)s - %(levelname)s - %(message)s',  # Log message format
-    level=logging.INFO  # Log level
-)
+import settings
+from drivers import browser_contexts, driver_factory, driver_instrumentation, driver_pool
+from pages import dom_waits
+
+# Logging is set up once for the whole run by plugins/plugin_logging.py
 logger = logging.getLogger(__name__)
 
+
+@pytest.fixture(scope="session")
+def browser_pool(base_url, driver_profile, remote_url):
+    """
+    Pool of warm browsers shared by the tests of this pytest process (one pool per xdist worker)
+    """
+    pool_config = settings.get_section("browser_pool")
+    pool = driver_pool.BrowserPool(
+        driver_factory=functools.partial(driver_factory.create_driver, driver_profile, remote_url),
+        start_url=base_url,
+        **pool_config
+    )
+    pool.warm_up()
+
+    yield pool
+
+    pool.close()
+
+
+@pytest.fixture(scope="session")
+def context_host(request, driver_profile):
+    """
+    Driver attached to one Chrome process shared by all the xdist workers, giving each test its own browser context
+    """
+    shared_chrome = browser_contexts.SharedChromeProcess(str(request.config.cache.mkdir("shared_chrome")))
+    try:
+        host = browser_contexts.BrowserContextHost(shared_chrome.acquire(), driver_factory.get_profile(driver_profile))
+    except Exception:
+        shared_chrome.release()
+        raise
+    driver_instrumentation.instrument(host.driver)
+
+    yield host
+
+    host.close()
+    shared_chrome.release()
+
+
 # @pytest.fixture is a decorator used to define a function that serves as a fixture in pytest.
 # Fixtures are responsible for setting up and tearing down resources needed for your tests.
 @pytest.fixture
-def browser():
-    # Setup web driver options
-    # option1: run the tests in headless mode. No browser is visible. comment out if no browser is needed
-    # option2: disables GPU acceleration. Can be helpful in certain env or for performance optimization.
-    # option3: bypasses the OS security model. Can be necessary in some environments, especially when running
-    # ChromeDriver inside containers or other isolated environments.
-    # option4: Sets the window size of the browser to 1920x1080 pixels. Not used in headless mode.
-    # Can be useful if you're running the browser with a visible window.
-    # option5: for not prompting DevTools information. just show the browser from user perspective. note: not used with headless mode
-    options = Options()
-    options.add_argument('--headless')
-    options.add_argument('--disable-gpu')
-    options.add_argument('--no-sandbox')
-    options.add_argument('window-size=1920x1080')
-    options.add_experimental_option("excludeSwitches", ["enable-logging"])
-
-    # Initialize WebDriver. replace browser with desired one.
-    driver = webdriver.Chrome(options=options)
-
-    # Get the website URL to test.
-    driver.get("https://www.saucedemo.com/")
-
-    # Explicit wait for the page title to change to "Swag Labs"
-    WebDriverWait(driver, 10).until(
-        expected_conditions.title_is("Swag Labs")
-    )
+def browser(request, base_url):
+    # pool: each test borrows a warm browser, reset between tests
+    # contexts: each test gets an isolated browser context (own cookies and storage) in a Chrome process shared
+    # by all the workers, which fits many more parallel tests in the memory of a machine
+    if request.config.getoption("execution_mode") == "contexts":
+        host = request.getfixturevalue("context_host")
+        context = host.open_context(base_url)
+        dom_waits.wait_for_title(host.driver, "Swag Labs", timeout=10)
+        logger.info("Setting up the browser in context %s", context.context_id)
+
+        yield host.driver
+
+        host.close_context(context)
+        logger.info("Tearing down completed")
+        return
+
+    # Borrow a browser already on the website, with the "Swag Labs" title loaded
+    browser_pool = request.getfixturevalue("browser_pool")
+    driver = browser_pool.acquire()
 
     # Add some logging information
-    logger.info(f"Setting up the browser with options: {driver.name}")
+    logger.info("Setting up the browser with options: %s", driver.name)
 
     # Generate a driver for each pytest test function
     yield driver
 
-    # Teardown
-    driver.quit()  # Teardown
+    # Teardown: the pool clears cookies and web storage and navigates back instead of quitting the browser
+    browser_pool.release(driver)
+
+    logger.info("Tearing down completed")
 
-    logger.info("Tearing down completed")
\ No newline at end of file
+
+@pytest.fixture
+def logged_in_browser(browser, storage_state_cache):
+    """
+    Browser already logged in and on the inventory page. Only the first test of the run types the credentials,
+    the next ones get the saved cookies and web storage injected
+    """
+    storage_state_cache.login(browser)
+    return browser
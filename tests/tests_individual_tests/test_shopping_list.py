@@ -5,17 +5,13 @@ from selenium.webdriver.support import expected_conditions
 from time import sleep
 
 class TestShoppingCart():
-    def test_shopping_items(self, browser):
+    def test_shopping_items(self, logged_in_browser):
         """
         Test successfully showing sell items
 
-        :param browser: driver passed by conftest.py yield
+        :param logged_in_browser: logged in driver passed by conftest.py
         """
-
-        # Find element using element's id attribute
-        browser.find_element(By.ID, "user-name").send_keys("standard_user")
-        browser.find_element(By.ID, "password").send_keys("secret_sauce")
-        browser.find_element(By.ID, "login-button").click()
+        browser = logged_in_browser
 
         text = WebDriverWait(browser, 5).until(
             expected_conditions.presence_of_element_located((By.CLASS_NAME, "title"))
@@ -33,17 +29,13 @@ class TestShoppingCart():
         assert item_tshirt.is_displayed(), "t-shirt item is not displayed"
         assert item_bike_light.is_displayed(), "bike item is not displayed"
 
-    def test_adding_to_cart(self, browser):
+    def test_adding_to_cart(self, logged_in_browser):
         """
         Test successfully adding to cart
 
-        :param browser: driver passed by conftest.py yield
+        :param logged_in_browser: logged in driver passed by conftest.py
         """
-
-        # Find element using element's id attribute
-        browser.find_element(By.ID, "user-name").send_keys("standard_user")
-        browser.find_element(By.ID, "password").send_keys("secret_sauce")
-        browser.find_element(By.ID, "login-button").click()
+        browser = logged_in_browser
 
         text = WebDriverWait(browser, 5).until(
             expected_conditions.presence_of_element_located((By.CLASS_NAME, "title"))
@@ -1,78 +1,62 @@
 import pytest
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions
 from selenium.webdriver.common.by import By
 
 import time
 import logging
 
-# Set up logging
-logging.basicConfig(
-    filename='pyselenium_project_log.txt',  # Specify the log file name
-    filemode='a',  # Append to the file instead of overwriting ('w' for overwrite)
-    # Formatting the logging msg: timestamp - severity level - message
-    format='%(asctime)s - %(levelname)s - %(message)s',  # Log message format
-    level=logging.INFO  # Log level
-)
+from drivers import browser_daemon
+from pages import dom_waits
+from plugins import plugin_watchdog
+
+# Logging is set up once for the whole run by plugins/plugin_logging.py
 logger = logging.getLogger(__name__)
 
 # @pytest.fixture is a decorator used to define a function that serves as a fixture in pytest.
 # Fixtures are responsible for setting up and tearing down resources needed for your tests.
 @pytest.fixture(scope="session")
-def browser():
-    # Setup web driver options
-    # option1: run the tests in headless mode. No browser is visible. comment out if no browser is needed
-    # option2: disables GPU acceleration. Can be helpful in certain env or for performance optimization.
-    # option3: bypasses the OS security model. Can be necessary in some environments, especially when running
-    # ChromeDriver inside containers or other isolated environments.
-    # option4: Sets the window size of the browser to 1920x1080 pixels. Not used in headless mode.
-    # Can be useful if you're running the browser with a visible window.
-    # option5: for not prompting DevTools information. just show the browser from user perspective. note: not used with headless mode
-    options = Options()
-    # options.add_argument('--headless')
-    options.add_argument('--disable-gpu')
-    options.add_argument('--no-sandbox')
-    options.add_argument('window-size=1920x1080')
-    options.add_experimental_option("excludeSwitches", ["enable-logging"])
-
-    # Initialize WebDriver. replace browser with desired one.
-    driver = webdriver.Chrome(options=options)
-
-    # Get the website URL to test.
-    driver.get("https://www.saucedemo.com/")
-
-    # Explicit wait for the page title to change to "Swag Labs"
-    WebDriverWait(driver, 10).until(
-        expected_conditions.title_is("Swag Labs")
-    )
+def browser(request, base_url, driver_launcher):
+    # Initialize WebDriver with the options of the driver profile (headless, page load strategy, blocked urls...)
+    # See drivers/driver_factory.py and the driver section of config/config.json. With --remote-url the browser
+    # runs on a Selenium Grid, with --browser-daemon it is kept running for the next runs
+    # The browser lives for the whole run: a watchdog samples its memory between tests and replaces it when it
+    # grows past the thresholds of the watchdog section of config.json
+    driver = plugin_watchdog.watch(request.config, driver_launcher)
+
+    def open_start_page(started_driver):
+        # Get the website URL to test.
+        started_driver.get(base_url)
+
+        # Explicit wait for the page title to change to "Swag Labs". Checked in the page on every DOM change, not polled
+        dom_waits.wait_for_title(started_driver, "Swag Labs", timeout=10)
+
+    open_start_page(driver)
+    driver.recycle_hooks.append(open_start_page)
 
     # Add some logging information
-    logger.info(f"Setting up the browser with options: {driver.name}")
+    logger.info("Setting up the browser with options: %s", driver.name)
 
     # Generate a driver for each pytest test function
     yield driver
 
     # Teardown
-    driver.quit()  # Teardown
+    plugin_watchdog.unwatch(request.config, driver)
+    # Quits the browser, or leaves it to the browser daemon for the next run
+    browser_daemon.release(driver)
 
     logger.info("Tearing down completed")
 
 @pytest.fixture(scope="session")
-def login(browser):
+def login(browser, storage_state_cache):
     """
-    Test successful login and keep the logedin session for the rest of the tests
+    Login once and keep the logedin session for the rest of the tests.
+    The login form is only used when no saved storage state is available, otherwise the saved
+    cookies and web storage are injected and the inventory page is opened directly
 
     :return:
     """
-
-    # Find element using element's id attribute
-    browser.find_element(By.ID, "user-name").clear()  # example of clearing the text field
-    browser.find_element(By.ID, "user-name").send_keys("standard_user")
-    browser.find_element(By.ID, "password").send_keys("secret_sauce")
-    browser.find_element(By.ID, "login-button").click()
-    WebDriverWait(browser, 5)
+    storage_state_cache.login(browser)
+    # A recycled browser is logged in again, from the saved storage state
+    browser.recycle_hooks.append(storage_state_cache.login)
 
     text = browser.find_element(By.CLASS_NAME, "title").text
 
@@ -80,4 +64,4 @@ def login(browser):
     assert "products" in text.lower()
 
     # or
-    # assert "inventory" in driver.current_url
\ No newline at end of file
+    # assert "inventory" in driver.current_url
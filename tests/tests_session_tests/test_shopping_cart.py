@@ -1,13 +1,15 @@
+import pytest
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions
 
 class TestShoppingCart:
-    def test_adding_to_cart(self, browser, login):
+    def test_adding_to_cart(self, browser, login, cart_state):
         """
         Test successfully adding to cart
 
         :param browser: driver passed by conftest.py yield
+        :param cart_state: starts with an empty cart
         """
 
         # Selecting some items
@@ -32,68 +34,58 @@ class TestShoppingCart:
 
         assert shopping_cart_element.text == "3", "Expected items in cart is 3"
 
-    def test_add_cheapest_item_in_the_cart(self, browser, login):
+    @pytest.mark.cart_state("sauce-labs-fleece-jacket", "sauce-labs-backpack", "sauce-labs-bolt-t-shirt")
+    def test_add_cheapest_item_in_the_cart(self, browser, login, cart_state):
         """
         Selecting items from list based on prices
 
         :param browser:
         :param login:
+        :param cart_state: starts with three items in the cart
         :return:
         """
 
-        # Find all price elements
-        price_elements = browser.find_elements(By.XPATH, "//div[@class='inventory_item_price']")
-
-        # List of tuples containing price and corresponding button
-        add_to_cart_buttons = []
-
-        # Iterate through price elements to find the minimum price
-        for price_element in price_elements:
-            price_text = price_element.text.replace('$', '')  # Remove the dollar sign
-            price = float(price_text)  # Convert to float
-
-            # Find the corresponding "Add to cart" button
-            add_to_cart_button = price_element.find_element(By.XPATH,
-                                                            "./following-sibling::button")
-
-            item = (price, add_to_cart_button)
-            add_to_cart_buttons.append(item)
-
-        # Using list is intentional. plan to use it to select other items based on price
-        items_sorted_by_price = sorted(add_to_cart_buttons, key=lambda el: (el[0]))
-
-        items_sorted_by_price[0][1].click()
+        # Read every item name, price and "Add to cart" button in one call and click the cheapest one
+        cart_state.add_cheapest_item_to_cart()
 
         shopping_cart_element = WebDriverWait(browser, 10).until(
             expected_conditions.presence_of_element_located((By.CLASS_NAME, "shopping_cart_badge"))
         )
 
-        # There are already added items to the cart
+        # The cart was seeded with three items
         assert shopping_cart_element.text == "4", "Expected items in cart is 4"
 
-    def test_remove_item_from_cart(self, browser, login):
+    @pytest.mark.cart_state("sauce-labs-fleece-jacket", "sauce-labs-backpack", "sauce-labs-bolt-t-shirt", "sauce-labs-onesie")
+    def test_remove_item_from_cart(self, browser, login, cart_state):
         """
         Test removing items from the cart
 
         :param browser: web driver passed by conftest yield
         :param login: login session kept valid and passed to each test
+        :param cart_state: starts with four items in the cart
         :return:
         """
 
-        # Remove a product from the cart
-        remove_buttons = browser.find_elements(By.XPATH, "//button[@class='btn btn_secondary btn_small btn_inventory ' and text()='Remove']")
+        # Remove a product from the cart. The buttons are found in a snapshot of the page, the click goes to the
+        # live button
+        remove_button_xpath = "//button[@class='btn btn_secondary btn_small btn_inventory ' and text()='Remove']"
+        remove_buttons = cart_state.snapshot().find_elements(By.XPATH, remove_button_xpath)
+        assert len(remove_buttons) == 4, "Expected a remove button per item in the cart"
         remove_buttons[0].click()
 
-        # Verify that the cart badge is not displayed anymore
-        cart_badge = browser.find_element(By.CLASS_NAME, "shopping_cart_badge")
-        assert cart_badge.text == '3', "Cart badge not showing the expected number of items in the cart: 1"
+        # Verify the cart badge and the remaining remove buttons from a single new snapshot
+        snapshot = cart_state.snapshot()
+        assert snapshot.find_element(By.CLASS_NAME, "shopping_cart_badge").text == '3', "Cart badge not showing the expected number of items in the cart: 3"
+        assert len(snapshot.find_elements(By.XPATH, remove_button_xpath)) == 3, "Expected 3 remove buttons left"
 
-    def test_add_items_by_their_order_in_the_list(self, browser, login):
+    @pytest.mark.cart_state("sauce-labs-bolt-t-shirt", "sauce-labs-fleece-jacket", "sauce-labs-onesie")
+    def test_add_items_by_their_order_in_the_list(self, browser, login, cart_state):
         """
         Selecting items based on their order in the list of items
 
         :param browser:
         :param login:
+        :param cart_state: starts with three items in the cart
         :return:
         """
 
@@ -109,5 +101,5 @@ class TestShoppingCart:
             expected_conditions.presence_of_element_located((By.CLASS_NAME, "shopping_cart_badge"))
         )
 
-        # There are already added items to the cart
+        # The cart was seeded with three items
         assert shopping_cart_element.text == "4", "Expected items in cart is 4"
\ No newline at end of file
@@ -1,11 +1,13 @@
 from selenium.webdriver.common.by import By
+from pages import page_shopping_items
 
 class TestShoppingList():
-    def test_shopping_items(self, browser, login):
+    def test_shopping_items(self, browser, login, cart_state):
         """
         Test successfully showing sell items
 
         :param browser: driver passed by conftest.py yield
+        :param cart_state: starts with an empty cart, so that the items show their "Add to cart" button
         """
 
         # Check three items are listed in the page
@@ -27,14 +29,13 @@ class TestShoppingList():
         """
 
         # Locate the sorting dropdownlist and choose sorting by price option
-        sort_dropdown = browser.find_element(By.CLASS_NAME, "product_sort_container")
-        sort_dropdown.click()
-        sort_dropdown.find_element(By.XPATH, "//select[@class='product_sort_container']/option[@value='hilo']").click()
+        page_cart = page_shopping_items.PageCart(browser)
+        page_cart.sort_items_by("hilo")
 
         # Verify that the listed products are sorted by price in descending order
-        # 1) First get all the items with the class inventory_item_price. all listed items have the same class name
-        # 2) Convert all the "text" values from the selected items to float after removing the '$'
-        # 3) Assert that values are sorted from High to Low
-        prices = browser.find_elements(By.CLASS_NAME, "inventory_item_price")
-        prices = [float(price.text.replace('$', '')) for price in prices]
-        assert prices == sorted(prices, reverse=True), "Products are not sorted by price in descending order"
\ No newline at end of file
+        # 1) First fetch the page DOM in a single call, the prices and names are then read locally
+        # 2) Assert that values are sorted from High to Low
+        snapshot = page_cart.snapshot()
+        prices = page_cart.get_item_prices(snapshot)
+        assert prices == sorted(prices, reverse=True), "Products are not sorted by price in descending order"
+        assert len(page_cart.get_item_names(snapshot)) == len(prices), "Every listed product should have a name"
@@ -1,26 +1,26 @@
 from selenium.webdriver.common.by import By
-from pages import page_shopping_items
 import pytest
 import logging
 
 logger = logging.getLogger(__name__)
 
 class TestShoppingCart:
-    @pytest.mark.parametrize("by, select_stmt", [
-        (By.XPATH, "//div[a[div[contains(text(), 'Fleece')]]]/following-sibling::div//button[contains(@class, 'btn btn_primary btn_small btn_inventory')]"),
-        (By.CSS_SELECTOR, "button[name='add-to-cart-sauce-labs-backpack']"),
-        (By.CSS_SELECTOR, "button[name='add-to-cart-sauce-labs-bolt-t-shirt']")
-    ])
-    def test_adding_to_cart(self, browser, login, by, select_stmt):
+    # One test per row of config/datasets/cart_items.csv: the item, and the locator strategy and selector of its button
+    @pytest.mark.dataset("cart_items.csv", required=("by", "selector"), id_column="item")
+    def test_adding_to_cart(self, browser, login, cart_state, dataset_row):
         """
         Test successfully adding to cart
 
         :param browser: driver passed by conftest.py yield
+        :param cart_state: starts with an empty cart, so that any item of the dataset can be added
+        :param dataset_row: item to add, streamed from the dataset
         """
 
         # Adding item to cart
-        page_cart = page_shopping_items.PageCart(browser)
+        by = getattr(By, dataset_row["by"])
+        page_cart = cart_state
         items_in_cart_before_adding = page_cart.get_cart_count()
-        page_cart.add_item_to_cart(by=by, item_selector=select_stmt)
+        page_cart.add_item_to_cart(by=by, item_selector=dataset_row["selector"])
         items_in_cart_after_adding = page_cart.get_cart_count()
-        assert items_in_cart_after_adding == items_in_cart_before_adding + 1, f"Expected items in cart is {items_in_cart_before_adding + 1}, actual {items_in_cart_after_adding}"
\ No newline at end of file
+        assert items_in_cart_after_adding == items_in_cart_before_adding + 1, f"Expected items in cart is {items_in_cart_before_adding + 1}, actual {items_in_cart_after_adding}"
+        logger.info("Element cache stats: %s", page_cart.cache_stats())
@@ -0,0 +1,28 @@
+from selenium.webdriver.common.by import By
+from urllib.parse import urljoin
+import pytest
+
+
+class TestVisual:
+    def test_inventory_page(self, browser, login, cart_state):
+        """
+        The inventory page looks like its baseline, see the visual section of config/config.json
+
+        :param cart_state: inventory page with an empty cart
+        """
+        cart_state.check_visual("inventory", full_page=True)
+        cart_state.check_visual("header", locator=(By.CLASS_NAME, "primary_header"))
+
+    @pytest.mark.cart_state("sauce-labs-backpack", "sauce-labs-onesie")
+    def test_cart_page(self, browser, login, cart_state, base_url):
+        """
+        The cart page lists the items of the cart like its baseline
+
+        :param cart_state: inventory page with two items in the cart
+        """
+        cart_state.navigate(urljoin(base_url, "cart.html"))
+        try:
+            cart_state.check_visual("cart_list", locator=(By.CLASS_NAME, "cart_list"))
+        finally:
+            # The next tests of the session start from the inventory page
+            cart_state.navigate(urljoin(base_url, "inventory.html"))